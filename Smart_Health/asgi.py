@@ -2,6 +2,7 @@
 ASGI config for Smart_Health project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Run it under uvicorn workers: gunicorn -c gunicorn_asgi.conf.py
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -12,5 +13,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Smart_Health.settings')
+# Serve the async variants of the Fuseki/Gemini-bound views (see ASYNC_VIEWS)
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -49,9 +49,12 @@ INSTALLED_APPS = [
     'apps.defis',
     'apps.sparql_service',
     'apps.ai_service',
+    'apps.core',
+    'apps.rollups',
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -177,7 +180,117 @@ CSRF_TRUSTED_ORIGINS = [
 # Fuseki Configuration
 FUSEKI_ENDPOINT = os.getenv('FUSEKI_ENDPOINT', 'http://localhost:3030/smarthealth/sparql')
 FUSEKI_UPDATE_ENDPOINT = os.getenv('FUSEKI_UPDATE_ENDPOINT', 'http://localhost:3030/smarthealth/update')
+# Triples per INSERT DATA request when a batch is synced at once
+SPARQL_INSERT_BATCH = int(os.getenv('SPARQL_INSERT_BATCH', '5000'))
+# Seconds before a Fuseki query or update gives up
+SPARQL_TIMEOUT = int(os.getenv('SPARQL_TIMEOUT', '10'))
+
+# Fuseki circuit breaker (apps.sparql_service.breaker): opens when at least
+# SPARQL_BREAKER_MIN_CALLS calls in the last SPARQL_BREAKER_WINDOW seconds failed
+# at SPARQL_BREAKER_FAILURE_RATE or more; a trial call is let through after
+# SPARQL_BREAKER_RESET_SECONDS, and Fuseki is probed every SPARQL_BREAKER_PROBE_INTERVAL
+# seconds while open (0 disables the probe)
+SPARQL_BREAKER_WINDOW = float(os.getenv('SPARQL_BREAKER_WINDOW', '30'))
+SPARQL_BREAKER_MIN_CALLS = int(os.getenv('SPARQL_BREAKER_MIN_CALLS', '3'))
+SPARQL_BREAKER_FAILURE_RATE = float(os.getenv('SPARQL_BREAKER_FAILURE_RATE', '0.5'))
+SPARQL_BREAKER_RESET_SECONDS = float(os.getenv('SPARQL_BREAKER_RESET_SECONDS', '15'))
+SPARQL_BREAKER_PROBE_INTERVAL = float(os.getenv('SPARQL_BREAKER_PROBE_INTERVAL', '5'))
+# Queued updates read per round trip when the retry queue is replayed
+SPARQL_RETRY_BATCH = int(os.getenv('SPARQL_RETRY_BATCH', '100'))
+# Seconds a replaying process owns its batch; a batch left by a dead process is resent after that
+SPARQL_RETRY_CLAIM_SECONDS = float(os.getenv('SPARQL_RETRY_CLAIM_SECONDS', '300'))
+# Seconds a process trusts its last look at the retry queue before checking the table again
+SPARQL_RETRY_PENDING_TTL = float(os.getenv('SPARQL_RETRY_PENDING_TTL', '0.5'))
+# Complete Fuseki updates with the superclass types they imply (rdfs:subClassOf
+# of the ontology), see apps.sparql_service.inference and materialize_types
+SPARQL_MATERIALIZE_TYPES = os.getenv('SPARQL_MATERIALIZE_TYPES', 'True') == 'True'
+
+# Local read replica (apps.sparql_service.replica): SELECT/ASK queries on the
+# default graph are answered from an in-process rdflib copy of Fuseki, kept
+# current by the sparql_changes feed (polled every SPARQL_REPLICA_POLL_SECONDS)
+# and reloaded from a full dump every SPARQL_REPLICA_REFRESH_SECONDS. Queries go
+# to Fuseki while the copy lags more than SPARQL_REPLICA_MAX_STALENESS seconds.
+# Feed rows are kept SPARQL_REPLICA_FEED_RETENTION seconds (keep it above the
+# refresh interval). Each process holds the whole dataset in memory.
+SPARQL_REPLICA_ENABLED = os.getenv('SPARQL_REPLICA_ENABLED', 'False') == 'True'
+SPARQL_REPLICA_POLL_SECONDS = float(os.getenv('SPARQL_REPLICA_POLL_SECONDS', '1'))
+SPARQL_REPLICA_MAX_STALENESS = float(os.getenv('SPARQL_REPLICA_MAX_STALENESS', '30'))
+SPARQL_REPLICA_REFRESH_SECONDS = float(os.getenv('SPARQL_REPLICA_REFRESH_SECONDS', '3600'))
+SPARQL_REPLICA_FEED_RETENTION = int(os.getenv('SPARQL_REPLICA_FEED_RETENTION', '86400'))
+
+# Async variants of the Fuseki/Gemini-bound views (AI query, health record list).
+# Smart_Health/asgi.py turns this on: run it with gunicorn -c gunicorn_asgi.conf.py
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+# Pooled HTTP client shared by the async views (connections per worker, seconds)
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', '100'))
+ASYNC_HTTP_TIMEOUT = float(os.getenv('ASYNC_HTTP_TIMEOUT', '30'))
+# Seconds before the async Gemini service retries listing models after a failure
+GEMINI_MODEL_RETRY_SECONDS = float(os.getenv('GEMINI_MODEL_RETRY_SECONDS', '60'))
 
 # Ontology Configuration
 ONTOLOGY_FILE = BASE_DIR / 'ontology' / 'smarthealth.ttl'
 ONTOLOGY_NAMESPACE = 'http://dhia.org/ontologies/smarthealth#'
+
+# Performance instrumentation (Server-Timing header + structured request log).
+# Requests slower than PERF_SLOW_REQUEST_MS are logged; PERF_SLOW_SAMPLE_RATE of
+# all requests keep their SQL/SPARQL text for that log
+PERF_MIDDLEWARE_ENABLED = os.getenv('PERF_MIDDLEWARE_ENABLED', 'True') == 'True'
+PERF_SLOW_REQUEST_MS = float(os.getenv('PERF_SLOW_REQUEST_MS', '500'))
+PERF_SLOW_SAMPLE_RATE = float(os.getenv('PERF_SLOW_SAMPLE_RATE', '0.1'))
+
+# Seconds the dashboard "recent" lists are cached
+DASHBOARD_RECENT_TTL = int(os.getenv('DASHBOARD_RECENT_TTL', '30'))
+# Rows each dashboard counter is split over, so that concurrent writes don't contend on one row
+DASHBOARD_COUNTER_SHARDS = int(os.getenv('DASHBOARD_COUNTER_SHARDS', '8'))
+
+# Shared cache (catalogue versions, dashboard lists...). Use a backend shared by
+# all workers in production, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds a catalogue version (food items, activities, health metrics, defis) stays in the shared cache
+CATALOGUE_CACHE_TTL = int(os.getenv('CATALOGUE_CACHE_TTL', '3600'))
+
+# Seconds a user's health metric analytics are cached
+HEALTH_ANALYTICS_TTL = int(os.getenv('HEALTH_ANALYTICS_TTL', '60'))
+
+# Online anomaly detection on health readings (apps.health_records.anomalies)
+ANOMALY_Z_THRESHOLD = float(os.getenv('ANOMALY_Z_THRESHOLD', '3.0'))
+ANOMALY_MIN_SAMPLES = int(os.getenv('ANOMALY_MIN_SAMPLES', '5'))
+ANOMALY_EWMA_ALPHA = float(os.getenv('ANOMALY_EWMA_ALPHA', '0.3'))
+
+# Rows fetched per database round trip by the streaming user data export
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+
+# Maximum number of objects accepted by one bulk ingestion request (POST .../bulk/)
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', '1000'))
+
+# Rows per page (and per lazy-loaded chunk) in the HTML time-series lists
+LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', '20'))
+
+# Prometheus /metrics endpoint: scrapers send "Authorization: Bearer <token>";
+# without a token only logged-in staff users can read it
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # Slow requests only; the per-request lines of apps.core.performance
+        # (INFO) are not printed unless a handler is configured for them
+        'apps.core.performance.slow': {
+            'handlers': ['console'],
+            'level': os.getenv('PERF_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
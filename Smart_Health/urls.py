@@ -9,6 +9,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from apps.users.views import home_view, login_view, signup_view, logout_view, dashboard_view
+from apps.core.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -36,6 +37,10 @@ urlpatterns = [
     # API endpoints
     path('api/ai/', include(('apps.ai_service.urls', 'api_ai'), namespace='api_ai')),
     path('api/users/', include('apps.users.urls')),
+    path('api/rollups/', include('apps.rollups.urls', namespace='rollups')),
+    
+    # Monitoring
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Serve media files in development
@@ -0,0 +1,46 @@
+"""
+Bulk creation of activity logs
+Used by ActivityLogViewSet.bulk: the logs and their intensity details are
+inserted with one bulk_create per table. Signals do not fire, so the dashboard
+counter and the rollups are updated here, once for the whole batch.
+"""
+
+from apps.rollups import buckets
+from apps.sparql_service import ntriples
+from apps.users.counters import increment
+
+from .models import ActivityLog, HighIntensityLog, LowIntensityLog, MediumIntensityLog
+
+# item key -> intensity detail model
+INTENSITY_DETAILS = {
+    'low_intensity': LowIntensityLog,
+    'medium_intensity': MediumIntensityLog,
+    'high_intensity': HighIntensityLog,
+}
+
+
+def create_logs(user, items):
+    """
+    Insert validated items (ActivityLogBulkItemSerializer) for `user`; returns
+    the created logs and their N-Triples
+    """
+    logs = ActivityLog.objects.bulk_create([
+        ActivityLog(
+            user=user, activity_id=item['activity_id'], date=item['date'],
+            duration=item['duration'], intensity=item.get('intensity') or None,
+        )
+        for item in items
+    ])
+    details = {model: [] for model in INTENSITY_DETAILS.values()}
+    for log, item in zip(logs, items):
+        for key, model in INTENSITY_DETAILS.items():
+            if item.get(key):
+                details[model].append(model(activity_log=log, **item[key]))
+    for model, rows in details.items():
+        if rows:
+            model.objects.bulk_create(rows)
+
+    increment('activity_logs', len(logs))
+    buckets.add_many(buckets.contribution(log) for log in logs)
+    triples = [line for log in logs for line in ntriples.activity_log_triples(log)]
+    return logs, triples
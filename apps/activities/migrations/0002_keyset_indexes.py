@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['user', '-date', '-activity_log_id'], name='activity_log_user_date_idx'),
+        ),
+    ]
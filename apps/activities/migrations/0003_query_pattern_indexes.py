@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['user', 'intensity', '-date'], name='activitylog_user_intensity_idx'),
+        ),
+    ]
@@ -34,6 +34,10 @@ class ActivityLog(models.Model):
     
     class Meta:
         db_table = 'activity_logs'
+        indexes = [
+            models.Index(fields=['user', '-date', '-activity_log_id'], name='activity_log_user_date_idx'),
+            models.Index(fields=['user', 'intensity', '-date'], name='activitylog_user_intensity_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.activity.activity_name} - {self.date}"
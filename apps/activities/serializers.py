@@ -39,18 +39,21 @@ class LowIntensityLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = LowIntensityLog
         fields = '__all__'
+        read_only_fields = ('activity_log',)
 
 
 class MediumIntensityLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = MediumIntensityLog
         fields = '__all__'
+        read_only_fields = ('activity_log',)
 
 
 class HighIntensityLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = HighIntensityLog
         fields = '__all__'
+        read_only_fields = ('activity_log',)
 
 
 class ActivityLogSerializer(serializers.ModelSerializer):
@@ -65,3 +68,29 @@ class ActivityLogSerializer(serializers.ModelSerializer):
         model = ActivityLog
         fields = '__all__'
         read_only_fields = ('activity_log_id',)
+
+
+class ActivityLogBulkItemSerializer(serializers.Serializer):
+    """
+    One activity log of a bulk upload (ActivityLogViewSet.bulk); the details
+    of its intensity go in the matching key. `activity_ids` comes from the
+    serializer context, loaded once per request.
+    """
+    activity_id = serializers.IntegerField()
+    date = serializers.DateTimeField()
+    duration = serializers.IntegerField(min_value=0)
+    intensity = serializers.ChoiceField(choices=ActivityLog.INTENSITY_CHOICES, required=False, allow_null=True)
+    low_intensity = LowIntensityLogSerializer(required=False)
+    medium_intensity = MediumIntensityLogSerializer(required=False)
+    high_intensity = HighIntensityLogSerializer(required=False)
+    
+    def validate_activity_id(self, value):
+        if value not in self.context['activity_ids']:
+            raise serializers.ValidationError(f'Unknown activity {value}')
+        return value
+    
+    def validate(self, data):
+        for key in ('low_intensity', 'medium_intensity', 'high_intensity'):
+            if key in data and key != f"{(data.get('intensity') or '').lower()}_intensity":
+                raise serializers.ValidationError({key: 'Does not match the intensity of the log'})
+        return data
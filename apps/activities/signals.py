@@ -7,15 +7,18 @@ from django.dispatch import receiver
 from .models import Activity, ActivityLog, Cardio, Musculation, Natation
 from apps.sparql_service.client import SparqlClient
 import logging
+from apps.core import catalogues, typeahead
+from apps.core.metrics import instrument_sync
 
 logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=Activity)
+@instrument_sync('Activity', 'save')
 def sync_activity_to_fuseki(sender, instance, created, **kwargs):
     """Automatically sync Activity to Fuseki when created/updated"""
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         # Determine activity type
         activity_type = 'Activity'
@@ -39,7 +42,7 @@ def sync_activity_to_fuseki(sender, instance, created, **kwargs):
                     sh:activity_description "{instance.activity_description}" .
             }}
             """
-            success = client.execute_update(sparql_insert)
+            success = client.execute_update(sparql_insert, infer=False)
             if success:
                 logger.info(f"Activity {instance.activity_id} synced to Fuseki (created)")
         else:
@@ -60,7 +63,7 @@ def sync_activity_to_fuseki(sender, instance, created, **kwargs):
                 OPTIONAL {{ sh:Activity_{instance.activity_id} sh:activity_description ?oldDesc }}
             }}
             """
-            success = client.execute_update(sparql_update)
+            success = client.execute_update(sparql_update, infer=False)
             if success:
                 logger.info(f"Activity {instance.activity_id} synced to Fuseki (updated)")
     except Exception as e:
@@ -68,10 +71,11 @@ def sync_activity_to_fuseki(sender, instance, created, **kwargs):
 
 
 @receiver(post_delete, sender=Activity)
+@instrument_sync('Activity', 'delete')
 def delete_activity_from_fuseki(sender, instance, **kwargs):
     """Automatically delete Activity from Fuseki when deleted from Django"""
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         sparql_delete = f"""
         PREFIX sh: <http://dhia.org/ontologies/smarthealth#>
@@ -89,18 +93,19 @@ def delete_activity_from_fuseki(sender, instance, **kwargs):
         }}
         """
         
-        client.execute_update(sparql_delete)
-        client.execute_update(sparql_delete_refs)
+        client.execute_update(sparql_delete, infer=False)
+        client.execute_update(sparql_delete_refs, infer=False)
         logger.info(f"Activity {instance.activity_id} deleted from Fuseki")
     except Exception as e:
         logger.error(f"Failed to delete Activity {instance.activity_id} from Fuseki: {str(e)}")
 
 
 @receiver(post_save, sender=ActivityLog)
+@instrument_sync('ActivityLog', 'save')
 def sync_activitylog_to_fuseki(sender, instance, created, **kwargs):
     """Automatically sync ActivityLog to Fuseki when created/updated"""
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         if created:
             sparql_insert = f"""
@@ -123,17 +128,18 @@ def sync_activitylog_to_fuseki(sender, instance, created, **kwargs):
             }}
             """
             
-            client.execute_update(sparql_insert)
+            client.execute_update(sparql_insert, infer=False)
             logger.info(f"ActivityLog {instance.activity_log_id} synced to Fuseki (created)")
     except Exception as e:
         logger.error(f"Failed to sync ActivityLog {instance.activity_log_id} to Fuseki: {str(e)}")
 
 
 @receiver(post_delete, sender=ActivityLog)
+@instrument_sync('ActivityLog', 'delete')
 def delete_activitylog_from_fuseki(sender, instance, **kwargs):
     """Automatically delete ActivityLog from Fuseki when deleted from Django"""
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         sparql_delete = f"""
         PREFIX sh: <http://dhia.org/ontologies/smarthealth#>
@@ -151,8 +157,18 @@ def delete_activitylog_from_fuseki(sender, instance, **kwargs):
         }}
         """
         
-        client.execute_update(sparql_delete)
-        client.execute_update(sparql_delete_refs)
+        client.execute_update(sparql_delete, infer=False)
+        client.execute_update(sparql_delete_refs, infer=False)
         logger.info(f"ActivityLog {instance.activity_log_id} deleted from Fuseki")
     except Exception as e:
         logger.error(f"Failed to delete ActivityLog {instance.activity_log_id} from Fuseki: {str(e)}")
+
+
+# Activity catalogue of the activity log forms
+catalogues.register(
+    'activities',
+    lambda: Activity.objects.select_related('cardio_details', 'musculation_details', 'natation_details')
+    .order_by('-created_at'),
+    [Activity, Cardio, Musculation, Natation],
+)
+typeahead.register('activities', lambda: Activity.objects.all(), 'activity_name')
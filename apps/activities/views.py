@@ -8,21 +8,28 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from apps.core import catalogues
+from apps.core.bulk import BulkCreateMixin
+from apps.core.eager_loading import EagerLoadingMixin, eager_load
+from apps.core.pagination import KeysetCursorPagination, keyset_paginate
+from apps.core.typeahead import TypeaheadMixin
 from django.utils import timezone
 from datetime import datetime
 from .models import Activity, ActivityLog, Cardio, Musculation, Natation, LowIntensityLog, MediumIntensityLog, HighIntensityLog
 from .serializers import (
-    ActivitySerializer, ActivityLogSerializer,
+    ActivitySerializer, ActivityLogSerializer, ActivityLogBulkItemSerializer,
     CardioSerializer, MusculationSerializer, NatationSerializer
 )
+from .bulk import create_logs
 
 
-class ActivityViewSet(viewsets.ModelViewSet):
+class ActivityViewSet(TypeaheadMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Activity model
     """
     queryset = Activity.objects.all()
     serializer_class = ActivitySerializer
+    typeahead_index = 'activities'
     permission_classes = [IsAuthenticated]
     
     @action(detail=True, methods=['get'])
@@ -30,17 +37,21 @@ class ActivityViewSet(viewsets.ModelViewSet):
         """Get all logs for a specific activity"""
         activity = self.get_object()
         logs = activity.logs.all()
-        serializer = ActivityLogSerializer(logs, many=True)
+        serializer = ActivityLogSerializer(eager_load(logs, ActivityLogSerializer), many=True)
         return Response(serializer.data)
 
 
-class ActivityLogViewSet(viewsets.ModelViewSet):
+class ActivityLogViewSet(BulkCreateMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for ActivityLog model
     """
     queryset = ActivityLog.objects.all()
     serializer_class = ActivityLogSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetCursorPagination
+    cursor_ordering = ('-date', '-activity_log_id')
+    bulk_serializer_class = ActivityLogBulkItemSerializer
+    bulk_sync_model = 'ActivityLog'
     
     def get_queryset(self):
         """Filter logs by user if not staff"""
@@ -52,11 +63,20 @@ class ActivityLogViewSet(viewsets.ModelViewSet):
         """Set user from request when creating log"""
         serializer.save(user=self.request.user)
     
+    def get_bulk_context(self):
+        """Valid activity ids, from the cached catalogue"""
+        context = super().get_bulk_context()
+        context['activity_ids'] = {activity.activity_id for activity in catalogues.get('activities')}
+        return context
+    
+    def perform_bulk_create(self, user, items):
+        return create_logs(user, items)
+    
     @action(detail=False, methods=['get'])
     def my_logs(self, request):
         """Get logs for current user"""
         logs = ActivityLog.objects.filter(user=request.user)
-        serializer = self.get_serializer(logs, many=True)
+        serializer = self.get_serializer(self.eager_load(logs), many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -68,11 +88,11 @@ class ActivityLogViewSet(viewsets.ModelViewSet):
         else:
             logs = ActivityLog.objects.filter(user=request.user)
         
-        serializer = self.get_serializer(logs, many=True)
+        serializer = self.get_serializer(self.eager_load(logs), many=True)
         return Response(serializer.data)
 
 
-class CardioViewSet(viewsets.ModelViewSet):
+class CardioViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Cardio activities
     """
@@ -81,7 +101,7 @@ class CardioViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
 
-class MusculationViewSet(viewsets.ModelViewSet):
+class MusculationViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Musculation activities
     """
@@ -90,7 +110,7 @@ class MusculationViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
 
-class NatationViewSet(viewsets.ModelViewSet):
+class NatationViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Natation activities
     """
@@ -104,7 +124,7 @@ class NatationViewSet(viewsets.ModelViewSet):
 @login_required
 def activity_list_view(request):
     """Display list of all activities"""
-    activities = Activity.objects.all().order_by('-created_at')
+    activities = catalogues.get('activities')
     return render(request, 'activities/activity_list.html', {
         'activities': activities
     })
@@ -370,11 +390,14 @@ def activity_delete_view(request, activity_id):
 
 @login_required
 def activity_log_list_view(request):
-    """Display list of user's activity logs"""
-    activity_logs = ActivityLog.objects.filter(user=request.user).select_related('activity', 'user').order_by('-date')
-    return render(request, 'activities/activity_log_list.html', {
-        'activity_logs': activity_logs
-    })
+    """Display list of user's activity logs, one keyset page at a time"""
+    activity_logs = ActivityLog.objects.filter(user=request.user).select_related('activity', 'user')
+    activity_logs, next_cursor = keyset_paginate(request, activity_logs, ('-date', '-activity_log_id'))
+    context = {'activity_logs': activity_logs, 'next_cursor': next_cursor}
+    if request.GET.get('partial'):
+        # Next chunk requested by the lazy loader
+        return render(request, 'activities/_activity_log_cards.html', context)
+    return render(request, 'activities/activity_log_list.html', context)
 
 
 @login_required
@@ -431,7 +454,7 @@ def activity_log_create_view(request):
             errors['intensity'] = "Intensité invalide"
         
         if errors:
-            activities = Activity.objects.all()
+            activities = catalogues.get('activities')
             return render(request, 'activities/activity_log_form.html', {
                 'is_create': True,
                 'activities': activities,
@@ -493,7 +516,7 @@ def activity_log_create_view(request):
         except Exception as e:
             messages.error(request, f"Erreur lors de la création: {str(e)}")
     
-    activities = Activity.objects.all()
+    activities = catalogues.get('activities')
     return render(request, 'activities/activity_log_form.html', {
         'is_create': True,
         'activities': activities
@@ -554,7 +577,7 @@ def activity_log_update_view(request, activity_log_id):
                 errors['duration'] = "La durée doit être un nombre"
         
         if errors:
-            activities = Activity.objects.all()
+            activities = catalogues.get('activities')
             return render(request, 'activities/activity_log_form.html', {
                 'is_create': False,
                 'activity_log': activity_log,
@@ -618,7 +641,7 @@ def activity_log_update_view(request, activity_log_id):
         except Exception as e:
             messages.error(request, f"Erreur lors de la mise à jour: {str(e)}")
     
-    activities = Activity.objects.all()
+    activities = catalogues.get('activities')
     return render(request, 'activities/activity_log_form.html', {
         'is_create': False,
         'activity_log': activity_log,
@@ -898,7 +921,7 @@ class AdminActivityLogCreateView(LoginRequiredMixin, UserPassesTestMixin, Create
         context = super().get_context_data(**kwargs)
         context['is_create'] = True
         context['page_title'] = 'Créer un Journal d\'Activité'
-        context['activities'] = Activity.objects.all()
+        context['activities'] = catalogues.get('activities')
         return context
 
 
@@ -920,7 +943,7 @@ class AdminActivityLogUpdateView(LoginRequiredMixin, UserPassesTestMixin, Update
         context = super().get_context_data(**kwargs)
         context['is_create'] = False
         context['page_title'] = 'Modifier un Journal d\'Activité'
-        context['activities'] = Activity.objects.all()
+        context['activities'] = catalogues.get('activities')
         return context
 
 
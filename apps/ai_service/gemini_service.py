@@ -4,9 +4,27 @@ Real AI-powered prompt to SPARQL converter using Google Gemini
 
 import requests
 from django.conf import settings
+from apps.core import http_client
+from apps.core.instrumentation import track
+from apps.core.metrics import record_gemini_usage
+import logging
 import os
 import json
+import time
 
+logger = logging.getLogger(__name__)
+
+# Use stable model names that are confirmed to work (as of Nov 2025)
+# Prioritize stable 2.5 versions which have better quota and performance
+PREFERRED_MODELS = [
+    "gemini-2.5-flash",         # Best balance of speed and quota (stable)
+    "gemini-flash-latest",      # Always points to latest flash
+    "gemini-2.5-pro",           # More capable but slower (stable)
+    "gemini-pro-latest",        # Always points to latest pro
+]
+# Fallback to most stable known model (as of Nov 2025)
+FALLBACK_MODEL = "gemini-2.5-flash"
+NOT_CONFIGURED = "AI service not configured. Add GEMINI_API_KEY to .env file"
 
 class GeminiAIService:
     """Use Google Gemini AI to convert natural language to SPARQL"""
@@ -27,53 +45,70 @@ class GeminiAIService:
     
     def _find_available_model(self):
         """Try to find an available Gemini model"""
-        # Use stable model names that are confirmed to work (as of Nov 2025)
-        # Prioritize stable 2.5 versions which have better quota and performance
-        models_to_try = [
-            "gemini-2.5-flash",         # Best balance of speed and quota (stable)
-            "gemini-flash-latest",      # Always points to latest flash
-            "gemini-2.5-pro",           # More capable but slower (stable)
-            "gemini-pro-latest",        # Always points to latest pro
-        ]
-        
         # Try to list available models first
         try:
-            response = requests.get(
-                f"{self.base_url}/models?key={self.api_key}",
-                timeout=5
-            )
-            if response.status_code == 200:
-                models_data = response.json().get('models', [])
-                available_models = []
-                for model in models_data:
-                    if 'generateContent' in model.get('supportedGenerationMethods', []):
-                        model_name = model['name'].replace('models/', '')
-                        # Skip only experimental/preview models, keep stable 2.x versions
-                        if '-exp' not in model_name and '-preview' not in model_name and 'thinking' not in model_name:
-                            available_models.append(model_name)
-                
-                # Return first model from our priority list that's available
-                for preferred in models_to_try:
-                    if preferred in available_models:
-                        return preferred
-                
-                # If none of our preferred models, use first available stable model
-                if available_models:
-                    return available_models[0]
+            with track('gemini'):
+                response = requests.get(
+                    f"{self.base_url}/models?key={self.api_key}",
+                    timeout=5
+                )
+            model_name = self._pick_model(response)
+            if model_name:
+                return model_name
         except Exception as e:
             print(f"Could not list models: {e}")
         
-        # Fallback to most stable known model (as of Nov 2025)
-        return "gemini-2.5-flash"
+        return FALLBACK_MODEL
+    
+    def _pick_model(self, response):
+        """Preferred model among those listed by the models endpoint, or None"""
+        if response.status_code != 200:
+            return None
+        models_data = response.json().get('models', [])
+        available_models = []
+        for model in models_data:
+            if 'generateContent' in model.get('supportedGenerationMethods', []):
+                model_name = model['name'].replace('models/', '')
+                # Skip only experimental/preview models, keep stable 2.x versions
+                if '-exp' not in model_name and '-preview' not in model_name and 'thinking' not in model_name:
+                    available_models.append(model_name)
+        
+        # Return first model from our priority list that's available
+        for preferred in PREFERRED_MODELS:
+            if preferred in available_models:
+                return preferred
+        
+        # If none of our preferred models, use first available stable model
+        return available_models[0] if available_models else None
+    
+    def _payload(self, text):
+        return {
+            "contents": [{
+                "parts": [{"text": text}]
+            }]
+        }
     
     def generate_sparql(self, prompt, user_id=None):
         """
         Use Gemini AI to generate SPARQL query from natural language
         """
         if not self.enabled:
-            return None, "AI service not configured. Add GEMINI_API_KEY to .env file"
+            return None, NOT_CONFIGURED
         
-        # Build the AI prompt with context
+        try:
+            with track('gemini'):
+                response = requests.post(
+                    f"{self.api_url}?key={self.api_key}",
+                    headers={'Content-Type': 'application/json'},
+                    json=self._payload(self._sparql_prompt(prompt, user_id)),
+                    timeout=30
+                )
+            return self._sparql_result(response)
+        except Exception as e:
+            return None, self._sparql_error(e)
+    
+    def _sparql_prompt(self, prompt, user_id=None):
+        """Build the AI prompt with context"""
         ontology_context = f"""
 You are a SPARQL query expert. Convert natural language questions to SPARQL queries.
 
@@ -91,7 +126,7 @@ You are a SPARQL query expert. Convert natural language questions to SPARQL quer
 - sh:HealthMetric (has subclasses: HeartRate, Cholesterol, SugarLevel, Oxygen, Weight, Height)
   - Properties: healthMetricId (integer), healthMetricName (string), healthMetricDescription (string), healthMetricUnit (string), healthMetricRecordedAt (dateTime)
   - IMPORTANT: For DELETE/UPDATE operations on HealthMetric, use healthMetricName (string) to identify metrics, NOT healthMetricId (integer)
-- sh:Meal (has subclasses: Breakfast, Lunch, Dinner, Snack) - IMPORTANT: Query for specific types
+- sh:Meal (has subclasses: Breakfast, Lunch, Dinner, Snack)
 - sh:FoodItem (properties: name, calories, protein, carbs)
 - sh:Habit (has subclasses: Reading, Cooking, Drawing, Journaling, Other - for habits like gym, exercise, meditation, etc.)
 - sh:HabitLog (properties: frequency, notes)
@@ -110,8 +145,9 @@ You are a SPARQL query expert. Convert natural language questions to SPARQL quer
 
 **Query Examples:**
 - "show users" → SELECT ?s ?name WHERE {{ ?s a sh:User . OPTIONAL {{ ?s sh:username ?name }} }}
-- "show meals" → SELECT ?s WHERE {{ {{ ?s a sh:Breakfast }} UNION {{ ?s a sh:Lunch }} UNION {{ ?s a sh:Dinner }} UNION {{ ?s a sh:Snack }} }}
-- "show activities" → SELECT ?s WHERE {{ {{ ?s a sh:Cardio }} UNION {{ ?s a sh:Musculation }} UNION {{ ?s a sh:Natation }} }}
+- "show meals" → SELECT ?s WHERE {{ ?s a sh:Meal }}
+- "show breakfasts" → SELECT ?s WHERE {{ ?s a sh:Breakfast }}
+- "show activities" → SELECT ?s WHERE {{ ?s a sh:Activity }}
 - "show health metrics" → SELECT ?metric ?metricId ?metricName ?metricUnit WHERE {{ ?metric a sh:HealthMetric . ?metric sh:healthMetricId ?metricId . ?metric sh:healthMetricName ?metricName . OPTIONAL {{ ?metric sh:healthMetricUnit ?metricUnit }} }}
 
 **INSERT Examples:**
@@ -130,7 +166,7 @@ You are a SPARQL query expert. Convert natural language questions to SPARQL quer
 - "add habit reading books" →
   INSERT DATA {{ sh:Reading_books a sh:Reading ; sh:habit_name "reading books" }}
 - "create habit gym" →
-  INSERT DATA {{ sh:Other_gym a sh:Other ; sh:habit_name "gym" }}
+  INSERT DATA {{ sh:Other_gym a sh:Other , sh:Habit ; sh:habit_name "gym" }}
 - "create health metric weight in kg" →
   INSERT DATA {{ sh:Weight_metric a sh:Weight ; sh:healthMetricName "weight" ; sh:healthMetricUnit "kg" }}
 - "add challenge 30 day fitness" →
@@ -155,11 +191,12 @@ You are a SPARQL query expert. Convert natural language questions to SPARQL quer
 1. Generate ONLY the SPARQL query, no explanations
 2. Always include PREFIX definitions
 3. Use the sh: namespace for all ontology terms
-4. **FOR PARENT CLASSES WITH SUBCLASSES**:
-   - **Meal, Activity, Habit**: For SELECT queries, use UNION to query ALL subclasses
-     Example: For "show meals", query: {{ ?s a sh:Breakfast }} UNION {{ ?s a sh:Lunch }} UNION {{ ?s a sh:Dinner }} UNION {{ ?s a sh:Snack }}
-   - **HealthMetric**: Query the parent class directly (sh:HealthMetric) because instances are stored as HealthMetric, not as subclasses
-     Example: For "health metrics", query: ?metric a sh:HealthMetric
+4. **FOR PARENT CLASSES WITH SUBCLASSES** (User, Meal, Activity, Habit, HealthMetric): every instance is also typed with its parent class
+   - To get all of them, query the parent class directly, do NOT use UNION over the subclasses
+     Example: For "show meals", query: ?s a sh:Meal
+   - To get one kind only, query the subclass
+     Example: For "show breakfasts", query: ?s a sh:Breakfast
+   - For INSERT, typing with the subclass is enough (e.g. sh:Breakfast_pancakes a sh:Breakfast)
 5. **FOR DELETE OPERATIONS**: DO NOT use UNION in DELETE WHERE. Match by unique property (name, ID, etc.) without specifying the class type
    - Example: DELETE WHERE {{ ?h sh:habit_name "test" . ?h ?p ?o }} (NOT: {{ ?h a sh:Other ; sh:habit_name "test" . ?h ?p ?o }})
    - Example: DELETE WHERE {{ ?m sh:name "pancakes" . ?m ?p ?o }} (for meals)
@@ -185,57 +222,45 @@ You are a SPARQL query expert. Convert natural language questions to SPARQL quer
             ontology_context += f"\n**User ID:** {user_id}"
         
         ontology_context += "\n\n**SPARQL Query:**"
-        
-        try:
-            # Use REST API directly
-            headers = {'Content-Type': 'application/json'}
-            payload = {
-                "contents": [{
-                    "parts": [{"text": ontology_context}]
-                }]
-            }
-            
-            response = requests.post(
-                f"{self.api_url}?key={self.api_key}",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                error_detail = response.text
-                
-                # Parse error for better user feedback
-                if response.status_code == 429:
-                    try:
-                        error_json = response.json()
-                        if 'error' in error_json and 'message' in error_json['error']:
-                            message = error_json['error']['message']
-                            if 'quota' in message.lower():
-                                return None, "❌ API Quota Exceeded: You've hit the free tier limit (200 requests/day). Please wait or upgrade your plan at: https://ai.google.dev/pricing"
-                    except:
-                        pass
-                    return None, "❌ API Rate Limit: Too many requests. Please wait a moment and try again."
-                elif response.status_code == 404:
-                    return None, f"❌ Model Not Found: The model '{self.model_name}' is not available. Trying to find alternative..."
-                
-                return None, f"AI API Error: {response.status_code} - {error_detail}"
-            
-            result = response.json()
-            sparql_query = result['candidates'][0]['content']['parts'][0]['text'].strip()
-            
-            # Clean up the response - extract just the SPARQL query
-            sparql_query = self._clean_sparql(sparql_query)
+        return ontology_context
+    
+    def _sparql_result(self, response):
+        """(sparql_query, error) from the generateContent response"""
+        if response.status_code != 200:
+            error_detail = response.text
             
-            return sparql_query, None
+            # Parse error for better user feedback
+            if response.status_code == 429:
+                try:
+                    error_json = response.json()
+                    if 'error' in error_json and 'message' in error_json['error']:
+                        message = error_json['error']['message']
+                        if 'quota' in message.lower():
+                            return None, "❌ API Quota Exceeded: You've hit the free tier limit (200 requests/day). Please wait or upgrade your plan at: https://ai.google.dev/pricing"
+                except:
+                    pass
+                return None, "❌ API Rate Limit: Too many requests. Please wait a moment and try again."
+            elif response.status_code == 404:
+                return None, f"❌ Model Not Found: The model '{self.model_name}' is not available. Trying to find alternative..."
             
-        except Exception as e:
-            error_msg = f"AI Error: {str(e)}"
-            if "API_KEY" in str(e).upper():
-                error_msg = "Invalid or missing GEMINI_API_KEY. Get your free key at: https://makersuite.google.com/app/apikey"
-            elif "timeout" in str(e).lower():
-                error_msg = "AI service timeout. Please try again."
-            return None, error_msg
+            return None, f"AI API Error: {response.status_code} - {error_detail}"
+        
+        result = response.json()
+        record_gemini_usage(result)
+        sparql_query = result['candidates'][0]['content']['parts'][0]['text'].strip()
+        
+        # Clean up the response - extract just the SPARQL query
+        sparql_query = self._clean_sparql(sparql_query)
+        
+        return sparql_query, None
+    
+    def _sparql_error(self, e):
+        error_msg = f"AI Error: {str(e)}"
+        if "API_KEY" in str(e).upper():
+            error_msg = "Invalid or missing GEMINI_API_KEY. Get your free key at: https://makersuite.google.com/app/apikey"
+        elif "timeout" in str(e).lower():
+            error_msg = "AI service timeout. Please try again."
+        return error_msg
     
     def _clean_sparql(self, text):
         """Extract and clean SPARQL query from AI response"""
@@ -256,7 +281,18 @@ You are a SPARQL query expert. Convert natural language questions to SPARQL quer
         if not self.enabled:
             return "query"
         
-        intent_prompt = f"""
+        try:
+            with track('gemini'):
+                response = requests.post(
+                    f"{self.api_url}?key={self.api_key}",
+                    json=self._payload(self._intent_prompt(prompt))
+                )
+            return self._intent_result(response)
+        except Exception:
+            return 'query'
+    
+    def _intent_prompt(self, prompt):
+        return f"""
 Analyze this prompt and return ONLY ONE WORD:
 - "query" if it's asking for information
 - "insert" if it's creating/adding new data
@@ -266,23 +302,13 @@ Analyze this prompt and return ONLY ONE WORD:
 Prompt: {prompt}
 
 Intent:"""
-        
-        try:
-            payload = {
-                "contents": [{
-                    "parts": [{"text": intent_prompt}]
-                }]
-            }
-            response = requests.post(
-                f"{self.api_url}?key={self.api_key}",
-                json=payload
-            )
-            if response.status_code == 200:
-                result = response.json()
-                intent = result['candidates'][0]['content']['parts'][0]['text'].strip().lower()
-                return intent if intent in ['query', 'insert', 'update', 'delete'] else 'query'
-        except Exception:
-            pass
+    
+    def _intent_result(self, response):
+        if response.status_code == 200:
+            result = response.json()
+            record_gemini_usage(result)
+            intent = result['candidates'][0]['content']['parts'][0]['text'].strip().lower()
+            return intent if intent in ['query', 'insert', 'update', 'delete'] else 'query'
         return 'query'
     
     def extract_entities(self, prompt):
@@ -290,7 +316,18 @@ Intent:"""
         if not self.enabled:
             return {}
         
-        entity_prompt = f"""
+        try:
+            with track('gemini'):
+                response = requests.post(
+                    f"{self.api_url}?key={self.api_key}",
+                    json=self._payload(self._entity_prompt(prompt))
+                )
+            return self._entities_result(response)
+        except Exception:
+            return {}
+    
+    def _entity_prompt(self, prompt):
+        return f"""
 Extract entities from this prompt and return as JSON:
 {{
   "user_id": null or number,
@@ -303,24 +340,93 @@ Extract entities from this prompt and return as JSON:
 Prompt: {prompt}
 
 JSON:"""
-        
-        try:
-            payload = {
-                "contents": [{
-                    "parts": [{"text": entity_prompt}]
-                }]
-            }
-            response = requests.post(
-                f"{self.api_url}?key={self.api_key}",
-                json=payload
+    
+    def _entities_result(self, response):
+        if response.status_code == 200:
+            result = response.json()
+            record_gemini_usage(result)
+            json_str = result['candidates'][0]['content']['parts'][0]['text'].strip()
+            # Extract JSON from response
+            if "{" in json_str:
+                json_str = json_str[json_str.index("{"):json_str.rindex("}")+1]
+            return json.loads(json_str)
+        return {}
+
+
+class AsyncGeminiAIService(GeminiAIService):
+    """
+    GeminiAIService for async views: same prompts and parsing, requests sent
+    through the shared pooled HTTP client. The model is discovered once per
+    process (first call of ensure_model()) instead of on every instantiation.
+    When the models endpoint fails, FALLBACK_MODEL is used without being
+    cached, and the discovery is retried after GEMINI_MODEL_RETRY_SECONDS.
+    """
+    
+    _models = {}  # api key -> model name
+    _retry_at = {}  # api key -> monotonic time before which discovery is not retried
+    
+    def __init__(self):
+        self.api_key = os.getenv('GEMINI_API_KEY', '')
+        self.enabled = bool(self.api_key)
+        self.base_url = "https://generativelanguage.googleapis.com/v1beta"
+        self.model_name = self._models.get(self.api_key)
+        self.api_url = self._model_url()
+    
+    def _model_url(self):
+        if not self.model_name:
+            return None
+        return f"{self.base_url}/models/{self.model_name}:generateContent"
+    
+    async def ensure_model(self):
+        if not self.enabled or self.model_name:
+            return
+        model_name = None
+        discover = time.monotonic() >= self._retry_at.get(self.api_key, 0)
+        if discover:
+            try:
+                with track('gemini'):
+                    response = await http_client.get_client().get(
+                        f"{self.base_url}/models?key={self.api_key}", timeout=5
+                    )
+                model_name = self._pick_model(response)
+            except Exception as e:
+                logger.warning(f"Could not list Gemini models, using {FALLBACK_MODEL}: {e}")
+        if model_name:
+            self._models[self.api_key] = model_name
+        elif discover:
+            retry = getattr(settings, 'GEMINI_MODEL_RETRY_SECONDS', 60)
+            self._retry_at[self.api_key] = time.monotonic() + retry
+        self.model_name = model_name or FALLBACK_MODEL
+        self.api_url = self._model_url()
+    
+    async def _generate(self, text):
+        await self.ensure_model()
+        with track('gemini'):
+            return await http_client.get_client().post(
+                f"{self.api_url}?key={self.api_key}", json=self._payload(text)
             )
-            if response.status_code == 200:
-                result = response.json()
-                json_str = result['candidates'][0]['content']['parts'][0]['text'].strip()
-                # Extract JSON from response
-                if "{" in json_str:
-                    json_str = json_str[json_str.index("{"):json_str.rindex("}")+1]
-                return json.loads(json_str)
+    
+    async def generate_sparql(self, prompt, user_id=None):
+        if not self.enabled:
+            return None, NOT_CONFIGURED
+        try:
+            response = await self._generate(self._sparql_prompt(prompt, user_id))
+            return self._sparql_result(response)
+        except Exception as e:
+            return None, self._sparql_error(e)
+    
+    async def analyze_intent(self, prompt):
+        if not self.enabled:
+            return 'query'
+        try:
+            return self._intent_result(await self._generate(self._intent_prompt(prompt)))
         except Exception:
-            pass
-        return {}
+            return 'query'
+    
+    async def extract_entities(self, prompt):
+        if not self.enabled:
+            return {}
+        try:
+            return self._entities_result(await self._generate(self._entity_prompt(prompt)))
+        except Exception:
+            return {}
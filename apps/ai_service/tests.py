@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+from unittest import mock
+from django.test import AsyncRequestFactory, TestCase
+from django.urls import reverse
+from apps.sparql_service.breaker import OPEN, breaker
+from apps.sparql_service.client import SparqlClient
+from . import views
+from .gemini_service import AsyncGeminiAIService, GeminiAIService
+
+
+class AIQueryViewTest(TestCase):
+    """Test cases for the AI query endpoint, Gemini mocked"""
+    
+    SELECT = 'PREFIX sh: <http://dhia.org/ontologies/smarthealth#>\nSELECT ?meal WHERE { ?meal a sh:Meal }'
+    
+    def setUp(self):
+        patches = [
+            mock.patch.dict(os.environ, {'GEMINI_API_KEY': 'test-key'}),
+            mock.patch.object(GeminiAIService, '_find_available_model', return_value='gemini-test'),
+            mock.patch.object(GeminiAIService, 'analyze_intent', return_value='query'),
+            mock.patch.object(GeminiAIService, 'generate_sparql', return_value=(self.SELECT, None)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(breaker.reset)
+    
+    def test_open_circuit_is_reported_as_fuseki_unavailable(self):
+        """Test a query refused by the open circuit breaker gets the 503 with the setup instructions"""
+        for _ in range(breaker.min_calls):
+            breaker.record(True)
+        self.assertEqual(breaker.state, OPEN)
+        response = self.client.post(
+            reverse('api_ai:ai-query'), {'prompt': 'show my meals', 'user_id': 1}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['error'], 'Fuseki server is not running')
+        self.assertTrue(response.json()['setup_instructions'])
+
+
+class AsyncAIQueryViewTest(TestCase):
+    """Test cases for the async AI query view, Gemini and Fuseki mocked"""
+    
+    INSERT = 'PREFIX sh: <http://dhia.org/ontologies/smarthealth#>\nINSERT DATA { sh:Meal_9 a sh:Meal }'
+    
+    def setUp(self):
+        self.analyzed = asyncio.Event()
+        self.extracted = asyncio.Event()
+        self.synced = []
+        
+        async def extract_entities(service, prompt):
+            self.extracted.set()
+            await self.analyzed.wait()  # only returns if intent analysis runs at the same time
+            return {'user_id': 7}
+        
+        async def analyze_intent(service, prompt):
+            self.analyzed.set()
+            await self.extracted.wait()
+            return 'insert'
+        
+        def sync_insert(sparql_query, user_id):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                self.synced.append((sparql_query, user_id))  # in a thread, off the event loop
+            return True
+        
+        patches = [
+            mock.patch.dict(os.environ, {'GEMINI_API_KEY': 'test-key'}),
+            mock.patch.object(AsyncGeminiAIService, 'ensure_model', mock.AsyncMock()),
+            mock.patch.object(AsyncGeminiAIService, 'extract_entities', extract_entities),
+            mock.patch.object(AsyncGeminiAIService, 'analyze_intent', analyze_intent),
+            mock.patch.object(AsyncGeminiAIService, 'generate_sparql', mock.AsyncMock(return_value=(self.INSERT, None))),
+            mock.patch.object(views, 'sync_insert_from_fuseki_to_django', sync_insert),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+    
+    async def post(self, prompt):
+        request = AsyncRequestFactory().post(
+            '/api/ai/query/', json.dumps({'prompt': prompt}), content_type='application/json'
+        )
+        response = await asyncio.wait_for(views.AsyncAIQueryView.as_view()(request), timeout=5)
+        return response.status_code, json.loads(response.content)
+    
+    async def test_insert_is_sent_then_synced_to_django(self):
+        """Test entities and intent are asked concurrently, and the Django sync runs in a thread"""
+        with mock.patch.object(SparqlClient, 'aexecute_update', mock.AsyncMock(return_value=True)) as update:
+            code, body = await self.post('add a meal')
+        self.assertEqual(code, 200)
+        self.assertEqual((body['intent'], body['action'], body['user_id']), ('insert', 'insert', 7))
+        update.assert_awaited_once_with(self.INSERT)
+        self.assertEqual(self.synced, [(self.INSERT, 7)])
+    
+    async def test_unreachable_fuseki_is_reported_as_unavailable(self):
+        """Test a connection failure of the Fuseki update gets the 503 and nothing is synced"""
+        refused = mock.AsyncMock(side_effect=ConnectionRefusedError('Connection refused'))
+        with mock.patch.object(SparqlClient, 'aexecute_update', refused):
+            code, body = await self.post('add a meal')
+        self.assertEqual(code, 503)
+        self.assertEqual(body['error'], 'Fuseki server is not running')
+        self.assertEqual(self.synced, [])
@@ -1,10 +1,11 @@
+from django.conf import settings
 from django.urls import path
-from .views import AIQueryView
+from .views import AIQueryView, AsyncAIQueryView
 from .test_views import test_ai_view
 
 app_name = 'ai_service'
 
 urlpatterns = [
-    path('query/', AIQueryView.as_view(), name='ai-query'),
+    path('query/', (AsyncAIQueryView if settings.ASYNC_VIEWS else AIQueryView).as_view(), name='ai-query'),
     path('test/', test_ai_view, name='ai-test'),
 ]
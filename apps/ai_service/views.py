@@ -2,13 +2,20 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
+from django.http import JsonResponse
+from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from asgiref.sync import sync_to_async
 # Updated regex patterns for meal sync - v2
 from django.conf import settings
+from apps.sparql_service.breaker import CircuitOpenError, is_transport_error
 from apps.sparql_service.client import SparqlClient
 from apps.sparql_service.formatter import SparqlResultFormatter
-from .gemini_service import GeminiAIService
+from apps.core.metrics import AI_INTENTS
+from .gemini_service import GeminiAIService, AsyncGeminiAIService
+import asyncio
+import json
 import logging
 import re
 
@@ -532,6 +539,190 @@ def sync_delete_from_fuseki_to_django(sparql_query):
         return False
 
 
+FUSEKI_SETUP_INSTRUCTIONS = [
+    '1. Start Fuseki server:',
+    '   Option A - Using Docker:',
+    '   docker-compose up -d fuseki',
+    '   ',
+    '   Option B - Manual (if installed):',
+    '   cd C:\\apache-jena-fuseki-5.2.0',
+    '   .\\fuseki-server.bat --update --mem /smarthealth',
+    '2. Verify Fuseki is running at: http://localhost:3030',
+]
+
+AI_NOT_CONFIGURED = {
+    'success': False,
+    'error': 'AI service not configured',
+    'setup_instructions': [
+        '1. Get free API key: https://makersuite.google.com/app/apikey',
+        '2. Add to .env file: GEMINI_API_KEY=your_key_here',
+        '3. Restart Django server'
+    ]
+}
+
+AI_QUERY_EXAMPLES = {
+    'query_examples': [
+        {
+            'prompt': 'Show me all users',
+            'description': 'Retrieves all users from the system',
+            'type': 'SELECT'
+        },
+        {
+            'prompt': 'What are the activities for user 1?',
+            'description': 'Gets activity logs for a specific user',
+            'type': 'SELECT'
+        },
+        {
+            'prompt': 'Show me health metrics for user 1',
+            'description': 'Retrieves health metrics for a specific user',
+            'type': 'SELECT'
+        },
+        {
+            'prompt': 'What meals does user 1 have?',
+            'description': 'Gets meal information for a specific user',
+            'type': 'SELECT'
+        },
+        {
+            'prompt': 'Show me all challenges',
+            'description': 'Lists all available challenges',
+            'type': 'SELECT'
+        }
+    ],
+    'insert_examples': [
+        {
+            'prompt': 'Add a new user named Alice with email alice@example.com',
+            'description': 'Creates a new user in the system',
+            'type': 'INSERT'
+        },
+        {
+            'prompt': 'Create a cardio activity called Running',
+            'description': 'Adds a new cardio activity',
+            'type': 'INSERT'
+        },
+        {
+            'prompt': 'Add a breakfast meal with 500 calories',
+            'description': 'Creates a new breakfast meal entry',
+            'type': 'INSERT'
+        },
+        {
+            'prompt': 'Create a new challenge called 30-Day Fitness',
+            'description': 'Adds a new challenge/defi',
+            'type': 'INSERT'
+        }
+    ],
+    'update_examples': [
+        {
+            'prompt': 'Update user Alice email to newalice@example.com',
+            'description': 'Changes the email of an existing user',
+            'type': 'UPDATE'
+        },
+        {
+            'prompt': 'Change the duration of Running activity to 45 minutes',
+            'description': 'Modifies an activity\'s duration',
+            'type': 'UPDATE'
+        },
+        {
+            'prompt': 'Set meal calories to 600 for breakfast',
+            'description': 'Updates the calorie count of a meal',
+            'type': 'UPDATE'
+        }
+    ],
+    'delete_examples': [
+        {
+            'prompt': 'Delete user Alice',
+            'description': 'Removes a user from the system',
+            'type': 'DELETE'
+        },
+        {
+            'prompt': 'Remove activity Running',
+            'description': 'Deletes an activity',
+            'type': 'DELETE'
+        },
+        {
+            'prompt': 'Delete the breakfast meal',
+            'description': 'Removes a meal entry',
+            'type': 'DELETE'
+        }
+    ],
+    'usage': {
+        'endpoint': '/api/ai/query/',
+        'method': 'POST',
+        'body': {
+            'prompt': 'Your natural language query/command',
+            'user_id': 'Optional: specific user ID (can be extracted from prompt)'
+        }
+    },
+    'capabilities': [
+        'Query data with natural language (SELECT)',
+        'Insert new data (INSERT)',
+        'Update existing data (UPDATE)',
+        'Delete data (DELETE)',
+        'AI-powered intent detection',
+        'Automatic entity extraction'
+    ]
+}
+
+
+def is_connection_error(e):
+    """True when `e` means Fuseki could not be reached (or the circuit breaker is open)"""
+    return isinstance(e, CircuitOpenError) or is_transport_error(e)
+
+
+def sparql_failure(e, sparql_query, update):
+    """(response body, status) for a failed SPARQL query (update=False) or update"""
+    import traceback
+    error_msg = str(e)
+    error_type = type(e).__name__
+    
+    # Log the malformed SPARQL for debugging
+    if update and ('Parse error' in error_msg or 'badly formed' in error_msg or 'QueryBadFormed' in error_msg):
+        logger.error(f"❌ MALFORMED SPARQL QUERY:")
+        logger.error(f"Error: {error_msg}")
+        logger.error(f"SPARQL:\n{sparql_query}")
+        return {
+            'success': False,
+            'error': f'Malformed SPARQL query: {error_msg}',
+            'sparql_query': sparql_query,
+            'hint': 'The AI generated invalid SPARQL syntax. Please try rephrasing your request.'
+        }, status.HTTP_400_BAD_REQUEST
+    
+    if is_connection_error(e):
+        retry = '3. Retry your operation after starting Fuseki' if update else '3. Refresh this page after starting Fuseki'
+        return {
+            'success': False,
+            'error': 'Fuseki server is not running',
+            'message': 'Cannot connect to Fuseki server. Please start Fuseki server first.',
+            'setup_instructions': FUSEKI_SETUP_INSTRUCTIONS + [retry],
+            'sparql_query': sparql_query,
+            'error_details': error_msg if settings.DEBUG else None
+        }, status.HTTP_503_SERVICE_UNAVAILABLE
+    
+    if not update:
+        return {
+            'success': False,
+            'error': f'Error executing SPARQL query: {error_msg}',
+            'sparql_query': sparql_query,
+            'error_type': error_type,
+            'traceback': traceback.format_exc() if settings.DEBUG else None
+        }, status.HTTP_500_INTERNAL_SERVER_ERROR
+    
+    # Log the error for debugging
+    logger.error(f"SPARQL update error: {error_msg}")
+    logger.error(f"SPARQL query: {sparql_query}")
+    logger.error(f"Error type: {error_type}")
+    if settings.DEBUG:
+        logger.error(f"Traceback: {traceback.format_exc()}")
+    
+    return {
+        'success': False,
+        'error': f'Error executing SPARQL update: {error_msg}',
+        'message': 'The SPARQL query failed. Please check the query syntax and try again.',
+        'sparql_query': sparql_query,
+        'error_type': error_type,
+        'traceback': traceback.format_exc() if settings.DEBUG else None
+    }, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
 # ============================================================================
 # API VIEWS
 # ============================================================================
@@ -560,15 +751,7 @@ class AIQueryView(APIView):
             
             # Check if AI is configured
             if not ai_service.enabled:
-                return Response({
-                    'success': False,
-                    'error': 'AI service not configured',
-                    'setup_instructions': [
-                        '1. Get free API key: https://makersuite.google.com/app/apikey',
-                        '2. Add to .env file: GEMINI_API_KEY=your_key_here',
-                        '3. Restart Django server'
-                    ]
-                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                return Response(AI_NOT_CONFIGURED, status=status.HTTP_503_SERVICE_UNAVAILABLE)
             
             # Extract user ID if not provided
             if not user_id:
@@ -577,6 +760,7 @@ class AIQueryView(APIView):
             
             # Analyze intent using AI
             intent = ai_service.analyze_intent(prompt)
+            AI_INTENTS.inc(intent=intent)
             
             # Generate SPARQL query using AI
             try:
@@ -664,70 +848,8 @@ class AIQueryView(APIView):
                             'sparql_query': sparql_query
                         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
                 except Exception as e:
-                    import urllib.error
-                    import traceback
-                    error_msg = str(e)
-                    error_type = type(e).__name__
-                    
-                    # Log the malformed SPARQL for debugging
-                    if 'Parse error' in error_msg or 'badly formed' in error_msg or 'QueryBadFormed' in error_msg:
-                        logger.error(f"❌ MALFORMED SPARQL QUERY:")
-                        logger.error(f"Error: {error_msg}")
-                        logger.error(f"SPARQL:\n{sparql_query}")
-                        return Response({
-                            'success': False,
-                            'error': f'Malformed SPARQL query: {error_msg}',
-                            'sparql_query': sparql_query,
-                            'hint': 'The AI generated invalid SPARQL syntax. Please try rephrasing your request.'
-                        }, status=status.HTTP_400_BAD_REQUEST)
-                    
-                    # Check for connection errors (more comprehensive)
-                    is_connection_error = (
-                        isinstance(e, urllib.error.URLError) or
-                        isinstance(e, ConnectionError) or
-                        'ConnectionRefusedError' in error_msg or
-                        'WinError 10061' in error_msg or
-                        'Connection refused' in error_msg.lower() or
-                        'cannot connect' in error_msg.lower() or
-                        'target machine actively refused' in error_msg.lower() or
-                        error_type == 'ConnectionRefusedError'
-                    )
-                    
-                    if is_connection_error:
-                        return Response({
-                            'success': False,
-                            'error': 'Fuseki server is not running',
-                            'message': 'Cannot connect to Fuseki server. Please start Fuseki server first.',
-                            'setup_instructions': [
-                                '1. Start Fuseki server:',
-                                '   Option A - Using Docker:',
-                                '   docker-compose up -d fuseki',
-                                '   ',
-                                '   Option B - Manual (if installed):',
-                                '   cd C:\\apache-jena-fuseki-5.2.0',
-                                '   .\\fuseki-server.bat --update --mem /smarthealth',
-                                '2. Verify Fuseki is running at: http://localhost:3030',
-                                '3. Retry your operation after starting Fuseki'
-                            ],
-                            'sparql_query': sparql_query,
-                            'error_details': error_msg if settings.DEBUG else None
-                        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-                    else:
-                        # Log the error for debugging
-                        logger.error(f"SPARQL update error: {error_msg}")
-                        logger.error(f"SPARQL query: {sparql_query}")
-                        logger.error(f"Error type: {error_type}")
-                        if settings.DEBUG:
-                            logger.error(f"Traceback: {traceback.format_exc()}")
-                        
-                        return Response({
-                            'success': False,
-                            'error': f'Error executing SPARQL update: {error_msg}',
-                            'message': 'The SPARQL query failed. Please check the query syntax and try again.',
-                            'sparql_query': sparql_query,
-                            'error_type': error_type,
-                            'traceback': traceback.format_exc() if settings.DEBUG else None
-                        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                    body, code = sparql_failure(e, sparql_query, update=True)
+                    return Response(body, status=code)
             else:
                 # Execute select query
                 try:
@@ -775,50 +897,8 @@ class AIQueryView(APIView):
                             'traceback': traceback.format_exc() if settings.DEBUG else None
                         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
                 except Exception as e:
-                    import urllib.error
-                    import traceback
-                    error_msg = str(e)
-                    error_type = type(e).__name__
-                    
-                    # Check for connection errors (more comprehensive)
-                    is_connection_error = (
-                        isinstance(e, urllib.error.URLError) or
-                        isinstance(e, ConnectionError) or
-                        'ConnectionRefusedError' in error_msg or
-                        'WinError 10061' in error_msg or
-                        'Connection refused' in error_msg.lower() or
-                        'cannot connect' in error_msg.lower() or
-                        'target machine actively refused' in error_msg.lower() or
-                        error_type == 'ConnectionRefusedError'
-                    )
-                    
-                    if is_connection_error:
-                        return Response({
-                            'success': False,
-                            'error': 'Fuseki server is not running',
-                            'message': 'Cannot connect to Fuseki server. Please start Fuseki server first.',
-                            'setup_instructions': [
-                                '1. Start Fuseki server:',
-                                '   Option A - Using Docker:',
-                                '   docker-compose up -d fuseki',
-                                '   ',
-                                '   Option B - Manual (if installed):',
-                                '   cd C:\\apache-jena-fuseki-5.2.0',
-                                '   .\\fuseki-server.bat --update --mem /smarthealth',
-                                '2. Verify Fuseki is running at: http://localhost:3030',
-                                '3. Refresh this page after starting Fuseki'
-                            ],
-                            'sparql_query': sparql_query,
-                            'error_details': error_msg if settings.DEBUG else None
-                        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-                    else:
-                        return Response({
-                            'success': False,
-                            'error': f'Error executing SPARQL query: {error_msg}',
-                            'sparql_query': sparql_query,
-                            'error_type': error_type,
-                            'traceback': traceback.format_exc() if settings.DEBUG else None
-                        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                    body, code = sparql_failure(e, sparql_query, update=False)
+                    return Response(body, status=code)
         
         except Exception as e:
             import traceback
@@ -858,106 +938,103 @@ class AIQueryView(APIView):
     
     def get(self, request):
         """Get example prompts and usage information"""
-        examples = {
-            'query_examples': [
-                {
-                    'prompt': 'Show me all users',
-                    'description': 'Retrieves all users from the system',
-                    'type': 'SELECT'
-                },
-                {
-                    'prompt': 'What are the activities for user 1?',
-                    'description': 'Gets activity logs for a specific user',
-                    'type': 'SELECT'
-                },
-                {
-                    'prompt': 'Show me health metrics for user 1',
-                    'description': 'Retrieves health metrics for a specific user',
-                    'type': 'SELECT'
-                },
-                {
-                    'prompt': 'What meals does user 1 have?',
-                    'description': 'Gets meal information for a specific user',
-                    'type': 'SELECT'
-                },
-                {
-                    'prompt': 'Show me all challenges',
-                    'description': 'Lists all available challenges',
-                    'type': 'SELECT'
-                }
-            ],
-            'insert_examples': [
-                {
-                    'prompt': 'Add a new user named Alice with email alice@example.com',
-                    'description': 'Creates a new user in the system',
-                    'type': 'INSERT'
-                },
-                {
-                    'prompt': 'Create a cardio activity called Running',
-                    'description': 'Adds a new cardio activity',
-                    'type': 'INSERT'
-                },
-                {
-                    'prompt': 'Add a breakfast meal with 500 calories',
-                    'description': 'Creates a new breakfast meal entry',
-                    'type': 'INSERT'
-                },
-                {
-                    'prompt': 'Create a new challenge called 30-Day Fitness',
-                    'description': 'Adds a new challenge/defi',
-                    'type': 'INSERT'
-                }
-            ],
-            'update_examples': [
-                {
-                    'prompt': 'Update user Alice email to newalice@example.com',
-                    'description': 'Changes the email of an existing user',
-                    'type': 'UPDATE'
-                },
-                {
-                    'prompt': 'Change the duration of Running activity to 45 minutes',
-                    'description': 'Modifies an activity\'s duration',
-                    'type': 'UPDATE'
-                },
-                {
-                    'prompt': 'Set meal calories to 600 for breakfast',
-                    'description': 'Updates the calorie count of a meal',
-                    'type': 'UPDATE'
-                }
-            ],
-            'delete_examples': [
-                {
-                    'prompt': 'Delete user Alice',
-                    'description': 'Removes a user from the system',
-                    'type': 'DELETE'
-                },
-                {
-                    'prompt': 'Remove activity Running',
-                    'description': 'Deletes an activity',
-                    'type': 'DELETE'
-                },
-                {
-                    'prompt': 'Delete the breakfast meal',
-                    'description': 'Removes a meal entry',
-                    'type': 'DELETE'
-                }
-            ],
-            'usage': {
-                'endpoint': '/api/ai/query/',
-                'method': 'POST',
-                'body': {
-                    'prompt': 'Your natural language query/command',
-                    'user_id': 'Optional: specific user ID (can be extracted from prompt)'
-                }
-            },
-            'capabilities': [
-                'Query data with natural language (SELECT)',
-                'Insert new data (INSERT)',
-                'Update existing data (UPDATE)',
-                'Delete data (DELETE)',
-                'AI-powered intent detection',
-                'Automatic entity extraction'
-            ]
-        }
+        return Response(AI_QUERY_EXAMPLES)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAIQueryView(View):
+    """
+    AIQueryView for ASGI deployments: Gemini and Fuseki are awaited on the
+    shared HTTP client instead of holding a worker thread for up to 30s, and
+    entity extraction runs concurrently with intent analysis. Only the
+    Fuseki -> Django sync touches the ORM, in a thread.
+    """
+    
+    async def post(self, request):
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            data = request.POST
+        prompt = data.get('prompt', '')
+        user_id = data.get('user_id', None)
+        if not prompt:
+            return JsonResponse({'error': 'Prompt is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        ai_service = AsyncGeminiAIService()
+        if not ai_service.enabled:
+            return JsonResponse(AI_NOT_CONFIGURED, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        await ai_service.ensure_model()
+        
+        if user_id:
+            intent = await ai_service.analyze_intent(prompt)
+        else:
+            entities, intent = await asyncio.gather(
+                ai_service.extract_entities(prompt), ai_service.analyze_intent(prompt)
+            )
+            user_id = entities.get('user_id')
+        AI_INTENTS.inc(intent=intent)
+        
+        sparql_query, error = await ai_service.generate_sparql(prompt, user_id)
+        if error:
+            return JsonResponse({
+                'success': False,
+                'error': error,
+                'prompt': prompt
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        logger.info(f"📝 Generated SPARQL Query:\n{sparql_query}")
         
-        return Response(examples)
+        client = SparqlClient()
+        upper = sparql_query.upper()
+        is_modification = any(keyword in upper for keyword in ['INSERT', 'DELETE', 'UPDATE'])
+        try:
+            if is_modification:
+                await client.aexecute_update(sparql_query)
+            else:
+                results = await client.aexecute_query(sparql_query)
+        except Exception as e:
+            body, code = sparql_failure(e, sparql_query, update=is_modification)
+            return JsonResponse(body, status=code)
+        
+        if is_modification:
+            operation = 'unknown'
+            if 'INSERT DATA' in upper:
+                operation = 'insert'
+                if not await sync_to_async(sync_insert_from_fuseki_to_django)(sparql_query, user_id):
+                    logger.warning("⚠️ Sync to Django failed or no entities recognized")
+            elif 'DELETE' in upper and 'INSERT' in upper:
+                operation = 'update'
+            elif 'DELETE' in upper:
+                operation = 'delete'
+                await sync_to_async(sync_delete_from_fuseki_to_django)(sparql_query)
+            return JsonResponse({
+                'success': True,
+                'prompt': prompt,
+                'intent': intent,
+                'action': operation,
+                'user_id': user_id,
+                'sparql_query': sparql_query,
+                'message': f'Data {operation}ed successfully and synced to database',
+                'ai_powered': True,
+                'ai_model': 'Google Gemini Pro'
+            })
+        
+        formatted_results = SparqlResultFormatter.format_results(results)
+        return JsonResponse({
+            'success': True,
+            'prompt': prompt,
+            'intent': intent,
+            'action': 'query',
+            'user_id': user_id,
+            'sparql_query': sparql_query,
+            'results_count': len(formatted_results) if formatted_results else 0,
+            'results': formatted_results,
+            'ai_powered': True,
+            'ai_model': 'Google Gemini Pro'
+        })
+    
+    async def get(self, request):
+        """Get example prompts and usage information"""
+        return JsonResponse(AI_QUERY_EXAMPLES)
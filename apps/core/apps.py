@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.core'
+    
+    def ready(self):
+        """Feed instrumented operations into the Prometheus metrics, track ORM statements"""
+        from django.db.backends.signals import connection_created
+        from apps.core import instrumentation, metrics
+        instrumentation.add_observer(metrics.observe_operation)
+        connection_created.connect(instrumentation.install_sql_wrapper)
@@ -0,0 +1,24 @@
+"""
+Helpers for coroutine views
+Django 4.2's login_required and render() are synchronous: the user lookup
+(session + user row) and template rendering (which may evaluate lazy
+querysets) must run in a thread, not on the event loop.
+"""
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import render
+
+arender = sync_to_async(render)
+
+
+def async_login_required(view):
+    """login_required for `async def` views; request.user is loaded before the view runs"""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if await sync_to_async(lambda: request.user.is_authenticated)():
+            return await view(request, *args, **kwargs)
+        return redirect_to_login(request.get_full_path())
+    return wrapper
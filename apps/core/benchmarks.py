@@ -0,0 +1,248 @@
+"""
+Benchmark scenarios and statistics for Smart Health
+Each scenario is a callable timed over many iterations; results are compared
+against a stored JSON baseline to detect regressions.
+"""
+
+import atexit
+import contextlib
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+class Scenario:
+    """A named operation to benchmark"""
+
+    def __init__(self, name, func, group):
+        self.name = name
+        self.func = func
+        self.group = group
+
+
+class _Rollback(Exception):
+    """Raised to roll back the transaction wrapping a write scenario"""
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_scenario(scenario, iterations, warmup=0):
+    """Time a scenario and return its latency/throughput/query statistics"""
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        for _ in range(warmup):
+            scenario.func()
+        timings, queries = [], 0
+        started = time.perf_counter()
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time.perf_counter()
+                scenario.func()
+                timings.append((time.perf_counter() - t0) * 1000)
+            queries += len(ctx.captured_queries)
+        elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        'group': scenario.group,
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3) if timings else 0.0,
+        'throughput_ops': round(iterations / elapsed, 2) if elapsed else 0.0,
+        'queries_per_op': round(queries / iterations, 2) if iterations else 0.0,
+    }
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Return a list of human readable regressions.
+    A scenario regresses when its p95 latency exceeds the baseline by more than
+    `threshold` (e.g. 0.2 = 20%) or when it issues more queries per operation.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if previous['p95_ms'] and current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {current['p95_ms']}ms > {previous['p95_ms']}ms (+{threshold:.0%} max)"
+            )
+        if current['queries_per_op'] > previous['queries_per_op']:
+            regressions.append(
+                f"{name}: {current['queries_per_op']} queries/op > {previous['queries_per_op']}"
+            )
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['scenarios']
+
+
+def save_baseline(path, results, metadata):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'metadata': metadata, 'scenarios': results}, f, indent=2, sort_keys=True)
+
+
+# ==================== SCENARIOS ====================
+
+def benchmark_user(username=None):
+    """The requested user, otherwise the one with the most activity logs"""
+    from apps.users.models import User
+
+    if username:
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise LookupError(f"Utilisateur '{username}' introuvable")
+    user = User.objects.annotate(n=Count('activity_logs')).order_by('-n').first()
+    if user is None:
+        raise LookupError('Base vide : lancez generate_dataset ou utilisez --generate')
+    return user
+
+
+def benchmark_defi_id():
+    """The Defi with the most participations, if any"""
+    from apps.defis.models import Defi
+
+    defi = Defi.objects.annotate(n=Count('participations')).order_by('-n').first()
+    return defi.defi_id if defi else None
+
+
+def _http_scenario(client, name, url, group):
+    def call():
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f'{name}: HTTP {response.status_code} on {url}')
+    return Scenario(name, call, group)
+
+
+def http_scenarios(user, defi_id=None):
+    """DRF viewsets and HTML list views, requested as `user`"""
+    client = Client()
+    client.force_login(user)
+    scenarios = [
+        _http_scenario(client, 'api.meals.list', reverse('meals:meal-api-list'), 'api'),
+        _http_scenario(client, 'api.activity_logs.list', reverse('activities:activitylog-api-list'), 'api'),
+        _http_scenario(client, 'api.health_records.list', reverse('health_records:healthrecord-list'), 'api'),
+        _http_scenario(client, 'api.habit_logs.list', reverse('habits:habitlog-list'), 'api'),
+        _http_scenario(
+            client, 'api.activity_logs.by_intensity',
+            reverse('activities:activitylog-api-by-intensity') + '?intensity=HIGH', 'api'
+        ),
+        _http_scenario(client, 'html.meal_list', reverse('meals:meal-list'), 'html'),
+        _http_scenario(client, 'html.activity_log_list', reverse('activities:activity-log-list'), 'html'),
+        _http_scenario(client, 'html.habit_list', reverse('habits:habit-list'), 'html'),
+        _http_scenario(client, 'html.health_record_list', reverse('health_records:record-list'), 'html'),
+    ]
+    if defi_id is not None:
+        scenarios.append(_http_scenario(
+            client, 'api.defis.leaderboard', reverse('defis:defi-leaderboard', args=[defi_id]), 'api'
+        ))
+    return scenarios
+
+
+def rdf_manager_scenarios():
+    """RDFManager create/get/update/delete against a scratch copy of the ontology"""
+    from apps.meals.rdf_manager import RDFManager
+
+    scratch_dir = tempfile.mkdtemp(prefix='smarthealth-bench-')
+    # The scenarios run after this returns: remove the copy when the process exits
+    atexit.register(shutil.rmtree, scratch_dir, ignore_errors=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = RDFManager()
+    source = manager.ttl_path
+    manager.ttl_path = os.path.join(scratch_dir, 'smarthealth.ttl')
+    shutil.copyfile(source, manager.ttl_path)
+    counter = {'next': 10_000_000}
+
+    def crud():
+        meal_id = counter['next']
+        counter['next'] += 1
+        manager.create_meal(meal_id, 'Bench meal', 'LUNCH', 650, '2025-01-01T12:00:00', 1)
+        manager.get_meal(meal_id)
+        manager.update_meal(meal_id, total_calories=700)
+        manager.delete_meal(meal_id)
+
+    def list_meals():
+        manager.get_all_meals()
+
+    return [
+        Scenario('rdf_manager.meal_crud', crud, 'rdf'),
+        Scenario('rdf_manager.get_all_meals', list_meals, 'rdf'),
+    ]
+
+
+def formatter_scenarios(rows=1000):
+    """SparqlResultFormatter on a synthetic SELECT result"""
+    from apps.sparql_service.formatter import SparqlResultFormatter
+
+    results = {
+        'head': {'vars': ['meal', 'name', 'calories', 'date', 'user']},
+        'results': {'bindings': [
+            {
+                'meal': {'type': 'uri', 'value': f'http://dhia.org/ontologies/smarthealth#Meal_{i}'},
+                'name': {'type': 'literal', 'value': f'Meal {i}'},
+                'calories': {'type': 'literal', 'value': str(300 + i % 700)},
+                'date': {'type': 'literal', 'value': '2025-01-01T12:00:00'},
+                'user': {'type': 'uri', 'value': f'http://dhia.org/ontologies/smarthealth#User_{i % 50}'},
+            }
+            for i in range(rows)
+        ]},
+    }
+    return [
+        Scenario('formatter.format_results', lambda: SparqlResultFormatter.format_results(results), 'sparql'),
+        Scenario('formatter.format_meal_results', lambda: SparqlResultFormatter.format_meal_results(results), 'sparql'),
+    ]
+
+
+def ai_sync_scenarios(user):
+    """AI sync parsers, each run inside a rolled back transaction"""
+    from apps.ai_service.views import sync_insert_from_fuseki_to_django, sync_delete_from_fuseki_to_django
+
+    insert_query = """
+    PREFIX sh: <http://dhia.org/ontologies/smarthealth#>
+    INSERT DATA {
+        sh:Meal_bench a sh:Lunch ; sh:calories 640 ; sh:name "Bench lunch" .
+    }
+    """
+    delete_query = """
+    PREFIX sh: <http://dhia.org/ontologies/smarthealth#>
+    DELETE WHERE { ?h sh:habit_name "bench-habit-that-does-not-exist" . ?h ?p ?o }
+    """
+
+    def rolled_back(func, *args):
+        def call():
+            try:
+                with transaction.atomic():
+                    func(*args)
+                    raise _Rollback()
+            except _Rollback:
+                pass
+        return call
+
+    return [
+        Scenario('ai_sync.insert_meal', rolled_back(sync_insert_from_fuseki_to_django, insert_query, user.user_id), 'ai'),
+        Scenario('ai_sync.delete_habit', rolled_back(sync_delete_from_fuseki_to_django, delete_query), 'ai'),
+    ]
@@ -0,0 +1,97 @@
+"""
+Bulk ingestion for DRF viewsets
+BulkCreateMixin adds `POST .../bulk/` to a viewset. The body is a JSON list
+of objects (or {"items": [...]}); each item is validated by
+`bulk_serializer_class`, whose lookups (valid foreign keys...) are loaded once
+into the serializer context by get_bulk_context(). Valid items are written by
+perform_bulk_create() in one transaction, invalid ones are reported by index:
+
+    {"created": 98, "ids": [...], "errors": [{"index": 3, "errors": {...}}]}
+
+bulk_create() does not send signals: perform_bulk_create() updates the derived
+tables itself and returns the N-Triples of the new rows, sent to Fuseki in one
+INSERT DATA once the transaction is committed (or to the retry queue if
+Fuseki is unavailable).
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from apps.sparql_service.client import SparqlClient
+
+from .metrics import instrument_sync
+
+logger = logging.getLogger(__name__)
+
+
+def sync_triples(model, triples):
+    """Insert the triples of a batch of `model` rows into Fuseki (errors are logged)"""
+    @instrument_sync(model, 'bulk_save')
+    def sync():
+        try:
+            SparqlClient(queue_writes=True).insert_triples(triples)
+            logger.info(f"{len(triples)} triples of {model} synced to Fuseki (bulk)")
+        except Exception as e:
+            logger.error(f"Failed to sync {model} batch to Fuseki: {str(e)}")
+
+    if triples:
+        sync()
+
+
+class BulkCreateMixin:
+    """
+    Set `bulk_serializer_class` and `bulk_sync_model` (label of the synced
+    model in the sync metrics), and implement perform_bulk_create(user, items)
+    returning (created objects, triples). A viewset missing one of them fails
+    with ImproperlyConfigured when its class is defined.
+    """
+
+    bulk_serializer_class = None
+    bulk_sync_model = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        missing = [name for name in ('bulk_serializer_class', 'bulk_sync_model') if getattr(cls, name) is None]
+        if not callable(getattr(cls, 'perform_bulk_create', None)):
+            missing.append('perform_bulk_create()')
+        if missing:
+            raise ImproperlyConfigured(f"{cls.__name__} uses BulkCreateMixin without {', '.join(missing)}")
+
+    def get_bulk_context(self):
+        return self.get_serializer_context()
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list):
+            return Response({'error': 'Expected a list of objects'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = getattr(settings, 'BULK_MAX_ITEMS', 1000)
+        if len(items) > limit:
+            return Response(
+                {'error': f'At most {limit} objects per request'}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        context = self.get_bulk_context()
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            serializer = self.bulk_serializer_class(data=item, context=context)
+            if serializer.is_valid():
+                valid.append(serializer.validated_data)
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        created = []
+        if valid:
+            with transaction.atomic():
+                created, triples = self.perform_bulk_create(request.user, valid)
+                transaction.on_commit(lambda: sync_triples(self.bulk_sync_model, triples))
+        return Response(
+            {'created': len(created), 'ids': [obj.pk for obj in created], 'errors': errors},
+            status=status.HTTP_201_CREATED if created or not errors else status.HTTP_400_BAD_REQUEST,
+        )
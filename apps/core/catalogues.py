@@ -0,0 +1,124 @@
+"""
+Versioned reference-data cache
+Small, rarely written tables that form views list in full (food items,
+activities, health metrics, defis) are cached at two levels:
+
+- in each process, as the evaluated list of model instances;
+- in the shared Django cache, pickled under a key carrying the version.
+
+A version counter per catalogue lives in the shared cache. Writes to any of
+the catalogue's models bump it once the transaction commits; every read does a
+single cache GET of the counter and only reloads (from the shared cache, else
+the database) when it changed. With a cache backend shared by the workers
+(memcached, redis) all processes see a write on their next request.
+
+Apps register their catalogues when their signals are imported:
+
+    catalogues.register('health_metrics', lambda: HealthMetric.objects.order_by('metric_name'), [HealthMetric])
+
+Cached instances are shared between requests: copy them before decorating
+them with per-request attributes. Structures derived from a catalogue (e.g.
+the typeahead indexes) can subscribe() to its committed writes to update
+themselves incrementally instead of reloading.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from .metrics import record_cache
+
+_registry = {}
+_local = {}
+_lock = threading.Lock()
+
+
+class Catalogue:
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.listeners = []
+
+    @property
+    def version_key(self):
+        return f'catalogue:{self.name}:version'
+
+    def data_key(self, version):
+        return f'catalogue:{self.name}:v{version}'
+
+
+def register(name, loader, models):
+    """Declare catalogue `name`, loaded by `loader()` and invalidated by writes to `models`"""
+    _registry[name] = Catalogue(name, loader)
+
+    def on_write(sender, instance=None, raw=False, signal=None, **kwargs):
+        if not raw:
+            # pk is captured now: Django clears it once the delete completes
+            deleted = signal is post_delete
+            pk = instance.pk
+            transaction.on_commit(lambda: _committed(name, sender, pk, deleted))
+
+    for model in models:
+        uid = f'catalogue_{name}_{model._meta.label}'
+        post_save.connect(on_write, sender=model, weak=False, dispatch_uid=f'{uid}_save')
+        post_delete.connect(on_write, sender=model, weak=False, dispatch_uid=f'{uid}_delete')
+
+
+def subscribe(name, listener):
+    """
+    Call `listener(model, pk, deleted, version)` after each committed write to
+    the catalogue, once the version has been bumped to `version`
+    """
+    _registry[name].listeners.append(listener)
+
+
+def _committed(name, model, pk, deleted):
+    new_version = invalidate(name)
+    for listener in _registry[name].listeners:
+        listener(model, pk, deleted, new_version)
+
+
+def version(name):
+    """
+    Current version of a catalogue (one shared-cache GET). A counter lost from
+    the cache restarts from the clock, never from a value already handed out.
+    """
+    return cache.get_or_set(_registry[name].version_key, time.time_ns, timeout=None)
+
+
+def invalidate(name):
+    """Bump the version: every process reloads the catalogue on its next read"""
+    key = _registry[name].version_key
+    try:
+        new_version = cache.incr(key)
+    except ValueError:
+        new_version = time.time_ns()
+        cache.set(key, new_version, timeout=None)
+    _local.pop(name, None)
+    return new_version
+
+
+def get(name):
+    """The catalogue as a new list of (shared, read-only) model instances"""
+    catalogue = _registry[name]
+    current = version(name)
+    cached = _local.get(name)
+    if cached is not None and cached[0] == current:
+        record_cache(f'catalogue_{name}', True)
+        return list(cached[1])
+
+    with _lock:
+        cached = _local.get(name)
+        if cached is None or cached[0] != current:
+            rows = cache.get(catalogue.data_key(current))
+            record_cache(f'catalogue_{name}', rows is not None)
+            if rows is None:
+                rows = list(catalogue.loader())
+                cache.set(catalogue.data_key(current), rows, getattr(settings, 'CATALOGUE_CACHE_TTL', 3600))
+            cached = (current, rows)
+            _local[name] = cached
+    return list(cached[1])
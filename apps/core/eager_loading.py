@@ -0,0 +1,157 @@
+"""
+Query planning for DRF viewsets
+Works out the select_related/prefetch_related lookups and annotations a
+serializer needs, so that listing N objects costs a fixed number of queries.
+
+Relations are inferred from nested serializers, dotted sources
+(`source='user.username'`) and related fields. To-one relations are joined
+with select_related; a to-many relation becomes a Prefetch whose queryset
+gets the plan of what is nested below it. Serializers declare what cannot be
+inferred, typically for SerializerMethodFields:
+
+    class DefiSerializer(serializers.ModelSerializer):
+        annotations = {'participation_count': Count('participations', distinct=True)}
+        select_related_fields = (...)      # extra select_related lookups
+        prefetch_related_fields = (...)    # extra prefetch_related lookups
+
+Declared lookups of a nested serializer are prefixed with its source; its
+annotations only apply when it is the top-level serializer.
+"""
+
+import functools
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+class QueryPlan:
+    """Lookups and annotations to apply to a queryset of one model"""
+
+    def __init__(self, model):
+        self.model = model
+        self.select_related = set()
+        self.prefetch_related = set()
+        self.annotations = {}
+        # To-many lookup -> QueryPlan of the prefetched model
+        self.children = {}
+
+    def child(self, lookup, model):
+        if lookup not in self.children:
+            self.children[lookup] = QueryPlan(model)
+        return self.children[lookup]
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        prefetches = [
+            Prefetch(lookup, queryset=plan.apply(plan.model._default_manager.all()))
+            for lookup, plan in sorted(self.children.items())
+        ]
+        prefetches.extend(sorted(self.prefetch_related))
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        return queryset
+
+
+def _relation_chain(model, attrs):
+    """Longest chain of relation fields at the start of `attrs`"""
+    chain = []
+    for attr in attrs:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation or field.related_model is None:
+            break
+        chain.append((attr, field))
+        model = field.related_model
+    return chain
+
+
+def _add_chain(plan, prefix, chain):
+    """
+    Join `chain` from `prefix` in `plan`: select_related up to the first to-many
+    relation, which becomes a Prefetch with its own plan for the rest.
+    Returns the plan and prefix in which the last relation was joined.
+    """
+    path = list(prefix)
+    for i, (attr, field) in enumerate(chain):
+        path.append(attr)
+        if field.many_to_many or field.one_to_many:
+            child = plan.child('__'.join(path), field.related_model)
+            return _add_chain(child, [], chain[i + 1:])
+    if len(path) > len(prefix):
+        plan.select_related.add('__'.join(path))
+    return plan, path
+
+
+def _walk(serializer, plan, prefix):
+    model = plan.model
+    for name in prefix:
+        model = model._meta.get_field(name).related_model
+    for lookup in getattr(serializer, 'select_related_fields', ()):
+        plan.select_related.add('__'.join(prefix + [lookup]))
+    for lookup in getattr(serializer, 'prefetch_related_fields', ()):
+        plan.prefetch_related.add('__'.join(prefix + [lookup]))
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            nested = field.child
+        elif isinstance(field, serializers.BaseSerializer):
+            nested = field
+        else:
+            nested = None
+        # The last attribute of a plain field is a value, not a relation
+        related = isinstance(field, (serializers.RelatedField, serializers.ManyRelatedField))
+        attrs = field.source_attrs if nested is not None or related else field.source_attrs[:-1]
+        chain = _relation_chain(model, attrs)
+        if not chain:
+            continue
+        if nested is None and related and len(chain) == len(attrs):
+            last = chain[-1][1]
+            if not (last.many_to_many or last.one_to_many):
+                # A primary key of a forward relation is read from the local column
+                chain = chain[:-1]
+        nested_plan, nested_prefix = _add_chain(plan, prefix, chain)
+        if nested is not None and len(chain) == len(attrs):
+            _walk(nested, nested_plan, nested_prefix)
+
+
+@functools.lru_cache(maxsize=None)
+def plan_for(serializer_class):
+    """QueryPlan for a ModelSerializer class (cached per class)"""
+    model = getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+    plan = QueryPlan(model)
+    if model is None:
+        return plan
+    _walk(serializer_class(), plan, [])
+    plan.annotations = dict(getattr(serializer_class, 'annotations', {}))
+    return plan
+
+
+def eager_load(queryset, serializer_class):
+    """Apply the query plan of `serializer_class` to `queryset`"""
+    return plan_for(serializer_class).apply(queryset)
+
+
+class EagerLoadingMixin:
+    """
+    ViewSet mixin applying the serializer's query plan to the list and retrieve
+    querysets. Custom actions building their own queryset call eager_load();
+    those serializing something else (or nothing) skip the joins.
+    """
+    eager_actions = ('list', 'retrieve')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if getattr(self, 'action', None) in self.eager_actions:
+            queryset = self.eager_load(queryset)
+        return queryset
+
+    def eager_load(self, queryset):
+        return eager_load(queryset, self.get_serializer_class())
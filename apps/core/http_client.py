@@ -0,0 +1,43 @@
+"""
+Shared asynchronous HTTP client
+The async views talk to Fuseki and Gemini through one httpx.AsyncClient per
+event loop: connections are pooled and kept alive between requests served by
+the same ASGI worker instead of being opened for every call. Pool size and
+timeouts come from ASYNC_HTTP_MAX_CONNECTIONS and ASYNC_HTTP_TIMEOUT.
+"""
+
+import asyncio
+
+from django.conf import settings
+
+# event loop -> client (an AsyncClient cannot be used from another loop)
+_clients = {}
+
+
+def get_client():
+    """The pooled AsyncClient of the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        import httpx
+
+        # Loops closed since (async_to_sync under WSGI) can't reuse their client
+        for stale in [other for other in _clients if other.is_closed()]:
+            del _clients[stale]
+        max_connections = getattr(settings, 'ASYNC_HTTP_MAX_CONNECTIONS', 100)
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(getattr(settings, 'ASYNC_HTTP_TIMEOUT', 30.0), connect=5.0),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max(max_connections // 5, 1),
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def aclose():
+    """Close the client of the running event loop (worker shutdown, tests)"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,417 @@
+"""
+Import of historical data files (activity logs, health records, meals)
+Used by manage.py import_history to onboard an organisation from CSV or JSON
+Lines exports of several GB:
+
+- the file is memory-mapped and read line by line (CSV rows may span lines),
+  so memory does not depend on its size;
+- rows are mapped to model fields (column names can be renamed), users are
+  resolved by username in batches and activities / metrics by name from the
+  cached catalogues;
+- duplicates are dropped with 64-bit hashes of the natural key of the rows:
+  a set of the rows read so far, and per chunk the rows already in the
+  database for the users and date range of the chunk (an index range, not
+  the whole table);
+- chunks of rows are inserted with bulk_create by a process pool, each worker
+  writing the N-Triples of its rows to its own file for a bulk load into
+  Fuseki;
+- a checkpoint keeps the byte offset up to which every chunk is committed, so
+  an interrupted import resumes where it stopped.
+
+Signals do not fire: finish() rebuilds the derived tables once at the end.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, time
+
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from apps.activities.models import ActivityLog
+from apps.health_records.models import HealthRecord
+from apps.meals.models import Meal
+from apps.sparql_service import ntriples
+from apps.users.models import User
+
+from . import catalogues
+
+
+class RowError(ValueError):
+    """A row that cannot be imported"""
+
+
+def _datetime(value, required=True):
+    if value in (None, ''):
+        if required:
+            raise RowError('missing date')
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise RowError(f'invalid date {value!r}')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.get_default_timezone())
+    return moment
+
+
+def _number(value, cast, required=True):
+    if value in (None, ''):
+        if required:
+            raise RowError('missing number')
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise RowError(f'invalid number {value!r}')
+
+
+def _choice(value, choices, required=True):
+    if value in (None, ''):
+        if required:
+            raise RowError('missing value')
+        return None
+    value = str(value).upper()
+    if value not in {key for key, _ in choices}:
+        raise RowError(f'invalid choice {value!r}')
+    return value
+
+
+def catalogue_lookup(name, pk, label):
+    """(ids, {label: id}) of a cached catalogue"""
+    rows = catalogues.get(name)
+    return {getattr(obj, pk) for obj in rows}, {getattr(obj, label): getattr(obj, pk) for obj in rows}
+
+
+def _catalogue_id(row, id_field, name_field, lookup, name):
+    ids, by_label = lookup
+    if row.get(id_field) not in (None, ''):
+        value = _number(row[id_field], int)
+        if value not in ids:
+            raise RowError(f'unknown {name} id {value}')
+        return value
+    if row.get(name_field) not in by_label:
+        raise RowError(f'unknown {name} {row.get(name_field)!r}')
+    return by_label[row[name_field]]
+
+
+class Kind:
+    """How one kind of row is mapped, keyed and turned into triples"""
+
+    def __init__(self, model, map_row, natural_key, key_fields, date_field, triples):
+        self.model = model
+        self.map_row = map_row
+        self.natural_key = natural_key
+        self.key_fields = key_fields
+        self.date_field = date_field
+        self.triples = triples
+
+
+def _activity_log(row, lookups):
+    return {
+        'activity_id': _catalogue_id(row, 'activity_id', 'activity', lookups['activities'], 'activity'),
+        'date': _datetime(row.get('date')),
+        'duration': _number(row.get('duration'), int),
+        'intensity': _choice(row.get('intensity'), ActivityLog.INTENSITY_CHOICES, required=False),
+    }
+
+
+def _health_record(row, lookups):
+    return {
+        'health_metric_id': _catalogue_id(row, 'health_metric_id', 'metric', lookups['health_metrics'], 'metric'),
+        'value': _number(row.get('value'), float, required=False),
+        'description': row.get('description') or '',
+        'start_date': _datetime(row.get('start_date')),
+        'end_date': _datetime(row.get('end_date'), required=False),
+    }
+
+
+def _meal(row, lookups):
+    if not row.get('meal_name'):
+        raise RowError('missing meal_name')
+    return {
+        'meal_name': row['meal_name'],
+        'meal_type': _choice(row.get('meal_type'), Meal.MEAL_TYPE_CHOICES),
+        'total_calories': _number(row.get('total_calories'), int),
+        'meal_date': _datetime(row.get('meal_date')),
+    }
+
+
+def _timestamp(value):
+    return value.timestamp() if value is not None else None
+
+
+KINDS = {
+    'activity_logs': Kind(
+        ActivityLog, _activity_log,
+        lambda f: (f['user_id'], f['activity_id'], _timestamp(f['date']), f['duration']),
+        ('user_id', 'activity_id', 'date', 'duration'), 'date', ntriples.activity_log_triples,
+    ),
+    'health_records': Kind(
+        HealthRecord, _health_record,
+        lambda f: (f['user_id'], f['health_metric_id'], _timestamp(f['start_date']), f['value']),
+        ('user_id', 'health_metric_id', 'start_date', 'value'), 'start_date', ntriples.health_record_triples,
+    ),
+    'meals': Kind(
+        Meal, _meal,
+        lambda f: (f['user_id'], f['meal_name'], f['meal_type'], _timestamp(f['meal_date'])),
+        ('user_id', 'meal_name', 'meal_type', 'meal_date'), 'meal_date', ntriples.meal_triples,
+    ),
+}
+
+
+def key_hash(key):
+    """64-bit hash of a natural key"""
+    return int.from_bytes(hashlib.blake2b(repr(key).encode(), digest_size=8).digest(), 'big')
+
+
+def existing_keys(kind, rows):
+    """
+    Hashes of the natural keys of the rows already in the database among
+    `rows` (mapped fields): one query over their users and date range
+    """
+    spec = KINDS[kind]
+    if not rows:
+        return set()
+    dates = [row[spec.date_field] for row in rows]
+    existing = spec.model.objects.filter(
+        user_id__in={row['user_id'] for row in rows},
+        **{f'{spec.date_field}__range': (min(dates), max(dates))},
+    ).values_list(*spec.key_fields)
+    return {key_hash(spec.natural_key(dict(zip(spec.key_fields, row)))) for row in existing}
+
+
+# -- reading -----------------------------------------------------------------
+
+def _lines(mm, start, state):
+    """Decoded lines of a memory-mapped file from byte `start`; state['offset'] follows the reads"""
+    position, size = start, len(mm)
+    while position < size:
+        end = mm.find(b'\n', position)
+        end = size if end == -1 else end + 1
+        line = mm[position:end].decode('utf-8-sig' if position == 0 else 'utf-8')
+        position = state['offset'] = end
+        yield line
+
+
+def read_rows(path, start=0, renames=None):
+    """
+    (row dict, byte offset after the row) of a .csv or JSON Lines file, from
+    byte `start` (a row boundary, 0 for the beginning)
+    """
+    renames = renames or {}
+    with open(path, 'rb') as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            state = {'offset': start}
+            if path.endswith('.csv'):
+                header = next(csv.reader(io.StringIO(next(_lines(mm, 0, {})))))
+                columns = [renames.get(name.strip(), name.strip()) for name in header]
+                if start == 0:
+                    start = mm.find(b'\n') + 1 or len(mm)
+                for values in csv.reader(_lines(mm, start, state)):
+                    if values:
+                        yield dict(zip(columns, values)), state['offset']
+            else:
+                for line in _lines(mm, start, state):
+                    if line.strip():
+                        row = json.loads(line)
+                        yield {renames.get(name, name): value for name, value in row.items()}, state['offset']
+
+
+# -- loading -----------------------------------------------------------------
+
+def _init_worker():
+    # A forked worker inherits the sockets of the parent's open connections:
+    # closing them would end the parent's sessions (PostgreSQL terminates on
+    # the close message), so the worker just forgets them and opens its own
+    for conn in connections.all(initialized_only=True):
+        conn.connection = None
+
+
+def load_chunk(kind, rows, ntriples_prefix=None, batch_size=5000):
+    """Insert mapped rows (worker side); returns (rows, triples) written"""
+    spec = KINDS[kind]
+    with transaction.atomic():
+        objects = spec.model.objects.bulk_create([spec.model(**row) for row in rows], batch_size=batch_size)
+    triples = [line for obj in objects for line in spec.triples(obj)]
+    if ntriples_prefix and triples:
+        with open(f'{ntriples_prefix}.{os.getpid()}.nt', 'a', encoding='utf-8') as out:
+            out.write('\n'.join(triples))
+            out.write('\n')
+    return len(objects), len(triples)
+
+
+class Importer:
+    """
+    Streams one file into `kind` rows. `checkpoint` is the path of the JSON
+    progress file; `report(stats)` is called after each committed chunk.
+    """
+
+    def __init__(self, path, kind, chunk_size=5000, workers=1, ntriples_prefix=None,
+                 renames=None, checkpoint=None, report=None):
+        self.path = path
+        self.kind = kind
+        self.spec = KINDS[kind]
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.ntriples_prefix = ntriples_prefix
+        self.renames = renames or {}
+        self.checkpoint = checkpoint
+        self.report = report
+        self.users = {}
+        self.errors = []
+        self.stats = {
+            'offset': 0, 'size': os.path.getsize(path), 'rows': 0, 'created': 0,
+            'duplicates': 0, 'skipped': 0, 'triples': 0, 'since': None,
+        }
+
+    # -- checkpoints ----------------------------------------------------------
+
+    def _signature(self):
+        info = os.stat(self.path)
+        return {'path': os.path.abspath(self.path), 'kind': self.kind, 'size': info.st_size, 'mtime': info.st_mtime}
+
+    def resume(self):
+        """Restore the progress of a previous run of the same file, if any"""
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return False
+        with open(self.checkpoint, encoding='utf-8') as handle:
+            saved = json.load(handle)
+        if saved.get('file') != self._signature():
+            return False
+        self.stats.update(saved['stats'])
+        return True
+
+    def _save_checkpoint(self):
+        if not self.checkpoint:
+            return
+        temporary = f'{self.checkpoint}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as handle:
+            json.dump({'file': self._signature(), 'stats': self.stats}, handle)
+        os.replace(temporary, self.checkpoint)
+
+    # -- mapping ---------------------------------------------------------------
+
+    def _resolve_users(self, rows):
+        wanted = {row['user'] for row in rows if row.get('user') and row['user'] not in self.users}
+        if wanted:
+            self.users.update(User.objects.filter(username__in=wanted).values_list('username', 'user_id'))
+
+    def _user_id(self, row):
+        if row.get('user_id') not in (None, ''):
+            return _number(row['user_id'], int)
+        if row.get('user') in self.users:
+            return self.users[row['user']]
+        raise RowError(f"unknown user {row.get('user')!r}")
+
+    def _map(self, rows, seen):
+        """Mapped, deduplicated rows of a chunk"""
+        self._resolve_users(rows)
+        lookups = {
+            'activities': catalogue_lookup('activities', 'activity_id', 'activity_name'),
+            'health_metrics': catalogue_lookup('health_metrics', 'health_metric_id', 'metric_name'),
+        }
+        candidates, first = [], self.stats['rows'] - len(rows) + 1
+        for number, row in enumerate(rows, first):
+            try:
+                fields = self.spec.map_row(row, lookups)
+                fields['user_id'] = self._user_id(row)
+            except RowError as e:
+                self.stats['skipped'] += 1
+                if len(self.errors) < 20:
+                    self.errors.append(f'row {number}: {e}')
+                continue
+            candidates.append(fields)
+        stored = existing_keys(self.kind, candidates)
+        mapped = []
+        for fields in candidates:
+            digest = key_hash(self.spec.natural_key(fields))
+            if digest in seen or digest in stored:
+                self.stats['duplicates'] += 1
+                continue
+            seen.add(digest)
+            mapped.append(fields)
+        if mapped:
+            day = timezone.localdate(min(fields[self.spec.date_field] for fields in mapped)).isoformat()
+            if self.stats['since'] is None or day < self.stats['since']:
+                self.stats['since'] = day
+        return mapped
+
+    def _chunks(self):
+        rows, offset = [], self.stats['offset']
+        for row, offset in read_rows(self.path, self.stats['offset'], self.renames):
+            rows.append(row)
+            if len(rows) >= self.chunk_size:
+                yield rows, offset
+                rows = []
+        if rows or offset != self.stats['offset']:
+            yield rows, offset
+
+    # -- run -------------------------------------------------------------------
+
+    def run(self):
+        """Import the file (from the checkpoint offset); returns the stats"""
+        seen = set()  # rows of this run, committed or not
+        if self.workers <= 1:
+            for rows, offset in self._chunks():
+                self.stats['rows'] += len(rows)
+                created, triples = load_chunk(self.kind, self._map(rows, seen), self.ntriples_prefix)
+                self._committed(offset, created, triples)
+            return self.stats
+
+        # Chunks may finish out of order: the checkpoint only moves past a chunk
+        # once every chunk before it is committed
+        connections.close_all()
+        pending, done, order = {}, {}, []
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker) as pool:
+            for rows, offset in self._chunks():
+                self.stats['rows'] += len(rows)
+                future = pool.submit(load_chunk, self.kind, self._map(rows, seen), self.ntriples_prefix)
+                pending[future] = offset
+                order.append(future)
+                if len(pending) >= 2 * self.workers:
+                    self._collect(pending, done, order, FIRST_COMPLETED)
+            while pending:
+                self._collect(pending, done, order, FIRST_COMPLETED)
+        return self.stats
+
+    def _collect(self, pending, done, order, return_when):
+        finished, _ = wait(pending, return_when=return_when)
+        for future in finished:
+            done[future] = (pending.pop(future), *future.result())
+        while order and order[0] in done:
+            offset, created, triples = done.pop(order.pop(0))
+            self._committed(offset, created, triples)
+
+    def _committed(self, offset, created, triples):
+        self.stats['offset'] = offset
+        self.stats['created'] += created
+        self.stats['triples'] += triples
+        self._save_checkpoint()
+        if self.report:
+            self.report(self.stats)
+
+
+def finish(kinds, since=None):
+    """Rebuild the derived tables after imports of `kinds` (signals did not fire)"""
+    from apps.health_records import anomalies, latest_values
+    from apps.rollups import buckets
+    from apps.users.counters import recount
+
+    recount([name for name in ('activity_logs', 'health_records', 'meals') if name in kinds])
+    if 'health_records' in kinds:
+        latest_values.rebuild()
+        anomalies.rebuild()
+    buckets.rebuild(since=since)
@@ -0,0 +1,143 @@
+"""
+Lightweight per-request instrumentation
+`track()` times an operation (ORM query, SPARQL call, RDFManager operation,
+Gemini call) and adds it to the profile of the request being served, if any.
+Outside a request (management commands, shell) it only notifies observers.
+
+The profile lives in a context variable, which sync_to_async copies into its
+threads: ORM statements are tracked by a wrapper every database connection
+gets when it is opened (install_sql_wrapper, connected in CoreConfig.ready),
+so each one is counted once in the profile of the request that ran it,
+whichever thread it ran in.
+"""
+
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+
+# Kinds reported in Server-Timing, in display order
+KINDS = ('db', 'sparql', 'sparql_update', 'rdf', 'rdf_save', 'gemini')
+
+# Captured statement text is truncated to keep slow-log lines bounded
+MAX_STATEMENT_LENGTH = 2000
+MAX_STATEMENTS = 50
+
+_current_profile = contextvars.ContextVar('smarthealth_request_profile', default=None)
+_in_timed = contextvars.ContextVar('smarthealth_in_timed', default=False)
+_observers = []
+
+
+class RequestProfile:
+    """Counts and durations collected while serving one request"""
+
+    __slots__ = ('counts', 'durations', 'sampled', 'statements')
+
+    def __init__(self, sampled=False):
+        self.counts = dict.fromkeys(KINDS, 0)
+        self.durations = dict.fromkeys(KINDS, 0.0)
+        self.sampled = sampled
+        self.statements = []
+
+    def record(self, kind, seconds, text=None):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        self.durations[kind] = self.durations.get(kind, 0.0) + seconds
+        if self.sampled and text is not None and len(self.statements) < MAX_STATEMENTS:
+            self.statements.append({
+                'kind': kind,
+                'ms': round(seconds * 1000, 2),
+                'text': str(text)[:MAX_STATEMENT_LENGTH],
+            })
+
+    def server_timing(self, total_seconds):
+        """Value of the Server-Timing response header"""
+        parts = []
+        for kind in KINDS:
+            if self.counts.get(kind):
+                parts.append(
+                    f'{kind.replace("_", "-")};dur={self.durations[kind] * 1000:.1f};desc="{self.counts[kind]}"'
+                )
+        parts.append(f'total;dur={total_seconds * 1000:.1f}')
+        return ', '.join(parts)
+
+    def summary(self):
+        """Counts and milliseconds per kind, for structured logs"""
+        return {
+            kind: {'count': self.counts[kind], 'ms': round(self.durations[kind] * 1000, 2)}
+            for kind in self.counts if self.counts[kind]
+        }
+
+
+def start_profile(sampled=False):
+    """Attach a new profile to the current context; returns (profile, token)"""
+    profile = RequestProfile(sampled)
+    return profile, _current_profile.set(profile)
+
+
+def end_profile(token):
+    _current_profile.reset(token)
+
+
+def current_profile():
+    return _current_profile.get()
+
+
+def add_observer(callback):
+    """Register `callback(kind, seconds, failed)`, called after every tracked operation"""
+    if callback not in _observers:
+        _observers.append(callback)
+
+
+@contextmanager
+def track(kind, text=None, profiled=True):
+    """Time the wrapped block as one operation of the given kind (profiled=False: observers only)"""
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        profile = _current_profile.get() if profiled else None
+        if profile is not None:
+            profile.record(kind, elapsed, text)
+        for callback in _observers:
+            callback(kind, elapsed, failed)
+
+
+def timed(kind):
+    """
+    Decorator version of track() for methods. Only the outermost timed call is
+    added to the request profile: a timed method called from another one
+    (RDFManager.save_ontology from create_meal) is already in its caller's time.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _in_timed.get():
+                with track(kind, profiled=False):
+                    return func(*args, **kwargs)
+            token = _in_timed.set(True)
+            try:
+                with track(kind):
+                    return func(*args, **kwargs)
+            finally:
+                _in_timed.reset(token)
+        return wrapper
+    return decorator
+
+
+def sql_execute_wrapper(execute, sql, params, many, context):
+    """Database execute_wrapper that tracks the ORM/SQL statements of a profiled request"""
+    if _current_profile.get() is None:
+        return execute(sql, params, many, context)
+    with track('db', sql):
+        return execute(sql, params, many, context)
+
+
+def install_sql_wrapper(connection, **kwargs):
+    """connection_created receiver: track the statements of every connection"""
+    if sql_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_execute_wrapper)
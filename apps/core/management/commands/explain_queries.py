@@ -0,0 +1,98 @@
+"""
+Commande Django : EXPLAIN des requêtes réellement émises par l'ORM
+Usage:
+    python manage.py explain_queries                       # requêtes des scénarios HTTP de benchmark
+    python manage.py explain_queries --input queries.jsonl # requêtes capturées pendant les tests
+    python manage.py explain_queries --fail-on-seq-scan --min-rows 1000
+"""
+
+import contextlib
+import io
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.core import benchmarks
+from apps.core.query_plans import QueryCapture, explain, table_rows
+
+
+class Command(BaseCommand):
+    help = 'Capture les SELECT de l\'ORM, exécute EXPLAIN et signale les scans séquentiels'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input', help='Fichier JSONL capturé par QueryCaptureRunner')
+        parser.add_argument('--save', help='Écrire les requêtes capturées (JSONL) dans ce fichier')
+        parser.add_argument('--user', help='Utilisateur au nom duquel les scénarios HTTP sont joués')
+        parser.add_argument('--min-rows', type=int, default=1000,
+                            help='Ignorer les scans de tables plus petites (catalogues, référentiels)')
+        parser.add_argument('--show-plans', action='store_true', help='Afficher le plan de chaque requête')
+        parser.add_argument('--fail-on-seq-scan', action='store_true',
+                            help='Code de sortie non nul si un scan séquentiel est signalé')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.stdout.write(self.style.WARNING(f'[SKIP] EXPLAIN non supporté pour {connection.vendor}'))
+            return
+
+        if options['input']:
+            capture = QueryCapture().load(options['input'])
+        else:
+            capture = self.capture_scenarios(options['user'])
+        if options['save']:
+            capture.dump(options['save'])
+        self.stdout.write(f'[EXPLAIN] {len(capture.statements)} requetes SELECT distinctes')
+
+        sizes, flagged = {}, 0
+        for sql, entry in sorted(capture.statements.items(), key=lambda item: -item[1]['count']):
+            try:
+                plan = explain(sql, entry['params'])
+            except Exception as e:
+                self.stderr.write(self.style.WARNING(f'[SKIP] {e}: {sql[:120]}'))
+                continue
+            if plan is None:
+                continue
+            lines, scans = plan
+            scans = [table for table in scans if self.table_size(table, sizes) >= options['min_rows']]
+            if scans:
+                flagged += 1
+                self.stdout.write(self.style.ERROR(
+                    f"\n[SEQ SCAN] {', '.join(sorted(set(scans)))} (x{entry['count']})"
+                ))
+                self.stdout.write(f'  {sql[:400]}')
+            elif options['show_plans']:
+                self.stdout.write(f"\n[PLAN] (x{entry['count']}) {sql[:400]}")
+            if scans or options['show_plans']:
+                for line in lines:
+                    self.stdout.write(f'    {line}')
+
+        if flagged:
+            message = f'{flagged} requete(s) avec scan sequentiel sur des tables >= {options["min_rows"]} lignes'
+            if options['fail_on_seq_scan']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(f'\n[WARN] {message}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('[OK] Aucun scan sequentiel signale'))
+
+    def capture_scenarios(self, username):
+        """Joue une fois chaque scénario HTTP de benchmark en capturant ses SELECT"""
+        try:
+            user = benchmarks.benchmark_user(username)
+        except LookupError as e:
+            raise CommandError(str(e))
+        capture = QueryCapture()
+        scenarios = benchmarks.http_scenarios(user, benchmarks.benchmark_defi_id())
+        with connection.execute_wrapper(capture), contextlib.redirect_stdout(io.StringIO()):
+            for scenario in scenarios:
+                scenario.func()
+        return capture
+
+    def table_size(self, table, sizes):
+        if table not in sizes:
+            try:
+                sizes[table] = table_rows(table)
+            except Exception:
+                sizes[table] = None
+            if sizes[table] is None:
+                # Alias of a subquery, or no statistics yet: keep it flagged
+                sizes[table] = float('inf')
+        return sizes[table]
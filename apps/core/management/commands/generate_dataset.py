@@ -0,0 +1,526 @@
+"""
+Commande Django pour générer un jeu de données synthétique à grande échelle
+Usage: python manage.py generate_dataset --users 100000 --activity-logs 10000000
+
+Les lignes sont insérées avec bulk_create par lots : les signaux post_save ne
+sont donc pas déclenchés (pas de synchronisation Fuseki ligne par ligne). Les
+triplets correspondants sont écrits dans un fichier N-Triples à charger en une
+seule fois dans Fuseki, par exemple :
+
+    curl -X POST -H 'Content-Type: application/n-triples' \
+         --data-binary @dataset.nt http://localhost:3030/smarthealth/data
+
+Avec le même --seed et la même --anchor-date, deux exécutions sur une base vide
+produisent exactement les mêmes lignes et les mêmes identifiants.
+"""
+
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.activities.models import (
+    Activity, ActivityLog, Cardio, Musculation, Natation,
+    LowIntensityLog, MediumIntensityLog, HighIntensityLog,
+)
+from apps.core import catalogues
+from apps.defis import leaderboard
+from apps.defis.models import (
+    Defi, DefiBadge, DefiStatus, Participation,
+    ParticipationProgress, ParticipationNumber, ParticipationRange,
+)
+from apps.habits.models import Habit, HabitLog, HabitLogFrequency, HabitLogNotes
+from apps.health_records import anomalies, latest_values
+from apps.health_records.models import HealthMetric, HealthRecord
+from apps.meals import nutrient_matrix
+from apps.meals.models import (
+    Meal, FoodItem,
+    Breakfast, Lunch, Dinner, Snack,
+)
+from apps.rollups import buckets as rollups
+from apps.sparql_service import ntriples
+from apps.users.counters import recount as recount_dashboard
+from apps.users.models import User
+
+
+ACTIVITY_NAMES = {
+    'Cardio': ['Course à pied', 'Vélo', 'Rameur', 'Corde à sauter', 'Elliptique', 'Marche rapide'],
+    'Musculation': ['Développé couché', 'Squat', 'Soulevé de terre', 'Tractions', 'Pompes', 'Fentes'],
+    'Natation': ['Crawl', 'Brasse', 'Dos crawlé', 'Papillon'],
+}
+
+FOOD_NAMES = {
+    'PROTEIN': ['Poulet grillé', 'Oeufs', 'Thon', 'Lentilles', 'Tofu', 'Saumon'],
+    'CARBS': ['Riz complet', 'Pâtes', 'Pain complet', 'Quinoa', 'Pomme de terre', 'Couscous'],
+    'FATS': ['Avocat', 'Amandes', "Huile d'olive", 'Noix', 'Fromage'],
+    'VEGETABLES': ['Brocoli', 'Épinards', 'Carottes', 'Courgette', 'Salade verte', 'Tomates'],
+    'FRUITS': ['Pomme', 'Banane', 'Orange', 'Fraises', 'Kiwi', 'Dattes'],
+}
+
+# calories, protein, carbs, fiber, sugar ranges per 100 g
+NUTRIENT_RANGES = {
+    'PROTEIN': ((110, 250), (15, 30), (0, 10), (0, 8), (0, 2)),
+    'CARBS': ((90, 380), (2, 14), (20, 75), (1, 9), (0, 6)),
+    'FATS': ((160, 880), (0, 25), (0, 20), (0, 12), (0, 5)),
+    'VEGETABLES': ((15, 60), (1, 4), (2, 10), (1, 5), (1, 6)),
+    'FRUITS': ((30, 280), (0, 3), (8, 75), (1, 8), (5, 65)),
+}
+
+MEAL_HOURS = {'BREAKFAST': 8, 'LUNCH': 12, 'DINNER': 20, 'SNACK': 16}
+
+# (moyenne, écart-type, min, max) des valeurs générées pour chaque métrique
+METRIC_DISTRIBUTIONS = {
+    'Heart Rate': (72, 10, 40, 190),
+    'Cholesterol': (190, 30, 100, 320),
+    'Sugar Level': (95, 15, 55, 250),
+    'Oxygen Saturation': (97, 1.5, 85, 100),
+    'Height': (170, 10, 140, 210),
+    'Weight': (72, 14, 40, 160),
+}
+
+HABIT_NAMES = {
+    'READING': ['Lire 20 pages', 'Lecture du soir'],
+    'COOKING': ['Cuisiner maison', 'Préparer les repas'],
+    'DRAWING': ['Croquis quotidien', 'Aquarelle'],
+    'JOURNALING': ['Journal de gratitude', 'Bilan de la journée'],
+    'OTHER': ['Méditation', 'Boire 2L d\'eau'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Génère un jeu de données synthétique reproductible (bulk_create + N-Triples)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Nombre d\'utilisateurs')
+        parser.add_argument('--activities', type=int, default=30, help='Taille du catalogue d\'activités')
+        parser.add_argument('--activity-logs', type=int, default=50000, help='Nombre de logs d\'activité')
+        parser.add_argument('--food-catalog', type=int, default=200, help='Aliments de catalogue (sans repas)')
+        parser.add_argument('--meals', type=int, default=20000, help='Nombre de repas')
+        parser.add_argument('--max-food-items-per-meal', type=int, default=4)
+        parser.add_argument('--health-records', type=int, default=30000,
+                            help='Nombre de health records, répartis entre les métriques')
+        parser.add_argument('--habits-per-user', type=int, default=2)
+        parser.add_argument('--habit-logs', type=int, default=20000)
+        parser.add_argument('--defis', type=int, default=20)
+        parser.add_argument('--participations', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=365, help='Profondeur historique en jours')
+        parser.add_argument('--anchor-date', help='Date de fin de l\'historique (YYYY-MM-DD), défaut : aujourd\'hui')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--username-prefix', default='gen_user_')
+        parser.add_argument('--ntriples', default='dataset.nt', help='Fichier N-Triples de sortie')
+        parser.add_argument('--skip-ntriples', action='store_true', help='Ne pas écrire de N-Triples')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.days = max(1, options['days'])
+        if options['anchor_date']:
+            anchor = datetime.strptime(options['anchor_date'], '%Y-%m-%d').date()
+        else:
+            anchor = timezone.now().date()
+        self.anchor = timezone.make_aware(datetime.combine(anchor, time.min))
+
+        prefix = options['username_prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f"Des utilisateurs '{prefix}*' existent déjà ; utilisez --username-prefix pour un autre lot"
+            )
+        if not HealthMetric.objects.exists() and options['health_records']:
+            raise CommandError("Aucune HealthMetric : appliquez d'abord les migrations (health_records 0008)")
+
+        self.nt_file = None
+        if not options['skip_ntriples']:
+            self.nt_file = open(options['ntriples'], 'w', encoding='utf-8')
+        self.triple_count = 0
+
+        self.stdout.write(self.style.SUCCESS(f"[START] Generation du jeu de donnees (seed={options['seed']})"))
+        try:
+            self.touched_models = set()
+            user_ids = self.generate_users(options['users'], prefix)
+            activity_ids = self.generate_activities(options['activities'])
+            self.generate_activity_logs(options['activity_logs'], user_ids, activity_ids)
+            self.generate_food_catalog(options['food_catalog'])
+            self.generate_meals(options['meals'], options['max_food_items_per_meal'], user_ids)
+            self.generate_health_records(options['health_records'], user_ids)
+            habit_ids = self.generate_habits(options['habits_per_user'], user_ids)
+            self.generate_habit_logs(options['habit_logs'], habit_ids)
+            defi_ids = self.generate_defis(options['defis'])
+            self.generate_participations(options['participations'], user_ids, defi_ids)
+            self.reset_sequences()
+            # bulk_create ne déclenche pas les signaux : tables dérivées reconstruites ici
+            recount_dashboard()
+            latest_values.rebuild()
+            anomalies.rebuild()
+            leaderboard.rebuild()
+            rollups.rebuild()
+            nutrient_matrix.invalidate()
+            for name in ('activities', 'health_metrics', 'defis'):
+                catalogues.invalidate(name)
+        finally:
+            if self.nt_file:
+                self.nt_file.close()
+
+        if self.nt_file:
+            self.stdout.write(self.style.SUCCESS(
+                f"[OK] {self.triple_count} triplets ecrits dans {options['ntriples']}"
+            ))
+        self.stdout.write(self.style.SUCCESS('[DONE] Jeu de donnees genere'))
+
+    # ==================== HELPERS ====================
+
+    def next_id(self, model):
+        """Premier identifiant libre ; les PK sont attribuées explicitement pour être reproductibles"""
+        self.touched_models.add(model)
+        return (model.objects.aggregate(m=Max(model._meta.pk.attname))['m'] or 0) + 1
+
+    def random_datetime(self, hour=None):
+        """Date aléatoire dans la fenêtre [anchor - days, anchor]"""
+        day = self.anchor - timedelta(days=self.rng.randrange(self.days))
+        if hour is None:
+            hour = self.rng.randrange(6, 23)
+        return day + timedelta(hours=hour, minutes=self.rng.randrange(60))
+
+    def write_triples(self, triples):
+        if self.nt_file and triples:
+            self.nt_file.write('\n'.join(triples))
+            self.nt_file.write('\n')
+            self.triple_count += len(triples)
+
+    def flush(self, rows_by_model, triples):
+        """Insère un lot (parents avant enfants) et écrit ses triplets"""
+        with transaction.atomic():
+            for model, rows in rows_by_model:
+                if rows:
+                    model.objects.bulk_create(rows, batch_size=self.batch_size)
+        self.write_triples(triples)
+
+    def batches(self, total):
+        """Découpe `total` en tailles de lot successives"""
+        done = 0
+        while done < total:
+            size = min(self.batch_size, total - done)
+            yield done, size
+            done += size
+
+    def progress(self, label, done, total):
+        self.stdout.write(f'  [{label}] {done}/{total}')
+
+    def reset_sequences(self):
+        """Réaligne les séquences (PostgreSQL) après l'insertion d'identifiants explicites"""
+        sql = connection.ops.sequence_reset_sql(no_style(), list(self.touched_models))
+        if sql:
+            with connection.cursor() as cursor:
+                for statement in sql:
+                    cursor.execute(statement)
+
+    # ==================== GENERATORS ====================
+
+    def generate_users(self, total, prefix):
+        self.stdout.write(f'\n[USERS] {total} utilisateurs...')
+        password = make_password('SmartHealth2024!')
+        start = self.next_id(User)
+        ids = []
+        for offset, size in self.batches(total):
+            rows, triples = [], []
+            for i in range(offset, offset + size):
+                user = User(
+                    user_id=start + i,
+                    username=f'{prefix}{i:07d}',
+                    email=f'{prefix}{i:07d}@example.com',
+                    first_name=self.rng.choice(['Amine', 'Sarra', 'Yassine', 'Ines', 'Omar', 'Nour']),
+                    last_name=self.rng.choice(['Ben Ali', 'Trabelsi', 'Gharbi', 'Jaziri', 'Mansour']),
+                    password=password,
+                )
+                rows.append(user)
+                triples.extend(ntriples.user_triples(user))
+                ids.append(user.user_id)
+            self.flush([(User, rows)], triples)
+            self.progress('USERS', offset + size, total)
+        return ids
+
+    def generate_activities(self, total):
+        self.stdout.write(f'\n[ACTIVITIES] {total} activites...')
+        start = self.next_id(Activity)
+        kinds = list(ACTIVITY_NAMES)
+        activities, details, triples = [], {Cardio: [], Musculation: [], Natation: []}, []
+        for i in range(total):
+            kind = kinds[i % len(kinds)]
+            activity = Activity(
+                activity_id=start + i,
+                activity_name=f"{self.rng.choice(ACTIVITY_NAMES[kind])} #{i + 1}",
+                activity_description=f'Activité de type {kind.lower()} générée',
+            )
+            activities.append(activity)
+            if kind == 'Cardio':
+                details[Cardio].append(Cardio(
+                    activity=activity,
+                    calories_burned=round(self.rng.uniform(150, 800), 1),
+                    heart_rate=self.rng.randrange(110, 175),
+                ))
+            elif kind == 'Musculation':
+                details[Musculation].append(Musculation(
+                    activity=activity,
+                    sets=self.rng.randrange(3, 6),
+                    repetitions=self.rng.randrange(6, 15),
+                    weight=self.rng.randrange(10, 120),
+                ))
+            else:
+                details[Natation].append(Natation(
+                    activity=activity,
+                    distance=self.rng.randrange(200, 3000, 50),
+                    style=self.rng.choice([c[0] for c in Natation._meta.get_field('style').choices]),
+                ))
+            triples.extend(ntriples.activity_triples(activity, kind))
+        self.touched_models.update(details)
+        self.flush([(Activity, activities)] + list(details.items()), triples)
+        return [a.activity_id for a in activities]
+
+    def generate_activity_logs(self, total, user_ids, activity_ids):
+        self.stdout.write(f'\n[ACTIVITY LOGS] {total} logs...')
+        if not user_ids or not activity_ids:
+            return
+        start = self.next_id(ActivityLog)
+        self.touched_models.update([LowIntensityLog, MediumIntensityLog, HighIntensityLog])
+        for offset, size in self.batches(total):
+            logs, low, medium, high, triples = [], [], [], [], []
+            for i in range(offset, offset + size):
+                intensity = self.rng.choice(['LOW', 'MEDIUM', 'HIGH', None])
+                log = ActivityLog(
+                    activity_log_id=start + i,
+                    activity_id=self.rng.choice(activity_ids),
+                    user_id=self.rng.choice(user_ids),
+                    date=self.random_datetime(),
+                    duration=self.rng.randrange(10, 120),
+                    intensity=intensity,
+                )
+                logs.append(log)
+                if intensity == 'LOW':
+                    low.append(LowIntensityLog(
+                        activity_log=log,
+                        breathing_rate=self.rng.choice(['Normal', 'Calme']),
+                        comfort_level=self.rng.randrange(6, 11),
+                    ))
+                elif intensity == 'MEDIUM':
+                    medium.append(MediumIntensityLog(
+                        activity_log=log,
+                        active_time=max(1, log.duration - self.rng.randrange(0, 10)),
+                        breaks_taken=self.rng.randrange(0, 4),
+                    ))
+                elif intensity == 'HIGH':
+                    high.append(HighIntensityLog(
+                        activity_log=log,
+                        lactic_acid_level=round(self.rng.uniform(4, 15), 1),
+                        injury_risk=self.rng.choice(['Faible', 'Moyen', 'Élevé']),
+                    ))
+                triples.extend(ntriples.activity_log_triples(log))
+            self.flush([
+                (ActivityLog, logs), (LowIntensityLog, low),
+                (MediumIntensityLog, medium), (HighIntensityLog, high),
+            ], triples)
+            self.progress('ACTIVITY LOGS', offset + size, total)
+
+    def build_food_item(self, food_item_id, meal_id=None):
+        """Construit un FoodItem (valeurs nutritionnelles incluses) et ses triplets"""
+        food_type = self.rng.choice(list(FOOD_NAMES))
+        item = FoodItem(
+            food_item_id=food_item_id,
+            meal_id=meal_id,
+            food_item_name=self.rng.choice(FOOD_NAMES[food_type]),
+            food_item_description=f'Portion de {food_type.lower()}',
+            food_type=food_type,
+        )
+        values = [self.rng.randint(low, high) for low, high in NUTRIENT_RANGES[food_type]]
+        item.set_nutrients(**dict(zip(FoodItem.NUTRIENTS, values)))
+        return item, ntriples.food_item_triples(item, item.nutrients)
+
+    def generate_food_catalog(self, total):
+        self.stdout.write(f'\n[FOODITEMS] {total} aliments de catalogue...')
+        start = self.next_id(FoodItem)
+        for offset, size in self.batches(total):
+            items, triples = [], []
+            for i in range(offset, offset + size):
+                item, item_triples = self.build_food_item(start + i)
+                items.append(item)
+                triples.extend(item_triples)
+            self.flush([(FoodItem, items)], triples)
+
+    def generate_meals(self, total, max_items, user_ids):
+        self.stdout.write(f'\n[MEALS] {total} repas...')
+        if not user_ids:
+            return
+        meal_start = self.next_id(Meal)
+        item_id = self.next_id(FoodItem)
+        detail_models = {'BREAKFAST': (Breakfast, 'breakfast_score'), 'LUNCH': (Lunch, 'lunch_score'),
+                         'DINNER': (Dinner, 'dinner_score'), 'SNACK': (Snack, 'snack_score')}
+        self.touched_models.update(model for model, _ in detail_models.values())
+        for offset, size in self.batches(total):
+            meals, items, triples = [], [], []
+            details = {model: [] for model, _ in detail_models.values()}
+            for i in range(offset, offset + size):
+                meal_type = self.rng.choice(list(MEAL_HOURS))
+                meal = Meal(
+                    meal_id=meal_start + i,
+                    user_id=self.rng.choice(user_ids),
+                    meal_name=f'{meal_type.capitalize()} {i + 1}',
+                    meal_type=meal_type,
+                    total_calories=0,
+                    meal_date=self.random_datetime(MEAL_HOURS[meal_type]),
+                )
+                meal_triples = []
+                for _ in range(self.rng.randint(1, max(1, max_items))):
+                    item, item_triples = self.build_food_item(item_id, meal.meal_id)
+                    item_id += 1
+                    items.append(item)
+                    meal.total_calories += item.calories_value
+                    meal_triples.extend(item_triples)
+                meals.append(meal)
+                model, score_field = detail_models[meal_type]
+                details[model].append(model(meal=meal, **{score_field: self.rng.randint(40, 100)}))
+                triples.extend(ntriples.meal_triples(meal))
+                triples.extend(meal_triples)
+            self.flush([(Meal, meals), (FoodItem, items)] + list(details.items()), triples)
+
+    def generate_health_records(self, total, user_ids):
+        self.stdout.write(f'\n[HEALTH RECORDS] {total} mesures...')
+        metrics = list(HealthMetric.objects.order_by('health_metric_id'))
+        if not user_ids or not metrics:
+            return
+        start = self.next_id(HealthRecord)
+        for offset, size in self.batches(total):
+            records, triples = [], []
+            for i in range(offset, offset + size):
+                metric = metrics[i % len(metrics)]
+                mean, stddev, low, high = METRIC_DISTRIBUTIONS.get(metric.metric_name, (50, 15, 0, 100))
+                value = round(min(high, max(low, self.rng.gauss(mean, stddev))), 1)
+                record = HealthRecord(
+                    health_record_id=start + i,
+                    user_id=self.rng.choice(user_ids),
+                    health_metric_id=metric.health_metric_id,
+                    value=value,
+                    description=f'{metric.metric_name}: {value} {metric.metric_unit}',
+                    start_date=self.random_datetime(),
+                )
+                records.append(record)
+            self.flush([(HealthRecord, records)], [])
+            # created_at (auto_now_add) n'est connu qu'après l'insertion
+            for record in records:
+                triples.extend(ntriples.health_record_triples(record))
+            self.write_triples(triples)
+            self.progress('HEALTH RECORDS', offset + size, total)
+
+    def generate_habits(self, per_user, user_ids):
+        total = per_user * len(user_ids)
+        self.stdout.write(f'\n[HABITS] {total} habitudes...')
+        start = self.next_id(Habit)
+        ids = []
+        pairs = [(user_id, n) for user_id in user_ids for n in range(per_user)]
+        for offset, size in self.batches(total):
+            habits, triples = [], []
+            for i in range(offset, offset + size):
+                user_id, _ = pairs[i]
+                habit_type = self.rng.choice(list(HABIT_NAMES))
+                habit = Habit(
+                    habit_id=start + i,
+                    user_id=user_id,
+                    habit_name=self.rng.choice(HABIT_NAMES[habit_type]),
+                    habit_type=habit_type,
+                )
+                habits.append(habit)
+                ids.append(habit.habit_id)
+                triples.extend(ntriples.habit_triples(habit))
+            self.flush([(Habit, habits)], triples)
+        return ids
+
+    def generate_habit_logs(self, total, habit_ids):
+        self.stdout.write(f'\n[HABIT LOGS] {total} logs...')
+        if not habit_ids:
+            return
+        start = self.next_id(HabitLog)
+        self.touched_models.update([HabitLogFrequency, HabitLogNotes])
+        for offset, size in self.batches(total):
+            logs, frequencies, notes, triples = [], [], [], []
+            for i in range(offset, offset + size):
+                start_date = self.random_datetime()
+                log = HabitLog(
+                    habit_log_id=start + i,
+                    habit_id=self.rng.choice(habit_ids),
+                    start_date=start_date,
+                    end_date=start_date + timedelta(minutes=self.rng.randrange(10, 90)),
+                    reminder_time=start_date - timedelta(minutes=15),
+                )
+                logs.append(log)
+                daily = self.rng.random() < 0.7
+                frequencies.append(HabitLogFrequency(habit_log=log, daily=daily, weekly=not daily))
+                if self.rng.random() < 0.3:
+                    notes.append(HabitLogNotes(habit_log=log, description='Séance réussie'))
+                triples.extend(ntriples.habit_log_triples(log))
+            self.flush([(HabitLog, logs), (HabitLogFrequency, frequencies), (HabitLogNotes, notes)], triples)
+            self.progress('HABIT LOGS', offset + size, total)
+
+    def generate_defis(self, total):
+        self.stdout.write(f'\n[DEFIS] {total} defis...')
+        start = self.next_id(Defi)
+        defis, triples = [], []
+        for i in range(total):
+            defi = Defi(
+                defi_id=start + i,
+                defi_name=f'Défi {i + 1}',
+                defi_description=self.rng.choice([
+                    '10 000 pas par jour', '30 jours sans sucre', 'Courir 50 km ce mois-ci',
+                    'Dormir 8 heures', 'Boire 2 litres d\'eau par jour',
+                ]),
+            )
+            defis.append(defi)
+            triples.extend(ntriples.defi_triples(defi))
+        self.touched_models.update([DefiStatus, DefiBadge])
+        self.flush([
+            (Defi, defis),
+            (DefiStatus, [DefiStatus(defi=d) for d in defis]),
+            (DefiBadge, [DefiBadge(defi=d) for d in defis]),
+        ], triples)
+        return [d.defi_id for d in defis]
+
+    def generate_participations(self, total, user_ids, defi_ids):
+        self.stdout.write(f'\n[PARTICIPATIONS] {total} participations...')
+        if not user_ids or not defi_ids:
+            return
+        if total > len(user_ids) * len(defi_ids):
+            total = len(user_ids) * len(defi_ids)
+            self.stdout.write(self.style.WARNING(
+                f'  [WARN] {total} participations seulement : une par couple (utilisateur, défi)'
+            ))
+        start = self.next_id(Participation)
+        self.touched_models.update([ParticipationProgress, ParticipationNumber, ParticipationRange])
+        # Couples distincts tirés parmi les len(user_ids) x len(defi_ids) possibles
+        pairs = self.rng.sample(range(len(user_ids) * len(defi_ids)), total)
+        for offset, size in self.batches(total):
+            participations, progress, numbers, ranges, triples = [], [], [], [], []
+            for i in range(offset, offset + size):
+                user_index, defi_index = divmod(pairs[i], len(defi_ids))
+                pair = (user_ids[user_index], defi_ids[defi_index])
+                start_date = self.random_datetime()
+                participation = Participation(
+                    participation_id=start + i,
+                    user_id=pair[0],
+                    defi_id=pair[1],
+                    start_date=start_date,
+                    end_date=start_date + timedelta(days=self.rng.choice([7, 14, 30, 60])),
+                )
+                value = self.rng.randint(0, 100)
+                participations.append(participation)
+                progress.append(ParticipationProgress(participation=participation, progress_value=value))
+                numbers.append(ParticipationNumber(participation=participation,
+                                                   participation_count=self.rng.randint(1, 30)))
+                ranges.append(ParticipationRange(participation=participation, range_value=self.rng.randint(0, 10)))
+                triples.extend(ntriples.participation_triples(participation, value))
+            self.flush([
+                (Participation, participations), (ParticipationProgress, progress),
+                (ParticipationNumber, numbers), (ParticipationRange, ranges),
+            ], triples)
+            self.progress('PARTICIPATIONS', offset + size, total)
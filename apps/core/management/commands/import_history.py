@@ -0,0 +1,110 @@
+"""
+Commande Django pour importer un historique volumineux (CSV ou JSON Lines)
+Usage: python manage.py import_history health_records export.csv --workers 4 --chunk-size 10000
+
+Le fichier est lu par memory mapping, ligne par ligne ; les lignes sont
+converties vers ActivityLog, HealthRecord ou Meal, dédoublonnées sur leur clé
+naturelle puis insérées par lots (bulk_create) par un pool de processus.
+Colonnes attendues (renommables avec --map colonne=champ) :
+
+- commun : user (nom d'utilisateur) ou user_id
+- activity_logs : activity (nom) ou activity_id, date, duration, intensity
+- health_records : metric (nom) ou health_metric_id, value, start_date, end_date, description
+- meals : meal_name, meal_type, total_calories, meal_date
+
+Chaque processus écrit les triplets de ses lignes dans <--ntriples>.<pid>.nt,
+à charger ensuite dans Fuseki. Un point de reprise (<fichier>.checkpoint.json)
+permet de relancer la commande après une interruption : l'import reprend au
+dernier lot validé. Les tables dérivées (compteurs, rollups, dernières valeurs,
+anomalies) sont reconstruites à la fin.
+"""
+
+import os
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.core import importer
+
+
+class Command(BaseCommand):
+    help = 'Importe un historique CSV / JSON Lines (memory mapping, lots parallèles, reprise)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(importer.KINDS), help='Type de lignes importées')
+        parser.add_argument('files', nargs='+', help='Fichiers .csv ou .jsonl')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Lignes par lot')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processus d\'insertion (défaut : 1 avec SQLite, sinon nombre de CPU)')
+        parser.add_argument('--map', action='append', default=[], metavar='COLONNE=CHAMP',
+                            help='Renomme une colonne du fichier')
+        parser.add_argument('--ntriples', default=None, help='Préfixe des fichiers N-Triples de sortie')
+        parser.add_argument('--restart', action='store_true', help='Ignorer les points de reprise existants')
+        parser.add_argument('--skip-rebuild', action='store_true',
+                            help='Ne pas reconstruire les tables dérivées à la fin')
+
+    def handle(self, *args, **options):
+        renames = {}
+        for mapping in options['map']:
+            column, _, field = mapping.partition('=')
+            if not field:
+                raise CommandError(f'--map attend colonne=champ, reçu : {mapping}')
+            renames[column] = field
+        workers = options['workers']
+        if workers is None:
+            workers = 1 if connection.vendor == 'sqlite' else os.cpu_count() or 1
+
+        since = None
+        for path in options['files']:
+            if not os.path.exists(path):
+                raise CommandError(f'Fichier introuvable : {path}')
+            checkpoint = f'{path}.checkpoint.json'
+            if options['restart'] and os.path.exists(checkpoint):
+                os.remove(checkpoint)
+            job = importer.Importer(
+                path, options['kind'], chunk_size=options['chunk_size'], workers=workers,
+                ntriples_prefix=options['ntriples'], renames=renames, checkpoint=checkpoint,
+            )
+            if job.resume():
+                self.stdout.write(self.style.WARNING(
+                    f"[RESUME] {path} : reprise à l'octet {job.stats['offset']} ({job.stats['created']} lignes déjà importées)"
+                ))
+            job.report = self.reporter(path, job.stats)
+            self.stdout.write(self.style.SUCCESS(f'[START] {path} ({workers} processus)'))
+            stats = job.run()
+            for error in job.errors:
+                self.stdout.write(self.style.WARNING(f'  [SKIP] {error}'))
+            self.stdout.write(self.style.SUCCESS(
+                f"[OK] {path} : {stats['created']} créées, {stats['duplicates']} doublons, "
+                f"{stats['skipped']} rejetées, {stats['triples']} triplets"
+            ))
+            if stats['since']:
+                day = date.fromisoformat(stats['since'])
+                since = day if since is None else min(since, day)
+
+        if not options['skip_rebuild']:
+            self.stdout.write('[REBUILD] Tables dérivées...')
+            importer.finish({options['kind']}, since=since)
+        for path in options['files']:
+            if os.path.exists(f'{path}.checkpoint.json'):
+                os.remove(f'{path}.checkpoint.json')
+        self.stdout.write(self.style.SUCCESS('[DONE] Import terminé'))
+
+    def reporter(self, path, stats):
+        """Affiche l'avancement et le débit après chaque lot validé"""
+        start = time.perf_counter()
+        first = {'offset': stats['offset'], 'rows': stats['rows']}
+
+        def report(stats):
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            rows = stats['rows'] - first['rows']
+            read = stats['offset'] - first['offset']
+            percent = 100.0 * stats['offset'] / stats['size'] if stats['size'] else 100.0
+            remaining = (stats['size'] - stats['offset']) / (read / elapsed) if read else 0.0
+            self.stdout.write(
+                f"  [{os.path.basename(path)}] {percent:5.1f}% - {stats['created']} lignes, "
+                f"{rows / elapsed:,.0f} lignes/s, {read / elapsed / 1e6:.1f} Mo/s, reste ~{remaining:.0f}s"
+            )
+        return report
@@ -0,0 +1,91 @@
+"""
+Commande Django pour mesurer les performances (latence p50/p95/p99, débit, requêtes SQL)
+Usage:
+    python manage.py generate_dataset --username-prefix bench_user_
+    python manage.py run_benchmarks --save benchmarks/baseline.json
+    python manage.py run_benchmarks --baseline benchmarks/baseline.json --threshold 0.2
+"""
+
+import platform
+import sys
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.core import benchmarks
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Exécute les benchmarks et compare le résultat à une baseline JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--only', help='Ne lancer que les scénarios dont le nom contient cette chaîne')
+        parser.add_argument('--user', help='Utilisateur au nom duquel les vues sont appelées')
+        parser.add_argument('--save', help='Écrire les résultats comme nouvelle baseline JSON')
+        parser.add_argument('--baseline', help='Baseline JSON à comparer')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Régression tolérée sur le p95 (0.2 = +20%%)')
+        parser.add_argument('--generate', action='store_true',
+                            help='Générer un jeu de données (generate_dataset) s\'il est absent')
+
+    def handle(self, *args, **options):
+        if options['generate'] and not User.objects.filter(username__startswith='bench_user_').exists():
+            self.stdout.write('[SEED] Generation du jeu de donnees de benchmark...')
+            call_command('generate_dataset', username_prefix='bench_user_', skip_ntriples=True,
+                         anchor_date='2025-01-01', stdout=self.stdout)
+
+        try:
+            user = benchmarks.benchmark_user(options['user'])
+        except LookupError as e:
+            raise CommandError(str(e))
+
+        scenarios = (
+            benchmarks.http_scenarios(user, benchmarks.benchmark_defi_id())
+            + benchmarks.rdf_manager_scenarios()
+            + benchmarks.formatter_scenarios()
+            + benchmarks.ai_sync_scenarios(user)
+        )
+        if options['only']:
+            scenarios = [s for s in scenarios if options['only'] in s.name]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"[START] {len(scenarios)} scenarios x {options['iterations']} iterations (user={user.username})"
+        ))
+        self.stdout.write(f"{'scenario':<32}{'p50':>10}{'p95':>10}{'p99':>10}{'ops/s':>10}{'queries':>9}")
+        results = {}
+        for scenario in scenarios:
+            try:
+                stats = benchmarks.run_scenario(scenario, options['iterations'], options['warmup'])
+            except Exception as e:
+                raise CommandError(f'[ERROR] {scenario.name}: {e}')
+            results[scenario.name] = stats
+            self.stdout.write(
+                f"{scenario.name:<32}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                f"{stats['p99_ms']:>10.2f}{stats['throughput_ops']:>10.1f}{stats['queries_per_op']:>9.1f}"
+            )
+
+        if options['save']:
+            benchmarks.save_baseline(options['save'], results, {
+                'created_at': timezone.now().isoformat(),
+                'iterations': options['iterations'],
+                'user': user.username,
+                'database': connection.vendor,
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+            })
+            self.stdout.write(self.style.SUCCESS(f"[SAVE] Baseline ecrite dans {options['save']}"))
+
+        if options['baseline']:
+            regressions = benchmarks.compare_to_baseline(
+                results, benchmarks.load_baseline(options['baseline']), options['threshold']
+            )
+            if regressions:
+                for line in regressions:
+                    self.stderr.write(self.style.ERROR(f'[REGRESSION] {line}'))
+                raise CommandError(f'{len(regressions)} regression(s) par rapport a {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS('[OK] Aucune regression'))
@@ -0,0 +1,214 @@
+"""
+In-process Prometheus metrics
+A minimal counter/histogram registry rendered in the Prometheus text exposition
+format by the /metrics view. Values are per process: with several gunicorn
+workers each one exposes its own series.
+"""
+
+import contextvars
+import functools
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Histogram:
+    """Cumulative histogram with optional labels"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def count(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        series = self._series.get(key)
+        return series['count'] if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, dict(s, buckets=list(s['buckets']))) for key, s in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['buckets']):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(series["sum"])}'
+            yield f'{self.name}_count{labels} {series["count"]}'
+
+
+class Registry:
+    """Ordered collection of metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+FUSEKI_QUERY_SECONDS = REGISTRY.register(Histogram(
+    'smarthealth_fuseki_query_duration_seconds', 'Fuseki SPARQL query latency', ['outcome']))
+FUSEKI_UPDATE_SECONDS = REGISTRY.register(Histogram(
+    'smarthealth_fuseki_update_duration_seconds', 'Fuseki SPARQL update latency', ['outcome']))
+GEMINI_SECONDS = REGISTRY.register(Histogram(
+    'smarthealth_gemini_request_duration_seconds', 'Gemini API call latency', ['outcome']))
+GEMINI_TOKENS = REGISTRY.register(Histogram(
+    'smarthealth_gemini_tokens', 'Gemini token usage per call', ['type'], buckets=TOKEN_BUCKETS))
+RDF_SAVE_SECONDS = REGISTRY.register(Histogram(
+    'smarthealth_rdf_save_ontology_duration_seconds', 'RDFManager.save_ontology duration', ['outcome']))
+SIGNAL_SYNC_SECONDS = REGISTRY.register(Histogram(
+    'smarthealth_signal_sync_duration_seconds', 'Fuseki sync signal handler duration',
+    ['model', 'operation', 'outcome']))
+AI_INTENTS = REGISTRY.register(Counter(
+    'smarthealth_ai_intent_total', 'AI query intents detected', ['intent']))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'smarthealth_cache_requests_total', 'Application cache lookups', ['cache', 'result']))
+SPARQL_BREAKER_TRANSITIONS = REGISTRY.register(Counter(
+    'smarthealth_fuseki_breaker_transitions_total', 'Fuseki circuit breaker state changes', ['state']))
+SPARQL_SHORT_CIRCUITED = REGISTRY.register(Counter(
+    'smarthealth_fuseki_short_circuited_total', 'Fuseki calls refused by the open circuit', ['operation']))
+SPARQL_QUEUED_UPDATES = REGISTRY.register(Counter(
+    'smarthealth_fuseki_queued_updates_total', 'Fuseki updates stored in the retry queue', ['reason']))
+SPARQL_REPLICA_READS = REGISTRY.register(Counter(
+    'smarthealth_sparql_reads_total', 'SPARQL queries by source while the read replica is enabled', ['source']))
+
+_KIND_HISTOGRAMS = {
+    'sparql': FUSEKI_QUERY_SECONDS,
+    'sparql_update': FUSEKI_UPDATE_SECONDS,
+    'gemini': GEMINI_SECONDS,
+    'rdf_save': RDF_SAVE_SECONDS,
+}
+
+# Set while a sync signal handler runs, so that a failed Fuseki update inside it
+# marks the sync as failed even though the handler swallows the exception.
+_sync_state = contextvars.ContextVar('smarthealth_sync_state', default=None)
+
+
+def observe_operation(kind, seconds, failed):
+    """Instrumentation observer (see apps.core.instrumentation.add_observer)"""
+    histogram = _KIND_HISTOGRAMS.get(kind)
+    if histogram is not None:
+        histogram.observe(seconds, outcome='error' if failed else 'ok')
+    if failed and kind == 'sparql_update':
+        state = _sync_state.get()
+        if state is not None:
+            state['failed'] = True
+
+
+def instrument_sync(model, operation):
+    """Decorator for Fuseki sync signal handlers: records duration and outcome per model"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            state = {'failed': False}
+            token = _sync_state.set(state)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                state['failed'] = True
+                raise
+            finally:
+                _sync_state.reset(token)
+                SIGNAL_SYNC_SECONDS.observe(
+                    time.perf_counter() - start,
+                    model=model, operation=operation,
+                    outcome='failure' if state['failed'] else 'success',
+                )
+        return wrapper
+    return decorator
+
+
+def record_gemini_usage(result):
+    """Record token counts from a Gemini generateContent response body"""
+    usage = (result or {}).get('usageMetadata') or {}
+    for key, label in (('promptTokenCount', 'prompt'), ('candidatesTokenCount', 'completion'),
+                       ('totalTokenCount', 'total')):
+        if usage.get(key) is not None:
+            GEMINI_TOKENS.observe(usage[key], type=label)
+
+
+def record_cache(cache_name, hit):
+    """Count a cache hit or miss"""
+    CACHE_REQUESTS.inc(cache=cache_name, result='hit' if hit else 'miss')
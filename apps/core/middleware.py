@@ -0,0 +1,93 @@
+"""
+Request performance middleware
+Adds a Server-Timing header and a structured log line to every request, and
+logs slow requests, with the SQL/SPARQL text of a sample of them. ORM
+statements reach the request profile through the wrapper installed on every
+connection by apps.core.instrumentation, also from sync_to_async threads.
+"""
+
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import instrumentation
+
+logger = logging.getLogger('apps.core.performance')
+slow_logger = logging.getLogger('apps.core.performance.slow')
+
+
+class PerformanceMiddleware:
+    """Profiles ORM, SPARQL, RDFManager and Gemini work done by each request"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PERF_MIDDLEWARE_ENABLED', True)
+        self.slow_ms = float(getattr(settings, 'PERF_SLOW_REQUEST_MS', 500))
+        self.sample_rate = float(getattr(settings, 'PERF_SLOW_SAMPLE_RATE', 0.1))
+        # Under ASGI, stay async so that async views are not run in a thread
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        profile, token = instrumentation.start_profile(self._sampled())
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.end_profile(token)
+        self._report(request, response, profile, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        profile, token = instrumentation.start_profile(self._sampled())
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.end_profile(token)
+        self._report(request, response, profile, time.perf_counter() - start)
+        return response
+
+    def _sampled(self):
+        # Statement text is only kept for sampled requests
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _report(self, request, response, profile, total):
+        response['Server-Timing'] = profile.server_timing(total)
+        total_ms = round(total * 1000, 2)
+        summary = profile.summary()
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'ms': total_ms,
+            'timings': summary,
+        }))
+        # Every slow request is logged; only sampled ones carry their statements
+        if total_ms >= self.slow_ms:
+            slow = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'ms': total_ms,
+                'timings': summary,
+            }
+            if profile.sampled:
+                slow['statements'] = profile.statements
+            slow_logger.warning(json.dumps(slow))
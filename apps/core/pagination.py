@@ -0,0 +1,154 @@
+"""
+Keyset (cursor) pagination
+Time-series lists are ordered by (date, id) and paged with a WHERE on the last
+row seen, (date < d) OR (date = d AND id < i), instead of OFFSET, so page 500
+costs the same as page 1 and no COUNT(*) is issued. The orderings match the
+(user, date, id) indexes.
+"""
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _reverse(ordering):
+    return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+
+def _seek(queryset, ordering, values):
+    """
+    Rows of `queryset` strictly after `values` (the ordering fields of a row)
+    in `ordering`, sorted by it; `values` are serialized strings. Invalid
+    values leave the queryset unfiltered.
+    """
+    model = queryset.model
+    names = [name.lstrip('-') for name in ordering]
+    fields = [model._meta.get_field(name) for name in names]
+    queryset = queryset.order_by(*ordering)
+    if not values or len(values) != len(fields):
+        return queryset
+    try:
+        first, last = (field.to_python(value) for field, value in zip(fields, values))
+    except Exception:
+        return queryset
+    if first is None or last is None:
+        return queryset
+    first_lookup = 'lt' if ordering[0].startswith('-') else 'gt'
+    last_lookup = 'lt' if ordering[1].startswith('-') else 'gt'
+    return queryset.filter(
+        Q(**{f'{names[0]}__{first_lookup}': first})
+        | Q(**{names[0]: first, f'{names[1]}__{last_lookup}': last})
+    )
+
+
+def _key(item, ordering):
+    model = type(item)
+    return [model._meta.get_field(name.lstrip('-')).value_to_string(item) for name in ordering]
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    DRF pagination ordered by the view's `cursor_ordering`, e.g.
+    ('-meal_date', '-meal_id'): two fields, the last one unique. The cursor
+    holds the key of the row a page starts after (or ends before, for
+    `previous` links). The response has `next`, `previous` and `results`.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(view.cursor_ordering)
+        page_size = self.get_page_size(request)
+        cursor = _decode_cursor(request.query_params.get(self.cursor_query_param, ''))
+        backwards = bool(cursor) and cursor[0] == 'before'
+        values = cursor[1:] if cursor and cursor[0] in ('after', 'before') else None
+
+        if backwards:
+            rows = list(_seek(queryset, _reverse(self.ordering), values)[:page_size + 1])
+            more_before = len(rows) > page_size
+            self.page = rows[:page_size][::-1]
+            self.next_key = _key(self.page[-1], self.ordering) if self.page else None
+            self.previous_key = _key(self.page[0], self.ordering) if more_before else None
+        else:
+            rows = list(_seek(queryset, self.ordering, values)[:page_size + 1])
+            self.page = rows[:page_size]
+            self.next_key = _key(self.page[-1], self.ordering) if len(rows) > page_size else None
+            self.previous_key = _key(self.page[0], self.ordering) if values and self.page else None
+        return self.page
+
+    def _link(self, direction, key):
+        if key is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, _encode_cursor([direction] + key))
+
+    def get_next_link(self):
+        return self._link('after', self.next_key)
+
+    def get_previous_link(self):
+        return self._link('before', self.previous_key)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+def _encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def keyset_paginate(request, queryset, ordering, page_size=None):
+    """
+    One page of `queryset` ordered by `ordering` (two fields, the last one
+    unique), starting after the `?cursor=` of the request.
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    An invalid cursor falls back to the first page.
+    """
+    page_size = page_size or getattr(settings, 'LIST_PAGE_SIZE', 20)
+    queryset = _seek(queryset, ordering, _decode_cursor(request.GET.get('cursor', '')))
+    items = list(queryset[:page_size + 1])
+    if len(items) <= page_size:
+        return items, None
+    items = items[:page_size]
+    return items, _encode_cursor(_key(items[-1], ordering))
@@ -0,0 +1,150 @@
+"""
+Query plan audit
+Captures the SELECT statements issued by the ORM (during benchmark scenarios or
+a test run), runs EXPLAIN on each distinct statement and flags sequential
+scans, so that the index set follows the queries the code actually makes.
+
+Capture during the test suite:
+    QUERY_CAPTURE_FILE=queries.jsonl python manage.py test apps --testrunner apps.core.query_plans.QueryCaptureRunner
+    python manage.py explain_queries --input queries.jsonl
+"""
+
+import json
+import logging
+import os
+import re
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections
+from django.test.runner import DiscoverRunner
+
+logger = logging.getLogger(__name__)
+
+_TABLE_RE = re.compile(r'^(?:SCAN|SEARCH) (?:TABLE )?(\S+)')
+
+
+class QueryCapture:
+    """
+    Database execute wrapper collecting distinct SELECT statements.
+    `statements` maps SQL text to {'params': first params seen, 'count': n}.
+    """
+
+    def __init__(self):
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip()[:6].upper() == 'SELECT':
+            entry = self.statements.get(sql)
+            if entry is None:
+                self.statements[sql] = {'params': params, 'count': 1}
+            else:
+                entry['count'] += 1
+        return execute(sql, params, many, context)
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for sql, entry in self.statements.items():
+                params = list(entry['params']) if entry['params'] is not None else None
+                f.write(json.dumps({'sql': sql, 'params': params, 'count': entry['count']},
+                                   cls=DjangoJSONEncoder) + '\n')
+
+    def load(self, path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    entry = self.statements.setdefault(item['sql'], {'params': item['params'], 'count': 0})
+                    entry['count'] += item.get('count', 1)
+        return self
+
+
+class QueryCaptureRunner(DiscoverRunner):
+    """Test runner writing the SELECTs issued by the suite to $QUERY_CAPTURE_FILE"""
+
+    def setup_databases(self, **kwargs):
+        old_config = super().setup_databases(**kwargs)
+        self.capture = QueryCapture()
+        for conn in connections.all():
+            conn.execute_wrappers.append(self.capture)
+        return old_config
+
+    def teardown_databases(self, old_config, **kwargs):
+        path = os.getenv('QUERY_CAPTURE_FILE', 'query_capture.jsonl')
+        self.capture.dump(path)
+        self.log(f'[CAPTURE] {len(self.capture.statements)} SELECT statements written to {path}')
+        super().teardown_databases(old_config, **kwargs)
+
+
+def _sqlite_plan(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        lines = [row[-1] for row in cursor.fetchall()]
+    scans = []
+    for line in lines:
+        # "SCAN meals" is a full table scan; "SCAN meals USING INDEX ..." walks an index
+        match = _TABLE_RE.match(line)
+        if line.startswith('SCAN ') and ' USING ' not in line and match and not match.group(1).startswith('('):
+            if match.group(1) != 'CONSTANT':
+                scans.append(match.group(1))
+    return lines, scans
+
+
+def _postgres_plan(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    lines, scans = [], []
+
+    def walk(node, depth):
+        relation = node.get('Relation Name')
+        label = node['Node Type'] + (f' on {relation}' if relation else '')
+        if node.get('Index Name'):
+            label += f" using {node['Index Name']}"
+        lines.append('  ' * depth + f"{label} (rows={node.get('Plan Rows')})")
+        if node['Node Type'] == 'Seq Scan' and relation:
+            scans.append(relation)
+        for child in node.get('Plans', ()):
+            walk(child, depth + 1)
+
+    walk(plan[0]['Plan'], 0)
+    return lines, scans
+
+
+def explain(sql, params):
+    """
+    (plan lines, tables read by a sequential scan) for one statement, or None
+    when EXPLAIN output is not parsed for the database vendor
+    """
+    if connection.vendor == 'sqlite':
+        return _sqlite_plan(sql, params)
+    if connection.vendor == 'postgresql':
+        return _postgres_plan(sql, params)
+    logger.warning(f'EXPLAIN is not supported for {connection.vendor}, statement skipped')
+    return None
+
+
+def table_rows(table):
+    """
+    Estimated row count of a table from the planner statistics (used to ignore
+    scans of small lookup tables), without reading the table. None if unknown.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # reltuples is -1 (or 0 on PostgreSQL < 14) until the table is analyzed
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)', [table])
+            row = cursor.fetchone()
+            return int(row[0]) if row and row[0] > 0 else None
+        if connection.vendor == 'sqlite':
+            # sqlite_stat1 exists once ANALYZE ran; otherwise the largest rowid
+            # is an upper bound read from the end of the table b-tree
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+            return cursor.fetchone()[0] or 0
+    return None
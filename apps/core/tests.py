@@ -0,0 +1,375 @@
+import asyncio
+from datetime import timedelta
+from io import StringIO
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from apps.health_records.models import HealthMetric
+from apps.meals.models import Meal, FoodItem
+from apps.users.models import User
+from . import catalogues
+from .benchmarks import percentile, compare_to_baseline
+from .bulk import BulkCreateMixin
+from .instrumentation import end_profile, start_profile, timed, track
+from .metrics import Histogram, Registry, SIGNAL_SYNC_SECONDS, instrument_sync
+from .middleware import PerformanceMiddleware
+from .query_plans import QueryCapture, explain
+from .typeahead import normalize
+
+
+class BenchmarkStatsTest(SimpleTestCase):
+    """Test cases for benchmark statistics"""
+    
+    def test_percentile_nearest_rank(self):
+        """Test nearest-rank percentiles"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 50), 0.0)
+    
+    def test_regression_detection(self):
+        """Test p95 and query count regressions against a baseline"""
+        baseline = {'api.meals.list': {'p95_ms': 10.0, 'queries_per_op': 4}}
+        ok = {'api.meals.list': {'p95_ms': 11.5, 'queries_per_op': 4}}
+        slow = {'api.meals.list': {'p95_ms': 12.5, 'queries_per_op': 4}}
+        chatty = {'api.meals.list': {'p95_ms': 9.0, 'queries_per_op': 5}}
+        self.assertEqual(compare_to_baseline(ok, baseline, 0.2), [])
+        self.assertEqual(len(compare_to_baseline(slow, baseline, 0.2)), 1)
+        self.assertEqual(len(compare_to_baseline(chatty, baseline, 0.2)), 1)
+
+
+class MetricsTest(SimpleTestCase):
+    """Test cases for the Prometheus registry"""
+    
+    def test_histogram_exposition(self):
+        """Test cumulative buckets, sum and count lines"""
+        registry = Registry()
+        histogram = registry.register(Histogram('test_seconds', 'Test', ['outcome'], buckets=(0.1, 1)))
+        histogram.observe(0.05, outcome='ok')
+        histogram.observe(0.5, outcome='ok')
+        text = registry.render()
+        self.assertIn('# TYPE test_seconds histogram', text)
+        self.assertIn('test_seconds_bucket{outcome="ok",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{outcome="ok",le="1"} 2', text)
+        self.assertIn('test_seconds_bucket{outcome="ok",le="+Inf"} 2', text)
+        self.assertIn('test_seconds_count{outcome="ok"} 2', text)
+    
+    def test_swallowed_sync_failure_is_counted(self):
+        """Test a failed Fuseki update inside a handler marks the sync as failed"""
+        @instrument_sync('TestModel', 'save')
+        def handler():
+            try:
+                with track('sparql_update'):
+                    raise ConnectionError('Fuseki down')
+            except ConnectionError:
+                pass  # handlers log and swallow errors
+        
+        before = SIGNAL_SYNC_SECONDS.count(model='TestModel', operation='save', outcome='failure')
+        handler()
+        after = SIGNAL_SYNC_SECONDS.count(model='TestModel', operation='save', outcome='failure')
+        self.assertEqual(after, before + 1)
+    
+    def test_nested_timed_calls_are_profiled_once(self):
+        """Test a timed method called from another timed method is not counted twice"""
+        @timed('rdf_save')
+        def save():
+            pass
+        
+        @timed('rdf')
+        def create():
+            save()
+        
+        profile, token = start_profile()
+        try:
+            create()
+            save()
+        finally:
+            end_profile(token)
+        self.assertEqual(profile.counts['rdf'], 1)
+        self.assertEqual(profile.counts['rdf_save'], 1)
+
+
+class MetricsEndpointTest(TestCase):
+    """Test cases for access to /metrics"""
+    
+    def test_token_or_staff_required(self):
+        """Test anonymous reads are refused even without a token, scrapers and staff are let in"""
+        url = reverse('metrics')
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get(url).status_code, 403)
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+        staff = User.objects.create_user(username='ops', email='ops@example.com', password='pw12345!', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class PerformanceMiddlewareTest(TestCase):
+    """Test cases for the ORM statements counted by the async performance middleware"""
+    
+    async def test_async_requests_count_their_own_queries_once(self):
+        """Test queries from every sync_to_async hop are counted once, in the profile of their request"""
+        def count_users():
+            User.objects.count()
+        
+        def count_users_and_close():
+            count_users()
+            connection.close()  # this thread's connection
+        
+        async def view(request):
+            await sync_to_async(count_users)()
+            if request.GET.get('other_thread'):
+                await sync_to_async(count_users_and_close, thread_sensitive=False)()
+            return HttpResponse()
+        
+        middleware = PerformanceMiddleware(view)
+        factory = AsyncRequestFactory()
+        one, two = await asyncio.gather(
+            middleware(factory.get('/')), middleware(factory.get('/', {'other_thread': 1}))
+        )
+        self.assertIn('db;', one['Server-Timing'])
+        self.assertIn('desc="1"', one['Server-Timing'])
+        self.assertIn('desc="2"', two['Server-Timing'])
+
+
+class EagerLoadingTest(TestCase):
+    """Test cases for serializer-driven query planning in API list endpoints"""
+    
+    ENDPOINTS = (
+        'meals:meal-api-list',
+        'meals:fooditem-api-list',
+        'activities:activitylog-api-list',
+        'habits:habitlog-list',
+        'health_records:healthrecord-list',
+        'defis:defi-list',
+        'defis:participation-list',
+    )
+    
+    def generate(self, prefix, size):
+        call_command(
+            'generate_dataset', users=size, activities=3, activity_logs=size * 4, food_catalog=size,
+            meals=size * 4, health_records=size * 4, habits_per_user=1, habit_logs=size * 4,
+            defis=size, participations=size * 4, username_prefix=prefix, skip_ntriples=True,
+            stdout=StringIO(),
+        )
+    
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries), len(response.json()['results'])
+    
+    def test_list_query_count_does_not_depend_on_rows(self):
+        """Test each list endpoint issues as many queries for 1 row as for a full page"""
+        staff = User.objects.create_user(username='staff', email='staff@example.com', password='pw12345!')
+        staff.is_staff = True
+        staff.save()
+        self.client.force_login(staff)
+        
+        self.generate('small_', 1)
+        small = {name: self.count_queries(reverse(name)) for name in self.ENDPOINTS}
+        self.generate('large_', 5)
+        for name in self.ENDPOINTS:
+            queries, rows = self.count_queries(reverse(name))
+            self.assertGreater(rows, small[name][1], name)
+            self.assertEqual(queries, small[name][0], name)
+
+
+class KeysetPaginationTest(TestCase):
+    """Test cases for cursor pagination of time-series lists"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='eater', email='eater@example.com', password='pw12345!')
+        now = timezone.now()
+        # Pairs of meals share a date: the id breaks the tie
+        self.meals = [
+            Meal.objects.create(
+                user=self.user, meal_name=f'Meal {i}', meal_type='LUNCH', total_calories=500,
+                meal_date=now - timedelta(days=i // 2),
+            )
+            for i in range(7)
+        ]
+        self.expected = [m.meal_id for m in sorted(self.meals, key=lambda m: (m.meal_date, m.meal_id), reverse=True)]
+        self.client.force_login(self.user)
+    
+    def test_api_cursor_walks_every_row_once(self):
+        """Test following `next` returns each meal once, newest first"""
+        url, seen = reverse('meals:meal-api-list') + '?page_size=2', []
+        while url:
+            body = self.client.get(url).json()
+            self.assertNotIn('count', body)
+            seen.extend(row['meal_id'] for row in body['results'])
+            url = body['next']
+        self.assertEqual(seen, self.expected)
+    
+    def test_api_previous_walks_back(self):
+        """Test following `previous` from the last page returns the earlier pages in order"""
+        url, pages = reverse('meals:meal-api-list') + '?page_size=3', []
+        while url:
+            body = self.client.get(url).json()
+            pages.append([row['meal_id'] for row in body['results']])
+            url = body['next']
+        url, back = body['previous'], []
+        while url:
+            body = self.client.get(url).json()
+            back.insert(0, [row['meal_id'] for row in body['results']])
+            url = body['previous']
+        self.assertEqual(back, pages[:-1])
+    
+    def test_html_lazy_chunks_walk_every_row_once(self):
+        """Test the HTML list and its lazy-loaded chunks cover every meal once"""
+        url, seen = reverse('meals:meal-list'), []
+        with self.settings(LIST_PAGE_SIZE=3):
+            response = self.client.get(url)
+            while True:
+                seen.extend(m.meal_id for m in response.context['meals'])
+                cursor = response.context['next_cursor']
+                if not cursor:
+                    break
+                response = self.client.get(url, {'cursor': cursor, 'partial': 1})
+                self.assertTemplateUsed(response, 'meals/_meal_cards.html')
+        self.assertEqual(seen, self.expected)
+
+
+class QueryPlanTest(TestCase):
+    """Test cases for the EXPLAIN-based sequential scan audit"""
+    
+    def capture(self, queryset):
+        capture = QueryCapture()
+        with connection.execute_wrapper(capture):
+            list(queryset)
+        return capture.statements
+    
+    def test_indexed_filter_is_not_flagged(self):
+        """Test a (user, date) lookup uses the composite index while a text filter scans"""
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('EXPLAIN parsing only implemented for SQLite and PostgreSQL')
+        user = User.objects.create_user(username='planner', email='planner@example.com', password='pw12345!')
+        indexed = self.capture(Meal.objects.filter(user=user).order_by('-meal_date', '-meal_id'))
+        unindexed = self.capture(Meal.objects.filter(meal_name__contains='soup'))
+        
+        for sql, entry in indexed.items():
+            self.assertEqual(explain(sql, entry['params'])[1], [])
+        for sql, entry in unindexed.items():
+            self.assertEqual(explain(sql, entry['params'])[1], ['meals'])
+
+
+class CatalogueCacheTest(TestCase):
+    """Test cases for the versioned reference-data cache"""
+    
+    def setUp(self):
+        HealthMetric.objects.create(metric_name='Poids', metric_description='Poids', metric_unit='kg')
+        catalogues.invalidate('health_metrics')
+    
+    def test_reads_are_cached_until_a_write_commits(self):
+        """Test a cached catalogue costs no query and reloads after a committed write"""
+        names = [m.metric_name for m in catalogues.get('health_metrics')]
+        self.assertIn('Poids', names)
+        with self.assertNumQueries(0):
+            catalogues.get('health_metrics')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            HealthMetric.objects.create(metric_name='Glycemie', metric_description='Glycemie', metric_unit='g/L')
+        with self.assertNumQueries(1):
+            reloaded = [m.metric_name for m in catalogues.get('health_metrics')]
+        self.assertEqual(reloaded, sorted(names + ['Glycemie']))
+
+
+class TypeaheadTest(TestCase):
+    """Test cases for the catalogue typeahead search"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='cook', email='cook@example.com', password='pw12345!')
+        self.meal = Meal.objects.create(
+            user=self.user, meal_name='Diner', meal_type='DINNER', total_calories=0, meal_date=timezone.now()
+        )
+        for name, food_type in (('Crème brûlée', 'FATS'), ('Pâtes complètes', 'CARBS'), ('Poulet rôti', 'PROTEIN')):
+            FoodItem.objects.create(
+                food_item_name=name, food_item_description=name, food_type=food_type, meal=self.meal
+            )
+        catalogues.invalidate('food_items')
+        self.client.force_login(self.user)
+    
+    def search(self, q):
+        response = self.client.get(reverse('meals:fooditem-api-search'), {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [hit['name'] for hit in response.json()['results']]
+    
+    def test_accent_insensitive_prefix_and_fuzzy_matches(self):
+        """Test accents are ignored, prefixes match any word and typos fall back to trigrams"""
+        self.assertEqual(normalize('Œufs brouillés'), 'oeufs brouilles')
+        self.assertEqual(self.search('creme BRU'), ['Crème brûlée'])
+        self.assertEqual(self.search('compl'), ['Pâtes complètes'])
+        self.assertEqual(self.search('poulett roti'), ['Poulet rôti'])
+        self.assertEqual(self.search(''), [])
+    
+    def test_index_follows_committed_writes(self):
+        """Test renames and deletions update the index"""
+        self.search('poulet')
+        item = FoodItem.objects.get(food_item_name='Poulet rôti')
+        with self.captureOnCommitCallbacks(execute=True):
+            item.food_item_name = 'Dinde rôtie'
+            item.save()
+        self.assertEqual(self.search('dinde'), ['Dinde rôtie'])
+        self.assertEqual(self.search('poulet'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertEqual(self.search('dinde'), [])
+    
+    def test_food_items_of_other_users_are_not_found(self):
+        """Test a user only finds the food items of their own meals and the catalogue ones"""
+        FoodItem.objects.create(food_item_name='Poulet basquaise', food_item_description='-', food_type='PROTEIN')
+        other = User.objects.create_user(username='guest', email='guest@example.com', password='pw12345!')
+        self.client.force_login(other)
+        self.assertEqual(self.search('poulet'), ['Poulet basquaise'])
+
+
+class HistoryImportTest(TestCase):
+    """Test cases for the chunked, resumable history importer"""
+    
+    def test_interrupted_import_resumes_without_duplicates(self):
+        """Test an import stopped after one chunk resumes from its checkpoint"""
+        import os
+        import tempfile
+        from apps.health_records.models import HealthRecord
+        from .importer import Importer
+        
+        User.objects.create_user(username='imported', email='imported@example.com', password='pw12345!')
+        lines = ['login,metric,value,start_date']
+        lines += [f'imported,Heart Rate,{60 + i},2024-01-{1 + i:02d}T08:00:00' for i in range(7)]
+        lines += ['imported,Heart Rate,60,2024-01-01T08:00:00', 'ghost,Heart Rate,60,2024-01-01T08:00:00']
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'history.csv')
+            with open(path, 'w', encoding='utf-8') as handle:
+                handle.write('\n'.join(lines) + '\n')
+            options = dict(chunk_size=3, renames={'login': 'user'}, checkpoint=f'{path}.checkpoint.json')
+            
+            def interrupt(stats):
+                raise KeyboardInterrupt
+            with self.assertRaises(KeyboardInterrupt):
+                Importer(path, 'health_records', report=interrupt, **options).run()
+            self.assertEqual(HealthRecord.objects.count(), 3)
+            
+            job = Importer(path, 'health_records', ntriples_prefix=os.path.join(directory, 'out'), **options)
+            self.assertTrue(job.resume())
+            stats = job.run()
+        self.assertEqual((stats['created'], stats['duplicates'], stats['skipped']), (7, 1, 1))
+        self.assertEqual(sorted(HealthRecord.objects.values_list('value', flat=True)), [60.0 + i for i in range(7)])
+
+
+class BulkCreateMixinTest(SimpleTestCase):
+    """Test cases for the bulk ingestion mixin"""
+    
+    def test_viewset_without_the_hooks_is_rejected(self):
+        """Test a viewset missing the serializer, sync label or perform_bulk_create() fails when defined"""
+        with self.assertRaisesMessage(ImproperlyConfigured, 'bulk_sync_model, perform_bulk_create()'):
+            class Incomplete(BulkCreateMixin):
+                bulk_serializer_class = dict
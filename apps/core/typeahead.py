@@ -0,0 +1,287 @@
+"""
+Typeahead search over reference catalogues
+Each index keeps, per process, the normalized words (tokens) of a catalogue
+label:
+
+- a sorted vocabulary of tokens with, per token, the ids of the rows using it:
+  a prefix query is a bisect into the vocabulary followed by a scan of the
+  tokens sharing the prefix (the flat equivalent of walking a prefix trie,
+  without one dict per node);
+- a trigram inverted index over the vocabulary, used for the words of a query
+  that prefix no token (typos): they match the tokens sharing enough trigrams.
+
+Text is lower-cased and stripped of accents, so 'creme brulee' finds
+'Crème brûlée'. Every word of the query must match a word of the label.
+
+Indexes follow their catalogue (apps.core.catalogues): a committed write
+updates the entry in place when the index was at the previous version, and
+any other version change rebuilds it on the next search. Only the process
+that made the write patches its index; the other processes see the version
+bump and rebuild theirs. Apps register their
+index next to the catalogue:
+
+    typeahead.register('activities', lambda: Activity.objects.all(), 'activity_name')
+
+and viewsets expose it with TypeaheadMixin (`GET .../search/?q=`).
+"""
+
+import bisect
+import math
+import threading
+import unicodedata
+from collections import defaultdict
+
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from . import catalogues
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Minimum trigram similarity (Jaccard) between a misspelled word and a token
+TRIGRAM_THRESHOLD = 0.3
+
+_LIGATURES = str.maketrans({'œ': 'oe', 'æ': 'ae', 'ß': 'ss'})
+_indexes = {}
+
+
+def normalize(text):
+    """Lower-case, accent-free text where anything but letters and digits is a space"""
+    text = unicodedata.normalize('NFKD', str(text).casefold().translate(_LIGATURES))
+    return ''.join(
+        ch if ch.isalnum() else ' '
+        for ch in text if not unicodedata.combining(ch)
+    )
+
+
+def trigrams(word):
+    """Trigrams of a word, padded so that its start and end weigh in"""
+    padded = f' {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Entry:
+    __slots__ = ('pk', 'owner', 'tokens', 'payload')
+
+    def __init__(self, pk, label, owner, payload):
+        self.pk = pk
+        self.owner = owner
+        self.tokens = tuple(dict.fromkeys(normalize(label).split()))
+        self.payload = payload
+
+    def matches(self, prefixes, alternatives):
+        """Every prefix starts one of the tokens, every alternative set contains one"""
+        return (
+            all(any(token.startswith(prefix) for token in self.tokens) for prefix in prefixes)
+            and all(any(token in similar for token in self.tokens) for similar in alternatives)
+        )
+
+
+class TypeaheadIndex:
+    """Prefix and trigram index over the rows of one catalogue"""
+
+    def __init__(self, name, queryset, label, owner=None, fields=()):
+        self.name = name
+        self.queryset = queryset
+        self.label = label
+        self.owner = owner
+        self.fields = tuple(fields)
+        self.model = queryset().model
+        self.version = None
+        self.entries = {}
+        self.postings = {}
+        self.vocabulary = []
+        self.token_trigrams = defaultdict(set)
+        self.lock = threading.Lock()
+
+    # -- maintenance -------------------------------------------------------
+
+    def _rows(self, queryset):
+        columns = ['pk', self.label, self.owner or 'pk', *self.fields]
+        for pk, label, owner, *values in queryset.values_list(*columns).iterator(chunk_size=5000):
+            payload = {'id': pk, 'name': label, **dict(zip(self.fields, values))}
+            yield Entry(pk, label or '', owner if self.owner else None, payload)
+
+    def _add(self, entry):
+        self.entries[entry.pk] = entry
+        for token in entry.tokens:
+            if token not in self.postings:
+                self.postings[token] = set()
+                bisect.insort(self.vocabulary, token)
+                for gram in trigrams(token):
+                    self.token_trigrams[gram].add(token)
+            self.postings[token].add(entry.pk)
+
+    def _remove(self, pk):
+        entry = self.entries.pop(pk, None)
+        if entry is None:
+            return
+        for token in entry.tokens:
+            posting = self.postings[token]
+            posting.discard(pk)
+            if posting:
+                continue
+            del self.postings[token]
+            del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+            for gram in trigrams(token):
+                self.token_trigrams[gram].discard(token)
+                if not self.token_trigrams[gram]:
+                    del self.token_trigrams[gram]
+
+    def rebuild(self, version):
+        entries = list(self._rows(self.queryset()))
+        postings = defaultdict(set)
+        for entry in entries:
+            for token in entry.tokens:
+                postings[token].add(entry.pk)
+        token_trigrams = defaultdict(set)
+        for token in postings:
+            for gram in trigrams(token):
+                token_trigrams[gram].add(token)
+        with self.lock:
+            self.entries = {entry.pk: entry for entry in entries}
+            self.postings = dict(postings)
+            self.vocabulary = sorted(postings)
+            self.token_trigrams = token_trigrams
+            self.version = version
+
+    def on_commit(self, model, pk, deleted, version):
+        """Catalogue listener: patch one entry if this index was up to date"""
+        if self.version is None or self.version != version - 1:
+            return  # missed a write (or never built): the next search rebuilds
+        entries = []
+        if model is self.model and not deleted:
+            entries = list(self._rows(self.queryset().filter(pk=pk)))
+        with self.lock:
+            if model is self.model:
+                self._remove(pk)
+                for entry in entries:
+                    self._add(entry)
+            self.version = version
+
+    def ensure_current(self):
+        current = catalogues.version(self.name)
+        if self.version != current:
+            self.rebuild(current)
+
+    # -- lookups -----------------------------------------------------------
+
+    def _prefixed(self, prefix):
+        """Tokens starting with `prefix`, in vocabulary order"""
+        vocabulary = self.vocabulary
+        position = bisect.bisect_left(vocabulary, prefix)
+        while position < len(vocabulary) and vocabulary[position].startswith(prefix):
+            yield vocabulary[position]
+            position += 1
+
+    def _similar(self, word):
+        """Tokens whose trigram similarity to `word` reaches TRIGRAM_THRESHOLD, best first"""
+        wanted = trigrams(word)
+        needed = max(1, math.ceil(TRIGRAM_THRESHOLD * len(wanted)))
+        # A similar token shares at least `needed` trigrams with the word, so
+        # it is in one of its len(wanted) - needed + 1 rarest postings
+        rarest = sorted(wanted, key=lambda gram: len(self.token_trigrams.get(gram, ())))
+        candidates = set()
+        for gram in rarest[:len(wanted) - needed + 1]:
+            candidates.update(self.token_trigrams.get(gram, ()))
+        scored = []
+        for token in candidates:
+            grams = trigrams(token)
+            score = len(wanted & grams) / len(wanted | grams)
+            if score >= TRIGRAM_THRESHOLD:
+                scored.append((-score, token))
+        return [token for _, token in sorted(scored)]
+
+    def _cost(self, tokens, bound):
+        """Rows using any of `tokens`, counted up to `bound`"""
+        total = 0
+        for token in tokens:
+            total += len(self.postings[token])
+            if total > bound:
+                break
+        return total
+
+    def _matches(self, words, owner, limit):
+        # Each word matches the tokens it prefixes or, failing that, the tokens
+        # it resembles. The rows of the most selective word are scanned and
+        # checked against the other words.
+        choices = []
+        for word in dict.fromkeys(words):
+            if next(self._prefixed(word), None) is not None:
+                choices.append((word, lambda word=word: self._prefixed(word), None))
+            else:
+                similar = self._similar(word)
+                choices.append((word, lambda similar=similar: iter(similar), set(similar)))
+        driver, best = None, math.inf
+        for choice in choices:
+            cost = self._cost(choice[1](), best)
+            if cost < best:
+                driver, best = choice, cost
+        prefixes = [word for word, _, similar in choices if similar is None and word != driver[0]]
+        alternatives = [similar for word, _, similar in choices if similar is not None and word != driver[0]]
+
+        found, seen = [], set()
+        for token in driver[1]():
+            for pk in self.postings[token]:
+                if pk in seen:
+                    continue
+                seen.add(pk)
+                entry = self.entries[pk]
+                if owner is not None and entry.owner is not None and entry.owner != owner:
+                    continue
+                if entry.matches(prefixes, alternatives):
+                    found.append(entry)
+                    if len(found) >= limit:
+                        return found
+        return found
+
+    def search(self, query, limit=DEFAULT_LIMIT, owner=None):
+        """Payloads of up to `limit` rows matching every word of `query`"""
+        words = normalize(query).split()
+        if not words:
+            return []
+        self.ensure_current()
+        with self.lock:
+            return [dict(entry.payload) for entry in self._matches(words, owner, limit)]
+
+
+def register(name, queryset, label, owner=None, fields=()):
+    """
+    Index the `label` field of catalogue `name` (already registered). `owner`
+    names the field restricting a row to one user, rows without one are
+    shared; `fields` are returned with each match.
+    """
+    index = TypeaheadIndex(name, queryset, label, owner=owner, fields=fields)
+    _indexes[name] = index
+    catalogues.subscribe(name, index.on_commit)
+    return index
+
+
+def search(name, query, limit=DEFAULT_LIMIT, owner=None):
+    return _indexes[name].search(query, limit=limit, owner=owner)
+
+
+class TypeaheadMixin:
+    """
+    Adds a `search` list action to a viewset:
+    GET .../search/?q=<text>&limit=<n> -> {'query': ..., 'results': [{'id', 'name', ...}]}
+
+    Set `typeahead_index` to the index name; with `typeahead_owner_scoped`,
+    non-staff users only match their own rows and the shared ones.
+    """
+
+    typeahead_index = None
+    typeahead_owner_scoped = False
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        owner = None
+        if self.typeahead_owner_scoped and not request.user.is_staff:
+            owner = request.user.pk
+        results = search(self.typeahead_index, query, limit=limit, owner=owner)
+        return Response({'query': query, 'results': results})
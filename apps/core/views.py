@@ -0,0 +1,24 @@
+"""
+Operational endpoints
+"""
+
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .metrics import REGISTRY
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint (text exposition format 0.0.4)
+    Open to scrapers sending "Authorization: Bearer <METRICS_TOKEN>" and to
+    logged-in staff; everyone else is refused, also when no token is set.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorization = request.headers.get('Authorization', '')
+    scraper = bool(token) and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+    if not scraper and not request.user.is_staff:
+        return HttpResponseForbidden('Forbidden')
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,175 @@
+"""
+Defi leaderboard
+Keeps LeaderboardEntry in step with participations and their progress, and
+answers top-K pages and "my rank" without joining the participation tables.
+
+Progress is a percentage, so a Defi has at most 101 distinct scores.
+LeaderboardBucket counts the entries of each (Defi, score): the number of
+participants ahead of a score is a sum over at most 100 bucket rows, whatever
+the size of the Defi. Ties are broken by the earliest participation, which is
+an index range count over the entries sharing the score.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import LeaderboardBucket, LeaderboardEntry, Participation
+
+
+def ranking(defi_id):
+    """Leaderboard rows of a Defi, best first; ties go to the earliest participation"""
+    return LeaderboardEntry.objects.filter(defi_id=defi_id).order_by('-progress_value', 'participation_id')
+
+
+def page_after(entry, limit):
+    """
+    The `limit` rows ranked just behind `entry`, best first: the rest of its
+    tie, then the lower scores. Two index range scans, no OFFSET.
+    """
+    rows = list(ranking(entry.defi_id).filter(
+        progress_value=entry.progress_value, participation_id__gt=entry.participation_id
+    )[:limit])
+    if len(rows) < limit:
+        rows += list(ranking(entry.defi_id).filter(progress_value__lt=entry.progress_value)[:limit - len(rows)])
+    return rows
+
+
+def rank_of(entry):
+    """1-based rank of `entry` in its Defi: bucket sum above its score + ties ahead of it"""
+    above = LeaderboardBucket.objects.filter(
+        defi_id=entry.defi_id, progress_value__gt=entry.progress_value
+    ).aggregate(total=Sum('entries'))['total'] or 0
+    ties = LeaderboardEntry.objects.filter(
+        defi_id=entry.defi_id, progress_value=entry.progress_value,
+        participation_id__lt=entry.participation_id,
+    ).count()
+    return above + ties + 1
+
+
+def participants(defi_id):
+    """Number of leaderboard rows of a Defi, from its buckets"""
+    return LeaderboardBucket.objects.filter(defi_id=defi_id).aggregate(total=Sum('entries'))['total'] or 0
+
+
+def _bucket_add(defi_id, progress_value, delta):
+    updated = LeaderboardBucket.objects.filter(defi_id=defi_id, progress_value=progress_value).update(
+        entries=F('entries') + delta
+    )
+    if not updated and delta > 0:
+        bucket, created = LeaderboardBucket.objects.get_or_create(
+            defi_id=defi_id, progress_value=progress_value, defaults={'entries': delta}
+        )
+        if not created:
+            LeaderboardBucket.objects.filter(pk=bucket.pk).update(entries=F('entries') + delta)
+
+
+def _move(participation_id, progress_value):
+    with transaction.atomic():
+        entry = (
+            LeaderboardEntry.objects.select_for_update()
+            .filter(participation_id=participation_id)
+            .only('defi_id', 'progress_value')
+            .first()
+        )
+        if entry is None:
+            return False
+        if entry.progress_value != progress_value:
+            LeaderboardEntry.objects.filter(participation_id=participation_id).update(progress_value=progress_value)
+            _bucket_add(entry.defi_id, entry.progress_value, -1)
+            _bucket_add(entry.defi_id, progress_value, 1)
+        return True
+
+
+def progress_saved(participation_id, progress_value):
+    """Update the score of one participation after its progress changed"""
+    if not _move(participation_id, progress_value or 0):
+        refresh(participation_id)
+
+
+def progress_deleted(participation_id):
+    """
+    Reset the score of a participation whose progress row was deleted. Never
+    recreates the row: during a cascade delete the participation is going away too.
+    """
+    _move(participation_id, 0)
+
+
+def participation_deleted(participation_id):
+    """Take the row of a participation about to be deleted out of its bucket"""
+    row = LeaderboardEntry.objects.filter(participation_id=participation_id).values_list(
+        'defi_id', 'progress_value'
+    ).first()
+    if row is not None:
+        _bucket_add(row[0], row[1], -1)
+
+
+def refresh(participation_id):
+    """Recompute the row of one participation from Participation/ParticipationProgress"""
+    row = (
+        Participation.objects
+        .filter(pk=participation_id)
+        .values_list('defi_id', 'user_id', 'user__username', 'progress__progress_value')
+        .first()
+    )
+    if row is None:
+        participation_deleted(participation_id)
+        LeaderboardEntry.objects.filter(participation_id=participation_id).delete()
+        return
+    defi_id, user_id, username, progress_value = row
+    progress_value = progress_value or 0
+    with transaction.atomic():
+        entry = LeaderboardEntry.objects.select_for_update().filter(participation_id=participation_id).first()
+        if entry is None:
+            LeaderboardEntry.objects.create(
+                participation_id=participation_id, defi_id=defi_id, user_id=user_id,
+                username=username, progress_value=progress_value,
+            )
+            _bucket_add(defi_id, progress_value, 1)
+            return
+        if (entry.defi_id, entry.progress_value) != (defi_id, progress_value):
+            _bucket_add(entry.defi_id, entry.progress_value, -1)
+            _bucket_add(defi_id, progress_value, 1)
+        LeaderboardEntry.objects.filter(participation_id=participation_id).update(
+            defi_id=defi_id, user_id=user_id, username=username, progress_value=progress_value,
+        )
+
+
+def username_changed(user):
+    """Propagate a username change to the user's rows"""
+    LeaderboardEntry.objects.filter(user_id=user.pk).exclude(username=user.username).update(
+        username=user.username
+    )
+
+
+def rebuild_buckets():
+    """Recount every bucket from the entries"""
+    LeaderboardBucket.objects.all().delete()
+    counts = (
+        LeaderboardEntry.objects.order_by()
+        .values_list('defi_id', 'progress_value')
+        .annotate(entries=Count('pk'))
+    )
+    LeaderboardBucket.objects.bulk_create(
+        LeaderboardBucket(defi_id=defi_id, progress_value=progress_value, entries=entries)
+        for defi_id, progress_value, entries in counts.iterator(chunk_size=5000)
+    )
+
+
+def rebuild():
+    """Rebuild the whole table (after bulk loads that bypass signals)"""
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        rows = Participation.objects.order_by('pk').values_list(
+            'participation_id', 'defi_id', 'user_id', 'user__username', 'progress__progress_value'
+        )
+        batch = []
+        for participation_id, defi_id, user_id, username, progress_value in rows.iterator(chunk_size=5000):
+            batch.append(LeaderboardEntry(
+                participation_id=participation_id, defi_id=defi_id, user_id=user_id,
+                username=username, progress_value=progress_value or 0,
+            ))
+            if len(batch) >= 5000:
+                LeaderboardEntry.objects.bulk_create(batch)
+                batch = []
+        LeaderboardEntry.objects.bulk_create(batch)
+        rebuild_buckets()
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('defis', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('participation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard_entry', serialize=False, to='defis.participation')),
+                ('username', models.CharField(max_length=150)),
+                ('progress_value', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('defi', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='defis.defi')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'defi_leaderboard',
+                'ordering': ['-progress_value', 'participation_id'],
+                'indexes': [models.Index(fields=['defi', '-progress_value', 'participation'], name='leaderboard_rank_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def backfill_leaderboard(apps, schema_editor):
+    """Fill the leaderboard table from existing participations"""
+    Participation = apps.get_model('defis', 'Participation')
+    LeaderboardEntry = apps.get_model('defis', 'LeaderboardEntry')
+    
+    rows = Participation.objects.order_by('pk').values_list(
+        'participation_id', 'defi_id', 'user_id', 'user__username', 'progress__progress_value'
+    )
+    
+    batch = []
+    for participation_id, defi_id, user_id, username, progress_value in rows.iterator(chunk_size=5000):
+        batch.append(LeaderboardEntry(
+            participation_id=participation_id,
+            defi_id=defi_id,
+            user_id=user_id,
+            username=username,
+            progress_value=progress_value or 0,
+        ))
+        if len(batch) >= 5000:
+            LeaderboardEntry.objects.bulk_create(batch)
+            batch = []
+    LeaderboardEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('defis', '0002_leaderboard_entry'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('defis', '0003_backfill_leaderboard'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='participation',
+            index=models.Index(fields=['user', 'defi'], name='participation_user_defi_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:37
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_buckets(apps, schema_editor):
+    """Count the existing leaderboard rows per (defi, progress_value)"""
+    LeaderboardEntry = apps.get_model('defis', 'LeaderboardEntry')
+    LeaderboardBucket = apps.get_model('defis', 'LeaderboardBucket')
+    
+    counts = (
+        LeaderboardEntry.objects.order_by()
+        .values_list('defi_id', 'progress_value')
+        .annotate(entries=Count('pk'))
+    )
+    LeaderboardBucket.objects.bulk_create(
+        LeaderboardBucket(defi_id=defi_id, progress_value=progress_value, entries=entries)
+        for defi_id, progress_value, entries in counts
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('defis', '0004_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('progress_value', models.IntegerField()),
+                ('entries', models.IntegerField(default=0)),
+                ('defi', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_buckets', to='defis.defi')),
+            ],
+            options={
+                'db_table': 'defi_leaderboard_bucket',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardbucket',
+            constraint=models.UniqueConstraint(fields=('defi', 'progress_value'), name='leaderboard_bucket_unique'),
+        ),
+        migrations.RunPython(fill_buckets, migrations.RunPython.noop),
+    ]
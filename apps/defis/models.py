@@ -1,3 +1,5 @@
+import threading
+import weakref
 from django.db import models
 from apps.users.models import User
 from django.db.models.signals import post_save
@@ -5,7 +7,8 @@ from django.dispatch import receiver
 from django.utils import timezone
 from django.conf import settings
 from datetime import timedelta
-from django.db.models import Avg
+from django.db import transaction
+from django.db.models import Avg, Count
 
 
 class Defi(models.Model):
@@ -97,6 +100,9 @@ class Participation(models.Model):
     
     class Meta:
         db_table = 'participations'
+        indexes = [
+            models.Index(fields=['user', 'defi'], name='participation_user_defi_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.defi.defi_name}"
@@ -139,65 +145,138 @@ class ParticipationRange(models.Model):
         return f"{self.participation.user.username} - Range: {self.range_value}"
 
 
+
+class LeaderboardEntry(models.Model):
+    """Denormalized leaderboard row, one per participation (see apps.defis.leaderboard)"""
+    participation = models.OneToOneField(
+        Participation, on_delete=models.CASCADE, primary_key=True, related_name='leaderboard_entry'
+    )
+    defi = models.ForeignKey(Defi, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    username = models.CharField(max_length=150)
+    progress_value = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'defi_leaderboard'
+        ordering = ['-progress_value', 'participation_id']
+        indexes = [
+            models.Index(fields=['defi', '-progress_value', 'participation'], name='leaderboard_rank_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.username} - {self.defi_id}: {self.progress_value}%"
+
+
+class LeaderboardBucket(models.Model):
+    """Number of leaderboard rows of a Defi at one progress value (see apps.defis.leaderboard)"""
+    defi = models.ForeignKey(Defi, on_delete=models.CASCADE, related_name='leaderboard_buckets')
+    progress_value = models.IntegerField()
+    entries = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'defi_leaderboard_bucket'
+        constraints = [
+            models.UniqueConstraint(fields=['defi', 'progress_value'], name='leaderboard_bucket_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.defi_id}: {self.entries} at {self.progress_value}%"
+
 # -- Signals and helpers that rely on model classes defined above --
 def _recalc_defi_status(defi):
-    """Recalculate and persist DefiStatus based on participations and progress."""
-    status, _ = DefiStatus.objects.get_or_create(defi=defi)
+    """Recalculate and persist DefiStatus from a single aggregate over participations."""
+    defi_id = getattr(defi, 'defi_id', defi)
     now = timezone.now()
-    # in_progress if any participation without end_date or with end_date in future
-    has_active = defi.participations.filter(models.Q(end_date__isnull=True) | models.Q(end_date__gt=now)).exists()
-    status.in_progress = bool(has_active)
-    # Determine completion according to configured rule
     # Rules: 'any' (default) = any participant reached threshold,
     # 'all' = all active participants reached threshold,
     # 'average' = average progress >= threshold
     rule = getattr(settings, 'DEFIS_COMPLETED_RULE', 'any')
     threshold = int(getattr(settings, 'DEFIS_COMPLETED_PERCENTAGE', 100))
 
+    # active = no end_date or end_date in the future; a missing progress row counts as 0
+    active = models.Q(end_date__isnull=True) | models.Q(end_date__gt=now)
+    below = models.Q(progress__isnull=True) | models.Q(progress__progress_value__lt=threshold)
+    stats = Participation.objects.filter(defi_id=defi_id).aggregate(
+        active_count=Count('pk', filter=active),
+        active_below=Count('pk', filter=active & below),
+        reached=Count('pk', filter=models.Q(progress__progress_value__gte=threshold)),
+        average=Avg('progress__progress_value'),
+    )
+
+    in_progress = stats['active_count'] > 0
     if rule == 'all':
-        active = defi.participations.filter(models.Q(end_date__isnull=True) | models.Q(end_date__gt=now))
-        if not active.exists():
-            completed = False
-        else:
-            # all active must have a progress >= threshold
-            completed = True
-            for p in active:
-                try:
-                    val = p.progress.progress_value
-                except ParticipationProgress.DoesNotExist:
-                    val = 0
-                if val < threshold:
-                    completed = False
-                    break
+        completed = in_progress and stats['active_below'] == 0
     elif rule == 'average':
-        avg = ParticipationProgress.objects.filter(participation__defi=defi).aggregate(avg=Avg('progress_value'))['avg'] or 0
-        completed = (avg >= threshold)
+        completed = (stats['average'] or 0) >= threshold
     else:  # default 'any'
-        completed = ParticipationProgress.objects.filter(participation__defi=defi, progress_value__gte=threshold).exists()
+        completed = stats['reached'] > 0
+
+    updated = DefiStatus.objects.filter(defi_id=defi_id).update(completed=completed, in_progress=in_progress)
+    if not updated:
+        DefiStatus.objects.get_or_create(
+            defi_id=defi_id, defaults={'completed': completed, 'in_progress': in_progress}
+        )
+
+
+class _DeferredStatusRecalc:
+    """on_commit callback recalculating the Defis saved during one transaction"""
+
+    def __init__(self):
+        self.defi_ids = set()
+        self.done = False
 
-    status.completed = bool(completed)
-    status.save()
+    def __call__(self):
+        self.done = True
+        for defi_id in sorted(self.defi_ids):
+            _recalc_defi_status(defi_id)
+
+
+# Weak reference to the callback registered for the current transaction of this
+# thread: Django drops the callback when the transaction (or the savepoint it
+# was registered in) rolls back, and after running it on commit, which kills
+# the reference and makes the next save register a new one.
+_pending_recalc = threading.local()
+
+
+def schedule_defi_status_recalc(defi_id):
+    """
+    Recalculate a Defi status once the current transaction commits.
+    All saves of one transaction share a single on_commit callback, so each
+    Defi is recalculated once; outside a transaction it runs immediately.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        _recalc_defi_status(defi_id)
+        return
+    ref = getattr(_pending_recalc, 'ref', None)
+    callback = ref() if ref is not None else None
+    if callback is None or callback.done:
+        callback = _DeferredStatusRecalc()
+        transaction.on_commit(callback)
+        _pending_recalc.ref = weakref.ref(callback)
+    callback.defi_ids.add(defi_id)
 
 
 @receiver(post_save, sender=Participation)
 def create_participation_related(sender, instance, created, **kwargs):
     """When a Participation is created, ensure related helper records exist and update Defi status."""
-    if created:
-        # initial progress
-        ParticipationProgress.objects.get_or_create(participation=instance, defaults={'progress_value': 0})
-        # initial number and range defaults
-        ParticipationNumber.objects.get_or_create(participation=instance, defaults={'participation_count': 0})
-        ParticipationRange.objects.get_or_create(participation=instance, defaults={'range_value': 0})
-    # any save (create or update) should trigger a status recalculation for the Defi
-    _recalc_defi_status(instance.defi)
+    with transaction.atomic():
+        if created:
+            # initial progress
+            ParticipationProgress.objects.get_or_create(participation=instance, defaults={'progress_value': 0})
+            # initial number and range defaults
+            ParticipationNumber.objects.get_or_create(participation=instance, defaults={'participation_count': 0})
+            ParticipationRange.objects.get_or_create(participation=instance, defaults={'range_value': 0})
+        # any save (create or update) should trigger a status recalculation for the Defi
+        schedule_defi_status_recalc(instance.defi_id)
 
 
 @receiver(post_save, sender=ParticipationProgress)
 def handle_progress_update(sender, instance, created, **kwargs):
     """When progress updates, possibly award badges and update Defi status."""
     # award badges according to thresholds (simple heuristic)
-    defi = instance.participation.defi
-    badge, _ = DefiBadge.objects.get_or_create(defi=defi)
+    defi_id = instance.participation.defi_id
+    badge, _ = DefiBadge.objects.get_or_create(defi_id=defi_id)
     v = instance.progress_value or 0
 
     # Badge thresholds are configurable via settings.DEFIS_BADGE_THRESHOLDS
@@ -223,7 +302,7 @@ def handle_progress_update(sender, instance, created, **kwargs):
         badge.save()
 
     # Recalculate status (completed if any participant reached 100)
-    _recalc_defi_status(defi)
+    schedule_defi_status_recalc(defi_id)
 
 
 @receiver(post_save, sender=Defi)
@@ -1,7 +1,9 @@
+from django.db.models import Count
 from rest_framework import serializers
 from .models import (
     Defi, DefiObjectif, DefiBadge, DefiStatus,
-    Participation, ParticipationProgress, ParticipationNumber, ParticipationRange
+    Participation, ParticipationProgress, ParticipationNumber, ParticipationRange,
+    LeaderboardEntry
 )
 
 
@@ -29,13 +31,17 @@ class DefiSerializer(serializers.ModelSerializer):
     status = DefiStatusSerializer(read_only=True)
     participation_count = serializers.SerializerMethodField()
     
+    # Applied by EagerLoadingMixin (apps.core.eager_loading)
+    annotations = {'participation_count': Count('participations', distinct=True)}
+    
     class Meta:
         model = Defi
         fields = '__all__'
         read_only_fields = ('defi_id',)
     
     def get_participation_count(self, obj):
-        return obj.participations.count()
+        count = getattr(obj, 'participation_count', None)
+        return obj.participations.count() if count is None else count
 
 
 class ParticipationProgressSerializer(serializers.ModelSerializer):
@@ -67,3 +73,12 @@ class ParticipationSerializer(serializers.ModelSerializer):
         model = Participation
         fields = '__all__'
         read_only_fields = ('participation_id',)
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    """Leaderboard row; `rank` is set on each instance by the view"""
+    rank = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = LeaderboardEntry
+        fields = ('rank', 'participation', 'user', 'username', 'progress_value')
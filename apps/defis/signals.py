@@ -2,21 +2,26 @@
 Signals for Defi model to sync with Fuseki RDF store
 """
 import logging
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from apps.defis.models import Defi
+from apps.defis.models import Defi, DefiBadge, DefiObjectif, Participation, ParticipationProgress
+from apps.defis import leaderboard
+from apps.users.models import User
 from apps.sparql_service.client import SparqlClient
+from apps.core import catalogues, typeahead
+from apps.core.metrics import instrument_sync
 
 logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=Defi)
+@instrument_sync('Defi', 'save')
 def sync_defi_to_fuseki(sender, instance, created, **kwargs):
     """
     Sync Defi to Fuseki when created or updated
     """
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         if created:
             # INSERT new defi
@@ -52,7 +57,7 @@ WHERE {{
 """
             logger.info(f"Updating Defi in Fuseki: {instance.defi_name}")
         
-        client.execute_update(sparql)
+        client.execute_update(sparql, infer=False)
         logger.info(f"✅ Defi '{instance.defi_name}' synced to Fuseki")
         
     except Exception as e:
@@ -60,12 +65,13 @@ WHERE {{
 
 
 @receiver(post_delete, sender=Defi)
+@instrument_sync('Defi', 'delete')
 def delete_defi_from_fuseki(sender, instance, **kwargs):
     """
     Delete Defi from Fuseki when deleted from Django
     """
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         sparql = f"""
 PREFIX sh: <http://dhia.org/ontologies/smarthealth#>
@@ -75,8 +81,69 @@ DELETE WHERE {{
 }}
 """
         
-        client.execute_update(sparql)
+        client.execute_update(sparql, infer=False)
         logger.info(f"✅ Defi '{instance.defi_name}' deleted from Fuseki")
         
     except Exception as e:
         logger.error(f"❌ Error deleting Defi from Fuseki: {str(e)}")
+
+
+@receiver(post_save, sender=ParticipationProgress)
+def update_leaderboard_progress(sender, instance, raw=False, **kwargs):
+    """Move the participation on its Defi leaderboard"""
+    if raw:
+        return
+    try:
+        leaderboard.progress_saved(instance.participation_id, instance.progress_value)
+    except Exception as e:
+        logger.error(f"Failed to update leaderboard for participation {instance.participation_id}: {str(e)}")
+
+
+@receiver(post_delete, sender=ParticipationProgress)
+def reset_leaderboard_progress(sender, instance, **kwargs):
+    """A participation without progress ranks with 0%"""
+    try:
+        leaderboard.progress_deleted(instance.participation_id)
+    except Exception as e:
+        logger.error(f"Failed to update leaderboard for participation {instance.participation_id}: {str(e)}")
+
+
+@receiver(post_save, sender=Participation)
+def update_leaderboard_participation(sender, instance, raw=False, **kwargs):
+    """Keep the leaderboard row of a participation (Defi, user) in step"""
+    if raw:
+        return
+    try:
+        leaderboard.refresh(instance.participation_id)
+    except Exception as e:
+        logger.error(f"Failed to update leaderboard for participation {instance.participation_id}: {str(e)}")
+
+
+@receiver(pre_delete, sender=Participation)
+def remove_leaderboard_participation(sender, instance, **kwargs):
+    """Take the participation out of its leaderboard bucket (its row goes with the cascade)"""
+    try:
+        leaderboard.participation_deleted(instance.participation_id)
+    except Exception as e:
+        logger.error(f"Failed to update leaderboard for participation {instance.participation_id}: {str(e)}")
+
+
+@receiver(post_save, sender=User)
+def update_leaderboard_username(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Propagate username changes to the denormalized leaderboard rows"""
+    if raw or created or (update_fields is not None and 'username' not in update_fields):
+        return
+    try:
+        leaderboard.username_changed(instance)
+    except Exception as e:
+        logger.error(f"Failed to update leaderboard usernames for user {instance.pk}: {str(e)}")
+
+
+# Defi catalogue of the challenge list (status is recalculated with .update()
+# and therefore read per request, not cached)
+catalogues.register(
+    'defis',
+    lambda: Defi.objects.select_related('badge').prefetch_related('objectives').order_by('defi_id'),
+    [Defi, DefiBadge, DefiObjectif],
+)
+typeahead.register('defis', lambda: Defi.objects.all(), 'defi_name')
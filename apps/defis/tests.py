@@ -0,0 +1,122 @@
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from apps.users.models import User
+from .models import (
+    Defi, DefiStatus, LeaderboardEntry, Participation, ParticipationProgress, _DeferredStatusRecalc
+)
+
+
+class DefiStatusTest(TestCase):
+    """Test cases for Defi status recalculation"""
+    
+    def setUp(self):
+        self.defi = Defi.objects.create(defi_name='10k pas', defi_description='Marcher 10 000 pas')
+        self.users = [
+            User.objects.create_user(username=f'walker{i}', email=f'walker{i}@example.com', password='pw12345!')
+            for i in range(3)
+        ]
+    
+    def join(self, user, progress):
+        with self.captureOnCommitCallbacks(execute=True):
+            participation = Participation.objects.create(user=user, defi=self.defi, start_date=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            ParticipationProgress.objects.filter(participation=participation).update(progress_value=progress)
+            participation.progress.refresh_from_db()
+            participation.progress.save()
+        return participation
+    
+    @override_settings(DEFIS_COMPLETED_RULE='all')
+    def test_all_rule_ignores_finished_participations(self):
+        """Test 'all' only considers active participations"""
+        self.join(self.users[0], 100)
+        finished = self.join(self.users[1], 20)
+        self.assertFalse(DefiStatus.objects.get(defi=self.defi).completed)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            finished.end_date = timezone.now() - timedelta(days=1)
+            finished.save()
+        status = DefiStatus.objects.get(defi=self.defi)
+        self.assertTrue(status.completed)
+        self.assertTrue(status.in_progress)
+    
+    def test_recalculation_is_coalesced_per_transaction(self):
+        """Test several progress saves in one transaction schedule one recalculation"""
+        participations = [self.join(user, 0) for user in self.users]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for participation in participations:
+                participation.progress.progress_value = 100
+                participation.progress.save()
+        recalcs = [c for c in callbacks if isinstance(c, _DeferredStatusRecalc)]
+        self.assertEqual(len(recalcs), 1)
+        self.assertTrue(DefiStatus.objects.get(defi=self.defi).completed)
+    
+    def test_rolled_back_savepoint_does_not_drop_later_recalculations(self):
+        """Test a save after a rolled-back savepoint still schedules a recalculation"""
+        participation = self.join(self.users[0], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    participation.progress.progress_value = 50
+                    participation.progress.save()
+                    raise IntegrityError('rolled back')
+            except IntegrityError:
+                pass
+            participation.progress.progress_value = 100
+            participation.progress.save()
+        self.assertTrue(DefiStatus.objects.get(defi=self.defi).completed)
+
+
+class LeaderboardTest(TestCase):
+    """Test cases for the denormalized Defi leaderboard"""
+    
+    def setUp(self):
+        self.defi = Defi.objects.create(defi_name='Marathon', defi_description='42 km')
+        self.users = [
+            User.objects.create_user(username=f'runner{i}', email=f'runner{i}@example.com', password='pw12345!')
+            for i in range(5)
+        ]
+        self.participations = [
+            Participation.objects.create(user=user, defi=self.defi, start_date=timezone.now())
+            for user in self.users
+        ]
+        for participation, value in zip(self.participations, [40, 90, 40, 10, 75]):
+            participation.progress.progress_value = value
+            participation.progress.save()
+    
+    def test_entries_follow_progress_and_username(self):
+        """Test progress and username changes reach the leaderboard rows"""
+        progress = self.participations[3].progress
+        progress.progress_value = 95
+        progress.save()
+        user = self.users[3]
+        user.username = 'sprinter'
+        user.save()
+        entry = LeaderboardEntry.objects.get(participation=self.participations[3])
+        self.assertEqual((entry.username, entry.progress_value), ('sprinter', 95))
+    
+    def test_leaderboard_pages_and_my_rank(self):
+        """Test top-K pages, tie-breaking and rank lookup"""
+        self.client.force_login(self.users[2])
+        url = reverse('defis:defi-leaderboard', args=[self.defi.pk])
+        
+        # session + user + defi + page, whatever the page size
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'limit': 3})
+        self.assertEqual(
+            [(row['rank'], row['username']) for row in response.json()],
+            [(1, 'runner1'), (2, 'runner4'), (3, 'runner0')],
+        )
+        
+        response = self.client.get(url, {'limit': 3, 'after': response.json()[-1]['participation']})
+        self.assertEqual([(row['rank'], row['username']) for row in response.json()], [(4, 'runner2'), (5, 'runner3')])
+        
+        response = self.client.get(reverse('defis:defi-my-rank', args=[self.defi.pk]))
+        self.assertEqual(response.json()['rank'], 4)
+        self.assertEqual(response.json()['participants'], 5)
+        
+        self.participations[1].delete()
+        response = self.client.get(reverse('defis:defi-my-rank', args=[self.defi.pk]))
+        self.assertEqual((response.json()['rank'], response.json()['participants']), (3, 4))
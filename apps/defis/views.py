@@ -1,12 +1,17 @@
+import copy
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from apps.core import catalogues
+from apps.core.eager_loading import EagerLoadingMixin, eager_load
+from apps.core.typeahead import TypeaheadMixin
 from django.utils import timezone
 from .models import Defi, Participation
-from .serializers import DefiSerializer, ParticipationSerializer
+from .serializers import DefiSerializer, ParticipationSerializer, LeaderboardEntrySerializer
+from . import leaderboard as leaderboard_store
 from django.views import generic
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
@@ -25,25 +30,29 @@ class DefiListView(generic.ListView):
     context_object_name = 'defis'
 
     def get_queryset(self):
-        # Prefetch related objects to avoid N+1 queries when rendering many defis
-        from django.db.models import Count, Prefetch
-        qs = Defi.objects.all().prefetch_related(
-            'objectives',
-            'badge',
-            'status',
-            Prefetch('participations', queryset=Participation.objects.select_related('progress'))
-        ).annotate(
-            objectives_count=Count('objectives', distinct=True),
-            participants_count=Count('participations', distinct=True)
+        # Defis, badges and objectives come from the cached catalogue; only the
+        # volatile parts (status, participant counts) are read per request
+        from django.db.models import Count
+        from .models import DefiStatus
+        defis = [copy.copy(defi) for defi in catalogues.get('defis')]
+        ids = [defi.defi_id for defi in defis]
+        statuses = {s.defi_id: s for s in DefiStatus.objects.filter(defi_id__in=ids)}
+        counts = dict(
+            Participation.objects.filter(defi_id__in=ids)
+            .values('defi_id').annotate(total=Count('pk')).values_list('defi_id', 'total')
         )
-        return qs
+        status_field = Defi._meta.get_field('status')
+        for defi in defis:
+            status_field.set_cached_value(defi, statuses.get(defi.defi_id))
+            defi.participants_count = counts.get(defi.defi_id, 0)
+        return defis
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         user = self.request.user
         # Attach user's participation and progress to each defi instance to make templating simple
         if user.is_authenticated:
-            parts = Participation.objects.filter(user=user, defi__in=ctx['defis']).select_related('progress')
+            parts = Participation.objects.filter(user=user).select_related('progress')
             part_map = {p.defi_id: p for p in parts}
             for defi in ctx['defis']:
                 p = part_map.get(getattr(defi, 'defi_id', None))
@@ -401,19 +410,20 @@ class AdminRangeDeleteView(AdminModelDeleteView):
     success_url = reverse_lazy('defis_admin:ranges_list')
 
 
-class DefiViewSet(viewsets.ModelViewSet):
+class DefiViewSet(TypeaheadMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Defi (Challenge) model
     """
     queryset = Defi.objects.all()
     serializer_class = DefiSerializer
+    typeahead_index = 'defis'
     permission_classes = [IsAuthenticated]
     
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Get all active challenges"""
         defis = Defi.objects.all()
-        serializer = self.get_serializer(defis, many=True)
+        serializer = self.get_serializer(self.eager_load(defis), many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
@@ -444,19 +454,53 @@ class DefiViewSet(viewsets.ModelViewSet):
         """Get all participants for a challenge"""
         defi = self.get_object()
         participations = defi.participations.all()
-        serializer = ParticipationSerializer(participations, many=True)
+        serializer = ParticipationSerializer(eager_load(participations, ParticipationSerializer), many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def leaderboard(self, request, pk=None):
-        """Get leaderboard for a challenge"""
+        """
+        Get leaderboard for a challenge, best first: the top `limit` rows
+        (default 20, at most 100); ?after=<participation_id> returns the rows
+        ranked behind that participation
+        """
         defi = self.get_object()
-        participations = defi.participations.order_by('-progress__progress_value')
-        serializer = ParticipationSerializer(participations, many=True)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+            after = int(request.query_params['after']) if request.query_params.get('after') else None
+        except ValueError:
+            return Response({'error': 'limit and after must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if after is not None:
+            previous = leaderboard_store.ranking(defi.pk).filter(participation_id=after).first()
+            if previous is None:
+                return Response({'error': 'Unknown participation'}, status=status.HTTP_400_BAD_REQUEST)
+            entries = leaderboard_store.page_after(previous, limit)
+            first_rank = leaderboard_store.rank_of(previous) + 1
+        else:
+            entries = list(leaderboard_store.ranking(defi.pk)[:limit])
+            first_rank = 1
+        for offset, entry in enumerate(entries):
+            entry.rank = first_rank + offset
+        serializer = LeaderboardEntrySerializer(entries, many=True)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def my_rank(self, request, pk=None):
+        """Get the current user's rank in a challenge"""
+        defi = self.get_object()
+        entry = leaderboard_store.ranking(defi.pk).filter(user=request.user).first()
+        if entry is None:
+            return Response(
+                {'message': 'You are not participating in this challenge'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        entry.rank = leaderboard_store.rank_of(entry)
+        data = LeaderboardEntrySerializer(entry).data
+        data['participants'] = leaderboard_store.participants(defi.pk)
+        return Response(data)
 
 
-class ParticipationViewSet(viewsets.ModelViewSet):
+class ParticipationViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Participation model
     """
@@ -478,7 +522,7 @@ class ParticipationViewSet(viewsets.ModelViewSet):
     def my_participations(self, request):
         """Get participations for current user"""
         participations = Participation.objects.filter(user=request.user)
-        serializer = self.get_serializer(participations, many=True)
+        serializer = self.get_serializer(self.eager_load(participations), many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -489,7 +533,7 @@ class ParticipationViewSet(viewsets.ModelViewSet):
             user=request.user,
             defi__created_at__lte=now
         ).exclude(end_date__lt=now)
-        serializer = self.get_serializer(participations, many=True)
+        serializer = self.get_serializer(self.eager_load(participations), many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
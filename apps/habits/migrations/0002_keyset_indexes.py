@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='habitlog',
+            index=models.Index(fields=['habit', '-start_date', '-habit_log_id'], name='habit_log_habit_date_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(fields=['user', '-created_at', '-habit_id'], name='habit_user_created_idx'),
+        ),
+    ]
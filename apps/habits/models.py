@@ -20,6 +20,9 @@ class Habit(models.Model):
     
     class Meta:
         db_table = 'habits'
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-habit_id'], name='habit_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.habit_name}"
@@ -36,6 +39,9 @@ class HabitLog(models.Model):
     
     class Meta:
         db_table = 'habit_logs'
+        indexes = [
+            models.Index(fields=['habit', '-start_date', '-habit_log_id'], name='habit_log_habit_date_idx'),
+        ]
     
     def __str__(self):
         return f"Log for {self.habit.habit_name} - {self.start_date}"
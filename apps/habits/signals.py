@@ -7,15 +7,18 @@ from django.dispatch import receiver
 from .models import Habit, HabitLog
 from apps.sparql_service.client import SparqlClient
 import logging
+from apps.core import catalogues, typeahead
+from apps.core.metrics import instrument_sync
 
 logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=Habit)
+@instrument_sync('Habit', 'save')
 def sync_habit_to_fuseki(sender, instance, created, **kwargs):
     """Automatically sync Habit to Fuseki when created/updated"""
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         # Determine habit type class
         habit_type_map = {
@@ -42,7 +45,7 @@ def sync_habit_to_fuseki(sender, instance, created, **kwargs):
                 sh:User_{instance.user.user_id} sh:hasHabit sh:Habit_{instance.habit_id} .
             }}
             """
-            success = client.execute_update(sparql_insert)
+            success = client.execute_update(sparql_insert, infer=False)
             if success:
                 logger.info(f"Habit {instance.habit_id} synced to Fuseki (created)")
         else:
@@ -63,7 +66,7 @@ def sync_habit_to_fuseki(sender, instance, created, **kwargs):
                 OPTIONAL {{ sh:Habit_{instance.habit_id} sh:habit_type ?oldType }}
             }}
             """
-            success = client.execute_update(sparql_update)
+            success = client.execute_update(sparql_update, infer=False)
             if success:
                 logger.info(f"Habit {instance.habit_id} synced to Fuseki (updated)")
     except Exception as e:
@@ -71,10 +74,11 @@ def sync_habit_to_fuseki(sender, instance, created, **kwargs):
 
 
 @receiver(post_delete, sender=Habit)
+@instrument_sync('Habit', 'delete')
 def delete_habit_from_fuseki(sender, instance, **kwargs):
     """Automatically delete Habit from Fuseki when deleted from Django"""
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         sparql_delete = f"""
         PREFIX sh: <http://dhia.org/ontologies/smarthealth#>
@@ -92,18 +96,19 @@ def delete_habit_from_fuseki(sender, instance, **kwargs):
         }}
         """
         
-        client.execute_update(sparql_delete)
-        client.execute_update(sparql_delete_refs)
+        client.execute_update(sparql_delete, infer=False)
+        client.execute_update(sparql_delete_refs, infer=False)
         logger.info(f"Habit {instance.habit_id} deleted from Fuseki")
     except Exception as e:
         logger.error(f"Failed to delete Habit {instance.habit_id} from Fuseki: {str(e)}")
 
 
 @receiver(post_save, sender=HabitLog)
+@instrument_sync('HabitLog', 'save')
 def sync_habitlog_to_fuseki(sender, instance, created, **kwargs):
     """Automatically sync HabitLog to Fuseki when created/updated"""
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         if created:
             sparql_insert = f"""
@@ -128,17 +133,18 @@ def sync_habitlog_to_fuseki(sender, instance, created, **kwargs):
             }}
             """
             
-            client.execute_update(sparql_insert)
+            client.execute_update(sparql_insert, infer=False)
             logger.info(f"HabitLog {instance.habit_log_id} synced to Fuseki (created)")
     except Exception as e:
         logger.error(f"Failed to sync HabitLog {instance.habit_log_id} to Fuseki: {str(e)}")
 
 
 @receiver(post_delete, sender=HabitLog)
+@instrument_sync('HabitLog', 'delete')
 def delete_habitlog_from_fuseki(sender, instance, **kwargs):
     """Automatically delete HabitLog from Fuseki when deleted from Django"""
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         sparql_delete = f"""
         PREFIX sh: <http://dhia.org/ontologies/smarthealth#>
@@ -156,8 +162,13 @@ def delete_habitlog_from_fuseki(sender, instance, **kwargs):
         }}
         """
         
-        client.execute_update(sparql_delete)
-        client.execute_update(sparql_delete_refs)
+        client.execute_update(sparql_delete, infer=False)
+        client.execute_update(sparql_delete_refs, infer=False)
         logger.info(f"HabitLog {instance.habit_log_id} deleted from Fuseki")
     except Exception as e:
         logger.error(f"Failed to delete HabitLog {instance.habit_log_id} from Fuseki: {str(e)}")
+
+
+# Habit names for the typeahead search (each user only matches their own)
+catalogues.register('habits', lambda: Habit.objects.order_by('habit_name'), [Habit])
+typeahead.register('habits', lambda: Habit.objects.all(), 'habit_name', owner='user_id', fields=('habit_type',))
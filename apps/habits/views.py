@@ -1,9 +1,13 @@
+from urllib.parse import urlencode
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from apps.core.eager_loading import EagerLoadingMixin, eager_load
+from apps.core.pagination import KeysetCursorPagination, keyset_paginate
+from apps.core.typeahead import TypeaheadMixin
 from rest_framework.authentication import SessionAuthentication
 from .models import Habit, HabitLog, Reading, Cooking, Drawing, Journaling
 from .serializers import (
@@ -12,12 +16,14 @@ from .serializers import (
 )
 
 
-class HabitViewSet(viewsets.ModelViewSet):
+class HabitViewSet(TypeaheadMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Habit model
     """
     queryset = Habit.objects.all()
     serializer_class = HabitSerializer
+    typeahead_index = 'habits'
+    typeahead_owner_scoped = True
     authentication_classes = [SessionAuthentication]
     permission_classes = [IsAuthenticated]
     
@@ -35,7 +41,7 @@ class HabitViewSet(viewsets.ModelViewSet):
     def my_habits(self, request):
         """Get habits for current user"""
         habits = Habit.objects.filter(user=request.user)
-        serializer = self.get_serializer(habits, many=True)
+        serializer = self.get_serializer(self.eager_load(habits), many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -47,7 +53,7 @@ class HabitViewSet(viewsets.ModelViewSet):
         else:
             habits = Habit.objects.filter(user=request.user)
         
-        serializer = self.get_serializer(habits, many=True)
+        serializer = self.get_serializer(self.eager_load(habits), many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
@@ -55,11 +61,11 @@ class HabitViewSet(viewsets.ModelViewSet):
         """Get all logs for a specific habit"""
         habit = self.get_object()
         logs = habit.logs.all()
-        serializer = HabitLogSerializer(logs, many=True)
+        serializer = HabitLogSerializer(eager_load(logs, HabitLogSerializer), many=True)
         return Response(serializer.data)
 
 
-class HabitLogViewSet(viewsets.ModelViewSet):
+class HabitLogViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for HabitLog model
     """
@@ -67,6 +73,8 @@ class HabitLogViewSet(viewsets.ModelViewSet):
     serializer_class = HabitLogSerializer
     authentication_classes = [SessionAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetCursorPagination
+    cursor_ordering = ('-start_date', '-habit_log_id')
     
     def get_queryset(self):
         """Filter logs by user's habits if not staff"""
@@ -78,11 +86,11 @@ class HabitLogViewSet(viewsets.ModelViewSet):
     def my_logs(self, request):
         """Get logs for current user's habits"""
         logs = HabitLog.objects.filter(habit__user=request.user)
-        serializer = self.get_serializer(logs, many=True)
+        serializer = self.get_serializer(self.eager_load(logs), many=True)
         return Response(serializer.data)
 
 
-class ReadingViewSet(viewsets.ModelViewSet):
+class ReadingViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Reading habits
     """
@@ -96,7 +104,7 @@ class ReadingViewSet(viewsets.ModelViewSet):
         return Reading.objects.filter(habit__user=self.request.user)
 
 
-class CookingViewSet(viewsets.ModelViewSet):
+class CookingViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Cooking habits
     """
@@ -110,7 +118,7 @@ class CookingViewSet(viewsets.ModelViewSet):
         return Cooking.objects.filter(habit__user=self.request.user)
 
 
-class DrawingViewSet(viewsets.ModelViewSet):
+class DrawingViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Drawing habits
     """
@@ -124,7 +132,7 @@ class DrawingViewSet(viewsets.ModelViewSet):
         return Drawing.objects.filter(habit__user=self.request.user)
 
 
-class JournalingViewSet(viewsets.ModelViewSet):
+class JournalingViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Journaling habits
     """
@@ -141,19 +149,35 @@ class JournalingViewSet(viewsets.ModelViewSet):
 # Web Interface Views
 @login_required
 def habit_list_view(request):
-    """Display list of user's habits"""
-    habits = Habit.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'habits/habit_list.html', {
-        'habits': habits
-    })
+    """Display list of user's habits, one keyset page at a time, optionally of one type (?type=)"""
+    habits = Habit.objects.filter(user=request.user).select_related('user')
+    habit_type = request.GET.get('type', '')
+    if habit_type not in dict(Habit.HABIT_TYPE_CHOICES):
+        habit_type = ''
+    if habit_type:
+        habits = habits.filter(habit_type=habit_type)
+    page, next_cursor = keyset_paginate(request, habits, ('-created_at', '-habit_id'))
+    context = {
+        'habits': page,
+        'next_cursor': next_cursor,
+        'habit_type': habit_type,
+        'habit_types': Habit.HABIT_TYPE_CHOICES,
+        'keyset_params': urlencode({'type': habit_type}) if habit_type else '',
+    }
+    if request.GET.get('partial'):
+        # Next chunk requested by the lazy loader
+        return render(request, 'habits/_habit_cards.html', context)
+    return render(request, 'habits/habit_list.html', context)
 
 
 @login_required
 def habit_logs_view(request, habit_id):
     """Display logs for a specific habit"""
     habit = get_object_or_404(Habit, habit_id=habit_id, user=request.user)
-    logs = habit.logs.select_related('frequency', 'notes').all().order_by('-start_date')
-    return render(request, 'habits/habit_logs.html', {
-        'habit': habit,
-        'logs': logs
-    })
+    logs = habit.logs.select_related('frequency', 'notes')
+    page, next_cursor = keyset_paginate(request, logs, ('-start_date', '-habit_log_id'))
+    context = {'habit': habit, 'logs': page, 'next_cursor': next_cursor}
+    if request.GET.get('partial'):
+        # Next chunk requested by the lazy loader
+        return render(request, 'habits/_habit_log_items.html', context)
+    return render(request, 'habits/habit_logs.html', context)
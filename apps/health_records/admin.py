@@ -1,7 +1,8 @@
 from django.contrib import admin
 from .models import (
     HealthRecord, StudentHealthRecord, TeacherHealthRecord,
-    HealthMetric, HeartRate, Cholesterol, SugarLevel, Oxygen, Height, Weight
+    HealthMetric, HeartRate, Cholesterol, SugarLevel, Oxygen, Height, Weight,
+    HealthAnomaly
 )
 
 
@@ -71,3 +72,11 @@ class StudentHealthRecordAdmin(admin.ModelAdmin):
 class TeacherHealthRecordAdmin(admin.ModelAdmin):
     list_display = ('health_record', 'teacher')
     search_fields = ('teacher__user__username', 'health_record__health_record_name')
+
+
+@admin.register(HealthAnomaly)
+class HealthAnomalyAdmin(admin.ModelAdmin):
+    list_display = ('health_record', 'user', 'health_metric', 'value', 'reason', 'z_score', 'detected_at')
+    search_fields = ('user__username', 'health_metric__metric_name')
+    list_filter = ('reason', 'health_metric', 'detected_at')
+    raw_id_fields = ('health_record',)
@@ -0,0 +1,300 @@
+"""
+Health metric analytics
+A user's readings are fetched with a single values_list query, ordered by
+metric name and date, and turned into NumPy arrays. Every statistic below
+(rolling means, percentiles, least-squares trend, BMI) is computed on those
+arrays, so years of readings cost one query and a handful of array passes.
+Chart series are downsampled the same way (LTTB or min/max buckets) so that
+their size depends on the requested resolution, not on the history length.
+
+Metrics are grouped by name, like latest_by_metric_name(): several
+HealthMetric rows called 'Weight' form one series.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.metrics import record_cache
+
+from .models import HealthRecord
+
+SECONDS_PER_DAY = 86400.0
+PERCENTILES = (10, 25, 50, 75, 90)
+WEIGHT_METRIC = 'Weight'   # kg
+HEIGHT_METRIC = 'Height'   # cm
+# WHO adult BMI classes: upper bound (exclusive) -> label
+BMI_CATEGORIES = ((18.5, 'Underweight'), (25.0, 'Normal'), (30.0, 'Overweight'), (float('inf'), 'Obese'))
+
+
+class MetricSeries:
+    """Readings of one metric: epoch seconds and values, sorted by time"""
+
+    def __init__(self, name, unit, times, values):
+        self.name = name
+        self.unit = unit
+        self.times = times
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def rolling(self, window_days):
+        """
+        Mean, min and max of the readings in the `window_days` before each
+        reading (inclusive). Window bounds come from searchsorted, means from
+        prefix sums, min and max from a sparse table.
+        """
+        window = window_days * SECONDS_PER_DAY
+        starts = np.searchsorted(self.times, self.times - window, side='left')
+        ends = np.arange(1, len(self.values) + 1)
+        sums = np.concatenate(([0.0], np.cumsum(self.values)))
+        means = (sums[ends] - sums[starts]) / (ends - starts)
+        mins, maxs = _window_extremes(self.values, starts, ends)
+        return means, mins, maxs
+
+    def slope_per_day(self):
+        """Least-squares trend of the values, in units per day"""
+        if len(self) < 2:
+            return None
+        days = (self.times - self.times.mean()) / SECONDS_PER_DAY
+        spread = np.dot(days, days)
+        if spread == 0:
+            return None
+        return float(np.dot(days, self.values - self.values.mean()) / spread)
+
+    def summary(self, window_days):
+        values = self.values
+        means, mins, maxs = self.rolling(window_days)
+        slope = self.slope_per_day()
+        return {
+            'metric': self.name,
+            'unit': self.unit,
+            'count': len(self),
+            'first_date': _iso(self.times[0]),
+            'last_date': _iso(self.times[-1]),
+            'last_value': float(values[-1]),
+            'mean': float(values.mean()),
+            'std': float(values.std()),
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'percentiles': dict(zip(
+                (f'p{p}' for p in PERCENTILES), (float(v) for v in np.percentile(values, PERCENTILES))
+            )),
+            'trend_per_day': slope,
+            'rolling': {
+                'window_days': window_days,
+                'mean': float(means[-1]),
+                'min': float(mins[-1]),
+                'max': float(maxs[-1]),
+            },
+        }
+
+    def series(self, window_days):
+        """Every reading with the rolling mean at that point"""
+        means, _, _ = self.rolling(window_days)
+        return {
+            'dates': [_iso(t) for t in self.times],
+            'values': self.values.tolist(),
+            'rolling_mean': means.tolist(),
+        }
+
+
+def _window_extremes(values, starts, ends):
+    """
+    Min and max of values[starts[i]:ends[i]] for every i, with windows whose
+    start and end never decrease. Uses a sparse table: log2(n) array passes.
+    """
+    n = len(values)
+    lengths = ends - starts
+    levels = max(1, int(np.log2(lengths.max())) + 1)
+    mins, maxs = [values], [values]
+    for level in range(1, levels):
+        half = 1 << (level - 1)
+        previous_min, previous_max = mins[-1], maxs[-1]
+        size = n - (1 << level) + 1
+        mins.append(np.minimum(previous_min[:size], previous_min[half:half + size]))
+        maxs.append(np.maximum(previous_max[:size], previous_max[half:half + size]))
+    level = np.log2(lengths).astype(np.int64)
+    span = 1 << level
+    window_min = np.empty(len(starts))
+    window_max = np.empty(len(starts))
+    for k in np.unique(level):
+        rows = level == k
+        left, right = starts[rows], ends[rows] - span[rows]
+        window_min[rows] = np.minimum(mins[k][left], mins[k][right])
+        window_max[rows] = np.maximum(maxs[k][left], maxs[k][right])
+    return window_min, window_max
+
+
+def _iso(epoch_seconds):
+    return datetime.fromtimestamp(float(epoch_seconds), tz=timezone.utc).isoformat()
+
+
+def load_series(user_id, metric=None, start=None, end=None):
+    """{metric name: MetricSeries} of a user's readings (one query)"""
+    rows = HealthRecord.objects.filter(
+        user_id=user_id, value__isnull=False, health_metric__isnull=False
+    )
+    if metric:
+        rows = rows.filter(health_metric__metric_name=metric)
+    if start:
+        rows = rows.filter(start_date__gte=start)
+    if end:
+        rows = rows.filter(start_date__lt=end)
+    rows = list(
+        rows.order_by('health_metric__metric_name', 'start_date', 'health_record_id')
+        .values_list('health_metric__metric_name', 'health_metric__metric_unit', 'start_date', 'value')
+    )
+    if not rows:
+        return {}
+    names, units, dates, values = zip(*rows)
+    names = np.array(names, dtype=object)
+    times = np.fromiter((d.timestamp() for d in dates), dtype=np.float64, count=len(dates))
+    values = np.array(values, dtype=np.float64)
+    # Rows are sorted by name: each metric is one contiguous slice
+    bounds = np.concatenate(([0], np.flatnonzero(names[1:] != names[:-1]) + 1, [len(names)]))
+    return {
+        names[a]: MetricSeries(names[a], units[a], times[a:b], values[a:b])
+        for a, b in zip(bounds[:-1], bounds[1:])
+    }
+
+
+def bmi(series):
+    """
+    BMI of every weight reading, using the latest height measured at or
+    before it (else the first height); the latest one with its WHO class.
+    """
+    weight, height = series.get(WEIGHT_METRIC), series.get(HEIGHT_METRIC)
+    if weight is None or height is None:
+        return None
+    at = np.searchsorted(height.times, weight.times, side='right') - 1
+    metres = height.values[np.clip(at, 0, None)] / 100.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = weight.values / (metres * metres)
+    valid = np.isfinite(values) & (metres > 0)
+    if not valid.any():
+        return None
+    last = np.flatnonzero(valid)[-1]
+    value = float(values[last])
+    return {
+        'value': round(value, 1),
+        'category': next(label for bound, label in BMI_CATEGORIES if value < bound),
+        'weight': float(weight.values[last]),
+        'height': float(height.values[np.clip(at, 0, None)][last]),
+        'date': _iso(weight.times[last]),
+        'trend_per_day': MetricSeries('BMI', 'kg/m2', weight.times[valid], values[valid]).slope_per_day(),
+    }
+
+
+def _cached(kind, user_id, params, compute):
+    """compute() cached for HEALTH_ANALYTICS_TTL seconds per user and parameters"""
+    digest = hashlib.md5('|'.join(str(p) for p in params).encode()).hexdigest()
+    key = f'health_{kind}:{user_id}:{digest}'
+    result = cache.get(key)
+    record_cache(f'health_{kind}', result is not None)
+    if result is None:
+        result = compute()
+        cache.set(key, result, getattr(settings, 'HEALTH_ANALYTICS_TTL', 60))
+    return result
+
+
+def analyse(user_id, metric=None, start=None, end=None, window_days=7, include_series=False):
+    """Summary of every metric of a user (and their BMI), cached for HEALTH_ANALYTICS_TTL seconds"""
+    def compute():
+        series = load_series(user_id, metric=metric, start=start, end=end)
+        metrics = []
+        for data in series.values():
+            summary = data.summary(window_days)
+            if include_series:
+                summary['series'] = data.series(window_days)
+            metrics.append(summary)
+        return {'metrics': metrics, 'bmi': bmi(series)}
+
+    return _cached('analytics', user_id, (metric, start, end, window_days, include_series), compute)
+
+
+# -- downsampling for charts -------------------------------------------------
+
+def lttb(times, values, points):
+    """
+    Largest-Triangle-Three-Buckets: indices of `points` readings keeping the
+    visual shape of the series. The first and last readings are kept; each
+    bucket in between keeps the reading forming the largest triangle with the
+    previously kept one and the mean of the next bucket. One vectorized pass
+    per bucket.
+    """
+    n = len(values)
+    if points >= n:
+        return np.arange(n)
+    if points < 3:
+        return np.array([0, n - 1])
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    kept = np.empty(points, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for b in range(points - 2):
+        start, stop = edges[b], edges[b + 1]
+        following = slice(stop, edges[b + 2]) if b + 2 < len(edges) else slice(n - 1, n)
+        mean_t, mean_v = times[following].mean(), values[following].mean()
+        t, v = times[start:stop], values[start:stop]
+        areas = np.abs(
+            (times[previous] - mean_t) * (v - values[previous])
+            - (times[previous] - t) * (mean_v - values[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        kept[b + 1] = previous
+    return kept
+
+
+def minmax_buckets(values, points):
+    """
+    Indices of the minimum and maximum reading of each of points // 2 buckets
+    of equal size, in time order: spikes survive whatever the compression
+    """
+    n = len(values)
+    buckets = max(points // 2, 1)
+    if 2 * buckets >= n:
+        return np.arange(n)
+    bucket = np.arange(n) * buckets // n
+    starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    kept = []
+    for reduce in (np.minimum, np.maximum):
+        extreme = reduce.reduceat(values, starts)
+        # First reading of each bucket equal to the bucket's extreme
+        candidates = np.flatnonzero(values == extreme[bucket])
+        _, first = np.unique(bucket[candidates], return_index=True)
+        kept.append(candidates[first])
+    return np.unique(np.concatenate(kept))
+
+
+DOWNSAMPLERS = {
+    'lttb': lambda series, points: lttb(series.times, series.values, points),
+    'minmax': lambda series, points: minmax_buckets(series.values, points),
+}
+
+
+def downsample(user_id, metric, points, method='lttb', start=None, end=None):
+    """
+    At most `points` readings of one metric of a user, chosen by `method`
+    ('lttb' or 'minmax'); None if the user has no reading of the metric
+    """
+    def compute():
+        data = load_series(user_id, metric=metric, start=start, end=end).get(metric)
+        if data is None:
+            return None
+        kept = DOWNSAMPLERS[method](data, points)
+        return {
+            'metric': data.name,
+            'unit': data.unit,
+            'method': method,
+            'source_points': len(data),
+            'points': len(kept),
+            'dates': [_iso(t) for t in data.times[kept]],
+            'values': data.values[kept].tolist(),
+        }
+
+    return _cached('chart', user_id, (metric, start, end, points, method), compute)
@@ -0,0 +1,227 @@
+"""
+Online anomaly detection on HealthRecord readings
+HealthMetricStats keeps, per (user, metric), the running statistics of the
+readings: Welford's count/mean/M2 (exact mean and variance, values can also be
+taken out again) and an exponentially weighted mean and variance that follow
+the recent level. A saved reading of a monitored metric is checked against the
+statistics *before* it is folded in:
+
+- outside the normal range of the metric (no history needed);
+- |z-score| against the user's mean above ANOMALY_Z_THRESHOLD;
+- |deviation from the EWMA| above the same threshold, in EWMA standard deviations.
+
+Statistical checks start after ANOMALY_MIN_SAMPLES readings. Each save or
+delete reads and writes one stats row, whatever the length of the history.
+"""
+
+import math
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.core import catalogues
+
+from .models import HealthAnomaly, HealthMetricStats, HealthRecord
+
+# Normal range (low, high) of the monitored metrics, by metric name; None = unbounded
+NORMAL_RANGES = {
+    'Heart Rate': (40.0, 120.0),        # BPM, at rest
+    'Sugar Level': (70.0, 180.0),       # mg/dL
+    'Oxygen Saturation': (92.0, None),  # SpO2 %
+}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def monitored_metrics():
+    """Names of the metrics whose readings are checked"""
+    return _setting('ANOMALY_METRICS', tuple(NORMAL_RANGES))
+
+
+def metric_name(metric_id):
+    for metric in catalogues.get('health_metrics'):
+        if metric.health_metric_id == metric_id:
+            return metric.metric_name
+    return None
+
+
+# -- running statistics ------------------------------------------------------
+
+def add_value(stats, value):
+    """Fold one reading into the Welford and EWMA statistics"""
+    stats.count += 1
+    delta = value - stats.mean
+    stats.mean += delta / stats.count
+    stats.m2 += delta * (value - stats.mean)
+    if stats.ewma is None:
+        stats.ewma, stats.ewm_var = value, 0.0
+    else:
+        alpha = _setting('ANOMALY_EWMA_ALPHA', 0.3)
+        delta = value - stats.ewma
+        stats.ewma += alpha * delta
+        stats.ewm_var = (1 - alpha) * (stats.ewm_var + alpha * delta * delta)
+
+
+def remove_value(stats, value):
+    """
+    Take one reading out of the Welford statistics (the EWMA depends on the
+    order of the readings and is left as is)
+    """
+    if stats.count <= 1:
+        stats.count, stats.mean, stats.m2 = 0, 0.0, 0.0
+        stats.ewma, stats.ewm_var = None, 0.0
+        return
+    previous_mean = (stats.count * stats.mean - value) / (stats.count - 1)
+    stats.m2 = max(stats.m2 - (value - previous_mean) * (value - stats.mean), 0.0)
+    stats.mean = previous_mean
+    stats.count -= 1
+
+
+def check(stats, value, name):
+    """(reason, z_score, ewma_z_score) if `value` is abnormal for these statistics, else None"""
+    threshold = _setting('ANOMALY_Z_THRESHOLD', 3.0)
+    z_score = ewma_z_score = None
+    if stats.count >= _setting('ANOMALY_MIN_SAMPLES', 5):
+        if stats.std > 0:
+            z_score = (value - stats.mean) / stats.std
+        if stats.ewma is not None and stats.ewm_var > 0:
+            ewma_z_score = (value - stats.ewma) / math.sqrt(stats.ewm_var)
+
+    low, high = NORMAL_RANGES.get(name, (None, None))
+    if low is not None and value < low:
+        reason = 'BELOW_RANGE'
+    elif high is not None and value > high:
+        reason = 'ABOVE_RANGE'
+    elif z_score is not None and abs(z_score) >= threshold:
+        reason = 'ZSCORE'
+    elif ewma_z_score is not None and abs(ewma_z_score) >= threshold:
+        reason = 'EWMA'
+    else:
+        return None
+    return reason, z_score, ewma_z_score
+
+
+# -- HealthRecord hooks ------------------------------------------------------
+
+def _reading(record):
+    """(user_id, metric_id, value) of a record, None if it has no metric or value"""
+    if record is None or record.health_metric_id is None or record.value is None:
+        return None
+    return record.user_id, record.health_metric_id, record.value
+
+
+def _locked_stats(user_id, metric_id):
+    stats, _ = HealthMetricStats.objects.select_for_update().get_or_create(
+        user_id=user_id, health_metric_id=metric_id
+    )
+    return stats
+
+
+def record_saved(record, previous=None):
+    """
+    Check a created or modified record and update the statistics; `previous`
+    is the (user_id, metric_id, value) the record had before the update
+    """
+    current = _reading(record)
+    if current == previous:
+        return
+    with transaction.atomic():
+        if previous is not None:
+            stats = _locked_stats(previous[0], previous[1])
+            remove_value(stats, previous[2])
+            stats.save()
+        HealthAnomaly.objects.filter(health_record_id=record.health_record_id).delete()
+        if current is None:
+            return
+        user_id, metric_id, value = current
+        stats = _locked_stats(user_id, metric_id)
+        name = metric_name(metric_id)
+        if name in monitored_metrics():
+            flagged = check(stats, value, name)
+            if flagged is not None:
+                reason, z_score, ewma_z_score = flagged
+                HealthAnomaly.objects.create(
+                    health_record_id=record.health_record_id, user_id=user_id, health_metric_id=metric_id,
+                    value=value, reason=reason, z_score=z_score, ewma_z_score=ewma_z_score,
+                )
+        add_value(stats, value)
+        stats.save()
+
+
+def records_created(records):
+    """
+    Check a batch of new records (bulk inserts that bypass signals) in date
+    order: one locked statistics row per (user, metric) and one bulk insert of
+    the anomalies
+    """
+    groups = {}
+    for record in sorted(records, key=lambda r: (r.start_date, r.health_record_id)):
+        reading = _reading(record)
+        if reading is not None:
+            groups.setdefault(reading[:2], []).append(record)
+    flagged_records = []
+    with transaction.atomic():
+        for (user_id, metric_id), group in groups.items():
+            stats = _locked_stats(user_id, metric_id)
+            name = metric_name(metric_id)
+            for record in group:
+                if name in monitored_metrics():
+                    flagged = check(stats, record.value, name)
+                    if flagged is not None:
+                        reason, z_score, ewma_z_score = flagged
+                        flagged_records.append(HealthAnomaly(
+                            health_record_id=record.health_record_id, user_id=user_id, health_metric_id=metric_id,
+                            value=record.value, reason=reason, z_score=z_score, ewma_z_score=ewma_z_score,
+                        ))
+                add_value(stats, record.value)
+            stats.save()
+        HealthAnomaly.objects.bulk_create(flagged_records)
+    return flagged_records
+
+
+def record_deleted(record):
+    """Take a deleted record out of its statistics (its anomaly is deleted by cascade)"""
+    reading = _reading(record)
+    if reading is None:
+        return
+    with transaction.atomic():
+        stats = _locked_stats(reading[0], reading[1])
+        remove_value(stats, reading[2])
+        stats.save()
+
+
+def previous_reading(record):
+    """The stored (user_id, metric_id, value) of a record about to be updated"""
+    if record.pk is None or record._state.adding:
+        return None
+    stored = HealthRecord.objects.filter(pk=record.pk).values_list('user_id', 'health_metric_id', 'value').first()
+    if stored is None or stored[1] is None or stored[2] is None:
+        return None
+    return stored
+
+
+def rebuild():
+    """
+    Recompute every statistics row from HealthRecord in date order (after bulk
+    loads that bypass signals); existing anomalies are kept
+    """
+    with transaction.atomic():
+        HealthMetricStats.objects.all().delete()
+        readings = (
+            HealthRecord.objects
+            .filter(health_metric__isnull=False, value__isnull=False)
+            .order_by('user_id', 'health_metric_id', 'start_date', 'health_record_id')
+            .values_list('user_id', 'health_metric_id', 'value')
+        )
+        batch, stats = [], None
+        for user_id, metric_id, value in readings.iterator(chunk_size=5000):
+            if stats is None or (stats.user_id, stats.health_metric_id) != (user_id, metric_id):
+                stats = HealthMetricStats(user_id=user_id, health_metric_id=metric_id, ewma=None)
+                batch.append(stats)
+                if len(batch) > 5000:
+                    HealthMetricStats.objects.bulk_create(batch[:-1])
+                    batch = batch[-1:]
+            add_value(stats, value)
+        HealthMetricStats.objects.bulk_create(batch)
@@ -0,0 +1,35 @@
+"""
+Bulk creation of health records
+Used by HealthRecordViewSet.bulk: the readings are inserted with one
+bulk_create. Signals do not fire, so the derived tables are updated here once
+for the whole batch: dashboard counter, rollups, latest values (one update per
+user and metric) and anomaly detection (one statistics row per user and metric).
+"""
+
+from apps.rollups import buckets
+from apps.sparql_service import ntriples
+from apps.users.counters import increment
+
+from . import anomalies, latest_values
+from .models import HealthRecord
+
+
+def create_records(user, items):
+    """
+    Insert validated items (HealthRecordBulkItemSerializer) for `user`;
+    returns the created records and their N-Triples
+    """
+    records = HealthRecord.objects.bulk_create([
+        HealthRecord(
+            user=user, health_metric_id=item.get('health_metric'), value=item.get('value'),
+            description=item.get('description', ''), start_date=item['start_date'],
+            end_date=item.get('end_date'),
+        )
+        for item in items
+    ])
+    increment('health_records', len(records))
+    buckets.add_many(buckets.contribution(record) for record in records)
+    latest_values.records_created(records)
+    anomalies.records_created(records)
+    triples = [line for record in records for line in ntriples.health_record_triples(record)]
+    return records, triples
@@ -0,0 +1,151 @@
+"""
+Latest value per (user, metric)
+Keeps LatestHealthMetricValue in step with HealthRecord and answers
+"latest metric of each type" with a single query.
+"""
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import HealthRecord, LatestHealthMetricValue
+
+# Reverse one-to-one metric details rendered by HealthMetricSerializer
+METRIC_DETAILS = ('heart_rate', 'cholesterol', 'sugar_level', 'oxygen', 'height', 'weight')
+
+
+def _is_newer(record, current):
+    """True if `record` is more recent than the stored latest value"""
+    if current.recorded_at != record.start_date:
+        return record.start_date > current.recorded_at
+    return record.health_record_id >= (current.health_record_id or 0)
+
+
+def record_saved(record):
+    """Update the latest value after `record` was created or modified"""
+    # The record may have moved to another metric: refresh the pair it used to lead
+    for stale in LatestHealthMetricValue.objects.filter(health_record_id=record.health_record_id).exclude(
+        health_metric_id=record.health_metric_id
+    ):
+        refresh(stale.user_id, stale.health_metric_id)
+
+    if not record.health_metric_id:
+        return
+    try:
+        _apply(record)
+    except IntegrityError:
+        # A concurrent first write for the same pair created the row first:
+        # its savepoint was rolled back, compare against that row instead
+        _apply(record)
+
+
+def _apply(record):
+    with transaction.atomic():
+        current = (
+            LatestHealthMetricValue.objects.select_for_update()
+            .filter(user_id=record.user_id, health_metric_id=record.health_metric_id)
+            .first()
+        )
+        if current is None:
+            LatestHealthMetricValue.objects.create(
+                user_id=record.user_id,
+                health_metric_id=record.health_metric_id,
+                health_record_id=record.health_record_id,
+                value=record.value,
+                recorded_at=record.start_date,
+            )
+        elif current.health_record_id == record.health_record_id and not _is_newer(record, current):
+            # The latest record was edited back in time: another record may now be newer
+            refresh(record.user_id, record.health_metric_id)
+        elif _is_newer(record, current):
+            current.health_record_id = record.health_record_id
+            current.value = record.value
+            current.recorded_at = record.start_date
+            current.save(update_fields=['health_record', 'value', 'recorded_at', 'updated_at'])
+
+
+def records_created(records):
+    """Update the latest values after a batch of new records: one update per (user, metric) pair"""
+    newest = {}
+    for record in records:
+        if not record.health_metric_id:
+            continue
+        key = (record.user_id, record.health_metric_id)
+        best = newest.get(key)
+        if best is None or (record.start_date, record.health_record_id) > (best.start_date, best.health_record_id):
+            newest[key] = record
+    for record in newest.values():
+        record_saved(record)
+
+
+def record_deleted(record):
+    """Update the latest value after `record` was deleted"""
+    if record.health_metric_id:
+        refresh(record.user_id, record.health_metric_id)
+
+
+def refresh(user_id, metric_id):
+    """Recompute the latest value of one (user, metric) pair from HealthRecord"""
+    latest = (
+        HealthRecord.objects
+        .filter(user_id=user_id, health_metric_id=metric_id)
+        .order_by('-start_date', '-health_record_id')
+        .values_list('health_record_id', 'value', 'start_date')
+        .first()
+    )
+    if latest is None:
+        LatestHealthMetricValue.objects.filter(user_id=user_id, health_metric_id=metric_id).delete()
+        return
+    record_id, value, start_date = latest
+    LatestHealthMetricValue.objects.update_or_create(
+        user_id=user_id, health_metric_id=metric_id,
+        defaults={'health_record_id': record_id, 'value': value, 'recorded_at': start_date},
+    )
+
+
+def rebuild():
+    """Rebuild the whole table (after bulk loads that bypass signals)"""
+    with transaction.atomic():
+        LatestHealthMetricValue.objects.all().delete()
+        records = (
+            HealthRecord.objects
+            .filter(health_metric__isnull=False)
+            .order_by('user_id', 'health_metric_id', '-start_date', '-health_record_id')
+            .values_list('user_id', 'health_metric_id', 'health_record_id', 'value', 'start_date')
+        )
+        batch, previous = [], None
+        for user_id, metric_id, record_id, value, start_date in records.iterator(chunk_size=5000):
+            if (user_id, metric_id) == previous:
+                continue
+            previous = (user_id, metric_id)
+            batch.append(LatestHealthMetricValue(
+                user_id=user_id, health_metric_id=metric_id, health_record_id=record_id,
+                value=value, recorded_at=start_date,
+            ))
+            if len(batch) >= 5000:
+                LatestHealthMetricValue.objects.bulk_create(batch)
+                batch = []
+        LatestHealthMetricValue.objects.bulk_create(batch)
+
+
+def latest_by_metric_name(user):
+    """
+    Latest value rows of `user`, one per metric name (newest metric wins), with
+    their HealthMetric and its details joined in - a single query.
+    """
+    rows = (
+        LatestHealthMetricValue.objects
+        .filter(user=user)
+        .select_related('health_metric', *(f'health_metric__{name}' for name in METRIC_DETAILS))
+    )
+    if connection.vendor == 'postgresql':
+        return rows.order_by(
+            'health_metric__metric_name', '-health_metric__recorded_at', '-health_metric_id'
+        ).distinct('health_metric__metric_name')
+
+    newest = (
+        LatestHealthMetricValue.objects
+        .filter(user=user, health_metric__metric_name=OuterRef('health_metric__metric_name'))
+        .order_by('-health_metric__recorded_at', '-health_metric_id')
+        .values('pk')[:1]
+    )
+    return rows.filter(pk=Subquery(newest)).order_by('health_metric__metric_name')
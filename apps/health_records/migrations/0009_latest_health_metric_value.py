@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('health_records', '0008_add_default_health_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestHealthMetricValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.FloatField(blank=True, null=True)),
+                ('recorded_at', models.DateTimeField(help_text='start_date of the latest record')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('health_metric', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latest_values', to='health_records.healthmetric')),
+                ('health_record', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='health_records.healthrecord')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latest_metric_values', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'latest_health_metric_values',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='latesthealthmetricvalue',
+            constraint=models.UniqueConstraint(fields=('user', 'health_metric'), name='unique_latest_value_per_user_metric'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+def backfill_latest_values(apps, schema_editor):
+    """Fill the latest-value table from existing health records"""
+    HealthRecord = apps.get_model('health_records', 'HealthRecord')
+    LatestHealthMetricValue = apps.get_model('health_records', 'LatestHealthMetricValue')
+    
+    records = (
+        HealthRecord.objects
+        .filter(health_metric__isnull=False)
+        .order_by('user_id', 'health_metric_id', '-start_date', '-health_record_id')
+        .values_list('user_id', 'health_metric_id', 'health_record_id', 'value', 'start_date')
+    )
+    
+    batch, previous = [], None
+    for user_id, metric_id, record_id, value, start_date in records.iterator(chunk_size=5000):
+        if (user_id, metric_id) == previous:
+            continue
+        previous = (user_id, metric_id)
+        batch.append(LatestHealthMetricValue(
+            user_id=user_id,
+            health_metric_id=metric_id,
+            health_record_id=record_id,
+            value=value,
+            recorded_at=start_date,
+        ))
+        if len(batch) >= 5000:
+            LatestHealthMetricValue.objects.bulk_create(batch)
+            batch = []
+    LatestHealthMetricValue.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_records', '0009_latest_health_metric_value'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_latest_values, migrations.RunPython.noop),
+    ]
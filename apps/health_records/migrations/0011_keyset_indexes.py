@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_records', '0010_backfill_latest_health_metric_values'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='healthrecord',
+            index=models.Index(fields=['user', '-start_date', '-health_record_id'], name='health_record_user_date_idx'),
+        ),
+    ]
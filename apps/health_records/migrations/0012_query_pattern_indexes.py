@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_records', '0011_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='healthrecord',
+            index=models.Index(fields=['user', '-created_at'], name='health_record_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthrecord',
+            index=models.Index(fields=['user', 'health_metric', '-start_date', '-health_record_id', 'value'], name='health_record_latest_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('health_records', '0012_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HealthMetricStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(default=0.0)),
+                ('m2', models.FloatField(default=0.0, help_text='Sum of squared deviations from the mean')),
+                ('ewma', models.FloatField(blank=True, null=True)),
+                ('ewm_var', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('health_metric', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_stats', to='health_records.healthmetric')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metric_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'health_metric_stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='HealthAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.FloatField()),
+                ('reason', models.CharField(choices=[('BELOW_RANGE', 'Below normal range'), ('ABOVE_RANGE', 'Above normal range'), ('ZSCORE', 'Far from the usual mean'), ('EWMA', 'Far from the recent trend')], max_length=20)),
+                ('z_score', models.FloatField(blank=True, null=True)),
+                ('ewma_z_score', models.FloatField(blank=True, null=True)),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('health_metric', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anomalies', to='health_records.healthmetric')),
+                ('health_record', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='anomaly', to='health_records.healthrecord')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='health_anomalies', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'health_anomalies',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='healthmetricstats',
+            constraint=models.UniqueConstraint(fields=('user', 'health_metric'), name='unique_stats_per_user_metric'),
+        ),
+        migrations.AddIndex(
+            model_name='healthanomaly',
+            index=models.Index(fields=['user', '-detected_at', '-id'], name='health_anomaly_user_idx'),
+        ),
+    ]
@@ -30,6 +30,15 @@ class HealthRecord(models.Model):
     
     class Meta:
         db_table = 'health_records'
+        indexes = [
+            models.Index(fields=['user', '-start_date', '-health_record_id'], name='health_record_user_date_idx'),
+            models.Index(fields=['user', '-created_at'], name='health_record_user_created_idx'),
+            # Covers the latest-value lookup (apps.health_records.latest_values.refresh)
+            models.Index(
+                fields=['user', 'health_metric', '-start_date', '-health_record_id', 'value'],
+                name='health_record_latest_idx',
+            ),
+        ]
     
     def __str__(self):
         metric_name = self.health_metric.metric_name if self.health_metric else "Health Record"
@@ -132,3 +141,82 @@ class Weight(models.Model):
     
     def __str__(self):
         return f"Weight: {self.weight_value} kg"
+
+
+class LatestHealthMetricValue(models.Model):
+    """Most recent HealthRecord value per (user, metric), maintained on HealthRecord save/delete"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='latest_metric_values')
+    health_metric = models.ForeignKey(HealthMetric, on_delete=models.CASCADE, related_name='latest_values')
+    health_record = models.ForeignKey(HealthRecord, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    value = models.FloatField(null=True, blank=True)
+    recorded_at = models.DateTimeField(help_text="start_date of the latest record")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'latest_health_metric_values'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'health_metric'], name='unique_latest_value_per_user_metric'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.health_metric.metric_name}: {self.value}"
+
+
+class HealthMetricStats(models.Model):
+    """
+    Running statistics of a user's readings of one metric (Welford mean and
+    variance, EWMA level and variance), updated in O(1) on HealthRecord save/delete
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='metric_stats')
+    health_metric = models.ForeignKey(HealthMetric, on_delete=models.CASCADE, related_name='user_stats')
+    count = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(default=0.0)
+    m2 = models.FloatField(default=0.0, help_text="Sum of squared deviations from the mean")
+    ewma = models.FloatField(null=True, blank=True)
+    ewm_var = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'health_metric_stats'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'health_metric'], name='unique_stats_per_user_metric'),
+        ]
+    
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def std(self):
+        return self.variance ** 0.5
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.health_metric.metric_name}: n={self.count} mean={self.mean:.2f}"
+
+
+class HealthAnomaly(models.Model):
+    """A reading flagged as abnormal when it was recorded"""
+    REASON_CHOICES = [
+        ('BELOW_RANGE', 'Below normal range'),
+        ('ABOVE_RANGE', 'Above normal range'),
+        ('ZSCORE', 'Far from the usual mean'),
+        ('EWMA', 'Far from the recent trend'),
+    ]
+    
+    health_record = models.OneToOneField(HealthRecord, on_delete=models.CASCADE, related_name='anomaly')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='health_anomalies')
+    health_metric = models.ForeignKey(HealthMetric, on_delete=models.CASCADE, related_name='anomalies')
+    value = models.FloatField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    z_score = models.FloatField(null=True, blank=True)
+    ewma_z_score = models.FloatField(null=True, blank=True)
+    detected_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'health_anomalies'
+        indexes = [
+            models.Index(fields=['user', '-detected_at', '-id'], name='health_anomaly_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.health_metric.metric_name}: {self.value} ({self.reason})"
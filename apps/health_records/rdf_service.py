@@ -23,8 +23,8 @@ PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
 class HealthRecordRDFService:
     """Service for converting HealthRecord to/from RDF and executing SPARQL operations"""
     
-    def __init__(self):
-        self.client = SparqlClient()
+    def __init__(self, queue_writes=False):
+        self.client = SparqlClient(queue_writes=queue_writes)
         self.namespace = settings.ONTOLOGY_NAMESPACE
     
     def _get_health_record_uri(self, record_id):
@@ -140,7 +140,7 @@ class HealthRecordRDFService:
 INSERT DATA {{
 {triples}
 }}"""
-            self.client.execute_update(insert_query)
+            self.client.execute_update(insert_query, infer=False)
             logger.info(f"HealthRecord {record.health_record_id} inserted into Fuseki")
             return True
         except Exception as e:
@@ -157,7 +157,7 @@ INSERT DATA {{
 INSERT DATA {{
 {triples}
 }}"""
-            self.client.execute_update(insert_query)
+            self.client.execute_update(insert_query, infer=False)
             logger.info(f"HealthMetric {metric.health_metric_id} inserted into Fuseki")
             return True
         except Exception as e:
@@ -180,7 +180,7 @@ WHERE {{
     {record_uri} ?p ?o .
     OPTIONAL {{ ?user sh:hasHealthRecord {record_uri} . }}
 }}"""
-            self.client.execute_update(delete_query)
+            self.client.execute_update(delete_query, infer=False)
             
             # Then insert the new triples
             new_triples = self.create_health_record_rdf(record)
@@ -189,7 +189,7 @@ WHERE {{
 INSERT DATA {{
 {new_triples}
 }}"""
-            self.client.execute_update(insert_query)
+            self.client.execute_update(insert_query, infer=False)
             logger.info(f"HealthRecord {record.health_record_id} updated in Fuseki")
             return True
         except Exception as e:
@@ -209,7 +209,7 @@ DELETE WHERE {{
     ?user sh:hasHealthRecord {record_uri} .
 }}
 """
-            self.client.execute_update(delete_query)
+            self.client.execute_update(delete_query, infer=False)
             logger.info(f"HealthRecord {record_id} deleted from Fuseki")
             return True
         except Exception as e:
@@ -219,9 +219,24 @@ DELETE WHERE {{
     def get_health_records_by_user(self, user_id):
         """Get all health records for a user from Fuseki using SPARQL"""
         try:
-            user_uri = f"<{self.namespace}User_{user_id}>"
-            
-            query = f"""
+            results = self.client.execute_query(self._user_records_query(user_id))
+            return self._parse_health_records_results(results)
+        except Exception as e:
+            logger.error(f"Error getting health records from Fuseki: {str(e)}")
+            raise
+    
+    async def aget_health_records_by_user(self, user_id):
+        """get_health_records_by_user() for async views"""
+        try:
+            results = await self.client.aexecute_query(self._user_records_query(user_id))
+            return self._parse_health_records_results(results)
+        except Exception as e:
+            logger.error(f"Error getting health records from Fuseki: {str(e)}")
+            raise
+    
+    def _user_records_query(self, user_id):
+        user_uri = f"<{self.namespace}User_{user_id}>"
+        return f"""
 {PREFIX}
 
 SELECT ?record ?recordId ?description ?value ?startDate ?endDate ?createdAt ?date ?metricId ?metricName ?metricUnit
@@ -243,11 +258,6 @@ WHERE {{
 }}
 ORDER BY DESC(?createdAt)
 """
-            results = self.client.execute_query(query)
-            return self._parse_health_records_results(results)
-        except Exception as e:
-            logger.error(f"Error getting health records from Fuseki: {str(e)}")
-            raise
     
     def get_health_record_by_id(self, record_id):
         """Get a specific health record from Fuseki using SPARQL"""
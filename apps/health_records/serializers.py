@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from .models import (
     HealthRecord, StudentHealthRecord, TeacherHealthRecord,
-    HealthMetric, HeartRate, Cholesterol, SugarLevel, Oxygen, Height, Weight
+    HealthMetric, HeartRate, Cholesterol, SugarLevel, Oxygen, Height, Weight,
+    HealthMetricStats, HealthAnomaly
 )
 
 
@@ -81,3 +82,43 @@ class TeacherHealthRecordSerializer(serializers.ModelSerializer):
     class Meta:
         model = TeacherHealthRecord
         fields = '__all__'
+
+
+class HealthAnomalySerializer(serializers.ModelSerializer):
+    metric_name = serializers.CharField(source='health_metric.metric_name', read_only=True)
+    recorded_at = serializers.DateTimeField(source='health_record.start_date', read_only=True)
+    
+    class Meta:
+        model = HealthAnomaly
+        fields = '__all__'
+
+
+class HealthMetricStatsSerializer(serializers.ModelSerializer):
+    metric_name = serializers.CharField(source='health_metric.metric_name', read_only=True)
+    std = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = HealthMetricStats
+        fields = ('health_metric', 'metric_name', 'count', 'mean', 'std', 'ewma', 'updated_at')
+
+
+class HealthRecordBulkItemSerializer(serializers.Serializer):
+    """
+    One reading of a bulk upload (HealthRecordViewSet.bulk). `metric_ids`
+    comes from the serializer context, loaded once per request.
+    """
+    health_metric = serializers.IntegerField(required=False, allow_null=True)
+    value = serializers.FloatField(required=False, allow_null=True)
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+    start_date = serializers.DateTimeField()
+    end_date = serializers.DateTimeField(required=False, allow_null=True)
+    
+    def validate_health_metric(self, value):
+        if value is not None and value not in self.context['metric_ids']:
+            raise serializers.ValidationError(f'Unknown health metric {value}')
+        return value
+    
+    def validate(self, data):
+        if data.get('end_date') and data['end_date'] < data['start_date']:
+            raise serializers.ValidationError({'end_date': 'Must not be before start_date'})
+        return data
@@ -2,20 +2,24 @@
 Django signals for automatic RDF/SPARQL synchronization
 """
 
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from .models import HealthRecord, HealthMetric
 from .rdf_service import HealthRecordRDFService
+from . import anomalies, latest_values
 import logging
+from apps.core import catalogues
+from apps.core.metrics import instrument_sync
 
 logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=HealthRecord)
+@instrument_sync('HealthRecord', 'save')
 def sync_health_record_to_fuseki(sender, instance, created, **kwargs):
     """Automatically sync HealthRecord to Fuseki when created/updated"""
     try:
-        rdf_service = HealthRecordRDFService()
+        rdf_service = HealthRecordRDFService(queue_writes=True)
         if created:
             rdf_service.insert_health_record(instance)
             logger.info(f"HealthRecord {instance.health_record_id} synced to Fuseki (created)")
@@ -28,10 +32,11 @@ def sync_health_record_to_fuseki(sender, instance, created, **kwargs):
 
 
 @receiver(post_delete, sender=HealthRecord)
+@instrument_sync('HealthRecord', 'delete')
 def delete_health_record_from_fuseki(sender, instance, **kwargs):
     """Automatically delete HealthRecord from Fuseki when deleted from Django"""
     try:
-        rdf_service = HealthRecordRDFService()
+        rdf_service = HealthRecordRDFService(queue_writes=True)
         rdf_service.delete_health_record(instance.health_record_id)
         logger.info(f"HealthRecord {instance.health_record_id} deleted from Fuseki")
     except Exception as e:
@@ -40,10 +45,11 @@ def delete_health_record_from_fuseki(sender, instance, **kwargs):
 
 
 @receiver(post_save, sender=HealthMetric)
+@instrument_sync('HealthMetric', 'save')
 def sync_health_metric_to_fuseki(sender, instance, created, **kwargs):
     """Automatically sync HealthMetric to Fuseki when created/updated"""
     try:
-        rdf_service = HealthRecordRDFService()
+        rdf_service = HealthRecordRDFService(queue_writes=True)
         if created:
             rdf_service.insert_health_metric(instance)
             logger.info(f"HealthMetric {instance.health_metric_id} synced to Fuseki (created)")
@@ -55,3 +61,59 @@ def sync_health_metric_to_fuseki(sender, instance, created, **kwargs):
         logger.error(f"Failed to sync HealthMetric {instance.health_metric_id} to Fuseki: {str(e)}")
         # Don't raise - allow Django operation to continue
 
+
+
+@receiver(post_save, sender=HealthRecord)
+def update_latest_metric_value(sender, instance, raw=False, **kwargs):
+    """Keep the per-(user, metric) latest value table up to date"""
+    if raw:
+        return
+    try:
+        latest_values.record_saved(instance)
+    except Exception as e:
+        logger.error(f"Failed to update latest value for HealthRecord {instance.health_record_id}: {str(e)}")
+
+
+@receiver(post_delete, sender=HealthRecord)
+def remove_latest_metric_value(sender, instance, **kwargs):
+    """Recompute the latest value when a HealthRecord is deleted"""
+    try:
+        latest_values.record_deleted(instance)
+    except Exception as e:
+        logger.error(f"Failed to update latest value for HealthRecord {instance.health_record_id}: {str(e)}")
+
+
+@receiver(pre_save, sender=HealthRecord)
+def remember_previous_reading(sender, instance, raw=False, **kwargs):
+    """Keep the reading an existing record had before it is modified"""
+    instance._anomaly_previous = None
+    if raw:
+        return
+    try:
+        instance._anomaly_previous = anomalies.previous_reading(instance)
+    except Exception as e:
+        logger.error(f"Failed to read previous value of HealthRecord {instance.pk}: {str(e)}")
+
+
+@receiver(post_save, sender=HealthRecord)
+def check_reading(sender, instance, raw=False, **kwargs):
+    """Flag abnormal readings and update the running statistics"""
+    if raw:
+        return
+    try:
+        anomalies.record_saved(instance, getattr(instance, '_anomaly_previous', None))
+    except Exception as e:
+        logger.error(f"Failed to check HealthRecord {instance.health_record_id} for anomalies: {str(e)}")
+
+
+@receiver(post_delete, sender=HealthRecord)
+def remove_reading(sender, instance, **kwargs):
+    """Take a deleted reading out of the running statistics"""
+    try:
+        anomalies.record_deleted(instance)
+    except Exception as e:
+        logger.error(f"Failed to update statistics for HealthRecord {instance.health_record_id}: {str(e)}")
+
+
+# Health metric catalogue of the health record pages
+catalogues.register('health_metrics', lambda: HealthMetric.objects.order_by('metric_name'), [HealthMetric])
@@ -0,0 +1,211 @@
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import path, reverse
+from django.utils import timezone
+from apps.users.models import User
+from Smart_Health.urls import urlpatterns as project_urlpatterns
+from .models import HealthAnomaly, HealthMetric, HealthMetricStats, HealthRecord, LatestHealthMetricValue
+from .views import health_record_list_async_view
+
+# URLconf of AsyncRecordListTest: the project's URLs plus the async list view
+urlpatterns = [path('async-records/', health_record_list_async_view)] + project_urlpatterns
+
+
+class LatestMetricValueTest(TestCase):
+    """Test cases for the per-(user, metric) latest value table"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='patient', email='patient@example.com', password='pw12345!')
+        self.heart = HealthMetric.objects.get(metric_name='Heart Rate')
+        self.weight = HealthMetric.objects.get(metric_name='Weight')
+        self.now = timezone.now()
+    
+    def add_record(self, metric, value, days_ago):
+        return HealthRecord.objects.create(
+            user=self.user, health_metric=metric, value=value,
+            description='test', start_date=self.now - timedelta(days=days_ago),
+        )
+    
+    def test_latest_value_follows_saves_and_deletes(self):
+        """Test newer records replace the latest value and deletes fall back"""
+        self.add_record(self.heart, 70, days_ago=2)
+        newest = self.add_record(self.heart, 80, days_ago=1)
+        self.add_record(self.heart, 60, days_ago=5)
+        latest = LatestHealthMetricValue.objects.get(user=self.user, health_metric=self.heart)
+        self.assertEqual(latest.value, 80)
+        
+        newest.delete()
+        latest = LatestHealthMetricValue.objects.get(user=self.user, health_metric=self.heart)
+        self.assertEqual(latest.value, 70)
+    
+    def test_latest_by_type_query_count_is_constant(self):
+        """Test the endpoint does not issue one query per metric type"""
+        self.add_record(self.heart, 72, days_ago=1)
+        self.add_record(self.weight, 68.5, days_ago=3)
+        self.client.force_login(self.user)
+        url = reverse('health_records:healthmetric-latest-by-type')
+        
+        # session + user + one query for the latest values
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        values = {item['metric_name']: item['latest_value'] for item in response.json()}
+        self.assertEqual(values, {'Heart Rate': 72, 'Weight': 68.5})
+
+
+class MetricAnalyticsTest(TestCase):
+    """Test cases for the vectorized metric analytics"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='athlete', email='athlete@example.com', password='pw12345!')
+        self.weight = HealthMetric.objects.get(metric_name='Weight')
+        self.height = HealthMetric.objects.get(metric_name='Height')
+        self.now = timezone.now()
+        for days_ago, value in ((30, 80.0), (20, 79.0), (10, 78.0), (0, 77.0)):
+            HealthRecord.objects.create(
+                user=self.user, health_metric=self.weight, value=value,
+                description='pesee', start_date=self.now - timedelta(days=days_ago),
+            )
+        HealthRecord.objects.create(
+            user=self.user, health_metric=self.height, value=175.0,
+            description='toise', start_date=self.now - timedelta(days=40),
+        )
+    
+    def test_statistics_trend_and_bmi(self):
+        """Test the endpoint summarises each series from one query and derives BMI"""
+        self.client.force_login(self.user)
+        url = reverse('health_records:healthrecord-analytics')
+        # session + user + the series
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'window': 15})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        weight = next(m for m in data['metrics'] if m['metric'] == 'Weight')
+        self.assertEqual(weight['count'], 4)
+        self.assertAlmostEqual(weight['mean'], 78.5)
+        self.assertAlmostEqual(weight['trend_per_day'], -0.1)
+        self.assertEqual(weight['percentiles']['p50'], 78.5)
+        self.assertEqual(weight['rolling'], {'window_days': 15, 'mean': 77.5, 'min': 77.0, 'max': 78.0})
+        self.assertEqual(data['bmi']['value'], 25.1)
+        self.assertEqual(data['bmi']['category'], 'Overweight')
+    
+    def test_chart_is_bounded(self):
+        """Test the chart endpoint returns at most the requested points, keeping the ends"""
+        self.client.force_login(self.user)
+        url = reverse('health_records:healthrecord-chart')
+        for method in ('lttb', 'minmax'):
+            data = self.client.get(url, {'metric': 'Weight', 'points': 3, 'method': method}).json()
+            self.assertEqual(data['source_points'], 4)
+            self.assertLessEqual(data['points'], 3)
+            self.assertEqual(data['values'][0], 80.0)
+            self.assertEqual(data['values'][-1], 77.0)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+
+class AnomalyDetectionTest(TestCase):
+    """Test cases for the running statistics and anomaly flags"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='monitored', email='monitored@example.com', password='pw12345!')
+        self.heart = HealthMetric.objects.get(metric_name='Heart Rate')
+        self.now = timezone.now()
+    
+    def add_record(self, value, days_ago):
+        return HealthRecord.objects.create(
+            user=self.user, health_metric=self.heart, value=value,
+            description='pouls', start_date=self.now - timedelta(days=days_ago),
+        )
+    
+    def test_stats_follow_history_and_flags_outliers(self):
+        """Test Welford stats match the history and abnormal readings are flagged"""
+        records = [self.add_record(value, days_ago=10 - i) for i, value in enumerate((70, 72, 68, 71, 69, 70))]
+        self.assertFalse(HealthAnomaly.objects.exists())
+        
+        spike = self.add_record(95, days_ago=1)
+        anomaly = HealthAnomaly.objects.get(health_record=spike)
+        self.assertEqual(anomaly.reason, 'ZSCORE')
+        self.assertGreater(anomaly.z_score, 3)
+        low = self.add_record(35, days_ago=0)
+        self.assertEqual(HealthAnomaly.objects.get(health_record=low).reason, 'BELOW_RANGE')
+        
+        records[0].value = 74
+        records[0].save()
+        spike.delete()
+        values = [74, 72, 68, 71, 69, 70, 35]
+        stats = HealthMetricStats.objects.get(user=self.user, health_metric=self.heart)
+        self.assertEqual(stats.count, len(values))
+        self.assertAlmostEqual(stats.mean, sum(values) / len(values))
+        mean = sum(values) / len(values)
+        self.assertAlmostEqual(stats.variance, sum((v - mean) ** 2 for v in values) / (len(values) - 1))
+        
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('health_records:healthanomaly-list'))
+        self.assertEqual([row['reason'] for row in response.json()['results']], ['BELOW_RANGE'])
+
+
+class BulkIngestionTest(TestCase):
+    """Test cases for the bulk reading upload"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='wearer', email='wearer@example.com', password='pw12345!')
+        self.heart = HealthMetric.objects.get(metric_name='Heart Rate')
+        self.client.login(username='wearer', password='pw12345!')
+    
+    def test_bulk_upload_updates_derived_tables(self):
+        """Test valid readings are inserted in a few queries and match a full rebuild"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.rollups import buckets
+        from apps.rollups.models import DailyMetricRollup
+        from apps.users.counters import get_counters
+        
+        now = timezone.now()
+        items = [
+            {'health_metric': self.heart.health_metric_id, 'value': 70 + i % 3,
+             'start_date': (now - timedelta(hours=60 - i)).isoformat()}
+            for i in range(60)
+        ]
+        items[50]['value'] = 150
+        items.append({'health_metric': 999999, 'value': 1, 'start_date': now.isoformat()})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/health/api/records/bulk/', items, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 60)
+        self.assertEqual(response.data['errors'][0]['index'], 60)
+        self.assertLess(len(queries), 50)
+        
+        self.assertEqual(get_counters()['health_records'], 60)
+        latest = LatestHealthMetricValue.objects.get(user=self.user, health_metric=self.heart)
+        self.assertEqual(latest.health_record_id, response.data['ids'][-1])
+        self.assertEqual(HealthMetricStats.objects.get(user=self.user, health_metric=self.heart).count, 60)
+        self.assertEqual(list(HealthAnomaly.objects.values_list('reason', flat=True)), ['ABOVE_RANGE'])
+        rollups = sorted(DailyMetricRollup.objects.values_list('day', 'count', 'total', 'minimum', 'maximum'))
+        buckets.rebuild()
+        self.assertEqual(rollups, sorted(DailyMetricRollup.objects.values_list('day', 'count', 'total', 'minimum', 'maximum')))
+
+
+@override_settings(ROOT_URLCONF='apps.health_records.tests', FUSEKI_ENDPOINT='http://127.0.0.1:9/sparql')
+class AsyncRecordListTest(TestCase):
+    """Test cases for the ASGI variant of the health record list"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='async', email='async@example.com', password='pw12345!')
+        HealthRecord.objects.create(
+            user=self.user, health_metric=HealthMetric.objects.get(metric_name='Weight'), value=72,
+            description='pesee asynchrone', start_date=timezone.now(),
+        )
+    
+    async def test_requires_login(self):
+        """Test anonymous users are redirected to the login page"""
+        response = await self.async_client.get('/async-records/')
+        self.assertEqual(response.status_code, 302)
+    
+    async def test_falls_back_to_orm_without_fuseki(self):
+        """Test the list is served from the ORM when Fuseki is unreachable, with Server-Timing"""
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get('/async-records/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'pesee asynchrone')
+        self.assertIn('Fuseki connection failed', response.context['error'])
+        self.assertIn('total;dur=', response['Server-Timing'])
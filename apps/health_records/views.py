@@ -1,18 +1,29 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from apps.core import catalogues
+from apps.core.async_views import arender, async_login_required
+from apps.core.bulk import BulkCreateMixin
+from apps.core.eager_loading import EagerLoadingMixin
+from apps.core.pagination import KeysetCursorPagination
 from django.views import generic
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from .models import HealthRecord, HealthMetric, StudentHealthRecord, TeacherHealthRecord
+from django.utils.dateparse import parse_date
+from .models import HealthRecord, HealthMetric, StudentHealthRecord, TeacherHealthRecord, HealthAnomaly, HealthMetricStats
 from .serializers import (
     HealthRecordSerializer, HealthMetricSerializer,
-    StudentHealthRecordSerializer, TeacherHealthRecordSerializer
+    StudentHealthRecordSerializer, TeacherHealthRecordSerializer,
+    HealthAnomalySerializer, HealthMetricStatsSerializer, HealthRecordBulkItemSerializer
 )
+from .bulk import create_records
 from .rdf_service import HealthRecordRDFService
+from .latest_values import latest_by_metric_name
+from . import analytics as metric_analytics
 
 
 # Staff Required Mixin
@@ -22,13 +33,17 @@ class StaffRequiredMixin(UserPassesTestMixin):
         return self.request.user.is_staff
 
 
-class HealthRecordViewSet(viewsets.ModelViewSet):
+class HealthRecordViewSet(BulkCreateMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for HealthRecord model
     """
     queryset = HealthRecord.objects.all()
     serializer_class = HealthRecordSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetCursorPagination
+    cursor_ordering = ('-start_date', '-health_record_id')
+    bulk_serializer_class = HealthRecordBulkItemSerializer
+    bulk_sync_model = 'HealthRecord'
     
     def get_queryset(self):
         """Filter records by user if not staff"""
@@ -40,11 +55,20 @@ class HealthRecordViewSet(viewsets.ModelViewSet):
         """Set user from request when creating record"""
         serializer.save(user=self.request.user)
     
+    def get_bulk_context(self):
+        """Valid health metric ids, from the cached catalogue"""
+        context = super().get_bulk_context()
+        context['metric_ids'] = {metric.health_metric_id for metric in catalogues.get('health_metrics')}
+        return context
+    
+    def perform_bulk_create(self, user, items):
+        return create_records(user, items)
+    
     @action(detail=False, methods=['get'])
     def my_records(self, request):
         """Get records for current user"""
         records = HealthRecord.objects.filter(user=request.user)
-        serializer = self.get_serializer(records, many=True)
+        serializer = self.get_serializer(self.eager_load(records), many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
@@ -59,6 +83,62 @@ class HealthRecordViewSet(viewsets.ModelViewSet):
             status=status.HTTP_404_NOT_FOUND
         )
     
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """
+        Statistics of the user's metric series (staff may pass ?user=<id>):
+        ?metric=<name>, ?start= / ?end= (ISO dates, end exclusive),
+        ?window=<days> for the rolling window, ?series=true for the readings
+        """
+        params = request.query_params
+        user_id = request.user.pk
+        if request.user.is_staff and params.get('user'):
+            user_id = params['user']
+        start = parse_date(params.get('start', '') or '')
+        end = parse_date(params.get('end', '') or '')
+        try:
+            window = min(max(int(params.get('window', 7)), 1), 365)
+        except ValueError:
+            return Response({'error': 'window must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        result = metric_analytics.analyse(
+            user_id,
+            metric=params.get('metric') or None,
+            start=start,
+            end=end,
+            window_days=window,
+            include_series=params.get('series') in ('1', 'true', 'True'),
+        )
+        return Response(result)
+    
+    @action(detail=False, methods=['get'])
+    def chart(self, request):
+        """
+        One metric's readings downsampled to at most ?points= (default 500):
+        ?metric=<name> (required), ?method=lttb|minmax, ?start= / ?end=
+        """
+        params = request.query_params
+        metric = params.get('metric')
+        if not metric:
+            return Response({'error': 'metric is required'}, status=status.HTTP_400_BAD_REQUEST)
+        method = params.get('method', 'lttb')
+        if method not in metric_analytics.DOWNSAMPLERS:
+            return Response({'error': 'method must be lttb or minmax'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            points = min(max(int(params.get('points', 500)), 3), 5000)
+        except ValueError:
+            return Response({'error': 'points must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        user_id = request.user.pk
+        if request.user.is_staff and params.get('user'):
+            user_id = params['user']
+        result = metric_analytics.downsample(
+            user_id, metric, points, method=method,
+            start=parse_date(params.get('start', '') or ''),
+            end=parse_date(params.get('end', '') or ''),
+        )
+        if result is None:
+            return Response({'message': 'No readings for this metric'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
+    
     @action(detail=False, methods=['get'])
     def latest(self, request):
         """Get latest health record for current user"""
@@ -72,7 +152,7 @@ class HealthRecordViewSet(viewsets.ModelViewSet):
         )
 
 
-class HealthMetricViewSet(viewsets.ModelViewSet):
+class HealthMetricViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for HealthMetric model
     """
@@ -90,7 +170,7 @@ class HealthMetricViewSet(viewsets.ModelViewSet):
     def my_metrics(self, request):
         """Get metrics for current user"""
         metrics = HealthMetric.objects.filter(health_records__user=request.user).distinct()
-        serializer = self.get_serializer(metrics, many=True)
+        serializer = self.get_serializer(self.eager_load(metrics), many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -102,32 +182,56 @@ class HealthMetricViewSet(viewsets.ModelViewSet):
         if metric_type:
             queryset = queryset.filter(metric_name__icontains=metric_type)
         
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(self.eager_load(queryset), many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def latest_by_type(self, request):
         """Get latest metric of each type for current user"""
-        from django.db.models import Max
-        
-        metric_names = HealthMetric.objects.filter(
-            health_records__user=request.user
-        ).values_list('metric_name', flat=True).distinct()
-        
-        latest_metrics = []
-        for name in metric_names:
-            metric = HealthMetric.objects.filter(
-                health_records__user=request.user,
-                metric_name=name
-            ).order_by('-recorded_at').first()
-            if metric:
-                latest_metrics.append(metric)
-        
-        serializer = self.get_serializer(latest_metrics, many=True)
-        return Response(serializer.data)
+        rows = latest_by_metric_name(request.user)
+        data = []
+        for row in rows:
+            item = self.get_serializer(row.health_metric).data
+            item['latest_value'] = row.value
+            item['latest_recorded_at'] = row.recorded_at
+            item['latest_health_record_id'] = row.health_record_id
+            data.append(item)
+        return Response(data)
+
+
+class HealthAnomalyViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Readings flagged as abnormal, newest first: the user's own (staff may pass
+    ?user=<id>), filtered by ?metric=<health_metric_id> and ?reason=
+    """
+    queryset = HealthAnomaly.objects.all()
+    serializer_class = HealthAnomalySerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetCursorPagination
+    cursor_ordering = ('-detected_at', '-id')
+    
+    def get_user_id(self):
+        if self.request.user.is_staff and self.request.query_params.get('user'):
+            return self.request.query_params['user']
+        return self.request.user.pk
+    
+    def get_queryset(self):
+        queryset = HealthAnomaly.objects.filter(user_id=self.get_user_id())
+        params = self.request.query_params
+        if params.get('metric'):
+            queryset = queryset.filter(health_metric_id=params['metric'])
+        if params.get('reason'):
+            queryset = queryset.filter(reason=params['reason'])
+        return queryset
+    
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Running statistics the readings are checked against"""
+        rows = HealthMetricStats.objects.filter(user_id=self.get_user_id()).select_related('health_metric')
+        return Response(HealthMetricStatsSerializer(rows, many=True).data)
 
 
-class StudentHealthRecordViewSet(viewsets.ModelViewSet):
+class StudentHealthRecordViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for StudentHealthRecord model
     """
@@ -142,7 +246,7 @@ class StudentHealthRecordViewSet(viewsets.ModelViewSet):
         return StudentHealthRecord.objects.filter(student__user=self.request.user)
 
 
-class TeacherHealthRecordViewSet(viewsets.ModelViewSet):
+class TeacherHealthRecordViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for TeacherHealthRecord model
     """
@@ -158,6 +262,49 @@ class TeacherHealthRecordViewSet(viewsets.ModelViewSet):
 
 
 # Web Interface Views
+def _parse_rdf_datetime(value):
+    """Dates from RDF (ISO format strings)"""
+    from datetime import datetime
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except:
+        try:
+            return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S')
+        except:
+            return None
+
+
+def _records_from_rdf(rdf_records):
+    """Convert RDF results to Django-like objects for template compatibility"""
+    records = []
+    for rdf_record in rdf_records:
+        record_obj = type('Record', (), {
+            'health_record_id': int(rdf_record.get('recordId', 0)),
+            'description': rdf_record.get('description', ''),
+            'value': float(rdf_record.get('value')) if rdf_record.get('value') else None,
+            'start_date': _parse_rdf_datetime(rdf_record.get('startDate', '')),
+            'end_date': _parse_rdf_datetime(rdf_record.get('endDate', '')),
+            'created_at': _parse_rdf_datetime(rdf_record.get('createdAt', '')),
+            'health_metric': type('Metric', (), {
+                'health_metric_id': int(rdf_record.get('metricId')) if rdf_record.get('metricId') else None,
+                'metric_name': rdf_record.get('metricName', ''),
+                'metric_unit': rdf_record.get('metricUnit', '')
+            })() if rdf_record.get('metricId') else None
+        })()
+        records.append(record_obj)
+    return records
+
+
+def _orm_fallback_context(user, error):
+    """Fallback to Django ORM if Fuseki fails"""
+    return {
+        'records': HealthRecord.objects.filter(user=user).select_related('health_metric').order_by('-created_at'),
+        'error': f'Fuseki connection failed, using Django ORM: {str(error)}'
+    }
+
+
 @login_required
 def health_record_list_view(request):
     """Display list of user's health records from Fuseki using SPARQL"""
@@ -165,80 +312,28 @@ def health_record_list_view(request):
     
     try:
         # Get records from Fuseki
-        rdf_records = rdf_service.get_health_records_by_user(request.user.id)
-        
-        # Convert RDF results to Django-like objects for template compatibility
-        from datetime import datetime
-        records = []
-        for rdf_record in rdf_records:
-            # Parse dates from RDF (ISO format strings)
-            start_date_str = rdf_record.get('startDate', '')
-            end_date_str = rdf_record.get('endDate', '')
-            created_at_str = rdf_record.get('createdAt', '')
-            
-            start_date = None
-            end_date = None
-            created_at = None
-            
-            if start_date_str:
-                try:
-                    start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
-                except:
-                    try:
-                        start_date = datetime.strptime(start_date_str, '%Y-%m-%dT%H:%M:%S')
-                    except:
-                        pass
-            
-            if end_date_str:
-                try:
-                    end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
-                except:
-                    try:
-                        end_date = datetime.strptime(end_date_str, '%Y-%m-%dT%H:%M:%S')
-                    except:
-                        pass
-            
-            if created_at_str:
-                try:
-                    created_at = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
-                except:
-                    try:
-                        created_at = datetime.strptime(created_at_str, '%Y-%m-%dT%H:%M:%S')
-                    except:
-                        pass
-            
-            record_obj = type('Record', (), {
-                'health_record_id': int(rdf_record.get('recordId', 0)),
-                'description': rdf_record.get('description', ''),
-                'value': float(rdf_record.get('value')) if rdf_record.get('value') else None,
-                'start_date': start_date,
-                'end_date': end_date,
-                'created_at': created_at,
-                'health_metric': type('Metric', (), {
-                    'health_metric_id': int(rdf_record.get('metricId')) if rdf_record.get('metricId') else None,
-                    'metric_name': rdf_record.get('metricName', ''),
-                    'metric_unit': rdf_record.get('metricUnit', '')
-                })() if rdf_record.get('metricId') else None
-            })()
-            records.append(record_obj)
-        
-        # Get metrics from Django (for dropdown) - can also be from Fuseki
-        metrics = HealthMetric.objects.all().order_by('metric_name')
-        
-        return render(request, 'health_records/record_list.html', {
-            'records': records,
-            'metrics': metrics
-        })
+        context = {'records': _records_from_rdf(rdf_service.get_health_records_by_user(request.user.id))}
     except Exception as e:
-        import traceback
-        # Fallback to Django ORM if Fuseki fails
-        records = HealthRecord.objects.filter(user=request.user).select_related('health_metric').order_by('-created_at')
-        metrics = HealthMetric.objects.all().order_by('metric_name')
-        return render(request, 'health_records/record_list.html', {
-            'records': records,
-            'metrics': metrics,
-            'error': f'Fuseki connection failed, using Django ORM: {str(e)}'
-        })
+        context = _orm_fallback_context(request.user, e)
+    
+    # Get metrics from Django (for dropdown) - can also be from Fuseki
+    context['metrics'] = catalogues.get('health_metrics')
+    return render(request, 'health_records/record_list.html', context)
+
+
+@async_login_required
+async def health_record_list_async_view(request):
+    """health_record_list_view for ASGI: the Fuseki query is awaited on the shared HTTP client"""
+    rdf_service = HealthRecordRDFService()
+    
+    try:
+        rdf_records = await rdf_service.aget_health_records_by_user(request.user.id)
+        context = {'records': _records_from_rdf(rdf_records)}
+    except Exception as e:
+        context = _orm_fallback_context(request.user, e)
+    
+    context['metrics'] = await sync_to_async(catalogues.get)('health_metrics')
+    return await arender(request, 'health_records/record_list.html', context)
 
 
 @login_required
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import (
-    Meal, FoodItem, Calories, Protein, Carbs, Fiber, Sugar,
+    Meal, FoodItem,
     Breakfast, Lunch, Dinner, Snack
 )
 
@@ -10,31 +10,6 @@ class FoodItemInline(admin.TabularInline):
     extra = 1
 
 
-class CaloriesInline(admin.StackedInline):
-    model = Calories
-    extra = 0
-
-
-class ProteinInline(admin.StackedInline):
-    model = Protein
-    extra = 0
-
-
-class CarbsInline(admin.StackedInline):
-    model = Carbs
-    extra = 0
-
-
-class FiberInline(admin.StackedInline):
-    model = Fiber
-    extra = 0
-
-
-class SugarInline(admin.StackedInline):
-    model = Sugar
-    extra = 0
-
-
 @admin.register(Meal)
 class MealAdmin(admin.ModelAdmin):
     list_display = ('meal_id', 'user', 'meal_name', 'meal_type', 'total_calories', 'meal_date')
@@ -46,10 +21,9 @@ class MealAdmin(admin.ModelAdmin):
 
 @admin.register(FoodItem)
 class FoodItemAdmin(admin.ModelAdmin):
-    list_display = ('food_item_id', 'meal', 'food_item_name', 'food_type')
+    list_display = ('food_item_id', 'meal', 'food_item_name', 'food_type', 'calories_value', 'protein_value', 'carbs_value')
     search_fields = ('food_item_name', 'meal__meal_name')
     list_filter = ('food_type',)
-    inlines = [CaloriesInline, ProteinInline, CarbsInline, FiberInline, SugarInline]
 
 
 @admin.register(Breakfast)
@@ -25,17 +25,10 @@ class Command(BaseCommand):
         
         # Synchroniser les FoodItems
         self.stdout.write('\n[FOODITEMS] Synchronisation des FoodItems...')
-        fooditems = FoodItem.objects.all().prefetch_related('calories', 'protein', 'carbs', 'fiber', 'sugar')
+        fooditems = FoodItem.objects.all()
         
         for item in fooditems:
             try:
-                # Récupérer les valeurs nutritionnelles
-                calories = getattr(item.calories, 'calories_value', None) if hasattr(item, 'calories') else None
-                protein = getattr(item.protein, 'protein_value', None) if hasattr(item, 'protein') else None
-                carbs = getattr(item.carbs, 'carbs_value', None) if hasattr(item, 'carbs') else None
-                fiber = getattr(item.fiber, 'fiber_value', None) if hasattr(item, 'fiber') else None
-                sugar = getattr(item.sugar, 'sugar_value', None) if hasattr(item, 'sugar') else None
-                
                 # Vérifier si existe déjà en RDF
                 existing = rdf_manager.get_fooditem(item.food_item_id)
                 
@@ -50,11 +43,7 @@ class Command(BaseCommand):
                         name=item.food_item_name,
                         description=item.food_item_description,
                         food_type=item.food_type,
-                        calories=calories,
-                        protein=protein,
-                        carbs=carbs,
-                        fiber=fiber,
-                        sugar=sugar
+                        **item.nutrients
                     )
                     self.stdout.write(self.style.SUCCESS(f'  [OK] FoodItem synchronise : {item.food_item_name}'))
             except Exception as e:
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meals', '0002_alter_fooditem_meal'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['user', '-meal_date', '-meal_id'], name='meal_user_date_idx'),
+        ),
+    ]
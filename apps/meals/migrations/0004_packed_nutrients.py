@@ -0,0 +1,85 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+NUTRIENT_MODELS = (
+    ('Calories', 'calories_value'),
+    ('Protein', 'protein_value'),
+    ('Carbs', 'carbs_value'),
+    ('Fiber', 'fiber_value'),
+    ('Sugar', 'sugar_value'),
+)
+
+
+def copy_nutrients_to_columns(apps, schema_editor):
+    """One UPDATE per nutrient: FoodItem.<name>_value from the one-to-one table"""
+    FoodItem = apps.get_model('meals', 'FoodItem')
+    for model_name, field in NUTRIENT_MODELS:
+        model = apps.get_model('meals', model_name)
+        value = model.objects.filter(food_item=OuterRef('pk')).values(field)[:1]
+        FoodItem.objects.update(**{field: Subquery(value)})
+
+
+def copy_columns_to_nutrients(apps, schema_editor):
+    """Recreate the one-to-one nutrient rows from the columns"""
+    FoodItem = apps.get_model('meals', 'FoodItem')
+    for model_name, field in NUTRIENT_MODELS:
+        model = apps.get_model('meals', model_name)
+        rows = FoodItem.objects.filter(**{f'{field}__isnull': False}).values_list('pk', field)
+        batch = []
+        for food_item_id, value in rows.iterator(chunk_size=5000):
+            batch.append(model(food_item_id=food_item_id, **{field: value}))
+            if len(batch) >= 5000:
+                model.objects.bulk_create(batch)
+                batch = []
+        model.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meals', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fooditem',
+            name='calories_value',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='protein_value',
+            field=models.IntegerField(blank=True, help_text='grams', null=True),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='carbs_value',
+            field=models.IntegerField(blank=True, help_text='grams', null=True),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='fiber_value',
+            field=models.IntegerField(blank=True, help_text='grams', null=True),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='sugar_value',
+            field=models.IntegerField(blank=True, help_text='grams', null=True),
+        ),
+        migrations.RunPython(copy_nutrients_to_columns, copy_columns_to_nutrients),
+        migrations.DeleteModel(
+            name='Calories',
+        ),
+        migrations.DeleteModel(
+            name='Protein',
+        ),
+        migrations.DeleteModel(
+            name='Carbs',
+        ),
+        migrations.DeleteModel(
+            name='Fiber',
+        ),
+        migrations.DeleteModel(
+            name='Sugar',
+        ),
+    ]
@@ -21,6 +21,9 @@ class Meal(models.Model):
     
     class Meta:
         db_table = 'meals'
+        indexes = [
+            models.Index(fields=['user', '-meal_date', '-meal_id'], name='meal_user_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.meal_name} ({self.meal_type})"
@@ -41,74 +44,61 @@ class FoodItem(models.Model):
     food_item_name = models.CharField(max_length=200)
     food_item_description = models.TextField()
     food_type = models.CharField(max_length=20, choices=FOOD_TYPE_CHOICES)
+    # Nutrients, formerly one-to-one rows in the calories/protein/carbs/fiber/sugar tables
+    calories_value = models.IntegerField(null=True, blank=True)
+    protein_value = models.IntegerField(null=True, blank=True, help_text="grams")
+    carbs_value = models.IntegerField(null=True, blank=True, help_text="grams")
+    fiber_value = models.IntegerField(null=True, blank=True, help_text="grams")
+    sugar_value = models.IntegerField(null=True, blank=True, help_text="grams")
+    
+    NUTRIENTS = ('calories', 'protein', 'carbs', 'fiber', 'sugar')
     
     class Meta:
         db_table = 'food_items'
     
     def __str__(self):
         return self.food_item_name
-
-
-class Calories(models.Model):
-    """Calories nutrition info"""
-    food_item = models.OneToOneField(FoodItem, on_delete=models.CASCADE, related_name='calories')
-    calories_value = models.IntegerField()
-    
-    class Meta:
-        db_table = 'calories'
-        verbose_name_plural = 'Calories'
-    
-    def __str__(self):
-        return f"{self.food_item.food_item_name}: {self.calories_value} cal"
-
-
-class Protein(models.Model):
-    """Protein nutrition info"""
-    food_item = models.OneToOneField(FoodItem, on_delete=models.CASCADE, related_name='protein')
-    protein_value = models.IntegerField(help_text="grams")
-    
-    class Meta:
-        db_table = 'protein'
-    
-    def __str__(self):
-        return f"{self.food_item.food_item_name}: {self.protein_value}g protein"
-
-
-class Carbs(models.Model):
-    """Carbohydrates nutrition info"""
-    food_item = models.OneToOneField(FoodItem, on_delete=models.CASCADE, related_name='carbs')
-    carbs_value = models.IntegerField(help_text="grams")
-    
-    class Meta:
-        db_table = 'carbs'
-        verbose_name_plural = 'Carbs'
-    
-    def __str__(self):
-        return f"{self.food_item.food_item_name}: {self.carbs_value}g carbs"
-
-
-class Fiber(models.Model):
-    """Fiber nutrition info"""
-    food_item = models.OneToOneField(FoodItem, on_delete=models.CASCADE, related_name='fiber')
-    fiber_value = models.IntegerField(help_text="grams")
     
-    class Meta:
-        db_table = 'fiber'
-    
-    def __str__(self):
-        return f"{self.food_item.food_item_name}: {self.fiber_value}g fiber"
-
-
-class Sugar(models.Model):
-    """Sugar nutrition info"""
-    food_item = models.OneToOneField(FoodItem, on_delete=models.CASCADE, related_name='sugar')
-    sugar_value = models.IntegerField(help_text="grams")
-    
-    class Meta:
-        db_table = 'sugar'
+    @property
+    def nutrients(self):
+        """{'calories': ..., 'protein': ...} with None for unknown values"""
+        return {name: getattr(self, f'{name}_value') for name in self.NUTRIENTS}
+    
+    def set_nutrients(self, **values):
+        """Assign nutrient values by name (calories=..., protein=...)"""
+        for name, value in values.items():
+            if name not in self.NUTRIENTS:
+                raise ValueError(f"Unknown nutrient: {name}")
+            setattr(self, f'{name}_value', value)
+    
+    # Accessors keeping the shape of the former one-to-one relations:
+    # item.calories.calories_value, or None when the value is unknown
+    calories = property(lambda self: Nutrient.of(self, 'calories'))
+    protein = property(lambda self: Nutrient.of(self, 'protein'))
+    carbs = property(lambda self: Nutrient.of(self, 'carbs'))
+    fiber = property(lambda self: Nutrient.of(self, 'fiber'))
+    sugar = property(lambda self: Nutrient.of(self, 'sugar'))
+
+
+class Nutrient:
+    """Read-only view of one nutrient column of a FoodItem"""
+    UNITS = {'calories': 'cal', 'protein': 'g protein', 'carbs': 'g carbs', 'fiber': 'g fiber', 'sugar': 'g sugar'}
+    
+    def __init__(self, food_item, name, value):
+        self.food_item = food_item
+        self.food_item_id = food_item.food_item_id
+        self.name = name
+        self.value = value
+        setattr(self, f'{name}_value', value)
+    
+    @classmethod
+    def of(cls, food_item, name):
+        value = getattr(food_item, f'{name}_value')
+        return None if value is None else cls(food_item, name, value)
     
     def __str__(self):
-        return f"{self.food_item.food_item_name}: {self.sugar_value}g sugar"
+        separator = ' ' if self.name == 'calories' else ''
+        return f"{self.food_item.food_item_name}: {self.value}{separator}{self.UNITS[self.name]}"
 
 
 class Breakfast(models.Model):
@@ -0,0 +1,124 @@
+"""
+Nutrient matrix of the FoodItem catalogue
+All nutrient columns are loaded once into a NumPy array (one row per FoodItem,
+one column per nutrient, NaN for unknown values) so that catalogue-wide
+nutrient aggregates are array operations instead of per-item attribute reads.
+
+The matrix is cached per process and tagged with the version of the
+'food_items' catalogue (apps.core.catalogues): FoodItem save/delete (and bulk
+loads, via invalidate()) bump it, and every process reloads its copy on the
+next access.
+
+Meal totals only read a handful of rows that may have just been written, so
+totals() and meal_totals() are SUM aggregates in the database rather than
+matrix lookups: they never wait for a reload.
+"""
+
+import threading
+
+import numpy as np
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from apps.core import catalogues
+
+from .models import FoodItem
+
+NUTRIENTS = FoodItem.NUTRIENTS
+
+_lock = threading.Lock()
+_cached = {'version': None, 'matrix': None}
+
+
+class NutrientMatrix:
+    """Sorted FoodItem ids and the matching (n_items, n_nutrients) float array"""
+
+    def __init__(self, ids, values):
+        self.ids = ids
+        self.values = values
+
+    @classmethod
+    def load(cls):
+        columns = ['food_item_id'] + [f'{name}_value' for name in NUTRIENTS]
+        rows = FoodItem.objects.order_by('food_item_id').values_list(*columns)
+        data = np.array(
+            [[np.nan if v is None else v for v in row] for row in rows.iterator(chunk_size=5000)],
+            dtype=np.float64,
+        ).reshape(-1, len(columns))
+        return cls(data[:, 0].astype(np.int64), np.ascontiguousarray(data[:, 1:]))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self, food_item_ids):
+        """Row positions of the given ids (repeats kept) and a mask of the ids found"""
+        wanted = np.asarray(list(food_item_ids), dtype=np.int64)
+        positions = np.searchsorted(self.ids, wanted)
+        found = positions < len(self.ids)
+        found[found] = self.ids[positions[found]] == wanted[found]
+        return positions, found
+
+    def rows(self, food_item_ids):
+        positions, found = self.positions(food_item_ids)
+        return self.values[positions[found]]
+
+    def summary(self, food_item_ids=None):
+        """Count of known values, mean, min and max of each nutrient"""
+        values = self.values if food_item_ids is None else self.rows(food_item_ids)
+        known = ~np.isnan(values)
+        counts = known.sum(axis=0)
+        result = {}
+        for i, name in enumerate(NUTRIENTS):
+            column = values[known[:, i], i]
+            result[name] = {
+                'count': int(counts[i]),
+                'mean': float(column.mean()) if counts[i] else None,
+                'min': _number(column.min()) if counts[i] else None,
+                'max': _number(column.max()) if counts[i] else None,
+            }
+        return result
+
+
+def _number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def invalidate():
+    """Mark every process' matrix (and FoodItem catalogue) stale, e.g. after bulk loads"""
+    catalogues.invalidate('food_items')
+    _cached['version'] = None
+
+
+def get_matrix():
+    """Current catalogue matrix, reloaded when its version changed"""
+    version = catalogues.version('food_items')
+    matrix = _cached['matrix']
+    if matrix is not None and _cached['version'] == version:
+        return matrix
+    with _lock:
+        if _cached['matrix'] is None or _cached['version'] != version:
+            _cached['matrix'] = NutrientMatrix.load()
+            _cached['version'] = version
+        return _cached['matrix']
+
+
+def _sums():
+    return {name: Coalesce(Sum(f'{name}_value'), 0) for name in NUTRIENTS}
+
+
+def totals(food_item_ids):
+    """{nutrient: sum} over a set of FoodItem ids; unknown ids are ignored"""
+    food_item_ids = {int(pk) for pk in food_item_ids}
+    return FoodItem.objects.filter(food_item_id__in=food_item_ids).aggregate(**_sums())
+
+
+def meal_totals(meal_ids):
+    """{meal_id: {nutrient: sum}} of the food items currently attached to each meal"""
+    rows = (
+        FoodItem.objects.filter(meal_id__in=meal_ids)
+        .order_by()
+        .values('meal_id')
+        .annotate(**_sums())
+    )
+    return {row.pop('meal_id'): row for row in rows}
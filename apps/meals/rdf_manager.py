@@ -8,6 +8,7 @@ from pathlib import Path
 import os
 from datetime import datetime
 from django.conf import settings
+from apps.core.instrumentation import timed
 
 
 # Définir les namespaces
@@ -29,6 +30,7 @@ class RDFManager:
         # Charger l'ontologie existante
         self.load_ontology()
     
+    @timed('rdf')
     def load_ontology(self):
         """Charge l'ontologie depuis le fichier TTL"""
         try:
@@ -40,6 +42,7 @@ class RDFManager:
         except Exception as e:
             print(f"[ERROR] Erreur lors du chargement de l'ontologie : {e}")
     
+    @timed('rdf_save')
     def save_ontology(self):
         """Sauvegarde l'ontologie dans le fichier TTL"""
         try:
@@ -50,6 +53,7 @@ class RDFManager:
     
     # ==================== MEAL OPERATIONS ====================
     
+    @timed('rdf')
     def create_meal(self, meal_id, meal_name, meal_type, total_calories, meal_date, user_id):
         """
         Crée un repas dans l'ontologie RDF
@@ -101,6 +105,7 @@ class RDFManager:
         print(f"[OK] Meal cree en RDF : {meal_name} (ID: {meal_id})")
         return meal_uri
     
+    @timed('rdf')
     def get_meal(self, meal_id):
         """Récupère un repas depuis l'ontologie"""
         meal_uri = SMARTHEALTH[f"Meal_{meal_id}"]
@@ -130,6 +135,7 @@ class RDFManager:
             }
         return None
     
+    @timed('rdf')
     def get_all_meals(self, user_id=None):
         """Récupère tous les repas (optionnellement filtrés par utilisateur)"""
         if user_id:
@@ -176,6 +182,7 @@ class RDFManager:
         
         return meals
     
+    @timed('rdf')
     def update_meal(self, meal_id, meal_name=None, total_calories=None, meal_date=None):
         """Met à jour un repas dans l'ontologie"""
         meal_uri = SMARTHEALTH[f"Meal_{meal_id}"]
@@ -200,6 +207,7 @@ class RDFManager:
         self.save_ontology()
         print(f"[OK] Meal mis a jour en RDF : ID {meal_id}")
     
+    @timed('rdf')
     def delete_meal(self, meal_id):
         """Supprime un repas de l'ontologie"""
         meal_uri = SMARTHEALTH[f"Meal_{meal_id}"]
@@ -211,6 +219,7 @@ class RDFManager:
         self.save_ontology()
         print(f"[OK] Meal supprime de RDF : ID {meal_id}")
     
+    @timed('rdf')
     def link_fooditem_to_meal(self, meal_id, fooditem_id):
         """Lie un FoodItem à un Meal"""
         meal_uri = SMARTHEALTH[f"Meal_{meal_id}"]
@@ -219,6 +228,7 @@ class RDFManager:
         self.graph.add((meal_uri, SMARTHEALTH.hasFoodItem, fooditem_uri))
         self.save_ontology()
     
+    @timed('rdf')
     def unlink_fooditem_from_meal(self, meal_id, fooditem_id):
         """Délie un FoodItem d'un Meal"""
         meal_uri = SMARTHEALTH[f"Meal_{meal_id}"]
@@ -229,6 +239,7 @@ class RDFManager:
     
     # ==================== FOODITEM OPERATIONS ====================
     
+    @timed('rdf')
     def create_fooditem(self, fooditem_id, name, description, food_type, 
                        calories=None, protein=None, carbs=None, fiber=None, sugar=None):
         """
@@ -285,6 +296,7 @@ class RDFManager:
         print(f"[OK] FoodItem cree en RDF : {name} (ID: {fooditem_id})")
         return fooditem_uri
     
+    @timed('rdf')
     def get_fooditem(self, fooditem_id):
         """Récupère un FoodItem depuis l'ontologie"""
         fooditem_uri = SMARTHEALTH[f"FoodItem_{fooditem_id}"]
@@ -337,6 +349,7 @@ class RDFManager:
             }
         return None
     
+    @timed('rdf')
     def get_all_fooditems(self):
         """Récupère tous les FoodItems"""
         query = """
@@ -367,6 +380,7 @@ class RDFManager:
         
         return fooditems
     
+    @timed('rdf')
     def update_fooditem(self, fooditem_id, name=None, description=None, food_type=None,
                        calories=None, protein=None, carbs=None, fiber=None, sugar=None):
         """Met à jour un FoodItem"""
@@ -414,6 +428,7 @@ class RDFManager:
         self.save_ontology()
         print(f"[OK] FoodItem mis a jour en RDF : ID {fooditem_id}")
     
+    @timed('rdf')
     def delete_fooditem(self, fooditem_id):
         """Supprime un FoodItem"""
         fooditem_uri = SMARTHEALTH[f"FoodItem_{fooditem_id}"]
@@ -435,6 +450,7 @@ class RDFManager:
     
     # ==================== UTILITY METHODS ====================
     
+    @timed('rdf')
     def get_next_meal_id(self):
         """Obtient le prochain ID disponible pour un Meal"""
         query = """
@@ -450,6 +466,7 @@ class RDFManager:
             return int(results[0].maxId) + 1
         return 1
     
+    @timed('rdf')
     def get_next_fooditem_id(self):
         """Obtient le prochain ID disponible pour un FoodItem"""
         query = """
@@ -465,10 +482,12 @@ class RDFManager:
             return int(results[0].maxId) + 1
         return 1
     
+    @timed('rdf')
     def execute_sparql(self, query):
         """Execute une requête SPARQL personnalisée"""
         return self.graph.query(query)
     
+    @timed('rdf')
     def get_stats(self):
         """Retourne des statistiques sur l'ontologie"""
         return {
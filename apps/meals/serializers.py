@@ -1,46 +1,23 @@
 from rest_framework import serializers
 from .models import (
-    Meal, FoodItem, Calories, Protein, Carbs, Fiber, Sugar,
+    Meal, FoodItem,
     Breakfast, Lunch, Dinner, Snack
 )
 
 
-class CaloriesSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Calories
-        fields = '__all__'
-
-
-class ProteinSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Protein
-        fields = '__all__'
-
-
-class CarbsSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Carbs
-        fields = '__all__'
-
-
-class FiberSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Fiber
-        fields = '__all__'
-
-
-class SugarSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Sugar
-        fields = '__all__'
+class NutrientField(serializers.ReadOnlyField):
+    """Nested shape of the former one-to-one nutrient rows: {'food_item': id, 'calories_value': ...}"""
+    
+    def to_representation(self, nutrient):
+        return {'food_item': nutrient.food_item_id, f'{nutrient.name}_value': nutrient.value}
 
 
 class FoodItemSerializer(serializers.ModelSerializer):
-    calories = CaloriesSerializer(read_only=True)
-    protein = ProteinSerializer(read_only=True)
-    carbs = CarbsSerializer(read_only=True)
-    fiber = FiberSerializer(read_only=True)
-    sugar = SugarSerializer(read_only=True)
+    calories = NutrientField()
+    protein = NutrientField()
+    carbs = NutrientField()
+    fiber = NutrientField()
+    sugar = NutrientField()
     
     class Meta:
         model = FoodItem
@@ -7,15 +7,18 @@ from django.dispatch import receiver
 from .models import Meal, FoodItem
 from apps.sparql_service.client import SparqlClient
 import logging
+from apps.core import catalogues, typeahead
+from apps.core.metrics import instrument_sync
 
 logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=Meal)
+@instrument_sync('Meal', 'save')
 def sync_meal_to_fuseki(sender, instance, created, **kwargs):
     """Automatically sync Meal to Fuseki when created/updated"""
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         # Determine meal type class
         meal_type_map = {
@@ -43,7 +46,7 @@ def sync_meal_to_fuseki(sender, instance, created, **kwargs):
                 sh:User_{instance.user.user_id} sh:hasMeal sh:Meal_{instance.meal_id} .
             }}
             """
-            success = client.execute_update(sparql_insert)
+            success = client.execute_update(sparql_insert, infer=False)
             if success:
                 logger.info(f"Meal {instance.meal_id} synced to Fuseki (created)")
             else:
@@ -69,7 +72,7 @@ def sync_meal_to_fuseki(sender, instance, created, **kwargs):
                 OPTIONAL {{ sh:Meal_{instance.meal_id} sh:meal_date ?oldDate }}
             }}
             """
-            success = client.execute_update(sparql_update)
+            success = client.execute_update(sparql_update, infer=False)
             if success:
                 logger.info(f"Meal {instance.meal_id} synced to Fuseki (updated)")
             else:
@@ -80,10 +83,11 @@ def sync_meal_to_fuseki(sender, instance, created, **kwargs):
 
 
 @receiver(post_delete, sender=Meal)
+@instrument_sync('Meal', 'delete')
 def delete_meal_from_fuseki(sender, instance, **kwargs):
     """Automatically delete Meal from Fuseki when deleted from Django"""
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         sparql_delete = f"""
         PREFIX sh: <http://dhia.org/ontologies/smarthealth#>
@@ -102,8 +106,8 @@ def delete_meal_from_fuseki(sender, instance, **kwargs):
         }}
         """
         
-        success1 = client.execute_update(sparql_delete)
-        success2 = client.execute_update(sparql_delete_refs)
+        success1 = client.execute_update(sparql_delete, infer=False)
+        success2 = client.execute_update(sparql_delete_refs, infer=False)
         
         if success1 and success2:
             logger.info(f"Meal {instance.meal_id} deleted from Fuseki")
@@ -115,10 +119,11 @@ def delete_meal_from_fuseki(sender, instance, **kwargs):
 
 
 @receiver(post_save, sender=FoodItem)
+@instrument_sync('FoodItem', 'save')
 def sync_fooditem_to_fuseki(sender, instance, created, **kwargs):
     """Automatically sync FoodItem to Fuseki when created/updated"""
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         if created:
             # INSERT new food item in Fuseki
@@ -141,7 +146,7 @@ def sync_fooditem_to_fuseki(sender, instance, created, **kwargs):
             
             sparql_insert += "}"
             
-            success = client.execute_update(sparql_insert)
+            success = client.execute_update(sparql_insert, infer=False)
             if success:
                 logger.info(f"FoodItem {instance.food_item_id} synced to Fuseki (created)")
             else:
@@ -167,7 +172,7 @@ def sync_fooditem_to_fuseki(sender, instance, created, **kwargs):
                 OPTIONAL {{ sh:FoodItem_{instance.food_item_id} sh:food_type ?oldType }}
             }}
             """
-            success = client.execute_update(sparql_update)
+            success = client.execute_update(sparql_update, infer=False)
             if success:
                 logger.info(f"FoodItem {instance.food_item_id} synced to Fuseki (updated)")
             else:
@@ -178,10 +183,11 @@ def sync_fooditem_to_fuseki(sender, instance, created, **kwargs):
 
 
 @receiver(post_delete, sender=FoodItem)
+@instrument_sync('FoodItem', 'delete')
 def delete_fooditem_from_fuseki(sender, instance, **kwargs):
     """Automatically delete FoodItem from Fuseki when deleted from Django"""
     try:
-        client = SparqlClient()
+        client = SparqlClient(queue_writes=True)
         
         sparql_delete = f"""
         PREFIX sh: <http://dhia.org/ontologies/smarthealth#>
@@ -200,8 +206,8 @@ def delete_fooditem_from_fuseki(sender, instance, **kwargs):
         }}
         """
         
-        success1 = client.execute_update(sparql_delete)
-        success2 = client.execute_update(sparql_delete_refs)
+        success1 = client.execute_update(sparql_delete, infer=False)
+        success2 = client.execute_update(sparql_delete_refs, infer=False)
         
         if success1 and success2:
             logger.info(f"FoodItem {instance.food_item_id} deleted from Fuseki")
@@ -210,3 +216,11 @@ def delete_fooditem_from_fuseki(sender, instance, **kwargs):
     except Exception as e:
         logger.error(f"Failed to delete FoodItem {instance.food_item_id} from Fuseki: {str(e)}")
         # Don't raise - allow Django operation to continue
+
+
+# Food item catalogue of the meal forms (also versions the nutrient matrix)
+catalogues.register('food_items', lambda: FoodItem.objects.order_by('food_item_id'), [FoodItem])
+typeahead.register(
+    'food_items', lambda: FoodItem.objects.all(), 'food_item_name', owner='meal__user_id',
+    fields=('food_type', 'calories_value', 'protein_value', 'carbs_value'),
+)
@@ -0,0 +1,63 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from apps.users.models import User
+from . import nutrient_matrix
+from .models import Meal, FoodItem
+from .serializers import FoodItemSerializer
+
+
+class NutrientTest(TestCase):
+    """Test cases for the packed nutrient columns and the nutrient matrix"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='eater', email='eater@example.com', password='pw12345!')
+        self.meal = Meal.objects.create(
+            user=self.user, meal_name='Dejeuner', meal_type='LUNCH', total_calories=0, meal_date=timezone.now()
+        )
+        self.apple = FoodItem.objects.create(
+            food_item_name='Pomme', food_item_description='Fruit', food_type='FRUITS',
+            meal=self.meal, calories_value=95, sugar_value=19,
+        )
+        self.rice = FoodItem.objects.create(
+            food_item_name='Riz', food_item_description='Cereale', food_type='CARBS',
+            meal=self.meal, calories_value=200, carbs_value=45, sugar_value=1,
+        )
+        # The matrix is cached across tests whose writes were rolled back
+        nutrient_matrix.invalidate()
+
+    def test_compatibility_accessors(self):
+        """Test item.<nutrient>.<nutrient>_value and the nested API shape still work"""
+        self.assertEqual(self.apple.calories.calories_value, 95)
+        self.assertIsNone(self.apple.protein)
+        data = FoodItemSerializer(self.apple).data
+        self.assertEqual(data['calories'], {'food_item': self.apple.pk, 'calories_value': 95})
+        self.assertIsNone(data['carbs'])
+
+    def test_totals_follow_updates(self):
+        """Test meal totals see committed changes and ignore unknown ids"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rice.calories_value = 250
+            self.rice.save()
+        totals = nutrient_matrix.meal_totals([self.meal.meal_id])[self.meal.meal_id]
+        self.assertEqual(totals, {'calories': 345, 'protein': 0, 'carbs': 45, 'fiber': 0, 'sugar': 20})
+        self.assertEqual(nutrient_matrix.totals([self.apple.pk, self.apple.pk, 999999])['calories'], 95)
+
+    def test_meal_nutrients_endpoint(self):
+        """Test the meal nutrients action returns the meal totals"""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('meals:meal-api-nutrients', args=[self.meal.meal_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['totals']['calories'], 295)
+
+    def test_meal_form_lists_only_the_picked_food_items(self):
+        """Test the meal form renders the meal's food items, the others are left to the search"""
+        FoodItem.objects.create(food_item_name='Banane', food_item_description='Fruit', food_type='FRUITS')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('meals:meal-edit', args=[self.meal.meal_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(item.food_item_name for item in response.context['food_items']), ['Pomme', 'Riz']
+        )
+        self.assertNotContains(response, 'Banane')
+        self.assertContains(response, reverse('meals:fooditem-api-search'))
@@ -1,9 +1,14 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from apps.core.async_views import arender, async_login_required
+from apps.core.eager_loading import EagerLoadingMixin, eager_load
+from apps.core.pagination import KeysetCursorPagination, keyset_paginate
+from apps.core.typeahead import TypeaheadMixin
 from django.db import models
 from .models import Meal, FoodItem, Breakfast, Lunch, Dinner, Snack
 from .serializers import (
@@ -11,15 +16,18 @@ from .serializers import (
     BreakfastSerializer, LunchSerializer, DinnerSerializer, SnackSerializer
 )
 from .rdf_manager import rdf_manager
+from . import nutrient_matrix
 
 
-class MealViewSet(viewsets.ModelViewSet):
+class MealViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Meal model
     """
     queryset = Meal.objects.all()
     serializer_class = MealSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetCursorPagination
+    cursor_ordering = ('-meal_date', '-meal_id')
     
     def get_queryset(self):
         """Filter meals by user if not staff"""
@@ -80,7 +88,7 @@ class MealViewSet(viewsets.ModelViewSet):
     def my_meals(self, request):
         """Get meals for current user"""
         meals = Meal.objects.filter(user=request.user)
-        serializer = self.get_serializer(meals, many=True)
+        serializer = self.get_serializer(self.eager_load(meals), many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -92,7 +100,7 @@ class MealViewSet(viewsets.ModelViewSet):
         else:
             meals = Meal.objects.filter(user=request.user)
         
-        serializer = self.get_serializer(meals, many=True)
+        serializer = self.get_serializer(self.eager_load(meals), many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -104,7 +112,7 @@ class MealViewSet(viewsets.ModelViewSet):
             user=request.user,
             meal_date__date=today
         )
-        serializer = self.get_serializer(meals, many=True)
+        serializer = self.get_serializer(self.eager_load(meals), many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
@@ -112,23 +120,45 @@ class MealViewSet(viewsets.ModelViewSet):
         """Get all food items for a specific meal"""
         meal = self.get_object()
         food_items = meal.food_items.all()
-        serializer = FoodItemSerializer(food_items, many=True)
+        serializer = FoodItemSerializer(eager_load(food_items, FoodItemSerializer), many=True)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def nutrients(self, request, pk=None):
+        """Nutrient totals of a meal"""
+        meal = self.get_object()
+        totals = nutrient_matrix.meal_totals([meal.meal_id]).get(meal.meal_id)
+        return Response({
+            'meal_id': meal.meal_id,
+            'totals': totals or dict.fromkeys(FoodItem.NUTRIENTS, 0),
+        })
+    
+    @action(detail=False, methods=['get'])
+    def nutrient_totals(self, request):
+        """Nutrient totals of the current user's meals (?ids=1,2,3 to restrict), one entry per meal"""
+        meals = Meal.objects.filter(user=request.user)
+        ids = [pk for pk in request.query_params.get('ids', '').split(',') if pk.strip().isdigit()]
+        if ids:
+            meals = meals.filter(meal_id__in=ids)
+        totals = nutrient_matrix.meal_totals(meals.values('meal_id'))
+        return Response([{'meal_id': meal_id, 'totals': values} for meal_id, values in sorted(totals.items())])
 
 
-class FoodItemViewSet(viewsets.ModelViewSet):
+class FoodItemViewSet(TypeaheadMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for FoodItem model
     """
     queryset = FoodItem.objects.all()
     serializer_class = FoodItemSerializer
+    typeahead_index = 'food_items'
+    typeahead_owner_scoped = True
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        """Filter food items by user's meals if not staff"""
+        """Filter food items by user's meals (and the catalogue items of no meal) if not staff"""
         if self.request.user.is_staff:
             return FoodItem.objects.all()
-        return FoodItem.objects.filter(meal__user=self.request.user)
+        return FoodItem.objects.filter(models.Q(meal__user=self.request.user) | models.Q(meal__isnull=True))
     
     def perform_create(self, serializer):
         """Create food item and sync with RDF"""
@@ -136,23 +166,12 @@ class FoodItemViewSet(viewsets.ModelViewSet):
         
         # Synchroniser avec RDF
         try:
-            # Récupérer les valeurs nutritionnelles
-            calories = getattr(fooditem.calories, 'calories_value', None) if hasattr(fooditem, 'calories') else None
-            protein = getattr(fooditem.protein, 'protein_value', None) if hasattr(fooditem, 'protein') else None
-            carbs = getattr(fooditem.carbs, 'carbs_value', None) if hasattr(fooditem, 'carbs') else None
-            fiber = getattr(fooditem.fiber, 'fiber_value', None) if hasattr(fooditem, 'fiber') else None
-            sugar = getattr(fooditem.sugar, 'sugar_value', None) if hasattr(fooditem, 'sugar') else None
-            
             rdf_manager.create_fooditem(
                 fooditem_id=fooditem.food_item_id,
                 name=fooditem.food_item_name,
                 description=fooditem.food_item_description,
                 food_type=fooditem.food_type,
-                calories=calories,
-                protein=protein,
-                carbs=carbs,
-                fiber=fiber,
-                sugar=sugar
+                **fooditem.nutrients
             )
             print(f"[API] FoodItem cree en RDF via API: {fooditem.food_item_name}")
         except Exception as e:
@@ -164,28 +183,27 @@ class FoodItemViewSet(viewsets.ModelViewSet):
         
         # Synchroniser avec RDF
         try:
-            # Récupérer les valeurs nutritionnelles
-            calories = getattr(fooditem.calories, 'calories_value', None) if hasattr(fooditem, 'calories') else None
-            protein = getattr(fooditem.protein, 'protein_value', None) if hasattr(fooditem, 'protein') else None
-            carbs = getattr(fooditem.carbs, 'carbs_value', None) if hasattr(fooditem, 'carbs') else None
-            fiber = getattr(fooditem.fiber, 'fiber_value', None) if hasattr(fooditem, 'fiber') else None
-            sugar = getattr(fooditem.sugar, 'sugar_value', None) if hasattr(fooditem, 'sugar') else None
-            
             rdf_manager.update_fooditem(
                 fooditem_id=fooditem.food_item_id,
                 name=fooditem.food_item_name,
                 description=fooditem.food_item_description,
                 food_type=fooditem.food_type,
-                calories=calories,
-                protein=protein,
-                carbs=carbs,
-                fiber=fiber,
-                sugar=sugar
+                **fooditem.nutrients
             )
             print(f"[API] FoodItem mis a jour en RDF via API: {fooditem.food_item_name}")
         except Exception as e:
             print(f"[API ERROR] Erreur synchronisation RDF : {e}")
     
+    @action(detail=False, methods=['get'])
+    def nutrient_summary(self, request):
+        """Count, mean, min and max of each nutrient over the visible food items (?type= to filter)"""
+        food_items = self.get_queryset()
+        food_type = request.query_params.get('type')
+        if food_type:
+            food_items = food_items.filter(food_type=food_type.upper())
+        ids = food_items.values_list('food_item_id', flat=True)
+        return Response(nutrient_matrix.get_matrix().summary(list(ids)))
+    
     def perform_destroy(self, instance):
         """Delete food item and sync with RDF"""
         fooditem_id = instance.food_item_id
@@ -210,11 +228,11 @@ class FoodItemViewSet(viewsets.ModelViewSet):
         if food_type:
             queryset = queryset.filter(food_type=food_type.upper())
         
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(self.eager_load(queryset), many=True)
         return Response(serializer.data)
 
 
-class BreakfastViewSet(viewsets.ReadOnlyModelViewSet):
+class BreakfastViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for Breakfast meals
     """
@@ -228,7 +246,7 @@ class BreakfastViewSet(viewsets.ReadOnlyModelViewSet):
         return Breakfast.objects.filter(meal__user=self.request.user)
 
 
-class LunchViewSet(viewsets.ReadOnlyModelViewSet):
+class LunchViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for Lunch meals
     """
@@ -242,7 +260,7 @@ class LunchViewSet(viewsets.ReadOnlyModelViewSet):
         return Lunch.objects.filter(meal__user=self.request.user)
 
 
-class DinnerViewSet(viewsets.ReadOnlyModelViewSet):
+class DinnerViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for Dinner meals
     """
@@ -256,7 +274,7 @@ class DinnerViewSet(viewsets.ReadOnlyModelViewSet):
         return Dinner.objects.filter(meal__user=self.request.user)
 
 
-class SnackViewSet(viewsets.ReadOnlyModelViewSet):
+class SnackViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for Snack meals
     """
@@ -277,11 +295,20 @@ from django.db import transaction
 
 @login_required
 def meal_list_view(request):
-    """Display list of user's meals"""
-    meals = Meal.objects.filter(user=request.user).select_related('user').prefetch_related('food_items').order_by('-meal_date')
-    return render(request, 'meals/meal_list.html', {
-        'meals': meals
-    })
+    """Display list of user's meals, one keyset page at a time"""
+    meals = Meal.objects.filter(user=request.user).select_related('user').prefetch_related('food_items')
+    meals, next_cursor = keyset_paginate(request, meals, ('-meal_date', '-meal_id'))
+    context = {'meals': meals, 'next_cursor': next_cursor}
+    if request.GET.get('partial'):
+        # Next chunk requested by the lazy loader
+        return render(request, 'meals/_meal_cards.html', context)
+    return render(request, 'meals/meal_list.html', context)
+
+
+def picked_food_items(ids):
+    """Food items already picked in the meal form; the others are found through the search endpoint"""
+    ids = [pk for pk in ids if str(pk).isdigit()]
+    return FoodItem.objects.filter(food_item_id__in=ids).order_by('food_item_name')
 
 
 def validate_meal_form(request):
@@ -342,15 +369,13 @@ def meal_create_view(request):
         errors, meal_name, meal_type, meal_date = validate_meal_form(request)
         
         if errors:
-            # Get all food items (available for selection)
-            available_food_items = FoodItem.objects.all().prefetch_related('calories', 'protein', 'carbs')
-            
-            # Get selected food items to maintain selection
+            # Keep the selected food items
             food_items_ids = request.POST.getlist('food_items')
             
             return render(request, 'meals/meal_form.html', {
                 'is_create': True,
-                'food_items': available_food_items,
+                'food_items': picked_food_items(food_items_ids),
+                'food_types': dict(FoodItem.FOOD_TYPE_CHOICES),
                 'meal_types': Meal.MEAL_TYPE_CHOICES,
                 'errors': errors,
                 'form_data': {
@@ -367,12 +392,7 @@ def meal_create_view(request):
                 food_items_ids = request.POST.getlist('food_items')
                 
                 # Calculate total calories from selected food items
-                total_calories = 0
-                if food_items_ids:
-                    selected_items = FoodItem.objects.filter(food_item_id__in=food_items_ids).prefetch_related('calories')
-                    for item in selected_items:
-                        if hasattr(item, 'calories'):
-                            total_calories += item.calories.calories_value
+                total_calories = nutrient_matrix.totals(set(food_items_ids))['calories']
                 
                 # Parse and prepare date
                 from django.utils import timezone
@@ -420,12 +440,10 @@ def meal_create_view(request):
         except Exception as e:
             messages.error(request, f'❌ Erreur lors de la création du repas : {str(e)}')
     
-    # Get all food items (available for selection)
-    available_food_items = FoodItem.objects.all().prefetch_related('calories', 'protein', 'carbs')
-    
     return render(request, 'meals/meal_form.html', {
         'is_create': True,
-        'food_items': available_food_items,
+        'food_items': FoodItem.objects.none(),
+        'food_types': dict(FoodItem.FOOD_TYPE_CHOICES),
         'meal_types': Meal.MEAL_TYPE_CHOICES,
         'form_data': {},
     })
@@ -435,7 +453,7 @@ def meal_create_view(request):
 def meal_detail_view(request, pk):
     """Display meal details"""
     meal = get_object_or_404(Meal, meal_id=pk, user=request.user)
-    food_items = meal.food_items.all().prefetch_related('calories', 'protein', 'carbs', 'fiber', 'sugar')
+    food_items = meal.food_items.all()
     
     return render(request, 'meals/meal_detail.html', {
         'meal': meal,
@@ -453,16 +471,14 @@ def meal_update_view(request, pk):
         errors, meal_name, meal_type, meal_date = validate_meal_form(request)
         
         if errors:
-            # Get all food items (available for selection)
-            available_food_items = FoodItem.objects.all().prefetch_related('calories', 'protein', 'carbs')
-            
-            # Get selected food items to maintain selection
+            # Keep the selected food items
             food_items_ids = request.POST.getlist('food_items')
             
             return render(request, 'meals/meal_form.html', {
                 'is_create': False,
                 'meal': meal,
-                'food_items': available_food_items,
+                'food_items': picked_food_items(food_items_ids),
+                'food_types': dict(FoodItem.FOOD_TYPE_CHOICES),
                 'current_food_items_ids': food_items_ids,
                 'meal_types': Meal.MEAL_TYPE_CHOICES,
                 'errors': errors,
@@ -483,12 +499,7 @@ def meal_update_view(request, pk):
                 FoodItem.objects.filter(meal=meal).update(meal=None)
                 
                 # Calculate total calories from selected food items
-                total_calories = 0
-                if food_items_ids:
-                    selected_items = FoodItem.objects.filter(food_item_id__in=food_items_ids).prefetch_related('calories')
-                    for item in selected_items:
-                        if hasattr(item, 'calories'):
-                            total_calories += item.calories.calories_value
+                total_calories = nutrient_matrix.totals(set(food_items_ids))['calories']
                 
                 # Parse and prepare date
                 from django.utils import timezone
@@ -538,16 +549,14 @@ def meal_update_view(request, pk):
         except Exception as e:
             messages.error(request, f'❌ Erreur lors de la modification du repas : {str(e)}')
     
-    # Get all food items (available for selection)
-    available_food_items = FoodItem.objects.all().prefetch_related('calories', 'protein', 'carbs')
-    
     # Get current meal's food items IDs
     current_food_items_ids = list(meal.food_items.values_list('food_item_id', flat=True))
     
     return render(request, 'meals/meal_form.html', {
         'is_create': False,
         'meal': meal,
-        'food_items': available_food_items,
+        'food_items': picked_food_items(current_food_items_ids),
+        'food_types': dict(FoodItem.FOOD_TYPE_CHOICES),
         'current_food_items_ids': current_food_items_ids,
         'meal_types': Meal.MEAL_TYPE_CHOICES,
         'form_data': {},
@@ -590,7 +599,17 @@ from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.shortcuts import get_object_or_404, redirect
 from django.forms import inlineformset_factory
-from .models import Calories, Protein, Carbs, Fiber, Sugar
+
+
+def nutrients_from_post(data):
+    """Nutrient values posted by the backoffice form; blank or invalid fields are left out"""
+    nutrients = {}
+    for name in FoodItem.NUTRIENTS:
+        try:
+            nutrients[name] = int(data.get(f'{name}_value', '').strip())
+        except (ValueError, TypeError):
+            pass
+    return nutrients
 
 
 class StaffRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
@@ -607,9 +626,7 @@ class AdminFoodItemListView(StaffRequiredMixin, generic.ListView):
     paginate_by = 20
 
     def get_queryset(self):
-        queryset = FoodItem.objects.select_related('meal', 'meal__user').prefetch_related(
-            'calories', 'protein', 'carbs', 'fiber', 'sugar'
-        ).order_by('-food_item_id')
+        queryset = FoodItem.objects.select_related('meal', 'meal__user').order_by('-food_item_id')
         
         # Add search functionality
         search = self.request.GET.get('search', '')
@@ -641,12 +658,9 @@ class AdminFoodItemDetailView(StaffRequiredMixin, generic.DetailView):
         context = super().get_context_data(**kwargs)
         obj = self.object
         
-        # Get nutritional information
-        context['calories'] = getattr(obj, 'calories', None)
-        context['protein'] = getattr(obj, 'protein', None)
-        context['carbs'] = getattr(obj, 'carbs', None)
-        context['fiber'] = getattr(obj, 'fiber', None)
-        context['sugar'] = getattr(obj, 'sugar', None)
+        # Get nutritional information (None when unknown)
+        for name in FoodItem.NUTRIENTS:
+            context[name] = getattr(obj, name)
         
         return context
 
@@ -671,80 +685,17 @@ class AdminFoodItemCreateView(StaffRequiredMixin, generic.CreateView):
         context['is_create'] = True
         
         # Initialize empty nutritional values for create form
-        context['calories_value'] = ''
-        context['protein_value'] = ''
-        context['carbs_value'] = ''
-        context['fiber_value'] = ''
-        context['sugar_value'] = ''
+        for name in FoodItem.NUTRIENTS:
+            context[f'{name}_value'] = ''
         
         return context
 
     def form_valid(self, form):
-        # Save FoodItem instance first
-        self.object = form.save()
-        
-        # Collect nutritional values
-        calories_value = None
-        protein_value = None
-        carbs_value = None
-        fiber_value = None
-        sugar_value = None
-        
-        # Handle nutritional information from POST data
-        try:
-            calories_value = self.request.POST.get('calories_value', '').strip()
-            if calories_value:
-                calories_value = int(calories_value)
-                Calories.objects.create(
-                    food_item=self.object,
-                    calories_value=calories_value
-                )
-        except (ValueError, TypeError):
-            pass
-        
-        try:
-            protein_value = self.request.POST.get('protein_value', '').strip()
-            if protein_value:
-                protein_value = int(protein_value)
-                Protein.objects.create(
-                    food_item=self.object,
-                    protein_value=protein_value
-                )
-        except (ValueError, TypeError):
-            pass
-        
-        try:
-            carbs_value = self.request.POST.get('carbs_value', '').strip()
-            if carbs_value:
-                carbs_value = int(carbs_value)
-                Carbs.objects.create(
-                    food_item=self.object,
-                    carbs_value=carbs_value
-                )
-        except (ValueError, TypeError):
-            pass
-        
-        try:
-            fiber_value = self.request.POST.get('fiber_value', '').strip()
-            if fiber_value:
-                fiber_value = int(fiber_value)
-                Fiber.objects.create(
-                    food_item=self.object,
-                    fiber_value=fiber_value
-                )
-        except (ValueError, TypeError):
-            pass
-        
-        try:
-            sugar_value = self.request.POST.get('sugar_value', '').strip()
-            if sugar_value:
-                sugar_value = int(sugar_value)
-                Sugar.objects.create(
-                    food_item=self.object,
-                    sugar_value=sugar_value
-                )
-        except (ValueError, TypeError):
-            pass
+        # Nutritional values are columns of FoodItem: a single INSERT
+        self.object = form.save(commit=False)
+        nutrients = nutrients_from_post(self.request.POST)
+        self.object.set_nutrients(**nutrients)
+        self.object.save()
         
         # 🔥 SYNCHRONISER AVEC RDF
         try:
@@ -753,11 +704,7 @@ class AdminFoodItemCreateView(StaffRequiredMixin, generic.CreateView):
                 name=self.object.food_item_name,
                 description=self.object.food_item_description,
                 food_type=self.object.food_type,
-                calories=calories_value,
-                protein=protein_value,
-                carbs=carbs_value,
-                fiber=fiber_value,
-                sugar=sugar_value
+                **nutrients
             )
             print(f"✅ FoodItem synchronisé avec RDF : {self.object.food_item_name}")
         except Exception as e:
@@ -786,81 +733,17 @@ class AdminFoodItemUpdateView(StaffRequiredMixin, generic.UpdateView):
         context['is_create'] = False
         
         # Get existing nutritional values
-        obj = self.object
-        context['calories_value'] = getattr(obj.calories, 'calories_value', '') if hasattr(obj, 'calories') else ''
-        context['protein_value'] = getattr(obj.protein, 'protein_value', '') if hasattr(obj, 'protein') else ''
-        context['carbs_value'] = getattr(obj.carbs, 'carbs_value', '') if hasattr(obj, 'carbs') else ''
-        context['fiber_value'] = getattr(obj.fiber, 'fiber_value', '') if hasattr(obj, 'fiber') else ''
-        context['sugar_value'] = getattr(obj.sugar, 'sugar_value', '') if hasattr(obj, 'sugar') else ''
+        for name, value in self.object.nutrients.items():
+            context[f'{name}_value'] = '' if value is None else value
         
         return context
 
     def form_valid(self, form):
-        # Save FoodItem instance first
-        self.object = form.save()
-        
-        # Collect nutritional values for RDF
-        calories_value = None
-        protein_value = None
-        carbs_value = None
-        fiber_value = None
-        sugar_value = None
-        
-        # Update nutritional information from POST data
-        try:
-            calories_value = self.request.POST.get('calories_value', '').strip()
-            if calories_value:
-                calories_value = int(calories_value)
-                Calories.objects.update_or_create(
-                    food_item=self.object,
-                    defaults={'calories_value': calories_value}
-                )
-        except (ValueError, TypeError):
-            pass
-        
-        try:
-            protein_value = self.request.POST.get('protein_value', '').strip()
-            if protein_value:
-                protein_value = int(protein_value)
-                Protein.objects.update_or_create(
-                    food_item=self.object,
-                    defaults={'protein_value': protein_value}
-                )
-        except (ValueError, TypeError):
-            pass
-        
-        try:
-            carbs_value = self.request.POST.get('carbs_value', '').strip()
-            if carbs_value:
-                carbs_value = int(carbs_value)
-                Carbs.objects.update_or_create(
-                    food_item=self.object,
-                    defaults={'carbs_value': carbs_value}
-                )
-        except (ValueError, TypeError):
-            pass
-        
-        try:
-            fiber_value = self.request.POST.get('fiber_value', '').strip()
-            if fiber_value:
-                fiber_value = int(fiber_value)
-                Fiber.objects.update_or_create(
-                    food_item=self.object,
-                    defaults={'fiber_value': fiber_value}
-                )
-        except (ValueError, TypeError):
-            pass
-        
-        try:
-            sugar_value = self.request.POST.get('sugar_value', '').strip()
-            if sugar_value:
-                sugar_value = int(sugar_value)
-                Sugar.objects.update_or_create(
-                    food_item=self.object,
-                    defaults={'sugar_value': sugar_value}
-                )
-        except (ValueError, TypeError):
-            pass
+        # Blank nutritional fields keep their current value: a single UPDATE
+        self.object = form.save(commit=False)
+        nutrients = nutrients_from_post(self.request.POST)
+        self.object.set_nutrients(**nutrients)
+        self.object.save()
         
         # 🔥 SYNCHRONISER LA MISE À JOUR AVEC RDF
         try:
@@ -869,11 +752,7 @@ class AdminFoodItemUpdateView(StaffRequiredMixin, generic.UpdateView):
                 name=self.object.food_item_name,
                 description=self.object.food_item_description,
                 food_type=self.object.food_type,
-                calories=calories_value,
-                protein=protein_value,
-                carbs=carbs_value,
-                fiber=fiber_value,
-                sugar=sugar_value
+                **nutrients
             )
             print(f"✅ FoodItem mis à jour en RDF : {self.object.food_item_name}")
         except Exception as e:
@@ -908,9 +787,7 @@ class AdminFoodItemDeleteView(StaffRequiredMixin, generic.DeleteView):
 
 
 # ============== RDF/SPARQL STATISTICS VIEW ================
-@login_required
-def rdf_stats_view(request):
-    """Vue pour afficher les statistiques RDF et effectuer des requêtes SPARQL"""
+def _rdf_stats_context():
     stats = rdf_manager.get_stats()
     
     # Exemple de requêtes SPARQL
@@ -958,9 +835,22 @@ ORDER BY ?foodName
     # Récupérer les aliments depuis RDF
     rdf_fooditems = rdf_manager.get_all_fooditems()
     
-    return render(request, 'meals/rdf_stats.html', {
+    return {
         'stats': stats,
         'sparql_examples': sparql_examples,
         'rdf_meals': rdf_meals[:10],  # Top 10
         'rdf_fooditems': rdf_fooditems[:10],  # Top 10
-    })
\ No newline at end of file
+    }
+
+
+@login_required
+def rdf_stats_view(request):
+    """Vue pour afficher les statistiques RDF et effectuer des requêtes SPARQL"""
+    return render(request, 'meals/rdf_stats.html', _rdf_stats_context())
+
+
+@async_login_required
+async def rdf_stats_async_view(request):
+    """rdf_stats_view pour ASGI : les requêtes sur le graphe rdflib tournent dans un thread"""
+    context = await sync_to_async(_rdf_stats_context)()
+    return await arender(request, 'meals/rdf_stats.html', context)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class RollupsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.rollups'
+
+    def ready(self):
+        """Import signals when app is ready"""
+        import apps.rollups.signals  # noqa
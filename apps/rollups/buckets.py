@@ -0,0 +1,280 @@
+"""
+Per-user daily and weekly rollups
+Meals and activity logs are summed into DailyRollup/WeeklyRollup, HealthRecord
+values into DailyMetricRollup/WeeklyMetricRollup, keyed by the local day and
+the Monday of the ISO week. Rows are kept in step with F() arithmetic by the
+save/delete signals (see signals.py); rebuild() recomputes history in chunks
+(manage.py rebuild_rollups) after bulk loads that bypass signals.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least, TruncDate, TruncWeek
+from django.utils import timezone
+
+from .models import DailyMetricRollup, DailyRollup, WeeklyMetricRollup, WeeklyRollup
+
+# model label -> (date field, {rollup field: source field, None counts the row})
+TOTAL_SOURCES = {
+    'meals.Meal': ('meal_date', {'meal_count': None, 'calories': 'total_calories'}),
+    'activities.ActivityLog': ('date', {'activity_count': None, 'activity_minutes': 'duration'}),
+}
+METRIC_SOURCE = 'health_records.HealthRecord'
+TOTAL_FIELDS = ('meal_count', 'calories', 'activity_count', 'activity_minutes')
+COUNT_FIELDS = ('meal_count', 'activity_count')
+
+
+def day_of(value):
+    """Local calendar day of a datetime"""
+    if timezone.is_aware(value):
+        return timezone.localdate(value)
+    return value.date()
+
+
+def week_of(day):
+    """Monday of the ISO week containing `day`"""
+    return day - timedelta(days=day.weekday())
+
+
+def _local_midnight(day):
+    start = datetime.combine(day, time.min)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
+
+def contribution(instance):
+    """
+    What one source row adds to the rollups, or None:
+    ('total', user_id, day, {field: amount}) or ('metric', user_id, metric_id, day, value)
+    """
+    label = instance._meta.label
+    if label == METRIC_SOURCE:
+        if instance.health_metric_id is None or instance.value is None or instance.start_date is None:
+            return None
+        start_date = instance._meta.get_field('start_date').to_python(instance.start_date)
+        return ('metric', instance.user_id, instance.health_metric_id, day_of(start_date), float(instance.value))
+
+    date_field, fields = TOTAL_SOURCES[label]
+    moment = getattr(instance, date_field)
+    if moment is None:
+        return None
+    moment = instance._meta.get_field(date_field).to_python(moment)
+    deltas = {
+        name: 1 if source is None else int(getattr(instance, source) or 0)
+        for name, source in fields.items()
+    }
+    return ('total', instance.user_id, day_of(moment), deltas)
+
+
+def _add(model, keys, deltas, bounds=None):
+    updates = {name: F(name) + amount for name, amount in deltas.items()}
+    if bounds is not None:
+        low = Value(bounds[0], output_field=FloatField())
+        high = Value(bounds[1], output_field=FloatField())
+        updates['minimum'] = Least(Coalesce('minimum', low), low)
+        updates['maximum'] = Greatest(Coalesce('maximum', high), high)
+    if model.objects.filter(**keys).update(**updates):
+        return
+    initial = dict(deltas)
+    if bounds is not None:
+        initial.update(minimum=bounds[0], maximum=bounds[1])
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **initial)
+    except IntegrityError:
+        # Created concurrently by another writer
+        model.objects.filter(**keys).update(**updates)
+
+
+def _subtract(model, keys, deltas, counts):
+    """Remove `deltas` from a row and drop it once its counts reach zero"""
+    model.objects.filter(**keys).update(**{name: F(name) - amount for name, amount in deltas.items()})
+    model.objects.filter(**keys, **{f'{name}__lte': 0 for name in counts}).delete()
+
+
+def _refresh_bounds(model, keys, value, start, days):
+    """Recompute min/max of a metric bucket whose bound was the removed value"""
+    row = model.objects.filter(**keys).filter(Q(minimum=value) | Q(maximum=value)).first()
+    if row is None:
+        return
+    HealthRecord = apps.get_model(METRIC_SOURCE)
+    bounds = HealthRecord.objects.filter(
+        user_id=row.user_id, health_metric_id=row.health_metric_id, value__isnull=False,
+        start_date__gte=_local_midnight(start), start_date__lt=_local_midnight(start + timedelta(days=days)),
+    ).aggregate(minimum=Min('value'), maximum=Max('value'))
+    model.objects.filter(pk=row.pk).update(**bounds)
+
+
+def _targets(item):
+    """(rollup model, keys, deltas, value) of the daily and weekly rows a contribution goes to"""
+    if item[0] == 'metric':
+        _, user_id, metric_id, day, value = item
+        keys = {'user_id': user_id, 'health_metric_id': metric_id}
+        deltas = {'count': 1, 'total': value}
+        return (
+            (DailyMetricRollup, {**keys, 'day': day}, deltas, value),
+            (WeeklyMetricRollup, {**keys, 'week_start': week_of(day)}, deltas, value),
+        )
+    _, user_id, day, deltas = item
+    return (
+        (DailyRollup, {'user_id': user_id, 'day': day}, deltas, None),
+        (WeeklyRollup, {'user_id': user_id, 'week_start': week_of(day)}, deltas, None),
+    )
+
+
+def add(item):
+    """Add a contribution (see contribution()) to the daily and weekly rows"""
+    if item is None:
+        return
+    for model, keys, deltas, value in _targets(item):
+        _add(model, keys, deltas, None if value is None else (value, value))
+
+
+def add_many(items):
+    """
+    Add many contributions (bulk inserts that bypass signals): they are merged
+    per rollup row first, so each touched row costs one UPDATE
+    """
+    merged = {}
+    for item in items:
+        if item is None:
+            continue
+        for model, keys, deltas, value in _targets(item):
+            row = merged.setdefault((model, tuple(sorted(keys.items()))), [keys, dict.fromkeys(deltas, 0), None])
+            for name, amount in deltas.items():
+                row[1][name] += amount
+            if value is not None:
+                row[2] = (value, value) if row[2] is None else (min(row[2][0], value), max(row[2][1], value))
+    for (model, _), (keys, deltas, bounds) in merged.items():
+        _add(model, keys, deltas, bounds)
+
+
+def remove(item):
+    """Take a contribution back out of the daily and weekly rows"""
+    if item is None:
+        return
+    if item[0] == 'metric':
+        _, user_id, metric_id, day, value = item
+        keys = {'user_id': user_id, 'health_metric_id': metric_id}
+        deltas = {'count': 1, 'total': value}
+        _subtract(DailyMetricRollup, {**keys, 'day': day}, deltas, ('count',))
+        _subtract(WeeklyMetricRollup, {**keys, 'week_start': week_of(day)}, deltas, ('count',))
+        _refresh_bounds(DailyMetricRollup, {**keys, 'day': day}, value, day, 1)
+        _refresh_bounds(WeeklyMetricRollup, {**keys, 'week_start': week_of(day)}, value, week_of(day), 7)
+    else:
+        _, user_id, day, deltas = item
+        _subtract(DailyRollup, {'user_id': user_id, 'day': day}, deltas, COUNT_FIELDS)
+        _subtract(WeeklyRollup, {'user_id': user_id, 'week_start': week_of(day)}, deltas, COUNT_FIELDS)
+
+
+def source_models():
+    return [apps.get_model(label) for label in (*TOTAL_SOURCES, METRIC_SOURCE)]
+
+
+def _date_field(model):
+    label = model._meta.label
+    return 'start_date' if label == METRIC_SOURCE else TOTAL_SOURCES[label][0]
+
+
+def _day_range(since):
+    """First and last local day holding source rows or rollups from `since` on"""
+    first = last = None
+    for model in source_models():
+        field = _date_field(model)
+        rows = model.objects.all()
+        if since is not None:
+            rows = rows.filter(**{f'{field}__gte': _local_midnight(since)})
+        bounds = rows.aggregate(first=Min(field), last=Max(field))
+        if bounds['first'] is not None:
+            first = min(filter(None, (first, day_of(bounds['first']))))
+            last = max(filter(None, (last, day_of(bounds['last']))))
+    for model in (DailyRollup, DailyMetricRollup):
+        rows = model.objects.filter(day__gte=since) if since is not None else model.objects.all()
+        bounds = rows.aggregate(first=Min('day'), last=Max('day'))
+        if bounds['first'] is not None:
+            first = min(filter(None, (first, bounds['first'])))
+            last = max(filter(None, (last, bounds['last'])))
+    return first, last
+
+
+def _rebuild_window(start, end):
+    """Recompute every rollup row of the days in [start, end): whole ISO weeks"""
+    lower, upper = _local_midnight(start), _local_midnight(end)
+    DailyRollup.objects.filter(day__gte=start, day__lt=end).delete()
+    WeeklyRollup.objects.filter(week_start__gte=start, week_start__lt=end).delete()
+    DailyMetricRollup.objects.filter(day__gte=start, day__lt=end).delete()
+    WeeklyMetricRollup.objects.filter(week_start__gte=start, week_start__lt=end).delete()
+
+    totals = {}
+    for label, (date_field, fields) in TOTAL_SOURCES.items():
+        sums = {
+            name: Count('pk') if source is None else Coalesce(Sum(source), 0)
+            for name, source in fields.items()
+        }
+        rows = (
+            apps.get_model(label).objects
+            .filter(**{f'{date_field}__gte': lower, f'{date_field}__lt': upper})
+            .annotate(day=TruncDate(date_field))
+            .values('user_id', 'day')
+            .annotate(**sums)
+        )
+        for row in rows:
+            entry = totals.setdefault((row['user_id'], row['day']), dict.fromkeys(TOTAL_FIELDS, 0))
+            for name in fields:
+                entry[name] += row[name]
+    DailyRollup.objects.bulk_create(
+        [DailyRollup(user_id=user_id, day=day, **values) for (user_id, day), values in totals.items()],
+        batch_size=5000,
+    )
+
+    metrics = (
+        apps.get_model(METRIC_SOURCE).objects
+        .filter(start_date__gte=lower, start_date__lt=upper,
+                health_metric__isnull=False, value__isnull=False)
+        .annotate(day=TruncDate('start_date'))
+        .values('user_id', 'health_metric_id', 'day')
+        .annotate(count=Count('pk'), total=Sum('value'), minimum=Min('value'), maximum=Max('value'))
+    )
+    DailyMetricRollup.objects.bulk_create([DailyMetricRollup(**row) for row in metrics], batch_size=5000)
+
+    weeks = (
+        DailyRollup.objects.filter(day__gte=start, day__lt=end)
+        .annotate(week_start=TruncWeek('day'))
+        .values('user_id', 'week_start')
+        .annotate(**{name: Sum(name) for name in TOTAL_FIELDS})
+    )
+    WeeklyRollup.objects.bulk_create([WeeklyRollup(**row) for row in weeks], batch_size=5000)
+    metric_weeks = (
+        DailyMetricRollup.objects.filter(day__gte=start, day__lt=end)
+        .annotate(week_start=TruncWeek('day'))
+        .values('user_id', 'health_metric_id', 'week_start')
+        .annotate(count=Sum('count'), total=Sum('total'), minimum=Min('minimum'), maximum=Max('maximum'))
+    )
+    WeeklyMetricRollup.objects.bulk_create([WeeklyMetricRollup(**row) for row in metric_weeks], batch_size=5000)
+    return len(totals)
+
+
+def rebuild(since=None, chunk_days=28, progress=None):
+    """
+    Recompute the rollups from `since` (a date, None for all history) in
+    windows of whole ISO weeks, one transaction per window so that memory and
+    lock time stay bounded. `progress(start, end, days)` is called per window.
+    """
+    first, last = _day_range(week_of(since) if since else None)
+    if first is None:
+        return 0
+    start = week_of(first)
+    step = timedelta(days=max(7, chunk_days - chunk_days % 7))
+    days = 0
+    while start <= last:
+        end = start + step
+        with transaction.atomic():
+            built = _rebuild_window(start, end)
+        days += built
+        if progress:
+            progress(start, end, built)
+        start = end
+    return days
@@ -0,0 +1,35 @@
+"""
+Commande Django pour recalculer les agrégats journaliers/hebdomadaires
+Usage:
+    python manage.py rebuild_rollups                     # tout l'historique
+    python manage.py rebuild_rollups --since 2024-01-01  # à partir d'une date (semaines complètes)
+    python manage.py rebuild_rollups --chunk-days 56     # taille des tranches traitées par transaction
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from apps.rollups.buckets import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les tables d\'agrégats par jour et par semaine ISO, par tranches de semaines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Date (AAAA-MM-JJ) à partir de laquelle recalculer')
+        parser.add_argument('--chunk-days', type=int, default=28,
+                            help='Nombre de jours par tranche (arrondi à des semaines entières)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError(f"Date invalide : {options['since']}")
+
+        self.stdout.write(self.style.SUCCESS('[START] Recalcul des agregats...'))
+
+        def progress(start, end, built):
+            self.stdout.write(f'  [OK] {start} -> {end}: {built} jours-utilisateur')
+
+        total = rebuild(since=since, chunk_days=options['chunk_days'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'[DONE] {total} jours-utilisateur recalcules'))
@@ -0,0 +1,100 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('health_records', '0012_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField(help_text='Monday of the ISO week')),
+                ('meal_count', models.IntegerField(default=0)),
+                ('calories', models.IntegerField(default=0)),
+                ('activity_count', models.IntegerField(default=0)),
+                ('activity_minutes', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'weekly_rollups',
+                'ordering': ['-week_start'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WeeklyMetricRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField(help_text='Monday of the ISO week')),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('minimum', models.FloatField(blank=True, null=True)),
+                ('maximum', models.FloatField(blank=True, null=True)),
+                ('health_metric', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_rollups', to='health_records.healthmetric')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_metric_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'weekly_metric_rollups',
+                'ordering': ['-week_start'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('meal_count', models.IntegerField(default=0)),
+                ('calories', models.IntegerField(default=0)),
+                ('activity_count', models.IntegerField(default=0)),
+                ('activity_minutes', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'daily_rollups',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyMetricRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('minimum', models.FloatField(blank=True, null=True)),
+                ('maximum', models.FloatField(blank=True, null=True)),
+                ('health_metric', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='health_records.healthmetric')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_metric_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'daily_metric_rollups',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='weeklyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'week_start'), name='unique_weekly_rollup_per_user_week'),
+        ),
+        migrations.AddConstraint(
+            model_name='weeklymetricrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'health_metric', 'week_start'), name='unique_weekly_metric_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='unique_daily_rollup_per_user_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailymetricrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'health_metric', 'day'), name='unique_daily_metric_rollup'),
+        ),
+    ]
@@ -0,0 +1,102 @@
+from django.db import models
+from apps.users.models import User
+from apps.health_records.models import HealthMetric
+
+
+class DailyRollup(models.Model):
+    """Meals and activity totals of one user on one (local) day (see apps.rollups.buckets)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    meal_count = models.IntegerField(default=0)
+    calories = models.IntegerField(default=0)
+    activity_count = models.IntegerField(default=0)
+    activity_minutes = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'daily_rollups'
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_daily_rollup_per_user_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.day}: {self.calories} kcal, {self.activity_minutes} min"
+
+
+class WeeklyRollup(models.Model):
+    """Meals and activity totals of one user in one ISO week, keyed by its Monday"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='weekly_rollups')
+    week_start = models.DateField(help_text="Monday of the ISO week")
+    meal_count = models.IntegerField(default=0)
+    calories = models.IntegerField(default=0)
+    activity_count = models.IntegerField(default=0)
+    activity_minutes = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'weekly_rollups'
+        ordering = ['-week_start']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'week_start'], name='unique_weekly_rollup_per_user_week'),
+        ]
+
+    @property
+    def iso_week(self):
+        year, week, _ = self.week_start.isocalendar()
+        return f"{year}-W{week:02d}"
+
+    def __str__(self):
+        return f"{self.user_id} - {self.iso_week}: {self.calories} kcal, {self.activity_minutes} min"
+
+
+class DailyMetricRollup(models.Model):
+    """Count, sum and bounds of the HealthRecord values of one (user, metric) on one day"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_metric_rollups')
+    health_metric = models.ForeignKey(HealthMetric, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+    total = models.FloatField(default=0)
+    minimum = models.FloatField(null=True, blank=True)
+    maximum = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'daily_metric_rollups'
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'health_metric', 'day'], name='unique_daily_metric_rollup'
+            ),
+        ]
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.user_id} - {self.health_metric_id} - {self.day}: {self.average}"
+
+
+class WeeklyMetricRollup(models.Model):
+    """Count, sum and bounds of the HealthRecord values of one (user, metric) in one ISO week"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='weekly_metric_rollups')
+    health_metric = models.ForeignKey(HealthMetric, on_delete=models.CASCADE, related_name='weekly_rollups')
+    week_start = models.DateField(help_text="Monday of the ISO week")
+    count = models.IntegerField(default=0)
+    total = models.FloatField(default=0)
+    minimum = models.FloatField(null=True, blank=True)
+    maximum = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'weekly_metric_rollups'
+        ordering = ['-week_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'health_metric', 'week_start'], name='unique_weekly_metric_rollup'
+            ),
+        ]
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.user_id} - {self.health_metric_id} - {self.week_start}: {self.average}"
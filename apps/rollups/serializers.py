@@ -0,0 +1,26 @@
+from rest_framework import serializers
+from .models import DailyRollup, WeeklyRollup, DailyMetricRollup, WeeklyMetricRollup
+
+
+class DailyRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyRollup
+        fields = ('day', 'user', 'meal_count', 'calories', 'activity_count', 'activity_minutes')
+
+
+class WeeklyRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WeeklyRollup
+        fields = ('week_start', 'iso_week', 'user', 'meal_count', 'calories', 'activity_count', 'activity_minutes')
+
+
+class DailyMetricRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyMetricRollup
+        fields = ('day', 'user', 'health_metric', 'count', 'total', 'average', 'minimum', 'maximum')
+
+
+class WeeklyMetricRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WeeklyMetricRollup
+        fields = ('week_start', 'user', 'health_metric', 'count', 'total', 'average', 'minimum', 'maximum')
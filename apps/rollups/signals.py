@@ -0,0 +1,50 @@
+"""
+Signals maintaining the daily/weekly rollups
+"""
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from .buckets import add, contribution, remove, source_models
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def remember_previous(sender, instance, raw=False, **kwargs):
+    """Keep what an existing row contributed before it is modified"""
+    instance._rollup_previous = None
+    if raw or instance.pk is None or instance._state.adding:
+        return
+    try:
+        previous = sender.objects.filter(pk=instance.pk).first()
+        instance._rollup_previous = contribution(previous) if previous is not None else None
+    except Exception as e:
+        logger.error(f"Failed to read previous rollup contribution of {sender.__name__} {instance.pk}: {str(e)}")
+
+
+def rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    """Move the row's contribution from its old bucket to its new one"""
+    if raw:
+        return
+    try:
+        previous = None if created else getattr(instance, '_rollup_previous', None)
+        current = contribution(instance)
+        if previous != current:
+            remove(previous)
+            add(current)
+    except Exception as e:
+        logger.error(f"Failed to update rollups for {sender.__name__} {instance.pk}: {str(e)}")
+
+
+def rollup_on_delete(sender, instance, **kwargs):
+    """Take a deleted row out of its bucket"""
+    try:
+        remove(contribution(instance))
+    except Exception as e:
+        logger.error(f"Failed to update rollups for {sender.__name__} {instance.pk}: {str(e)}")
+
+
+for model in source_models():
+    label = model._meta.label
+    pre_save.connect(remember_previous, sender=model, dispatch_uid=f'rollup_previous_{label}')
+    post_save.connect(rollup_on_save, sender=model, dispatch_uid=f'rollup_save_{label}')
+    post_delete.connect(rollup_on_delete, sender=model, dispatch_uid=f'rollup_delete_{label}')
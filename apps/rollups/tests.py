@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from apps.activities.models import Activity, ActivityLog
+from apps.health_records.models import HealthMetric, HealthRecord
+from apps.meals.models import Meal
+from apps.users.models import User
+from . import buckets
+from .models import DailyRollup, WeeklyRollup, DailyMetricRollup, WeeklyMetricRollup
+
+
+class RollupTest(TestCase):
+    """Test cases for the incremental daily/weekly rollups"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='runner', email='runner@example.com', password='pw12345!')
+        self.activity = Activity.objects.create(activity_name='Course', activity_description='Course a pied')
+        self.metric = HealthMetric.objects.create(metric_name='Poids', metric_description='Poids', metric_unit='kg')
+        # Monday and Wednesday of the same ISO week, then the next Monday
+        self.monday = timezone.make_aware(datetime(2024, 3, 4, 12, 0))
+
+    def meal(self, when, calories):
+        return Meal.objects.create(
+            user=self.user, meal_name='Repas', meal_type='LUNCH', total_calories=calories, meal_date=when
+        )
+
+    def snapshot(self):
+        return (
+            sorted(DailyRollup.objects.values_list('day', 'meal_count', 'calories', 'activity_count', 'activity_minutes')),
+            sorted(WeeklyRollup.objects.values_list('week_start', 'meal_count', 'calories', 'activity_minutes')),
+            sorted(DailyMetricRollup.objects.values_list('day', 'count', 'total', 'minimum', 'maximum')),
+            sorted(WeeklyMetricRollup.objects.values_list('week_start', 'count', 'total', 'minimum', 'maximum')),
+        )
+
+    def test_signals_match_rebuild(self):
+        """Test incremental updates (create, move, delete) agree with a full rebuild"""
+        first = self.meal(self.monday, 500)
+        self.meal(self.monday + timedelta(days=2), 700)
+        ActivityLog.objects.create(activity=self.activity, user=self.user, date=self.monday, duration=30)
+        records = [
+            HealthRecord.objects.create(user=self.user, health_metric=self.metric, value=value,
+                                        description='pesee', start_date=self.monday)
+            for value in (70.0, 72.0)
+        ]
+
+        week = WeeklyRollup.objects.get(user=self.user)
+        self.assertEqual((week.meal_count, week.calories, week.activity_minutes), (2, 1200, 30))
+
+        first.meal_date = self.monday + timedelta(days=7)
+        first.save()
+        records[1].delete()
+        daily = DailyMetricRollup.objects.get(user=self.user)
+        self.assertEqual((daily.count, daily.minimum, daily.maximum), (1, 70.0, 70.0))
+
+        incremental = self.snapshot()
+        buckets.rebuild(chunk_days=7)
+        self.assertEqual(self.snapshot(), incremental)
+        self.assertEqual(WeeklyRollup.objects.count(), 2)
+
+    def test_trend_reads_dense_series(self):
+        """Test the trend endpoint returns one bucket per day, zero-filled"""
+        self.meal(timezone.now(), 650)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('rollups:daily-rollup-trend'), {'periods': 7})
+        self.assertEqual(response.status_code, 200)
+        series = response.json()['series']
+        self.assertEqual(len(series), 7)
+        self.assertEqual(series[-1]['calories'], 650)
+        self.assertEqual(sum(bucket['meal_count'] for bucket in series), 1)
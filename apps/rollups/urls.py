@@ -0,0 +1,15 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import DailyRollupViewSet, WeeklyRollupViewSet, DailyMetricRollupViewSet, WeeklyMetricRollupViewSet
+
+router = DefaultRouter()
+router.register(r'daily', DailyRollupViewSet, basename='daily-rollup')
+router.register(r'weekly', WeeklyRollupViewSet, basename='weekly-rollup')
+router.register(r'metrics/daily', DailyMetricRollupViewSet, basename='daily-metric-rollup')
+router.register(r'metrics/weekly', WeeklyMetricRollupViewSet, basename='weekly-metric-rollup')
+
+app_name = 'rollups'
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
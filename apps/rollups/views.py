@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from apps.core.pagination import KeysetCursorPagination
+from .buckets import TOTAL_FIELDS, week_of
+from .serializers import (
+    DailyRollupSerializer, WeeklyRollupSerializer,
+    DailyMetricRollupSerializer, WeeklyMetricRollupSerializer
+)
+
+
+class RollupViewSetMixin:
+    """
+    Read-only access to one rollup table: the user's own rows (staff may pass
+    ?user=<id>), filtered by ?start= and ?end= (inclusive ISO dates) and, for
+    metric rollups, ?metric=<health_metric_id>.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetCursorPagination
+    # Bucket key field and bucket length in days
+    period_field = 'day'
+    period_days = 1
+    max_periods = 366
+    requires_metric = False
+
+    def get_queryset(self):
+        model = self.get_serializer_class().Meta.model
+        user_id = self.request.user.pk
+        if self.request.user.is_staff and self.request.query_params.get('user'):
+            user_id = self.request.query_params['user']
+        queryset = model.objects.filter(user_id=user_id)
+        metric = self.request.query_params.get('metric')
+        if metric and hasattr(model, 'health_metric'):
+            queryset = queryset.filter(health_metric_id=metric)
+        start = parse_date(self.request.query_params.get('start', '') or '')
+        end = parse_date(self.request.query_params.get('end', '') or '')
+        if start:
+            queryset = queryset.filter(**{f'{self.period_field}__gte': self.align(start)})
+        if end:
+            queryset = queryset.filter(**{f'{self.period_field}__lte': end})
+        return queryset
+
+    def align(self, day):
+        return week_of(day) if self.period_days == 7 else day
+
+    def empty_bucket(self):
+        return dict.fromkeys(TOTAL_FIELDS, 0)
+
+    def bucket(self, row):
+        return {name: getattr(row, name) for name in TOTAL_FIELDS}
+
+    @action(detail=False, methods=['get'])
+    def trend(self, request):
+        """
+        Dense series of the last ?periods= buckets ending today (missing buckets
+        are zero/empty): reads one rollup row per bucket, never the raw events.
+        """
+        if self.requires_metric and not request.query_params.get('metric'):
+            return Response({'error': 'metric is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            periods = int(request.query_params.get('periods', 30))
+        except ValueError:
+            return Response({'error': 'periods must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        periods = min(max(periods, 1), self.max_periods)
+        last = self.align(timezone.localdate())
+        first = last - timedelta(days=self.period_days * (periods - 1))
+        rows = {
+            getattr(row, self.period_field): row
+            for row in self.get_queryset().filter(
+                **{f'{self.period_field}__gte': first, f'{self.period_field}__lte': last}
+            )
+        }
+        series = []
+        for i in range(periods):
+            key = first + timedelta(days=self.period_days * i)
+            row = rows.get(key)
+            series.append({self.period_field: key, **(self.bucket(row) if row else self.empty_bucket())})
+        return Response({'start': first, 'end': last, 'series': series})
+
+
+class MetricRollupViewSetMixin(RollupViewSetMixin):
+    """Metric rollups: the trend needs ?metric=<health_metric_id>"""
+    requires_metric = True
+
+    def empty_bucket(self):
+        return {'count': 0, 'average': None, 'minimum': None, 'maximum': None}
+
+    def bucket(self, row):
+        return {'count': row.count, 'average': row.average, 'minimum': row.minimum, 'maximum': row.maximum}
+
+
+class DailyRollupViewSet(RollupViewSetMixin, viewsets.ReadOnlyModelViewSet):
+    """Calories and activity minutes per day"""
+    serializer_class = DailyRollupSerializer
+    cursor_ordering = ('-day', '-id')
+
+
+class WeeklyRollupViewSet(RollupViewSetMixin, viewsets.ReadOnlyModelViewSet):
+    """Calories and activity minutes per ISO week"""
+    serializer_class = WeeklyRollupSerializer
+    cursor_ordering = ('-week_start', '-id')
+    period_field = 'week_start'
+    period_days = 7
+    max_periods = 104
+
+
+class DailyMetricRollupViewSet(MetricRollupViewSetMixin, viewsets.ReadOnlyModelViewSet):
+    """Health metric values per day"""
+    serializer_class = DailyMetricRollupSerializer
+    cursor_ordering = ('-day', '-id')
+
+
+class WeeklyMetricRollupViewSet(MetricRollupViewSetMixin, viewsets.ReadOnlyModelViewSet):
+    """Health metric values per ISO week"""
+    serializer_class = WeeklyMetricRollupSerializer
+    cursor_ordering = ('-week_start', '-id')
+    period_field = 'week_start'
+    period_days = 7
+    max_periods = 104
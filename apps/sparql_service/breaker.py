@@ -0,0 +1,206 @@
+"""
+Circuit breaker for the Fuseki triplestore
+Every SparqlClient call goes through the process-wide `breaker`:
+
+- closed: calls go through. The outcome of the calls of the last
+  SPARQL_BREAKER_WINDOW seconds is kept; once there are at least
+  SPARQL_BREAKER_MIN_CALLS of them and SPARQL_BREAKER_FAILURE_RATE of them
+  failed, the circuit opens;
+- open: calls fail at once with CircuitOpenError, so views fall back to the
+  ORM without waiting for a connect timeout and queued writes go to the retry
+  queue (apps.sparql_service.retry_queue). A background thread probes Fuseki
+  every SPARQL_BREAKER_PROBE_INTERVAL seconds and closes the circuit as soon
+  as it answers (it also runs while writes wait in the retry queue, see
+  watch());
+- half-open: SPARQL_BREAKER_RESET_SECONDS after opening, one trial call is let
+  through; its success closes the circuit, its failure opens it again.
+
+Only transport failures (connection, timeout, 5xx) count: a malformed query
+says nothing about the health of the triplestore. Like the metrics, the state
+is per process.
+"""
+
+import logging
+import threading
+import time
+import urllib.error
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+
+from apps.core.metrics import SPARQL_BREAKER_TRANSITIONS, SPARQL_SHORT_CIRCUITED
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Fuseki while the circuit is open"""
+
+
+def is_transport_error(exc):
+    """True if `exc` means Fuseki is unreachable or failing, not that the query is wrong"""
+    if isinstance(exc, urllib.error.HTTPError):
+        return exc.code >= 500
+    if isinstance(exc, OSError):  # URLError, ConnectionError, socket timeouts
+        return True
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    if 'EndPointInternalError' in names or 'TransportError' in names:  # SPARQLWrapper 500, httpx
+        return True
+    status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    return status is not None and status >= 500
+
+
+def probe_fuseki():
+    """True if the Fuseki query endpoint answers an ASK query"""
+    response = requests.get(
+        settings.FUSEKI_ENDPOINT, params={'query': 'ASK {}'},
+        headers={'Accept': 'application/sparql-results+json'},
+        timeout=getattr(settings, 'SPARQL_BREAKER_PROBE_TIMEOUT', 2.0),
+    )
+    return response.status_code == 200
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker; thread-safe"""
+
+    def __init__(self, window=30.0, min_calls=3, failure_rate=0.5, reset_seconds=15.0,
+                 probe=None, probe_interval=5.0, clock=time.monotonic):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.reset_seconds = reset_seconds
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.clock = clock
+        self.state = CLOSED
+        self.opened_at = None
+        self.on_recover = []  # callbacks run when Fuseki is reachable again
+        self._calls = deque()  # (time, failed)
+        self._trial_at = None
+        self._prober = None
+        self._watching = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go to Fuseki now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = self.clock()
+            if self.state == OPEN and now - self.opened_at >= self.reset_seconds:
+                self._set_state(HALF_OPEN)
+            # A single trial at a time; a trial that never reported is given up
+            if self.state == HALF_OPEN and (self._trial_at is None or now - self._trial_at >= self.reset_seconds):
+                self._trial_at = now
+                return True
+            return False
+
+    @contextmanager
+    def guard(self, operation):
+        """Wrap one Fuseki call: refused while open, outcome recorded otherwise"""
+        if not self.allow():
+            SPARQL_SHORT_CIRCUITED.inc(operation=operation)
+            raise CircuitOpenError('Fuseki circuit breaker is open')
+        try:
+            yield
+        except Exception as e:
+            self.record(is_transport_error(e))
+            raise
+        self.record(False)
+
+    def record(self, failed):
+        """Report the outcome of an allowed call (failed: transport failure)"""
+        closed = False
+        with self._lock:
+            now = self.clock()
+            if self.state == HALF_OPEN:
+                self._trial_at = None
+                if failed:
+                    self._open(now)
+                else:
+                    closed = self._close()
+            elif self.state == CLOSED:
+                self._calls.append((now, failed))
+                while self._calls and self._calls[0][0] <= now - self.window:
+                    self._calls.popleft()
+                failures = sum(1 for _, call_failed in self._calls if call_failed)
+                if len(self._calls) >= self.min_calls and failures >= self.failure_rate * len(self._calls):
+                    self._open(now)
+        if closed:
+            self._notify_recovered()
+
+    def watch(self):
+        """Probe Fuseki until it answers, then run on_recover, even if the circuit is closed"""
+        with self._lock:
+            self._watching = True
+            self._start_prober()
+
+    def reset(self):
+        """Back to closed with no history (tests, manual recovery)"""
+        with self._lock:
+            self._calls.clear()
+            self._trial_at = None
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def _set_state(self, state):
+        logger.warning(f"Fuseki circuit breaker: {self.state} -> {state}")
+        self.state = state
+        SPARQL_BREAKER_TRANSITIONS.inc(state=state)
+
+    def _open(self, now):
+        self._set_state(OPEN)
+        self.opened_at = now
+        self._calls.clear()
+        self._start_prober()
+
+    def _close(self):
+        self._set_state(CLOSED)
+        self.opened_at = None
+        return True
+
+    def _start_prober(self):
+        if self.probe is not None and self.probe_interval > 0 and self._prober is None:
+            self._prober = threading.Thread(target=self._probe_loop, name='fuseki-probe', daemon=True)
+            self._prober.start()
+
+    def _notify_recovered(self):
+        for callback in self.on_recover:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Circuit breaker recovery callback failed: {str(e)}")
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            with self._lock:
+                if self.state == CLOSED and not self._watching:
+                    self._prober = None
+                    return
+            try:
+                healthy = self.probe()
+            except Exception:
+                healthy = False
+            if healthy:
+                with self._lock:
+                    self._prober = None
+                    self._watching = False
+                    if self.state != CLOSED:
+                        self._close()
+                self._notify_recovered()
+                return
+
+
+breaker = CircuitBreaker(
+    window=getattr(settings, 'SPARQL_BREAKER_WINDOW', 30.0),
+    min_calls=getattr(settings, 'SPARQL_BREAKER_MIN_CALLS', 3),
+    failure_rate=getattr(settings, 'SPARQL_BREAKER_FAILURE_RATE', 0.5),
+    reset_seconds=getattr(settings, 'SPARQL_BREAKER_RESET_SECONDS', 15.0),
+    probe=probe_fuseki,
+    probe_interval=getattr(settings, 'SPARQL_BREAKER_PROBE_INTERVAL', 5.0),
+)
@@ -1,48 +1,138 @@
 from SPARQLWrapper import SPARQLWrapper, JSON
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from apps.core.instrumentation import track
+from apps.core import http_client
+from apps.core.metrics import SPARQL_REPLICA_READS
+from .breaker import CircuitOpenError, breaker, is_transport_error
+from .replica import replica
+from . import inference, retry_queue
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class SparqlClient:
-    """SPARQL Client for Fuseki interactions"""
+    """
+    SPARQL Client for Fuseki interactions
+    Calls go through the circuit breaker (see breaker.py). With
+    queue_writes=True (sync signal handlers, bulk endpoints), updates that
+    cannot be sent are stored in the retry queue instead of raising.
+    Queries are answered by the local read replica when it is enabled and
+    can serve them (see replica.py); accepted updates feed it. Updates are
+    completed with the superclass types they imply (see inference.py).
+    """
     
-    def __init__(self):
+    def __init__(self, queue_writes=False):
         self.sparql = SPARQLWrapper(settings.FUSEKI_ENDPOINT)
         self.sparql.setReturnFormat(JSON)
+        self.sparql.setTimeout(self._timeout())
         self.update_endpoint = settings.FUSEKI_UPDATE_ENDPOINT
+        self.queue_writes = queue_writes
     
-    def execute_query(self, query):
-        """Execute a SPARQL SELECT query"""
+    def _timeout(self):
+        return int(getattr(settings, 'SPARQL_TIMEOUT', 10))
+    
+    def _infer(self, update_query, infer):
+        if infer and getattr(settings, 'SPARQL_MATERIALIZE_TYPES', True):
+            return inference.materialize(update_query)
+        return update_query
+    
+    def execute_query(self, query, max_staleness=None):
+        """Execute a SPARQL SELECT query (max_staleness: seconds the replica may lag, 0 for Fuseki)"""
+        results = replica.query(query, max_staleness)
+        if results is not None:
+            SPARQL_REPLICA_READS.inc(source='replica')
+            return results
+        if replica.enabled:
+            SPARQL_REPLICA_READS.inc(source='fuseki')
         try:
             self.sparql.setQuery(query)
-            results = self.sparql.query().convert()
+            with breaker.guard('query'), track('sparql', query):
+                results = self.sparql.query().convert()
             return results
         except Exception as e:
             logger.error(f"Error executing SPARQL query: {str(e)}")
             raise
     
-    def execute_update(self, update_query):
-        """Execute a SPARQL UPDATE query"""
+    def execute_update(self, update_query, infer=True):
+        """Execute a SPARQL UPDATE query (infer: add the implied rdf:type triples)"""
+        sent_query = self._infer(update_query, infer)
+        # Keep queued writes in order: new ones wait behind them
+        if self.queue_writes and retry_queue.has_pending():
+            retry_queue.enqueue(sent_query, 'backlog')
+            return True
         try:
             update_sparql = SPARQLWrapper(self.update_endpoint)
-            update_sparql.setQuery(update_query)
+            update_sparql.setQuery(sent_query)
             update_sparql.method = 'POST'
-            update_sparql.query()
-            return True
+            update_sparql.setTimeout(self._timeout())
+            with breaker.guard('update'), track('sparql_update', sent_query):
+                update_sparql.query()
+        except Exception as e:
+            if self.queue_writes and (isinstance(e, CircuitOpenError) or is_transport_error(e)):
+                retry_queue.enqueue(sent_query, 'open' if isinstance(e, CircuitOpenError) else 'failure')
+                logger.warning(f"SPARQL update queued for retry: {str(e)}")
+                return True
+            logger.error(f"Error executing SPARQL update: {str(e)}")
+            raise
+        replica.record(sent_query)
+        return True
+    
+    async def aexecute_query(self, query, max_staleness=None):
+        """execute_query() for async views, over the shared HTTP client"""
+        if replica.enabled:
+            results = await sync_to_async(replica.query)(query, max_staleness)
+            SPARQL_REPLICA_READS.inc(source='fuseki' if results is None else 'replica')
+            if results is not None:
+                return results
+        try:
+            with breaker.guard('query'), track('sparql', query):
+                response = await http_client.get_client().post(
+                    settings.FUSEKI_ENDPOINT,
+                    data={'query': query},
+                    headers={'Accept': 'application/sparql-results+json'},
+                )
+                response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error executing SPARQL query: {str(e)}")
+            raise
+    
+    async def aexecute_update(self, update_query, infer=True):
+        """execute_update() for async views, over the shared HTTP client"""
+        sent_query = self._infer(update_query, infer)
+        try:
+            with breaker.guard('update'), track('sparql_update', sent_query):
+                response = await http_client.get_client().post(
+                    self.update_endpoint, data={'update': sent_query}
+                )
+                response.raise_for_status()
         except Exception as e:
             logger.error(f"Error executing SPARQL update: {str(e)}")
             raise
+        if replica.enabled:
+            await sync_to_async(replica.record)(sent_query)
+        return True
     
-    def insert_data(self, triples):
+    def insert_data(self, triples, infer=True):
         """Insert RDF triples into the triplestore"""
         insert_query = f"""
         INSERT DATA {{
             {triples}
         }}
         """
-        return self.execute_update(insert_query)
+        return self.execute_update(insert_query, infer=infer)
+    
+    def insert_triples(self, triples):
+        """Insert a list of N-Triples lines, SPARQL_INSERT_BATCH triples per INSERT DATA"""
+        # Implied types are added to the lines: cheaper than parsing big updates
+        if getattr(settings, 'SPARQL_MATERIALIZE_TYPES', True):
+            triples = list(triples) + inference.implied_ntriples(triples)
+        size = getattr(settings, 'SPARQL_INSERT_BATCH', 5000)
+        for start in range(0, len(triples), size):
+            self.insert_data('\n'.join(triples[start:start + size]), infer=False)
+        return True
     
     def delete_data(self, triples):
         """Delete RDF triples from the triplestore"""
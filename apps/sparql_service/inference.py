@@ -0,0 +1,173 @@
+"""
+Materialized RDFS subclass inference
+The rdfs:subClassOf hierarchy of ontology/smarthealth.ttl is read once per
+process and closed transitively. Only the app class hierarchies of
+HIERARCHIES are kept: the ontology also files nutrients (sh:calories),
+intensities (sh:High) and log fields under FoodItem, ActivityLog or HabitLog,
+and their individuals are not food items or activity logs. Updates sent through SparqlClient are then
+completed with the rdf:type triples they imply, so that `?s a sh:Meal` matches
+every Breakfast, Lunch, Dinner and Snack with a single indexed pattern instead
+of a UNION over the subclasses:
+
+- insert: an update typing a resource with a subclass also types it with every
+  superclass, as long as the subclass type still holds once the update ran;
+- delete: removing a subclass type from a resource also removes the
+  superclass types no other type of the resource still implies. Superclass
+  types are treated as derived: one asserted together with its subclass is
+  removed with it. Types removed through a variable ({ ?s a sh:Dinner }) are
+  left alone, as are blank nodes; DELETE WHERE { <s> ?p ?o } needs no help.
+
+The implied triples are appended to the update as extra operations, so Fuseki,
+the retry queue and the read replica all receive the complete update. Updates
+that mention no subclass are sent untouched without being parsed. The model
+signal handlers already assert every type of what they write (a sh:Meal ;
+a sh:Lunch) and send with infer=False; inference is for the AI and other
+free-form updates.
+materialize_types adds the implied types to data loaded before this existed.
+"""
+
+import functools
+import logging
+import re
+
+from django.conf import settings
+from rdflib import RDF, RDFS, Graph, URIRef
+from rdflib.plugins.sparql.algebra import translateUpdate
+from rdflib.plugins.sparql.parser import parseUpdate
+from rdflib.plugins.sparql.parserutils import CompValue
+
+logger = logging.getLogger(__name__)
+
+RDF_TYPE = RDF.type.n3()
+
+# Superclasses whose subclasses are materialized (local names in the ontology)
+HIERARCHIES = ('Meal', 'Activity', 'Habit', 'HealthMetric', 'User', 'HealthRecord')
+
+
+@functools.lru_cache(maxsize=1)
+def superclasses():
+    """Class IRI -> IRIs of all its superclasses within HIERARCHIES (transitive, without itself)"""
+    graph = Graph()
+    graph.parse(str(settings.ONTOLOGY_FILE), format='turtle')
+    roots = {URIRef(settings.ONTOLOGY_NAMESPACE + name) for name in HIERARCHIES}
+    closure = {}
+    for cls in set(graph.subjects(RDFS.subClassOf, None)):
+        if isinstance(cls, URIRef):
+            supers = {
+                sup for sup in graph.transitive_objects(cls, RDFS.subClassOf)
+                if isinstance(sup, URIRef) and sup != cls
+                and roots & set(graph.transitive_objects(sup, RDFS.subClassOf))
+            }
+            if supers:
+                closure[cls] = frozenset(supers)
+    return closure
+
+
+@functools.lru_cache(maxsize=1)
+def subclasses():
+    """Class IRI -> IRIs of all its subclasses"""
+    result = {}
+    for cls, supers in superclasses().items():
+        for sup in supers:
+            result.setdefault(sup, set()).add(cls)
+    return result
+
+
+@functools.lru_cache(maxsize=1)
+def _mentions_subclass():
+    """Cheap test for updates that may type something with a subclass"""
+    names = sorted({re.escape(cls.split('#')[-1].split('/')[-1]) for cls in superclasses()})
+    return re.compile(r'[:#/](?:%s)\b' % '|'.join(names or ['(?!)']))
+
+
+def implied_ntriples(lines):
+    """N-Triples lines implied by the rdf:type lines of `lines` (not already in it)"""
+    closure = superclasses()
+    present = set(lines)
+    implied = []
+    for line in lines:
+        parts = line.split(' ', 3)
+        if len(parts) < 3 or parts[1] != RDF_TYPE or not parts[0].startswith('<'):
+            continue
+        for sup in sorted(closure.get(URIRef(parts[2][1:-1]), ())):
+            extra = f'{parts[0]} {RDF_TYPE} {sup.n3()} .'
+            if extra not in present:
+                present.add(extra)
+                implied.append(extra)
+    return implied
+
+
+def _type_triples(triples):
+    closure = superclasses()
+    return [(s, o) for s, p, o in triples or () if p == RDF.type and o in closure]
+
+
+def _clause_triples(clause):
+    if not isinstance(clause, CompValue):
+        return []
+    triples = list(clause.get('triples') or [])
+    for graph_triples in (clause.get('quads') or {}).values():
+        triples.extend(graph_triples)
+    return triples
+
+
+def materialize(update):
+    """`update` followed by the operations keeping the implied rdf:type triples in step"""
+    if not superclasses() or not _mentions_subclass().search(update):
+        return update
+    try:
+        operations = translateUpdate(parseUpdate(update)).algebra
+    except Exception as e:
+        logger.warning(f"Could not parse SPARQL update for inference, sent as is: {str(e)}")
+        return update
+    closure = superclasses()
+    inserted = set()  # (subject, class); subject may be a variable of a template
+    deleted = set()
+    for operation in operations:
+        if operation.name == 'InsertData':
+            inserted.update(_type_triples(_clause_triples(operation)))
+        elif operation.name in ('DeleteData', 'DeleteWhere'):
+            deleted.update(_type_triples(_clause_triples(operation)))
+        elif operation.name == 'Modify':
+            inserted.update(_type_triples(_clause_triples(operation.get('insert'))))
+            deleted.update(_type_triples(_clause_triples(operation.get('delete'))))
+
+    extra = []
+    rows = sorted(
+        (s.n3(), cls.n3(), sup.n3())
+        for s, cls in inserted if isinstance(s, URIRef)
+        for sup in closure[cls]
+    )
+    if rows:
+        values = ' '.join(f'({s} {cls} {sup})' for s, cls, sup in rows)
+        extra.append(f'INSERT {{ ?s a ?super }} WHERE {{ VALUES (?s ?class ?super) {{ {values} }} ?s a ?class }}')
+    classes = sorted({cls.n3() for s, cls in inserted if not isinstance(s, URIRef)})
+    if classes:
+        # Template inserts ({ ?m a sh:Lunch } WHERE ...): complete the whole class
+        values = ' '.join(f'({cls} {sup.n3()})' for cls in classes for sup in sorted(closure[URIRef(cls[1:-1])]))
+        extra.append(f'INSERT {{ ?s a ?super }} WHERE {{ VALUES (?class ?super) {{ {values} }} ?s a ?class }}')
+
+    removed = {}
+    for s, cls in deleted:
+        if isinstance(s, URIRef):
+            for sup in closure[cls]:
+                removed.setdefault(sup, set()).add(s)
+    for sup in sorted(removed):
+        subjects = ' '.join(s.n3() for s in sorted(removed[sup]))
+        subs = ', '.join(sub.n3() for sub in sorted(subclasses()[sup]))
+        extra.append(
+            f'DELETE {{ ?s a {sup.n3()} }} WHERE {{ VALUES ?s {{ {subjects} }} ?s a {sup.n3()} '
+            f'FILTER NOT EXISTS {{ ?s a ?type FILTER (?type IN ({subs})) }} }}'
+        )
+    if not extra:
+        return update
+    return update.rstrip().rstrip(';') + ' ;\n' + ' ;\n'.join(extra)
+
+
+def backfill_updates():
+    """One update per class with superclasses, adding its implied types to existing data"""
+    return [
+        f'INSERT {{ ?s a ?super }} WHERE {{ VALUES ?super {{ {" ".join(sup.n3() for sup in sorted(supers))} }} '
+        f'?s a {cls.n3()} }}'
+        for cls, supers in sorted(superclasses().items())
+    ]
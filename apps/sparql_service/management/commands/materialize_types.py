@@ -0,0 +1,41 @@
+"""
+Commande Django pour ajouter dans Fuseki les types rdf:type implicites
+Usage:
+    python manage.py materialize_types            # complète les données existantes
+    python manage.py materialize_types --dry-run  # affiche les mises à jour sans rien envoyer
+
+Pour chaque classe qui a des super-classes dans ontology/smarthealth.ttl
+(rdfs:subClassOf), les instances de la classe reçoivent aussi le type de ses
+super-classes : un sh:Breakfast devient un sh:Meal. Les nouvelles écritures
+sont complétées au fil de l'eau par SparqlClient ; cette commande sert pour
+les données chargées avant, ou après un changement de la hiérarchie.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.sparql_service import inference
+from apps.sparql_service.client import SparqlClient
+
+
+class Command(BaseCommand):
+    help = 'Ajoute dans Fuseki les types des super-classes (rdfs:subClassOf) des instances existantes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Afficher les mises à jour sans rien envoyer')
+
+    def handle(self, *args, **options):
+        updates = inference.backfill_updates()
+        self.stdout.write(self.style.SUCCESS(f'[START] {len(updates)} classe(s) avec super-classes'))
+        client = SparqlClient()
+        for update in updates:
+            if options['dry_run']:
+                self.stdout.write(f'  {update}')
+                continue
+            try:
+                client.execute_update(update, infer=False)
+            except Exception as e:
+                raise CommandError(f'Fuseki a refusé la mise à jour : {str(e)}')
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('[DONE] Aucun envoi (--dry-run)'))
+        else:
+            self.stdout.write(self.style.SUCCESS('[DONE] Types implicites ajoutés'))
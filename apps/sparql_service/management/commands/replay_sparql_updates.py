@@ -0,0 +1,42 @@
+"""
+Commande Django pour renvoyer à Fuseki les mises à jour SPARQL en attente
+Usage:
+    python manage.py replay_sparql_updates           # renvoie la file d'attente
+    python manage.py replay_sparql_updates --list    # affiche la file sans rien envoyer
+
+Les mises à jour sont mises en file (table pending_sparql_updates) quand le
+disjoncteur Fuseki est ouvert ou qu'un envoi échoue ; elles sont renvoyées dans
+l'ordre automatiquement au retour de Fuseki. Cette commande sert après un
+redémarrage ou depuis une tâche planifiée.
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.sparql_service import retry_queue
+from apps.sparql_service.models import PendingSparqlUpdate
+
+
+class Command(BaseCommand):
+    help = 'Renvoie à Fuseki les mises à jour SPARQL mises en file pendant une indisponibilité'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--list', action='store_true', help='Afficher la file sans rien envoyer')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for item in PendingSparqlUpdate.objects.all():
+                self.stdout.write(
+                    f'  [{item.id}] {item.created_at:%Y-%m-%d %H:%M:%S} {item.reason}, '
+                    f'{item.attempts} tentative(s) {item.last_error[:80]}'
+                )
+            self.stdout.write(f'{PendingSparqlUpdate.objects.count()} mise(s) à jour en attente')
+            return
+
+        self.stdout.write(self.style.SUCCESS('[START] Envoi de la file à Fuseki...'))
+        sent, remaining = retry_queue.replay()
+        if remaining:
+            self.stdout.write(self.style.WARNING(
+                f'[PARTIAL] {sent} envoyée(s), {remaining} toujours en attente (Fuseki indisponible ?)'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'[DONE] {sent} mise(s) à jour envoyée(s)'))
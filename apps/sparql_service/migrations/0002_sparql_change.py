@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sparql_service', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SparqlChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('update', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'sparql_changes',
+                'ordering': ['id'],
+            },
+        ),
+    ]
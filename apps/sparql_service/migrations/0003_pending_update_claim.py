@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sparql_service', '0002_sparql_change'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingsparqlupdate',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
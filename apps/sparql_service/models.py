@@ -0,0 +1,37 @@
+from django.db import models
+
+
+class PendingSparqlUpdate(models.Model):
+    """SPARQL update that could not be sent to Fuseki, replayed in id order (see retry_queue)"""
+    REASON_CHOICES = [
+        ('open', 'Circuit open'),
+        ('failure', 'Update failed'),
+        ('backlog', 'Behind queued updates'),
+    ]
+
+    update = models.TextField()
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)  # being replayed until then
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'pending_sparql_updates'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.id} ({self.reason}, {self.attempts} attempts)"
+
+
+class SparqlChange(models.Model):
+    """Update accepted by Fuseki, in the change feed the read replicas follow (see replica)"""
+    update = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'sparql_changes'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.id} ({self.created_at})"
@@ -0,0 +1,243 @@
+"""
+N-Triples serialization of Django models
+Produces the same URIs and properties as the Fuseki sync signals so that bulk
+loaded data is indistinguishable from data synced one row at a time.
+"""
+
+from django.conf import settings
+
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+RDF_TYPE = '<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>'
+
+MEAL_CLASSES = {
+    'BREAKFAST': 'Breakfast',
+    'LUNCH': 'Lunch',
+    'DINNER': 'Dinner',
+    'SNACK': 'Snack',
+}
+
+HABIT_CLASSES = {
+    'READING': 'Reading',
+    'COOKING': 'Cooking',
+    'DRAWING': 'Drawing',
+    'JOURNALING': 'Journaling',
+    'OTHER': 'Other',
+}
+
+# (attribute on FoodItem nutrient row, individual prefix, class, link property)
+NUTRIENTS = (
+    ('calories', 'Calories', 'calories', 'hasCalories'),
+    ('protein', 'Protein', 'protein', 'hasProtein'),
+    ('carbs', 'Carbs', 'carbs', 'hasCarbs'),
+    ('fiber', 'Fiber', 'fiber', 'hasFiber'),
+    ('sugar', 'Sugar', 'sugar', 'hasSugar'),
+)
+
+
+def iri(local_name):
+    """Full IRI of a term in the SmartHealth namespace"""
+    return f"<{settings.ONTOLOGY_NAMESPACE}{local_name}>"
+
+
+def escape_literal(value):
+    """Escape a Python string for use inside an N-Triples literal"""
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def literal(value, datatype=None):
+    """Render a typed literal"""
+    if datatype is None:
+        return f'"{escape_literal(value)}"'
+    return f'"{escape_literal(value)}"^^<{XSD}{datatype}>'
+
+
+def date_literal(value):
+    """Render a date/datetime as xsd:dateTime"""
+    return literal(value.isoformat(), 'dateTime')
+
+
+def triple(subject, predicate, obj):
+    return f"{subject} {predicate} {obj} ."
+
+
+def user_triples(user):
+    """Triples for a User"""
+    s = iri(f"User_{user.user_id}")
+    return [
+        triple(s, RDF_TYPE, iri('User')),
+        triple(s, iri('UserId'), literal(user.user_id, 'integer')),
+        triple(s, iri('username'), literal(user.username)),
+        triple(s, iri('email'), literal(user.email)),
+    ]
+
+
+def meal_triples(meal):
+    """Triples for a Meal (see apps.meals.signals)"""
+    s = iri(f"Meal_{meal.meal_id}")
+    return [
+        triple(s, RDF_TYPE, iri('Meal')),
+        triple(s, RDF_TYPE, iri(MEAL_CLASSES.get(meal.meal_type, 'Meal'))),
+        triple(s, iri('mealId'), literal(meal.meal_id, 'integer')),
+        triple(s, iri('meal_name'), literal(meal.meal_name)),
+        triple(s, iri('meal_type'), literal(meal.meal_type)),
+        triple(s, iri('total_calories'), literal(meal.total_calories, 'integer')),
+        triple(s, iri('meal_date'), date_literal(meal.meal_date)),
+        triple(iri(f"User_{meal.user_id}"), iri('hasMeal'), s),
+    ]
+
+
+def food_item_triples(item, nutrients=None):
+    """
+    Triples for a FoodItem and its nutrient individuals.
+    `nutrients` maps 'calories'/'protein'/... to a value; missing keys are skipped.
+    """
+    s = iri(f"FoodItem_{item.food_item_id}")
+    triples = [
+        triple(s, RDF_TYPE, iri('FoodItem')),
+        triple(s, iri('foodItemId'), literal(item.food_item_id, 'integer')),
+        triple(s, iri('foodItemName'), literal(item.food_item_name)),
+        triple(s, iri('foodItemDescription'), literal(item.food_item_description)),
+        triple(s, iri('food_type'), literal(item.food_type)),
+    ]
+    if item.meal_id:
+        triples.append(triple(iri(f"Meal_{item.meal_id}"), iri('hasFoodItem'), s))
+    for key, prefix, cls, link in NUTRIENTS:
+        value = (nutrients or {}).get(key)
+        if value is None:
+            continue
+        n = iri(f"{prefix}_{item.food_item_id}")
+        triples.append(triple(n, RDF_TYPE, iri(cls)))
+        triples.append(triple(n, iri(f"{key}_value"), literal(value, 'integer')))
+        triples.append(triple(s, iri(link), n))
+    return triples
+
+
+def activity_triples(activity, activity_type='Activity'):
+    """Triples for an Activity (see apps.activities.signals)"""
+    s = iri(f"Activity_{activity.activity_id}")
+    return [
+        triple(s, RDF_TYPE, iri('Activity')),
+        triple(s, RDF_TYPE, iri(activity_type)),
+        triple(s, iri('activityId'), literal(activity.activity_id, 'integer')),
+        triple(s, iri('activity_name'), literal(activity.activity_name)),
+        triple(s, iri('activity_description'), literal(activity.activity_description)),
+    ]
+
+
+def activity_log_triples(log):
+    """Triples for an ActivityLog (see apps.activities.signals)"""
+    s = iri(f"ActivityLog_{log.activity_log_id}")
+    triples = [
+        triple(s, RDF_TYPE, iri('ActivityLog')),
+        triple(s, iri('activityLogId'), literal(log.activity_log_id, 'integer')),
+        triple(s, iri('duration'), literal(log.duration, 'integer')),
+        triple(s, iri('date'), date_literal(log.date)),
+    ]
+    if log.intensity:
+        triples.append(triple(s, iri('intensity'), literal(log.intensity)))
+    triples.append(triple(iri(f"User_{log.user_id}"), iri('CreatesActivityLog'), s))
+    triples.append(triple(s, iri('logsActivity'), iri(f"Activity_{log.activity_id}")))
+    return triples
+
+
+def health_metric_triples(metric):
+    """Triples for a HealthMetric (see HealthRecordRDFService)"""
+    s = iri(f"HealthMetric_{metric.health_metric_id}")
+    triples = [
+        triple(s, RDF_TYPE, iri('HealthMetric')),
+        triple(s, iri('healthMetricId'), literal(metric.health_metric_id, 'integer')),
+        triple(s, iri('healthMetricName'), literal(metric.metric_name)),
+    ]
+    if metric.metric_description:
+        triples.append(triple(s, iri('healthMetricDescription'), literal(metric.metric_description)))
+    if metric.metric_unit:
+        triples.append(triple(s, iri('healthMetricUnit'), literal(metric.metric_unit)))
+    if metric.recorded_at:
+        triples.append(triple(s, iri('healthMetricRecordedAt'), date_literal(metric.recorded_at)))
+    return triples
+
+
+def health_record_triples(record):
+    """Triples for a HealthRecord (see HealthRecordRDFService)"""
+    s = iri(f"HealthRecord_{record.health_record_id}")
+    triples = [
+        triple(s, RDF_TYPE, iri('HealthRecord')),
+        triple(iri(f"User_{record.user_id}"), iri('hasHealthRecord'), s),
+        triple(s, iri('healthRecordId'), literal(record.health_record_id, 'integer')),
+    ]
+    if record.description:
+        triples.append(triple(s, iri('healthRecordDescription'), literal(record.description)))
+    if record.value is not None:
+        triples.append(triple(s, iri('healthRecordValue'), literal(float(record.value), 'float')))
+    if record.start_date:
+        triples.append(triple(s, iri('healthRecord_startDate'), date_literal(record.start_date)))
+    if record.end_date:
+        triples.append(triple(s, iri('healthRecord_endDate'), date_literal(record.end_date)))
+    if record.created_at:
+        triples.append(triple(s, iri('healthRecordCreatedAt'), date_literal(record.created_at)))
+    if record.health_metric_id:
+        triples.append(triple(s, iri('containsMetric'), iri(f"HealthMetric_{record.health_metric_id}")))
+    return triples
+
+
+def habit_triples(habit):
+    """Triples for a Habit (see apps.habits.signals)"""
+    s = iri(f"Habit_{habit.habit_id}")
+    return [
+        triple(s, RDF_TYPE, iri('Habit')),
+        triple(s, RDF_TYPE, iri(HABIT_CLASSES.get(habit.habit_type, 'Habit'))),
+        triple(s, iri('habitId'), literal(habit.habit_id, 'integer')),
+        triple(s, iri('habit_name'), literal(habit.habit_name)),
+        triple(s, iri('habit_type'), literal(habit.habit_type)),
+        triple(iri(f"User_{habit.user_id}"), iri('hasHabit'), s),
+    ]
+
+
+def habit_log_triples(log):
+    """Triples for a HabitLog (see apps.habits.signals)"""
+    s = iri(f"HabitLog_{log.habit_log_id}")
+    triples = [
+        triple(s, RDF_TYPE, iri('HabitLog')),
+        triple(s, iri('habitLogId'), literal(log.habit_log_id, 'integer')),
+        triple(s, iri('start_date'), date_literal(log.start_date)),
+    ]
+    if log.end_date:
+        triples.append(triple(s, iri('end_date'), date_literal(log.end_date)))
+    if log.reminder_time:
+        triples.append(triple(s, iri('reminder_time'), date_literal(log.reminder_time)))
+    triples.append(triple(iri(f"Habit_{log.habit_id}"), iri('hasLog'), s))
+    return triples
+
+
+def defi_triples(defi):
+    """Triples for a Defi (see apps.defis.signals)"""
+    s = iri(f"Defi_{defi.defi_id}")
+    return [
+        triple(s, RDF_TYPE, iri('Defi')),
+        triple(s, iri('defi_name'), literal(defi.defi_name)),
+        triple(s, iri('defi_description'), literal(defi.defi_description)),
+        triple(s, iri('defi_id'), literal(defi.defi_id, 'integer')),
+    ]
+
+
+def participation_triples(participation, progress_value=None):
+    """Triples for a Participation and its progress value"""
+    s = iri(f"Participation_{participation.participation_id}")
+    triples = [
+        triple(s, RDF_TYPE, iri('Participation')),
+        triple(s, iri('participationId'), literal(participation.participation_id, 'integer')),
+        triple(s, iri('start_date'), date_literal(participation.start_date)),
+        triple(iri(f"User_{participation.user_id}"), iri('hasParticipation'), s),
+        triple(iri(f"Defi_{participation.defi_id}"), iri('hasParticipation'), s),
+    ]
+    if participation.end_date:
+        triples.append(triple(s, iri('end_Date'), date_literal(participation.end_date)))
+    if progress_value is not None:
+        triples.append(triple(s, iri('participationProgress_value'), literal(progress_value, 'integer')))
+    return triples
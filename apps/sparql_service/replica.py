@@ -0,0 +1,282 @@
+"""
+Local read replica of the triplestore
+With SPARQL_REPLICA_ENABLED, every process keeps an rdflib copy of the Fuseki
+dataset and SparqlClient.execute_query answers SELECT / ASK queries from it, so
+read traffic scales with the app nodes instead of going to a single Fuseki.
+
+- change feed: every update Fuseki accepted from SparqlClient (signals, bulk
+  endpoints, retry queue replay, AI updates) is appended to the sparql_changes
+  table and applied to the local copy; the other processes pick it up when
+  they poll the table (at most every SPARQL_REPLICA_POLL_SECONDS, before a
+  query);
+- full refresh: a background thread reloads the copy from a CONSTRUCT dump of
+  Fuseki every SPARQL_REPLICA_REFRESH_SECONDS (and as soon as the replica is
+  first used), which also catches writes made to Fuseki outside the app;
+- routing: only queries over the default graph are answered locally (no
+  FROM / GRAPH / SERVICE, no Jena property functions), and only while the copy
+  lags the feed by at most SPARQL_REPLICA_MAX_STALENESS seconds. Anything else
+  goes to Fuseki, as does every query until the first dump is loaded. While
+  the circuit breaker is open, a stale copy is preferred to no answer, except
+  for callers asking for max_staleness=0.
+
+Queries share the copy and run concurrently; applying feed changes waits for
+the queries in flight and holds new ones back. A full refresh builds a new
+graph and swaps it in. Feed ids skipped as rolled back are checked again on
+every poll until the next refresh, so a write whose transaction committed late
+is still applied.
+"""
+
+import functools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from rdflib import Graph, URIRef
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.parserutils import CompValue
+
+from apps.core.instrumentation import track
+
+from .breaker import OPEN, breaker
+from .models import SparqlChange
+
+logger = logging.getLogger(__name__)
+
+DUMP_QUERY = 'CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o }'
+LOCAL_FORMS = {'SelectQuery', 'AskQuery'}
+# Algebra nodes that reach outside the default graph
+REMOTE_NODES = {'DatasetClause', 'Graph', 'ServiceGraphPattern'}
+# Property functions only Fuseki implements (text:query, list:member, ...)
+JENA_NAMESPACES = ('http://jena.apache.org/', 'http://jena.hpl.hp.com/')
+# Largest run of missing feed ids remembered for a later check
+MAX_SKIPPED_IDS = 1000
+
+
+def _is_local(node):
+    if isinstance(node, CompValue):
+        if node.name in REMOTE_NODES:
+            return False
+        return all(_is_local(value) for value in node.values())
+    if isinstance(node, (list, tuple, set)):
+        return all(_is_local(value) for value in node)
+    if isinstance(node, URIRef):
+        return not node.startswith(JENA_NAMESPACES)
+    return True
+
+
+@functools.lru_cache(maxsize=256)
+def prepare(query):
+    """Parsed query if the replica can answer it, None otherwise"""
+    try:
+        prepared = prepareQuery(query)
+    except Exception:
+        return None  # valid for Fuseki perhaps, not for rdflib
+    if prepared.algebra.name not in LOCAL_FORMS or not _is_local(prepared.algebra):
+        return None
+    return prepared
+
+
+class SharedLock:
+    """Shared by readers, exclusive for one writer; waiting writers go first"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writing or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class ReadReplica:
+    """In-process copy of the Fuseki dataset; thread-safe"""
+
+    def __init__(self):
+        self.graph = None  # None until the first dump is loaded
+        self.position = 0  # id of the last feed change applied
+        self.synced_at = None  # monotonic time the copy was last caught up with the feed
+        self._gap_since = None
+        self._skipped = set()  # feed ids passed over as rolled back, checked again on each poll
+        self._lock = threading.RLock()  # replica state and feed application
+        self._graph_lock = SharedLock()  # queries (shared) against feed changes (exclusive)
+        self._refresher = None
+        self._wake = threading.Event()
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'SPARQL_REPLICA_ENABLED', False)
+
+    def lag(self):
+        """Seconds since the copy was last known to be current"""
+        return float('inf') if self.synced_at is None else time.monotonic() - self.synced_at
+
+    def query(self, query, max_staleness=None):
+        """SPARQL JSON results from the local copy, or None if the query must go to Fuseki"""
+        if not self.enabled:
+            return None
+        prepared = prepare(query)
+        if prepared is None:
+            return None
+        if max_staleness is None:
+            max_staleness = getattr(settings, 'SPARQL_REPLICA_MAX_STALENESS', 30.0)
+        with self._lock:
+            if self.graph is None:
+                self.start()
+                return None
+            if self.lag() > getattr(settings, 'SPARQL_REPLICA_POLL_SECONDS', 1.0):
+                try:
+                    self._catch_up()
+                except Exception as e:
+                    logger.warning(f"Replica could not read the change feed: {str(e)}")
+            graph = self.graph
+            if graph is None or (self.lag() > max_staleness and (max_staleness <= 0 or breaker.state != OPEN)):
+                return None
+        try:
+            with self._graph_lock.read(), track('rdf', query):
+                result = graph.query(prepared)
+                return json.loads(result.serialize(format='json'))
+        except Exception as e:
+            logger.warning(f"Replica could not answer the query, using Fuseki: {str(e)}")
+            return None
+
+    def record(self, update):
+        """Publish an update Fuseki accepted on the change feed, and apply it locally"""
+        if not self.enabled:
+            return
+        SparqlChange.objects.create(update=update)
+        with self._lock:
+            if self.graph is not None:
+                self._catch_up()
+
+    def refresh(self):
+        """Reload the copy from a Fuseki dump, then apply the feed from where the dump started"""
+        # Updates reach Fuseki before their feed row is written, so the dump
+        # holds every change up to `position`; later ones may be applied twice,
+        # which is harmless for INSERT DATA / DELETE DATA.
+        position = SparqlChange.objects.aggregate(last=Max('id'))['last'] or 0
+        with breaker.guard('query'), track('sparql', DUMP_QUERY):
+            response = requests.post(
+                settings.FUSEKI_ENDPOINT, data={'query': DUMP_QUERY},
+                headers={'Accept': 'application/n-triples'},
+                timeout=getattr(settings, 'SPARQL_REPLICA_DUMP_TIMEOUT', 300),
+            )
+            response.raise_for_status()
+        graph = Graph()
+        graph.parse(data=response.content, format='nt')
+        with self._lock:
+            # The dump holds every change numbered up to `position`, committed or not yet
+            self.graph, self.position, self.synced_at, self._gap_since = graph, position, None, None
+            self._skipped = set()
+            self._catch_up()
+        retention = getattr(settings, 'SPARQL_REPLICA_FEED_RETENTION', 86400)
+        SparqlChange.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=retention)).delete()
+        logger.info(f"Replica loaded: {len(graph)} triples, feed position {self.position}")
+
+    def start(self):
+        """Start the background refresh thread (first load, then every SPARQL_REPLICA_REFRESH_SECONDS)"""
+        with self._lock:
+            if self._refresher is None or not self._refresher.is_alive():
+                self._refresher = threading.Thread(target=self._refresh_loop, name='sparql-replica', daemon=True)
+                self._refresher.start()
+
+    def _catch_up(self):
+        """Apply the feed changes this copy has not seen yet, in id order (lock held)"""
+        if self._skipped and self.graph is not None:
+            late = SparqlChange.objects.filter(id__in=self._skipped).order_by('id').values_list('id', 'update')
+            for change_id, update in late:
+                logger.info(f"Replica applying feed change {change_id} committed after it was skipped")
+                if not self._apply(change_id, update):
+                    return
+                self._skipped.discard(change_id)
+        batch = getattr(settings, 'SPARQL_REPLICA_FEED_BATCH', 500)
+        while self.graph is not None:
+            changes = list(
+                SparqlChange.objects.filter(id__gt=self.position).order_by('id').values_list('id', 'update')[:batch]
+            )
+            for change_id, update in changes:
+                if change_id != self.position + 1:
+                    if not self._skip_gap():
+                        return  # an earlier change may still be committed: wait for it
+                    if change_id - self.position - 1 <= MAX_SKIPPED_IDS:
+                        self._skipped.update(range(self.position + 1, change_id))
+                    else:
+                        logger.warning(
+                            f"Replica skipped feed ids {self.position + 1}-{change_id - 1} without tracking them"
+                        )
+                if not self._apply(change_id, update):
+                    return
+                self.position, self._gap_since = change_id, None
+            if len(changes) < batch:
+                self.synced_at = time.monotonic()
+                return
+
+    def _apply(self, change_id, update):
+        """Apply one feed change to the copy; on failure drop the copy until reloaded (lock held)"""
+        try:
+            with self._graph_lock.write():
+                self.graph.update(update)
+        except Exception as e:
+            # The copy no longer matches Fuseki: stop serving until reloaded
+            logger.error(f"Replica could not apply change {change_id}, reloading: {str(e)}")
+            self.graph = None
+            self._wake.set()
+            return False
+        return True
+
+    def _skip_gap(self):
+        """Whether a missing feed id is old enough to be a rolled-back write (or a late commit)"""
+        now = time.monotonic()
+        if self._gap_since is None:
+            self._gap_since = now
+        return now - self._gap_since >= getattr(settings, 'SPARQL_REPLICA_GAP_SECONDS', 10.0)
+
+    def _refresh_loop(self):
+        while True:
+            interval = getattr(settings, 'SPARQL_REPLICA_REFRESH_SECONDS', 3600.0)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Replica refresh failed: {str(e)}")
+                interval = min(interval, getattr(settings, 'SPARQL_BREAKER_PROBE_INTERVAL', 5.0) or 5.0)
+            finally:
+                connection.close()
+            self._wake.wait(interval)
+            self._wake.clear()
+
+
+replica = ReadReplica()
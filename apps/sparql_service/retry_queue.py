@@ -0,0 +1,147 @@
+"""
+Retry queue for Fuseki writes
+Writes of the sync signal handlers and bulk endpoints (SparqlClient with
+queue_writes=True) are stored in the pending_sparql_updates table instead of
+being lost when Fuseki is down: straight away while the circuit breaker is
+open, or after a transport failure. The row is written in the caller's
+transaction, so an update whose Django change is rolled back is never
+replayed.
+
+replay() sends the queued updates in order. It runs in a background thread
+once the breaker's probe finds Fuseki reachable again, and from the
+replay_sparql_updates command (e.g. after a restart). While the table holds
+updates, new writes of every process are queued behind them so that Fuseki
+receives them in order; each process checks the table at most every
+SPARQL_RETRY_PENDING_TTL seconds. A replay claims the oldest batch for
+SPARQL_RETRY_CLAIM_SECONDS in a short transaction, sends it outside of any
+transaction and then deletes the sent rows: two processes never send batches
+concurrently or out of order, and no database lock is held while Fuseki is
+called. A batch claimed by a process that died is taken over once its claim
+expires (its updates may then reach Fuseki twice).
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.core.metrics import SPARQL_QUEUED_UPDATES
+
+from .breaker import CircuitOpenError, breaker, is_transport_error
+from .models import PendingSparqlUpdate
+
+logger = logging.getLogger(__name__)
+
+_pending = {}  # last answer of has_pending(): {'known': bool, 'at': monotonic time}
+_replayer = None
+_replayer_lock = threading.Lock()
+
+
+def enqueue(update, reason):
+    PendingSparqlUpdate.objects.create(update=update, reason=reason)
+    SPARQL_QUEUED_UPDATES.inc(reason=reason)
+    _remember(True)
+    # Probe (and replay) once the row is visible to other connections
+    transaction.on_commit(breaker.watch)
+
+
+def _remember(known):
+    _pending.update(known=known, at=time.monotonic())
+
+
+def has_pending():
+    """Whether the queue (shared by every process) holds updates, cached for SPARQL_RETRY_PENDING_TTL"""
+    at = _pending.get('at')
+    if at is None or time.monotonic() - at >= getattr(settings, 'SPARQL_RETRY_PENDING_TTL', 0.5):
+        _remember(PendingSparqlUpdate.objects.exists())
+    return _pending['known']
+
+
+def _claim_batch(size):
+    """
+    Claim the oldest `size` queued updates for SPARQL_RETRY_CLAIM_SECONDS;
+    None if another process is replaying them (it holds the oldest row)
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(PendingSparqlUpdate.objects.select_for_update(skip_locked=True).order_by('id')[:size])
+        oldest = PendingSparqlUpdate.objects.order_by('id').values_list('id', flat=True).first()
+        if batch and (batch[0].id != oldest or (batch[0].claimed_until and batch[0].claimed_until > now)):
+            return None
+        claim = getattr(settings, 'SPARQL_RETRY_CLAIM_SECONDS', 300)
+        PendingSparqlUpdate.objects.filter(id__in=[item.id for item in batch]).update(
+            claimed_until=now + timedelta(seconds=claim)
+        )
+    return batch
+
+
+def _settle(done, failed=None, error='', released=()):
+    """Delete the sent (or dropped) updates, record the failure and release the rest of the batch"""
+    with transaction.atomic():
+        PendingSparqlUpdate.objects.filter(id__in=done).delete()
+        if failed is not None:
+            PendingSparqlUpdate.objects.filter(id=failed).update(
+                attempts=F('attempts') + 1, last_error=error[:2000], claimed_until=None
+            )
+        PendingSparqlUpdate.objects.filter(id__in=released).update(claimed_until=None)
+
+
+def replay():
+    """
+    Send the queued updates to Fuseki in order, stopping at the first
+    transport failure; updates Fuseki rejects are dropped (and logged).
+    Returns (sent, remaining).
+    """
+    from .client import SparqlClient
+
+    client = SparqlClient()
+    batch = getattr(settings, 'SPARQL_RETRY_BATCH', 100)
+    sent = 0
+    while True:
+        pending = _claim_batch(batch)
+        if pending is None:
+            return sent, PendingSparqlUpdate.objects.count()
+        if not pending:
+            _remember(False)
+            return sent, 0
+        done = []
+        for position, item in enumerate(pending):
+            try:
+                client.execute_update(item.update, infer=False)  # stored with its implied types
+            except Exception as e:
+                if isinstance(e, CircuitOpenError) or is_transport_error(e):
+                    _settle(done, item.id, str(e), [later.id for later in pending[position + 1:]])
+                    return sent, PendingSparqlUpdate.objects.count()
+                logger.error(f"Dropping queued SPARQL update {item.id} rejected by Fuseki: {str(e)}")
+            else:
+                sent += 1
+            done.append(item.id)
+        _settle(done)
+
+
+def _replay_in_thread():
+    try:
+        sent, remaining = replay()
+        if sent or remaining:
+            logger.info(f"Replayed {sent} queued SPARQL updates ({remaining} remaining)")
+    except Exception as e:
+        logger.error(f"Failed to replay queued SPARQL updates: {str(e)}")
+    finally:
+        connection.close()
+
+
+def schedule_replay():
+    """Replay the queue in a background thread, unless one is already running"""
+    global _replayer
+    with _replayer_lock:
+        if _replayer is None or not _replayer.is_alive():
+            _replayer = threading.Thread(target=_replay_in_thread, name='sparql-replay', daemon=True)
+            _replayer.start()
+
+
+breaker.on_recover.append(schedule_replay)
@@ -0,0 +1,231 @@
+import time
+import urllib.error
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
+from rdflib import Graph
+from . import inference, retry_queue
+from .breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, breaker
+from .client import SparqlClient
+from .models import PendingSparqlUpdate, SparqlChange
+from .replica import prepare, replica
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    """Test cases for the Fuseki circuit breaker states"""
+    
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(window=30, min_calls=4, failure_rate=0.5, reset_seconds=10, clock=self.clock)
+        self.recovered = []
+        self.breaker.on_recover.append(lambda: self.recovered.append(True))
+    
+    def fail(self, exc=None):
+        with self.assertRaises(Exception):
+            with self.breaker.guard('query'):
+                raise exc or urllib.error.URLError('Connection refused')
+    
+    def test_opens_on_failure_rate(self):
+        """Test the circuit opens once enough recent calls failed, and refuses calls while open"""
+        with self.breaker.guard('query'):
+            pass
+        self.fail()
+        self.fail()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.fail()
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            with self.breaker.guard('query'):
+                pass
+    
+    def test_old_and_query_errors_do_not_count(self):
+        """Test failures outside the window and malformed queries don't open the circuit"""
+        self.fail()
+        self.fail()
+        self.clock.now += 31
+        self.fail()
+        self.fail(ValueError('QueryBadFormed'))
+        self.fail(ValueError('QueryBadFormed'))
+        self.assertEqual(self.breaker.state, CLOSED)
+    
+    def test_half_open_trial(self):
+        """Test one trial call after the reset delay: failure reopens, success closes"""
+        for _ in range(4):
+            self.fail()
+        self.clock.now += 10
+        self.fail()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.recovered, [True])
+
+
+class RetryQueueTest(TestCase):
+    """Test cases for writes queued while the circuit is open"""
+    
+    def setUp(self):
+        retry_queue._pending.clear()
+        for _ in range(breaker.min_calls):
+            breaker.record(True)
+        self.assertEqual(breaker.state, OPEN)
+    
+    def tearDown(self):
+        breaker.reset()
+        retry_queue._pending.clear()
+    
+    def test_open_circuit_short_circuits_reads_and_queues_writes(self):
+        """Test reads fail fast and signal writes are queued, in order, then kept by a failed replay"""
+        with self.assertRaises(CircuitOpenError):
+            SparqlClient().execute_query('SELECT * WHERE { ?s ?p ?o }')
+        with self.assertRaises(CircuitOpenError):
+            SparqlClient().execute_update('INSERT DATA { <urn:a> <urn:b> <urn:c> }')
+        
+        client = SparqlClient(queue_writes=True)
+        self.assertTrue(client.execute_update('INSERT DATA { <urn:a> <urn:b> 1 }'))
+        self.assertTrue(client.execute_update('DELETE DATA { <urn:a> <urn:b> 1 }'))
+        queued = list(PendingSparqlUpdate.objects.values_list('reason', 'update'))
+        self.assertEqual([reason for reason, _ in queued], ['open', 'backlog'])
+        self.assertTrue(queued[0][1].startswith('INSERT'))
+        
+        self.assertEqual(retry_queue.replay(), (0, 2))
+        self.assertEqual(PendingSparqlUpdate.objects.first().attempts, 1)
+    
+    def test_updates_queued_by_another_process_are_seen(self):
+        """Test a fresh process queues its writes behind rows already in the table"""
+        breaker.reset()
+        PendingSparqlUpdate.objects.create(update='INSERT DATA { <urn:a> <urn:b> 1 }', reason='failure')
+        self.assertTrue(retry_queue.has_pending())
+        self.assertTrue(SparqlClient(queue_writes=True).execute_update('INSERT DATA { <urn:a> <urn:b> 2 }'))
+        self.assertEqual(list(PendingSparqlUpdate.objects.values_list('reason', flat=True)), ['failure', 'backlog'])
+    
+    def test_replay_sends_a_claimed_batch_outside_the_transaction(self):
+        """Test a replay claims its batch, so a concurrent replay backs off, and deletes what it sent"""
+        breaker.reset()
+        for value in (1, 2):
+            PendingSparqlUpdate.objects.create(update=f'INSERT DATA {{ <urn:a> <urn:b> {value} }}', reason='failure')
+        concurrent = []
+        
+        def send(client, update, infer=True):
+            self.assertIsNotNone(PendingSparqlUpdate.objects.first().claimed_until)
+            concurrent.append(retry_queue.replay())
+            return True
+        
+        with mock.patch.object(SparqlClient, 'execute_update', send):
+            self.assertEqual(retry_queue.replay(), (2, 0))
+        self.assertEqual(concurrent, [(0, 2), (0, 2)])
+        self.assertFalse(PendingSparqlUpdate.objects.exists())
+
+
+@override_settings(SPARQL_REPLICA_ENABLED=True, SPARQL_REPLICA_POLL_SECONDS=0)
+class ReadReplicaTest(TestCase):
+    """Test cases for SELECT queries answered by the local replica"""
+    
+    def setUp(self):
+        breaker.reset()  # earlier tests may have opened it (no Fuseki here)
+        replica.graph = Graph()
+        replica.graph.update('INSERT DATA { <urn:meal:1> a <urn:Meal> }')
+        replica.position = 0
+        replica.synced_at = time.monotonic()
+    
+    def tearDown(self):
+        replica.graph, replica.position, replica.synced_at = None, 0, None
+        replica._gap_since, replica._skipped = None, set()
+    
+    def test_queries_follow_the_change_feed(self):
+        """Test changes recorded here or by another process are visible without calling Fuseki"""
+        replica.record('INSERT DATA { <urn:meal:2> a <urn:Meal> }')
+        SparqlChange.objects.create(update='DELETE DATA { <urn:meal:1> a <urn:Meal> }')
+        
+        results = SparqlClient().execute_query('SELECT ?meal WHERE { ?meal a <urn:Meal> }')
+        meals = [row['meal']['value'] for row in results['results']['bindings']]
+        self.assertEqual(meals, ['urn:meal:2'])
+        self.assertTrue(SparqlClient().execute_query('ASK { <urn:meal:2> a <urn:Meal> }')['boolean'])
+        self.assertEqual(replica.position, SparqlChange.objects.latest('id').id)
+    
+    def test_routing(self):
+        """Test named graphs, federation, updates and stale reads are left to Fuseki"""
+        self.assertIsNone(prepare('SELECT ?s WHERE { GRAPH ?g { ?s ?p ?o } }'))
+        self.assertIsNone(prepare('SELECT ?s WHERE { SERVICE <http://example.org/sparql> { ?s ?p ?o } }'))
+        self.assertIsNone(prepare('SELECT ?s FROM <http://example.org/g> WHERE { ?s ?p ?o }'))
+        self.assertIsNone(prepare('CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o }'))
+        self.assertIsNone(replica.query('SELECT ?s WHERE { ?s ?p ?o }', max_staleness=0))
+        self.assertIsNotNone(replica.query('SELECT ?s WHERE { ?s ?p ?o }'))
+        
+        # A stale copy stands in for an unreachable Fuseki, but never for a fresh read
+        for _ in range(breaker.min_calls):
+            breaker.record(True)
+        replica.synced_at = time.monotonic() - 3600
+        with self.settings(SPARQL_REPLICA_POLL_SECONDS=7200):
+            self.assertIsNotNone(replica.query('SELECT ?s WHERE { ?s ?p ?o }'))
+            self.assertIsNone(replica.query('SELECT ?s WHERE { ?s ?p ?o }', max_staleness=0))
+        breaker.reset()
+    
+    @override_settings(SPARQL_REPLICA_GAP_SECONDS=0)
+    def test_skipped_change_committed_late_is_applied(self):
+        """Test a feed id passed over as rolled back is applied once its row shows up"""
+        late = SparqlChange.objects.create(update='INSERT DATA { <urn:meal:late> a <urn:Meal> }')
+        SparqlChange.objects.filter(pk=late.pk).delete()  # not visible yet
+        replica.record('INSERT DATA { <urn:meal:2> a <urn:Meal> }')
+        self.assertFalse(SparqlClient().execute_query('ASK { <urn:meal:late> a <urn:Meal> }')['boolean'])
+        
+        SparqlChange.objects.create(id=late.pk, update=late.update)
+        self.assertTrue(SparqlClient().execute_query('ASK { <urn:meal:late> a <urn:Meal> }')['boolean'])
+
+
+class SubclassInferenceTest(SimpleTestCase):
+    """Test cases for the materialized rdfs:subClassOf types"""
+    
+    PREFIX = 'PREFIX sh: <http://dhia.org/ontologies/smarthealth#>\n'
+    MEALS = PREFIX + 'SELECT ?meal WHERE { ?meal a sh:Meal }'
+    
+    def meals(self, graph):
+        return sorted(str(row.meal).split('#')[-1] for row in graph.query(self.MEALS))
+    
+    def test_types_follow_inserts_and_deletes(self):
+        """Test a subclass-typed resource matches its superclass until the subclass type is removed"""
+        graph = Graph()
+        graph.update(inference.materialize(
+            self.PREFIX + 'INSERT DATA { sh:Breakfast_pancakes a sh:Breakfast ; sh:name "pancakes" . sh:Lunch_salad a sh:Lunch }'
+        ))
+        self.assertEqual(self.meals(graph), ['Breakfast_pancakes', 'Lunch_salad'])
+        
+        graph.update(inference.materialize(
+            self.PREFIX + 'DELETE { ?m a sh:Lunch } INSERT { ?m a sh:Dinner } WHERE { ?m a sh:Lunch }'
+        ))
+        graph.update(inference.materialize(self.PREFIX + 'DELETE DATA { sh:Breakfast_pancakes a sh:Breakfast }'))
+        self.assertEqual(self.meals(graph), ['Lunch_salad'])
+    
+    def test_untouched_updates_and_ntriples(self):
+        """Test updates without subclasses are not rewritten, and N-Triples batches get the implied lines"""
+        update = self.PREFIX + 'DELETE WHERE { sh:Meal_1 ?p ?o }'
+        self.assertEqual(inference.materialize(update), update)
+        rdf_type = '<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>'
+        lines = [f'<urn:meal:1> {rdf_type} <http://dhia.org/ontologies/smarthealth#Snack> .']
+        self.assertEqual(
+            inference.implied_ntriples(lines),
+            [f'<urn:meal:1> {rdf_type} <http://dhia.org/ontologies/smarthealth#Meal> .'],
+        )
+    
+    def test_nutrients_and_intensities_gain_no_type(self):
+        """Test nutrient and intensity individuals are not typed as food items or activity logs"""
+        rdf_type = '<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>'
+        sh = 'http://dhia.org/ontologies/smarthealth#'
+        lines = [
+            f'<{sh}Calories_1> {rdf_type} <{sh}calories> .',
+            f'<{sh}ActivityLog_1_intensity> {rdf_type} <{sh}High> .',
+        ]
+        self.assertEqual(inference.implied_ntriples(lines), [])
+        update = self.PREFIX + 'INSERT DATA { sh:Calories_1 a sh:calories . sh:Log_1 a sh:Low }'
+        self.assertEqual(inference.materialize(update), update)
+        self.assertFalse(any('FoodItem' in u or 'ActivityLog' in u for u in inference.backfill_updates()))
@@ -0,0 +1,77 @@
+"""
+Dashboard counters
+Table sizes shown on the dashboard are kept in DashboardCounter rows, updated
+with F() expressions by post_save/post_delete signals (see signals.py) and
+periodically corrected with an exact COUNT(*) (manage.py recount_dashboard).
+Each counter is split over DASHBOARD_COUNTER_SHARDS rows (created by the
+users 0003 migration); a write updates one of them at random, so concurrent
+inserts do not all queue on the same row lock.
+"""
+
+import random
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import DashboardCounter
+
+# counter name -> model label
+COUNTED_MODELS = {
+    'users': 'users.User',
+    'activity_logs': 'activities.ActivityLog',
+    'meals': 'meals.Meal',
+    'health_records': 'health_records.HealthRecord',
+    'habit_logs': 'habits.HabitLog',
+    'participations': 'defis.Participation',
+}
+
+
+def counter_name_for(model):
+    """Counter name tracking `model`, or None"""
+    label = model._meta.label
+    for name, model_label in COUNTED_MODELS.items():
+        if model_label == label:
+            return name
+    return None
+
+
+def _shards():
+    return max(getattr(settings, 'DASHBOARD_COUNTER_SHARDS', 8), 1)
+
+
+def increment(name, delta=1):
+    """Add `delta` to a random shard of a counter"""
+    shard = random.randrange(_shards())
+    if not DashboardCounter.objects.filter(name=name, shard=shard).update(value=F('value') + delta):
+        # Shard added since the migration (DASHBOARD_COUNTER_SHARDS raised)
+        DashboardCounter.objects.get_or_create(name=name, shard=shard)
+        DashboardCounter.objects.filter(name=name, shard=shard).update(value=F('value') + delta)
+
+
+def recount(names=None):
+    """Replace counters with exact COUNT(*) values (kept in shard 0)"""
+    now = timezone.now()
+    values = {}
+    for name in names or COUNTED_MODELS:
+        model = apps.get_model(COUNTED_MODELS[name])
+        with transaction.atomic():
+            # Lock the shards so that no increment lands between the count and the reset
+            list(DashboardCounter.objects.select_for_update().filter(name=name))
+            values[name] = model.objects.count()
+            DashboardCounter.objects.filter(name=name).exclude(shard=0).update(value=0, recounted_at=now)
+            DashboardCounter.objects.update_or_create(
+                name=name, shard=0, defaults={'value': values[name], 'recounted_at': now}
+            )
+    return values
+
+
+def get_counters():
+    """All counters in one query; counters never computed yet are recounted once"""
+    values = dict(DashboardCounter.objects.values('name').annotate(total=Sum('value')).values_list('name', 'total'))
+    missing = [name for name in COUNTED_MODELS if name not in values]
+    if missing:
+        values.update(recount(missing))
+    return values
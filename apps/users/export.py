@@ -0,0 +1,198 @@
+"""
+Streaming export of everything a user recorded
+Each format is a generator of bytes chunks: rows are read with
+.iterator(chunk_size=EXPORT_CHUNK_SIZE) and encoded one at a time, so memory
+stays flat whatever the number of rows. Used by the export endpoint
+(StreamingHttpResponse) and by the export_user_data command.
+
+Formats:
+- ndjson: one JSON object per line, {"type": <section>, ...fields}; meals
+  carry their food items;
+- csv: one section (food items are their own section);
+- nt: the user's RDF subgraph as N-Triples, with the URIs of the Fuseki sync.
+"""
+
+import csv
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from apps.activities.models import ActivityLog
+from apps.defis.models import Participation
+from apps.habits.models import Habit, HabitLog
+from apps.health_records.models import HealthRecord
+from apps.meals.models import Meal, FoodItem
+from apps.sparql_service import ntriples
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'nt': ('application/n-triples', 'nt'),
+}
+BUFFER_SIZE = 64 * 1024
+
+MEAL_FIELDS = ('meal_id', 'meal_name', 'meal_type', 'total_calories', 'meal_date', 'created_at')
+FOOD_ITEM_FIELDS = (
+    'food_item_id', 'meal_id', 'food_item_name', 'food_item_description', 'food_type',
+    'calories_value', 'protein_value', 'carbs_value', 'fiber_value', 'sugar_value',
+)
+
+# section -> (queryset of the user's rows, exported columns)
+SECTIONS = {
+    'meals': (lambda user: Meal.objects.filter(user=user).order_by('meal_id'), MEAL_FIELDS),
+    'food_items': (
+        lambda user: FoodItem.objects.filter(meal__user=user).order_by('meal_id', 'food_item_id'),
+        FOOD_ITEM_FIELDS,
+    ),
+    'activity_logs': (
+        lambda user: ActivityLog.objects.filter(user=user).order_by('activity_log_id'),
+        ('activity_log_id', 'activity_id', 'activity__activity_name', 'date', 'duration', 'intensity'),
+    ),
+    'habits': (
+        lambda user: Habit.objects.filter(user=user).order_by('habit_id'),
+        ('habit_id', 'habit_name', 'habit_type', 'created_at'),
+    ),
+    'habit_logs': (
+        lambda user: HabitLog.objects.filter(habit__user=user).order_by('habit_log_id'),
+        ('habit_log_id', 'habit_id', 'start_date', 'end_date', 'reminder_time', 'created_at'),
+    ),
+    'health_records': (
+        lambda user: HealthRecord.objects.filter(user=user).order_by('health_record_id'),
+        (
+            'health_record_id', 'health_metric_id', 'health_metric__metric_name', 'health_metric__metric_unit',
+            'value', 'description', 'start_date', 'end_date', 'created_at',
+        ),
+    ),
+    'participations': (
+        lambda user: Participation.objects.filter(user=user).order_by('participation_id'),
+        ('participation_id', 'defi_id', 'defi__defi_name', 'progress__progress_value', 'start_date', 'end_date'),
+    ),
+}
+# NDJSON sections, in order (food items are nested in their meal)
+NDJSON_SECTIONS = ('meals', 'activity_logs', 'habits', 'habit_logs', 'health_records', 'participations')
+
+
+def chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def _rows(user, section):
+    queryset, fields = SECTIONS[section]
+    return queryset(user).values_list(*fields).iterator(chunk_size=chunk_size())
+
+
+def _buffered(pieces):
+    """Join small str pieces into bytes chunks of about BUFFER_SIZE"""
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def gzipped(chunks, level=6):
+    """Compress a stream of bytes chunks on the fly (gzip container)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# -- NDJSON ------------------------------------------------------------------
+
+def _ndjson_lines(user):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    meals = (
+        Meal.objects.filter(user=user).order_by('meal_id')
+        .prefetch_related('food_items').iterator(chunk_size=chunk_size())
+    )
+    for meal in meals:
+        row = {'type': 'meal', **{field: getattr(meal, field) for field in MEAL_FIELDS}}
+        row['food_items'] = [
+            {field: getattr(item, field) for field in FOOD_ITEM_FIELDS}
+            for item in meal.food_items.all()
+        ]
+        yield encoder.encode(row) + '\n'
+    for section in NDJSON_SECTIONS[1:]:
+        fields = SECTIONS[section][1]
+        kind = section[:-1]
+        for values in _rows(user, section):
+            yield encoder.encode({'type': kind, **dict(zip(fields, values))}) + '\n'
+
+
+def ndjson(user):
+    return _buffered(_ndjson_lines(user))
+
+
+# -- CSV ---------------------------------------------------------------------
+
+class _Echo:
+    """File-like object handing back what csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(user, section):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(SECTIONS[section][1])
+    for values in _rows(user, section):
+        yield writer.writerow(values)
+
+
+def csv_rows(user, section):
+    return _buffered(_csv_lines(user, section))
+
+
+# -- N-Triples ---------------------------------------------------------------
+
+def _triple_lines(user):
+    size = chunk_size()
+    yield from ntriples.user_triples(user)
+    for meal in Meal.objects.filter(user=user).prefetch_related('food_items').iterator(chunk_size=size):
+        yield from ntriples.meal_triples(meal)
+        for item in meal.food_items.all():
+            yield from ntriples.food_item_triples(item, item.nutrients)
+    for log in ActivityLog.objects.filter(user=user).iterator(chunk_size=size):
+        yield from ntriples.activity_log_triples(log)
+    for record in HealthRecord.objects.filter(user=user).iterator(chunk_size=size):
+        yield from ntriples.health_record_triples(record)
+    for habit in Habit.objects.filter(user=user).iterator(chunk_size=size):
+        yield from ntriples.habit_triples(habit)
+    for log in HabitLog.objects.filter(habit__user=user).iterator(chunk_size=size):
+        yield from ntriples.habit_log_triples(log)
+    participations = Participation.objects.filter(user=user).annotate(
+        progress_value=F('progress__progress_value')
+    )
+    for participation in participations.iterator(chunk_size=size):
+        yield from ntriples.participation_triples(participation, participation.progress_value)
+
+
+def rdf(user):
+    return _buffered(line + '\n' for line in _triple_lines(user))
+
+
+def stream(user, fmt='ndjson', section=None, compress=False):
+    """Bytes chunks of the export of `user` in format `fmt` (csv needs a section)"""
+    if fmt == 'ndjson':
+        chunks = ndjson(user)
+    elif fmt == 'csv':
+        chunks = csv_rows(user, section)
+    elif fmt == 'nt':
+        chunks = rdf(user)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return gzipped(chunks) if compress else chunks
+
+
+def filename(user, fmt, section=None, compress=False):
+    name = f"smarthealth-{user.username}-{section or 'all'}.{FORMATS[fmt][1]}"
+    return f"{name}.gz" if compress else name
@@ -0,0 +1,47 @@
+"""
+Commande Django pour exporter toutes les données d'un utilisateur
+Usage: python manage.py export_user_data <username> [--format ndjson|csv|nt] [--section meals] [--gzip] [--output fichier]
+Les lignes sont lues par paquets et écrites au fil de l'eau: la mémoire reste constante.
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.users import export
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = "Exporte les données d'un utilisateur en NDJSON, CSV ou N-Triples"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', type=str, help="Nom d'utilisateur")
+        parser.add_argument('--format', choices=list(export.FORMATS), default='ndjson', help='Format de sortie')
+        parser.add_argument('--section', choices=list(export.SECTIONS), help='Section à exporter (obligatoire en csv)')
+        parser.add_argument('--gzip', action='store_true', help='Compresser la sortie (gzip)')
+        parser.add_argument('--output', type=str, help='Fichier de sortie (par défaut: sortie standard)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Utilisateur introuvable: {options['username']}")
+        fmt, section = options['format'], options['section']
+        if fmt == 'csv' and section is None:
+            raise CommandError('Le format csv nécessite --section')
+
+        chunks = export.stream(user, fmt, section=section, compress=options['gzip'])
+        output = options['output']
+        written = 0
+        out = open(output, 'wb') if output else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if output:
+                out.close()
+            else:
+                out.flush()
+        if output:
+            self.stdout.write(self.style.SUCCESS(f'[DONE] {written} octets écrits dans {output}'))
@@ -0,0 +1,17 @@
+"""
+Commande Django pour recalculer exactement les compteurs du dashboard
+Usage: python manage.py recount_dashboard (à planifier, par ex. toutes les nuits via cron)
+"""
+
+from django.core.management.base import BaseCommand
+from apps.users.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs du dashboard avec un COUNT(*) exact'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('[START] Recalcul des compteurs...'))
+        for name, value in recount().items():
+            self.stdout.write(f'  [OK] {name}: {value}')
+        self.stdout.write(self.style.SUCCESS('[DONE] Compteurs a jour'))
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# counter name -> model label (as in apps.users.counters when this was written)
+COUNTED_MODELS = {
+    'users': 'users.User',
+    'activity_logs': 'activities.ActivityLog',
+    'meals': 'meals.Meal',
+    'health_records': 'health_records.HealthRecord',
+    'habit_logs': 'habits.HabitLog',
+    'participations': 'defis.Participation',
+}
+
+
+def create_counters(apps, schema_editor):
+    """All shards of every counter, the exact count in shard 0"""
+    DashboardCounter = apps.get_model('users', 'DashboardCounter')
+    shards = getattr(settings, 'DASHBOARD_COUNTER_SHARDS', 8)
+    now = timezone.now()
+    rows = []
+    for name, label in COUNTED_MODELS.items():
+        value = apps.get_model(label).objects.count()
+        rows.extend(
+            DashboardCounter(name=name, shard=shard, value=value if shard == 0 else 0, recounted_at=now)
+            for shard in range(shards)
+        )
+    DashboardCounter.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_dashboard_counter'),
+        ('activities', '0003_query_pattern_indexes'),
+        ('meals', '0004_packed_nutrients'),
+        ('health_records', '0013_metric_stats_and_anomalies'),
+        ('habits', '0002_keyset_indexes'),
+        ('defis', '0004_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='DashboardCounter',
+        ),
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('value', models.BigIntegerField(default=0)),
+                ('recounted_at', models.DateTimeField(blank=True, help_text='Last exact recount', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'dashboard_counters',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dashboardcounter',
+            constraint=models.UniqueConstraint(fields=('name', 'shard'), name='dashboard_counter_name_shard'),
+        ),
+        migrations.RunPython(create_counters, migrations.RunPython.noop),
+    ]
@@ -38,3 +38,24 @@ class Teacher(models.Model):
     
     def __str__(self):
         return f"Teacher: {self.user.username} - {self.matier}"
+
+
+class DashboardCounter(models.Model):
+    """
+    One shard of the row count of a large table, maintained incrementally for
+    the dashboard; the count is the sum of the shards of a name
+    """
+    name = models.CharField(max_length=50)
+    shard = models.PositiveSmallIntegerField(default=0)
+    value = models.BigIntegerField(default=0)
+    recounted_at = models.DateTimeField(null=True, blank=True, help_text="Last exact recount")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'dashboard_counters'
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'shard'], name='dashboard_counter_name_shard'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name}[{self.shard}]: {self.value}"
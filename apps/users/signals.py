@@ -0,0 +1,33 @@
+"""
+Signals maintaining the dashboard counters
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.apps import apps
+from .counters import COUNTED_MODELS, counter_name_for, increment
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def counter_on_save(sender, instance, created, raw=False, **kwargs):
+    """Increment the counter of a newly created row"""
+    if created and not raw:
+        try:
+            increment(counter_name_for(sender), 1)
+        except Exception as e:
+            logger.error(f"Failed to update dashboard counter for {sender.__name__}: {str(e)}")
+
+
+def counter_on_delete(sender, instance, **kwargs):
+    """Decrement the counter of a deleted row"""
+    try:
+        increment(counter_name_for(sender), -1)
+    except Exception as e:
+        logger.error(f"Failed to update dashboard counter for {sender.__name__}: {str(e)}")
+
+
+for label in COUNTED_MODELS.values():
+    model = apps.get_model(label)
+    post_save.connect(counter_on_save, sender=model, dispatch_uid=f'dashboard_counter_save_{label}')
+    post_delete.connect(counter_on_delete, sender=model, dispatch_uid=f'dashboard_counter_delete_{label}')
@@ -1,5 +1,6 @@
 from django.test import TestCase
-from .models import User, Student, Teacher
+from .models import User, Student, Teacher, DashboardCounter
+from .counters import get_counters
 
 
 class UserModelTest(TestCase):
@@ -21,3 +22,63 @@ class UserModelTest(TestCase):
     def test_user_str(self):
         """Test user string representation"""
         self.assertEqual(str(self.user), 'testuser')
+
+
+class DashboardCounterTest(TestCase):
+    """Test cases for incrementally maintained dashboard counters"""
+    
+    def test_counters_follow_creates_and_deletes(self):
+        """Test counters are updated by signals without recounting"""
+        User.objects.create_user(username='first', email='first@example.com', password='pw12345!')
+        self.assertEqual(get_counters()['users'], 1)
+        
+        second = User.objects.create_user(username='second', email='second@example.com', password='pw12345!')
+        self.assertEqual(sum(DashboardCounter.objects.filter(name='users').values_list('value', flat=True)), 2)
+        
+        second.delete()
+        self.assertEqual(get_counters()['users'], 1)
+
+
+class UserExportTest(TestCase):
+    """Test cases for the streaming data export"""
+    
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.meals.models import Meal, FoodItem
+        self.user = User.objects.create_user(username='exporter', email='exp@example.com', password='pw12345!')
+        now = timezone.now()
+        for i in range(3):
+            meal = Meal.objects.create(
+                user=self.user, meal_name=f'Repas {i}', meal_type='LUNCH',
+                total_calories=500, meal_date=now - timedelta(days=i),
+            )
+            FoodItem.objects.create(
+                meal=meal, food_item_name=f'Plat {i}', food_item_description='', food_type='PROTEIN', calories_value=200,
+            )
+        self.client.login(username='exporter', password='pw12345!')
+    
+    def _body(self, response):
+        return b''.join(response.streaming_content)
+    
+    def test_ndjson_export_nests_food_items(self):
+        """Test NDJSON export streams one line per meal with its food items"""
+        import json
+        response = self.client.get('/api/users/export/')
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in self._body(response).decode().splitlines()]
+        self.assertEqual([line['type'] for line in lines], ['meal'] * 3)
+        self.assertEqual(lines[0]['food_items'][0]['food_item_name'], 'Plat 0')
+    
+    def test_gzipped_csv_and_ntriples(self):
+        """Test CSV sections are compressed on the fly and RDF is N-Triples"""
+        import gzip
+        response = self.client.get('/api/users/export/', {'format': 'csv', 'section': 'food_items', 'gzip': '1'})
+        rows = gzip.decompress(self._body(response)).decode().splitlines()
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(rows[0].startswith('food_item_id,meal_id'))
+        self.assertEqual(self.client.get('/api/users/export/', {'format': 'csv'}).status_code, 400)
+        
+        triples = self._body(self.client.get('/api/users/export/', {'format': 'nt'})).decode().splitlines()
+        self.assertTrue(all(line.endswith(' .') for line in triples))
+        self.assertTrue(any('hasFoodItem' in line for line in triples))
@@ -1,8 +1,8 @@
-# Empty URL patterns - to be implemented
 from django.urls import path
+from . import views
 
 app_name = 'users'
 
 urlpatterns = [
-    # Add URL patterns here
+    path('export/', views.export_view, name='export'),
 ]
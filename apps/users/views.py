@@ -3,6 +3,9 @@ from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
+from django.conf import settings
+from django.core.cache import cache
+from apps.core.metrics import record_cache
 from .models import User
 from rest_framework import viewsets
 
@@ -94,40 +97,54 @@ def logout_view(request):
     return redirect('home')
 
 
+def _cached_list(key, ttl, queryset_factory):
+    """Evaluate a small queryset and cache the resulting list for `ttl` seconds"""
+    rows = cache.get(key)
+    record_cache('dashboard', rows is not None)
+    if rows is None:
+        rows = list(queryset_factory())
+        cache.set(key, rows, ttl)
+    return rows
+
+
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def dashboard_view(request):
     """Admin dashboard view"""
     from apps.activities.models import ActivityLog
     from apps.meals.models import Meal
-    from apps.health_records.models import HealthRecord
-    from apps.habits.models import HabitLog
-    from apps.defis.models import Participation
+    from .counters import get_counters
+    
+    # Get statistics (maintained incrementally, see counters.py)
+    counters = get_counters()
     
-    # Get statistics
-    total_users = User.objects.count()
-    total_activities = ActivityLog.objects.count()
-    total_meals = Meal.objects.count()
-    total_records = HealthRecord.objects.count()
-    total_habits = HabitLog.objects.count()
-    total_participations = Participation.objects.count()
+    ttl = getattr(settings, 'DASHBOARD_RECENT_TTL', 30)
     
     # Recent users
-    recent_users = User.objects.order_by('-date_joined')[:5]
+    recent_users = _cached_list(
+        'dashboard:recent_users', ttl,
+        lambda: User.objects.order_by('-date_joined')[:5]
+    )
     
     # Recent activities
-    recent_activities = ActivityLog.objects.select_related('user', 'activity').order_by('-date')[:10]
+    recent_activities = _cached_list(
+        'dashboard:recent_activities', ttl,
+        lambda: ActivityLog.objects.select_related('user', 'activity').order_by('-date')[:10]
+    )
     
     # Recent meals
-    recent_meals = Meal.objects.select_related('user').order_by('-meal_date')[:10]
+    recent_meals = _cached_list(
+        'dashboard:recent_meals', ttl,
+        lambda: Meal.objects.select_related('user').order_by('-meal_date')[:10]
+    )
     
     context = {
-        'total_users': total_users,
-        'total_activities': total_activities,
-        'total_meals': total_meals,
-        'total_records': total_records,
-        'total_habits': total_habits,
-        'total_participations': total_participations,
+        'total_users': counters['users'],
+        'total_activities': counters['activity_logs'],
+        'total_meals': counters['meals'],
+        'total_records': counters['health_records'],
+        'total_habits': counters['habit_logs'],
+        'total_participations': counters['participations'],
         'recent_users': recent_users,
         'recent_activities': recent_activities,
         'recent_meals': recent_meals,
@@ -135,3 +152,35 @@ def dashboard_view(request):
     }
     
     return render(request, 'dashboard.html', context)
+
+
+@login_required
+def export_view(request):
+    """
+    Stream the user's data: ?format=ndjson|csv|nt, ?section=<name> (required
+    for csv), ?gzip=1; staff may export another user with ?user=<id>
+    """
+    from django.http import HttpResponseBadRequest, StreamingHttpResponse
+    from django.shortcuts import get_object_or_404
+    from . import export
+    
+    fmt = request.GET.get('format', 'ndjson')
+    section = request.GET.get('section') or None
+    compress = request.GET.get('gzip') in ('1', 'true', 'yes')
+    if fmt not in export.FORMATS:
+        return HttpResponseBadRequest(f"format must be one of: {', '.join(export.FORMATS)}")
+    if fmt == 'csv' and section not in export.SECTIONS:
+        return HttpResponseBadRequest(f"csv needs section=<{'|'.join(export.SECTIONS)}>")
+    
+    user = request.user
+    if request.user.is_staff and request.GET.get('user'):
+        user = get_object_or_404(User, pk=request.GET['user'])
+    
+    response = StreamingHttpResponse(
+        export.stream(user, fmt, section=section, compress=compress),
+        content_type='application/gzip' if compress else f'{export.FORMATS[fmt][0]}; charset=utf-8',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{export.filename(user, fmt, section if fmt == "csv" else None, compress)}"'
+    )
+    return response
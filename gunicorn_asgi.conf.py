@@ -0,0 +1,20 @@
+"""
+Gunicorn configuration for the ASGI deployment
+    gunicorn -c gunicorn_asgi.conf.py
+
+Uvicorn workers serve Smart_Health.asgi, which switches on the async views:
+a worker keeps serving other requests while it waits on Fuseki or Gemini,
+so a few workers per CPU are enough.
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = 'Smart_Health.asgi:application'
+worker_class = 'uvicorn.workers.UvicornWorker'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# Gemini calls can take up to ASYNC_HTTP_TIMEOUT seconds
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+keepalive = 5
+graceful_timeout = 30
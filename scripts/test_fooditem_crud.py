@@ -13,7 +13,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Smart_Health.settings')
 django.setup()
 
 from django.contrib.auth import get_user_model
-from apps.meals.models import Meal, FoodItem, Calories, Protein, Carbs, Fiber, Sugar
+from apps.meals.models import Meal, FoodItem
 from django.utils import timezone
 from datetime import timedelta
 
@@ -269,24 +269,19 @@ def create_test_data():
     for item_data in food_items_data:
         nutrition = item_data.pop('nutrition')
         
+        # Nutritional information is stored in the calories_value, protein_value... columns
         food_item, created = FoodItem.objects.get_or_create(
             meal=item_data['meal'],
             food_item_name=item_data['food_item_name'],
             defaults={
                 'food_item_description': item_data['food_item_description'],
                 'food_type': item_data['food_type'],
+                **{f'{name}_value': value for name, value in nutrition.items()},
             }
         )
         
         if created:
             created_count += 1
-            # Add nutritional information
-            Calories.objects.create(food_item=food_item, calories_value=nutrition['calories'])
-            Protein.objects.create(food_item=food_item, protein_value=nutrition['protein'])
-            Carbs.objects.create(food_item=food_item, carbs_value=nutrition['carbs'])
-            Fiber.objects.create(food_item=food_item, fiber_value=nutrition['fiber'])
-            Sugar.objects.create(food_item=food_item, sugar_value=nutrition['sugar'])
-            
             print(f"   ✅ Créé: {food_item.food_item_name} ({food_item.get_food_type_display()})")
         else:
             print(f"   ℹ️  Existe déjà: {food_item.food_item_name}")
@@ -303,11 +298,10 @@ def create_test_data():
     print(f"\n🍽️ Repas créés: {Meal.objects.count()}")
     print(f"🍳 Aliments créés: {FoodItem.objects.count()}")
     print(f"🔥 Entrées nutritionnelles:")
-    print(f"   - Calories: {Calories.objects.count()}")
-    print(f"   - Protéines: {Protein.objects.count()}")
-    print(f"   - Glucides: {Carbs.objects.count()}")
-    print(f"   - Fibres: {Fiber.objects.count()}")
-    print(f"   - Sucres: {Sugar.objects.count()}")
+    for label, name in (('Calories', 'calories'), ('Protéines', 'protein'), ('Glucides', 'carbs'),
+                        ('Fibres', 'fiber'), ('Sucres', 'sugar')):
+        count = FoodItem.objects.filter(**{f'{name}_value__isnull': False}).count()
+        print(f"   - {label}: {count}")
     
     print("\n" + "="*60)
     print("🎉 CONFIGURATION TERMINÉE!")